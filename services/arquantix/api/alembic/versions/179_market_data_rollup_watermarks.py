@@ -0,0 +1,50 @@
+"""Rollup incrémental des bougies 1h/4h/1d/1w depuis les barres 5m — watermarks par instrument."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "179"
+down_revision = "178"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_data_rollup_watermarks",
+        sa.Column(
+            "instrument_id",
+            sa.Integer(),
+            sa.ForeignKey("public.market_data_instruments.id"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column("target_timeframe", sa.String(10), primary_key=True, nullable=False),
+        sa.Column("base_timeframe", sa.String(10), nullable=False, server_default="5m"),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=True),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.text("now()"),
+        ),
+        schema="public",
+    )
+    # Les barres de base touchées depuis le watermark sont lues par (instrument_id, updated_at).
+    op.create_index(
+        "ix_market_data_bars_5m_instrument_updated_at",
+        "market_data_bars_5m",
+        ["instrument_id", "updated_at"],
+        unique=False,
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_market_data_bars_5m_instrument_updated_at",
+        table_name="market_data_bars_5m",
+        schema="public",
+    )
+    op.drop_table("market_data_rollup_watermarks", schema="public")
@@ -0,0 +1,40 @@
+"""File d'attente des backtests : progression, annulation, réutilisation par empreinte des paramètres."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "180"
+down_revision = "179"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("backtest_runs", sa.Column("params_hash", sa.String(64), nullable=True), schema="public")
+    op.add_column("backtest_runs", sa.Column("progress_done", sa.Integer(), nullable=True), schema="public")
+    op.add_column("backtest_runs", sa.Column("progress_total", sa.Integer(), nullable=True), schema="public")
+    op.add_column(
+        "backtest_runs",
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        schema="public",
+    )
+    op.add_column("backtest_runs", sa.Column("started_at", sa.DateTime(timezone=True), nullable=True), schema="public")
+    op.add_column("backtest_runs", sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True), schema="public")
+    op.create_index(
+        "ix_backtest_runs_params_hash",
+        "backtest_runs",
+        ["params_hash"],
+        unique=False,
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_backtest_runs_params_hash", table_name="backtest_runs", schema="public")
+    op.drop_column("backtest_runs", "finished_at", schema="public")
+    op.drop_column("backtest_runs", "started_at", schema="public")
+    op.drop_column("backtest_runs", "cancel_requested", schema="public")
+    op.drop_column("backtest_runs", "progress_total", schema="public")
+    op.drop_column("backtest_runs", "progress_done", schema="public")
+    op.drop_column("backtest_runs", "params_hash", schema="public")
@@ -0,0 +1,79 @@
+"""Balayage de paramètres des backtests : grille, métriques résumées par combinaison, top-k en runs complets."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "181"
+down_revision = "180"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backtest_sweeps",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column("name", sa.String(200), nullable=True),
+        sa.Column("created_by_email", sa.String(255), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True, server_default=sa.text("now()")),
+        sa.Column("start_date", sa.Date(), nullable=False),
+        sa.Column("end_date", sa.Date(), nullable=False),
+        sa.Column("rebalance", sa.String(20), nullable=False),
+        sa.Column("strategy_type", sa.String(50), nullable=False),
+        sa.Column("base_params_json", sa.JSON(), nullable=True),
+        sa.Column("grid_json", sa.JSON(), nullable=False),
+        sa.Column("fees_bps", sa.Numeric(10, 4), nullable=False, server_default="0.0"),
+        sa.Column("slippage_bps", sa.Numeric(10, 4), nullable=False, server_default="0.0"),
+        sa.Column("allow_weekend_trading", sa.String(10), nullable=False, server_default="true"),
+        sa.Column("instrument_ids_json", sa.JSON(), nullable=False),
+        sa.Column("bundle_id", sa.String(36), nullable=True),
+        sa.Column("rank_metric", sa.String(50), nullable=False, server_default="sharpe_ratio"),
+        sa.Column("rank_ascending", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+        sa.Column("top_k", sa.Integer(), nullable=False, server_default="5"),
+        sa.Column("status", sa.String(20), nullable=False, server_default="PENDING"),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("combinations_total", sa.Integer(), nullable=True),
+        sa.Column("combinations_done", sa.Integer(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        schema="public",
+    )
+    op.create_table(
+        "backtest_sweep_results",
+        sa.Column("id", sa.Integer(), primary_key=True, nullable=False),
+        sa.Column(
+            "sweep_id",
+            sa.Integer(),
+            sa.ForeignKey("public.backtest_sweeps.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("combo_index", sa.Integer(), nullable=False),
+        sa.Column("params_json", sa.JSON(), nullable=False),
+        sa.Column("metrics_json", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("elapsed_ms", sa.Integer(), nullable=True),
+        sa.Column("rank", sa.Integer(), nullable=True),
+        sa.Column(
+            "run_id",
+            sa.Integer(),
+            sa.ForeignKey("public.backtest_runs.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.UniqueConstraint("sweep_id", "combo_index", name="uq_backtest_sweep_results_sweep_combo"),
+        schema="public",
+    )
+    op.create_index(
+        "ix_backtest_sweep_results_sweep_rank",
+        "backtest_sweep_results",
+        ["sweep_id", "rank"],
+        unique=False,
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_backtest_sweep_results_sweep_rank", table_name="backtest_sweep_results", schema="public")
+    op.drop_table("backtest_sweep_results", schema="public")
+    op.drop_table("backtest_sweeps", schema="public")
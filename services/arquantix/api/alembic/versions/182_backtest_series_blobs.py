@@ -0,0 +1,33 @@
+"""Blob colonnaire des séries de backtest : un binaire compact par run, lu directement par /series et /compare."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "182"
+down_revision = "181"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "backtest_series_blobs",
+        sa.Column(
+            "run_id",
+            sa.Integer(),
+            sa.ForeignKey("public.backtest_runs.id", ondelete="CASCADE"),
+            primary_key=True,
+            nullable=False,
+        ),
+        sa.Column("format", sa.String(20), nullable=False),
+        sa.Column("n_dates", sa.Integer(), nullable=False),
+        sa.Column("n_instruments", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True, server_default=sa.text("now()")),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("backtest_series_blobs", schema="public")
@@ -0,0 +1,58 @@
+"""Snapshots de valorisation de flotte : table des runs (prix figés par cutoff) et unicité
+des snapshots planifiés par (portefeuille, as_of)."""
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "183"
+down_revision = "182"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pe_valuation_snapshot_runs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True, nullable=False),
+        sa.Column("as_of", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="running"),
+        sa.Column("portfolios_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("portfolios_done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("snapshots_written", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("prices", JSONB(astext_type=sa.Text()), nullable=False, server_default="{}"),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()")),
+        schema="public",
+    )
+    op.create_index(
+        "uq_pe_valuation_snapshot_runs_as_of",
+        "pe_valuation_snapshot_runs",
+        ["as_of"],
+        unique=True,
+        schema="public",
+    )
+    op.create_index(
+        "ix_pe_valuation_snapshot_runs_status",
+        "pe_valuation_snapshot_runs",
+        ["status"],
+        schema="public",
+    )
+    op.create_index(
+        "uq_pe_portfolio_valuations_scheduled_pf_ts",
+        "pe_portfolio_valuations",
+        ["portfolio_id", "valuation_timestamp"],
+        unique=True,
+        schema="public",
+        postgresql_where=sa.text("valuation_source = 'scheduled_snapshot'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_pe_portfolio_valuations_scheduled_pf_ts", table_name="pe_portfolio_valuations", schema="public")
+    op.drop_index("ix_pe_valuation_snapshot_runs_status", table_name="pe_valuation_snapshot_runs", schema="public")
+    op.drop_index("uq_pe_valuation_snapshot_runs_as_of", table_name="pe_valuation_snapshot_runs", schema="public")
+    op.drop_table("pe_valuation_snapshot_runs", schema="public")
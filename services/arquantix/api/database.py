@@ -17,7 +17,7 @@ def _safe_load_dotenv(path: Path) -> None:
 _safe_load_dotenv(api_dir / ".env.local")  # Priority: .env.local first
 _safe_load_dotenv(api_dir / ".env")  # Then .env
 
-from sqlalchemy import create_engine, Column, Integer, SmallInteger, String, Text, DateTime, JSON, Enum as SQLEnum, Date, Numeric, BigInteger, ForeignKey, Boolean, Index, UniqueConstraint, text, Float
+from sqlalchemy import create_engine, Column, Integer, SmallInteger, String, Text, DateTime, JSON, Enum as SQLEnum, Date, Numeric, BigInteger, ForeignKey, Boolean, Index, UniqueConstraint, text, Float, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, backref
 from sqlalchemy.sql import func
@@ -833,6 +833,18 @@ class MarketDataBar1w(Base):
     instrument = relationship("MarketDataInstrument", backref="bars_1w")
 
 
+class MarketDataRollupWatermark(Base):
+    """Rollup incrémental des bougies : dernier updated_at de barre de base (5m) agrégé par (instrument, timeframe cible)."""
+    __tablename__ = "market_data_rollup_watermarks"
+    __table_args__ = {"schema": "public"}
+
+    instrument_id = Column(Integer, ForeignKey("public.market_data_instruments.id"), primary_key=True, nullable=False)
+    target_timeframe = Column(String(10), primary_key=True, nullable=False)
+    base_timeframe = Column(String(10), nullable=False, server_default="5m")
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class MarketDataLatestQuote(Base):
     """Snapshot table: one row per instrument for latest quote (e.g. Binance ticker)."""
     __tablename__ = "market_data_latest_quotes"
@@ -915,8 +927,16 @@ class BacktestRun(Base):
     allow_weekend_trading = Column(String(10), nullable=False, server_default="true")  # "true" or "false" as string
     instrument_ids_json = Column(JSON, nullable=False)  # Array of instrument IDs
     bundle_id = Column(String(36), nullable=True)  # Optional bundle ID (stored as string, but can reference bundles.id)
-    status = Column(String(20), nullable=False, server_default="PENDING")  # "PENDING", "SUCCESS", "FAILED"
+    status = Column(String(20), nullable=False, server_default="PENDING")  # "PENDING", "RUNNING", "SUCCESS", "FAILED", "CANCELLED"
     error_message = Column(Text, nullable=True)
+    # Job queue (services/backtest/jobs.py): progress in dates processed, cooperative cancellation,
+    # reuse of a finished run with the same inputs (params_hash).
+    params_hash = Column(String(64), nullable=True, index=True)
+    progress_done = Column(Integer, nullable=True)
+    progress_total = Column(Integer, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, server_default=text("false"))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class BacktestPortfolioSeries(Base):
@@ -971,6 +991,77 @@ class BacktestMetrics(Base):
     instrument = relationship("MarketDataInstrument", backref="metrics")
 
 
+class BacktestSeriesBlob(Base):
+    """Columnar copy of a run's series (services/backtest/columnar.py), read by /series and /compare."""
+    __tablename__ = "backtest_series_blobs"
+    __table_args__ = (
+        {"schema": "public"},
+    )
+
+    run_id = Column(Integer, ForeignKey("public.backtest_runs.id", ondelete="CASCADE"), primary_key=True, nullable=False)
+    format = Column(String(20), nullable=False)  # "npz-v1"
+    n_dates = Column(Integer, nullable=False)
+    n_instruments = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
+
+
+class BacktestSweep(Base):
+    """Parameter sweep (services/backtest/sweep.py): one base request, a grid of strategy params."""
+    __tablename__ = "backtest_sweeps"
+    __table_args__ = (
+        {"schema": "public"},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(200), nullable=True)
+    created_by_email = Column(String(255), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    rebalance = Column(String(20), nullable=False)
+    strategy_type = Column(String(50), nullable=False)  # "CPPI", "CORE_SATELLITE", ...
+    base_params_json = Column(JSON, nullable=True)  # strategy params shared by every combination
+    grid_json = Column(JSON, nullable=False)  # param name -> list of values
+    fees_bps = Column(Numeric(10, 4), nullable=False, server_default="0.0")
+    slippage_bps = Column(Numeric(10, 4), nullable=False, server_default="0.0")
+    allow_weekend_trading = Column(String(10), nullable=False, server_default="true")  # "true" or "false" as string
+    instrument_ids_json = Column(JSON, nullable=False)
+    bundle_id = Column(String(36), nullable=True)
+    rank_metric = Column(String(50), nullable=False, server_default="sharpe_ratio")
+    rank_ascending = Column(Boolean, nullable=False, server_default=text("false"))
+    top_k = Column(Integer, nullable=False, server_default="5")  # combinations stored as full backtest runs
+    status = Column(String(20), nullable=False, server_default="PENDING")  # "PENDING", "RUNNING", "SUCCESS", "FAILED"
+    error_message = Column(Text, nullable=True)
+    combinations_total = Column(Integer, nullable=True)
+    combinations_done = Column(Integer, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BacktestSweepResult(Base):
+    """Summary metrics of one sweep combination; run_id points to the full run for the top-k."""
+    __tablename__ = "backtest_sweep_results"
+    __table_args__ = (
+        UniqueConstraint("sweep_id", "combo_index", name="uq_backtest_sweep_results_sweep_combo"),
+        Index("ix_backtest_sweep_results_sweep_rank", "sweep_id", "rank"),
+        {"schema": "public"},
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sweep_id = Column(Integer, ForeignKey("public.backtest_sweeps.id", ondelete="CASCADE"), nullable=False)
+    combo_index = Column(Integer, nullable=False)
+    params_json = Column(JSON, nullable=False)  # full strategy params of the combination
+    metrics_json = Column(JSON, nullable=True)  # portfolio metrics (total_return, sharpe_ratio, ...)
+    status = Column(String(20), nullable=False)  # "SUCCESS" or "FAILED"
+    error_message = Column(Text, nullable=True)
+    elapsed_ms = Column(Integer, nullable=True)
+    rank = Column(Integer, nullable=True)  # 1 = best by rank_metric
+    run_id = Column(Integer, ForeignKey("public.backtest_runs.id", ondelete="SET NULL"), nullable=True)
+
+    sweep = relationship("BacktestSweep", backref="results")
+
+
 class FieldDefinition(Base):
     __tablename__ = "field_definitions"
     __table_args__ = (
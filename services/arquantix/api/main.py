@@ -465,7 +465,7 @@ def create_app(testing: bool = False) -> FastAPI:
             init_dispatcher(SessionLocal)
 
             r = get_redis()
-            engine = init_alert_engine(r)
+            engine = init_alert_engine(r, SessionLocal)
             if engine is None:
                 return
             db = SessionLocal()
@@ -478,6 +478,42 @@ def create_app(testing: bool = False) -> FastAPI:
         _t3 = threading.Thread(target=_init_price_alert_engine, daemon=True)
         _t3.start()
 
+        # Quote bus : table de quotes en mémoire alimentée par l'ingester bookTicker (Redis pub/sub)
+        try:
+            from services.market_data.quote_bus import start_quote_bus_listener
+
+            if start_quote_bus_listener():
+                _log.info("Market data quote bus listener started")
+        except Exception as e:
+            _log.exception("Market data quote bus listener failed to start: %s", e)
+
+        # Cache chart-history : invalidations publiées par les jobs d'ingestion de barres
+        try:
+            from services.market_data.chart_history_cache import start_chart_cache_listener
+
+            if start_chart_cache_listener():
+                _log.info("Market data chart cache invalidation listener started")
+        except Exception as e:
+            _log.exception("Market data chart cache listener failed to start: %s", e)
+
+        # Outbox : réveil des workers par LISTEN/NOTIFY (le tick reste le filet de sécurité)
+        try:
+            from services.transaction_outbox.notify import start_outbox_wakeup_listener
+
+            if start_outbox_wakeup_listener():
+                _log.info("Transaction outbox LISTEN/NOTIFY listener started")
+        except Exception as e:
+            _log.exception("Transaction outbox listener failed to start: %s", e)
+
+        # Outbox : consumer multi-workers (ordre par scope person, commit par événement)
+        try:
+            from services.transaction_outbox.consumer import start_outbox_consumer
+
+            if start_outbox_consumer():
+                _log.info("Transaction outbox consumer started")
+        except Exception as e:
+            _log.exception("Transaction outbox consumer failed to start: %s", e)
+
     if not testing:
         from services.security.two_factor_config_guard import (
             TwoFactorConfigGuardError,
@@ -0,0 +1,103 @@
+"""
+Benchmark: backtest strategies on the NumPy engine (services/backtest/engine.py), on synthetic
+daily prices (random walks, every calendar day).
+
+Usage:
+  python scripts/bench_backtest_engine.py
+  python scripts/bench_backtest_engine.py --sizes 10 100 500 --years 10 --rounds 3
+  python scripts/bench_backtest_engine.py --sizes 50 --strategies core_satellite_daily
+
+Strategies timed per size:
+  weights_equal / weights_momentum  executor weight-schedule path (monthly rebalance)
+  cppi                              run_cppi_backtest (weekly rebalance)
+  core_satellite                    run_core_satellite_backtest (monthly rebalance)
+  core_satellite_daily              run_core_satellite_backtest (daily rebalance, shrinkage):
+                                    one optimizer run per date on rolling-window moments
+No database access. Prints one JSON document.
+Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backtest.executor import run_weight_strategy_backtest
+from services.backtest.strategies.core_satellite import run_core_satellite_backtest
+from services.backtest.strategies.cppi import run_cppi_backtest
+
+STRATEGIES = ("weights_equal", "weights_momentum", "cppi", "core_satellite", "core_satellite_daily")
+
+
+def _prices(n_instruments: int, years: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2014-01-01", periods=365 * years + years // 4, freq="D")
+    vol = rng.uniform(0.01, 0.05, n_instruments)
+    log_returns = rng.normal(0.0003, vol, (len(index), n_instruments))
+    values = 100.0 * np.exp(np.cumsum(log_returns, axis=0))
+    return pd.DataFrame(values, index=index, columns=list(range(1, n_instruments + 1)))
+
+
+def _runner(name: str, prices: pd.DataFrame):
+    ids = list(prices.columns)
+    calendar = [d.date() for d in prices.index]
+    start, end = calendar[0], calendar[-1]
+
+    if name in ("weights_equal", "weights_momentum"):
+        strategy_type = "equal_weight" if name == "weights_equal" else "momentum"
+        return lambda: run_weight_strategy_backtest(prices, ids, calendar, strategy_type, "monthly", 10.0, 5.0)
+    if name == "cppi":
+        weights = {i: 1.0 / len(ids) for i in ids}
+        return lambda: run_cppi_backtest(
+            prices_df=prices, weights_resolver=lambda d: weights, start_date=start, end_date=end,
+            initial_capital=100.0, rebalance_frequency="weekly", fees_bps=10.0, slippage_bps=5.0,
+        )
+    if name == "core_satellite_daily":
+        return lambda: run_core_satellite_backtest(
+            prices_df=prices, instrument_ids=ids, start_date=start, end_date=end, initial_capital=100.0,
+            rebalance_frequency="daily", fees_bps=10.0, slippage_bps=5.0, shrinkage=True,
+        )
+    return lambda: run_core_satellite_backtest(
+        prices_df=prices, instrument_ids=ids, start_date=start, end_date=end, initial_capital=100.0,
+        rebalance_frequency="monthly", fees_bps=10.0, slippage_bps=5.0,
+        top_k_satellite=min(len(ids), 20),
+    )
+
+
+def _time(fn, rounds: int) -> dict:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {"median_sec": round(statistics.median(samples), 4), "min_sec": round(min(samples), 4)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500], help="Instrument counts")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed runs per case (median reported)")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        prices = _prices(size, args.years)
+        for name in args.strategies:
+            row = {"instruments": size, "dates": len(prices), "strategy": name}
+            row["engine"] = _time(_runner(name, prices), args.rounds)
+            results.append(row)
+            print(json.dumps(row), file=sys.stderr)
+
+    print(json.dumps({"years": args.years, "rounds": args.rounds, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
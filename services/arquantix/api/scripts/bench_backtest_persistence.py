@@ -0,0 +1,222 @@
+"""
+Benchmark: backtest series persistence (services/backtest/repository.py) - write and read latency
+for one run, at realistic sizes (daily equal-weight backtest on synthetic prices).
+
+Usage:
+  python scripts/bench_backtest_persistence.py
+  python scripts/bench_backtest_persistence.py --sizes 10 50 200 --years 10 --rounds 3
+  python scripts/bench_backtest_persistence.py --no-db
+
+Write (one run: portfolio and instrument series):
+  orm_per_row     previous path, one ORM object per row (Decimal(str()) values)
+  insert_batches  multi-row INSERT ... VALUES batches (bulk_insert_rows without COPY)
+  copy            COPY FROM STDIN (default path for large runs on psycopg2)
+  blob            columnar blob (encode + upsert into backtest_series_blobs)
+Read (GET /{run_id}/series and POST /compare handlers, called directly):
+  series_rows / series_blob / series_columnar, compare_rows / compare_blob
+
+Everything runs inside one transaction that is rolled back at the end (temporary BENCH*
+instruments and runs are never committed). --no-db only times the in-memory steps
+(row building, blob encode / decode, response building). Prints one JSON document.
+Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backtest import repository
+from services.backtest.columnar import decode_series, encode_series, instrument_rows, portfolio_rows
+from services.backtest.executor import run_weight_strategy_backtest
+
+
+def _result(n_instruments: int, years: int, ids=None, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2014-01-01", periods=365 * years + years // 4, freq="D")
+    values = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (len(index), n_instruments)), axis=0))
+    ids = ids or list(range(1, n_instruments + 1))
+    prices = pd.DataFrame(values, index=index, columns=ids)
+    calendar = [d.date() for d in index]
+    return run_weight_strategy_backtest(prices, ids, calendar, "equal_weight", "daily", 10.0, 5.0)
+
+
+def _time(fn, rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return round(statistics.median(samples), 2)
+
+
+def _rows_count(result: dict) -> int:
+    return len(result["portfolio_series"]) + sum(len(s) for s in result["instrument_series"].values())
+
+
+def _bench_offline(size: int, years: int, rounds: int) -> dict:
+    result = _result(size, years)
+    blob = encode_series(result["portfolio_series"], result["instrument_series"])
+
+    def _decode_to_rows():
+        decoded = decode_series(blob)
+        portfolio_rows(decoded)
+        instrument_rows(decoded)
+
+    return {
+        "instruments": size,
+        "rows": _rows_count(result),
+        "blob_bytes": len(blob),
+        "build_rows_ms": _time(lambda: (
+            repository.portfolio_series_rows(1, result["portfolio_series"]),
+            repository.instrument_series_rows(1, result["instrument_series"]),
+        ), rounds),
+        "blob_encode_ms": _time(lambda: encode_series(result["portfolio_series"], result["instrument_series"]), rounds),
+        "blob_decode_to_rows_ms": _time(_decode_to_rows, rounds),
+        "blob_decode_nav_only_ms": _time(lambda: decode_series(blob, with_instruments=False, with_json=False), rounds),
+    }
+
+
+def _store_orm_per_row(db, run_id: int, result: dict) -> None:
+    """Previous implementation: one ORM object (and Decimal conversions) per row"""
+    from database import BacktestInstrumentSeries, BacktestPortfolioSeries
+
+    for item in result["portfolio_series"]:
+        db.add(BacktestPortfolioSeries(
+            run_id=run_id,
+            date=item["date"],
+            nav_base100=Decimal(str(item.get("nav_base100", 100.0))),
+            portfolio_return=Decimal(str(item.get("portfolio_return", 0.0))),
+            drawdown=Decimal(str(item.get("drawdown", 0.0))),
+            turnover=Decimal(str(item.get("turnover", 0.0))),
+            costs=Decimal(str(item.get("costs", 0.0))),
+            weights_json=repository.clean_json_numbers(item.get("weights_json")),
+            tradable_json=item.get("tradable_json"),
+        ))
+    for instrument_id, rows in result["instrument_series"].items():
+        for item in rows:
+            db.add(BacktestInstrumentSeries(
+                run_id=run_id,
+                instrument_id=instrument_id,
+                date=item["date"],
+                base100=Decimal(str(item.get("base100", 100.0))),
+                instrument_return=Decimal(str(item["instrument_return"])) if item.get("instrument_return") is not None else None,
+            ))
+    db.flush()
+
+
+def _bench_db(session, size: int, years: int, rounds: int) -> dict:
+    from database import BacktestRun, MarketDataInstrument
+    from services.backtest.routes import CompareBacktestsRequest, compare_backtests, get_backtest_series
+
+    instruments = [
+        MarketDataInstrument(symbol=f"BENCH{size}_{i}", asset_class="crypto", provider="binance")
+        for i in range(size)
+    ]
+    session.add_all(instruments)
+    session.flush()
+    result = _result(size, years, ids=[inst.id for inst in instruments])
+    dates = [item["date"] for item in result["portfolio_series"]]
+    runs = [
+        BacktestRun(
+            name=f"BENCH {size} #{k}", start_date=dates[0], end_date=dates[-1], rebalance="daily",
+            strategy_type="equal_weight", instrument_ids_json=[inst.id for inst in instruments], status="SUCCESS",
+        )
+        for k in range(2)
+    ]
+    session.add_all(runs)
+    session.flush()
+    run_id, other_id = runs[0].id, runs[1].id
+
+    def _write(fn):
+        samples = []
+        for _ in range(rounds):
+            nested = session.begin_nested()
+            start = time.perf_counter()
+            fn()
+            session.flush()
+            samples.append((time.perf_counter() - start) * 1000.0)
+            nested.rollback()
+        return round(statistics.median(samples), 2)
+
+    def _store_rows():
+        repository.store_portfolio_series(session, run_id, result["portfolio_series"], commit=False)
+        repository.store_instrument_series(session, run_id, result["instrument_series"], commit=False)
+
+    copy_min_rows = repository.BULK_COPY_MIN_ROWS
+    out = {"instruments": size, "rows": _rows_count(result)}
+    out["write_orm_per_row_ms"] = _write(lambda: _store_orm_per_row(session, run_id, result))
+    repository.BULK_COPY_MIN_ROWS = 10 ** 12
+    try:
+        out["write_insert_batches_ms"] = _write(_store_rows)
+    finally:
+        repository.BULK_COPY_MIN_ROWS = copy_min_rows
+    out["write_copy_ms"] = _write(_store_rows)
+    out["write_blob_ms"] = _write(lambda: repository.store_series_blob(
+        session, run_id, result["portfolio_series"], result["instrument_series"], commit=False,
+    ))
+
+    # Read: rows only (blobs removed in a savepoint), then the same runs with their blobs
+    for rid in (run_id, other_id):
+        repository.store_run_results(session, rid, result, commit=False)
+    compare = CompareBacktestsRequest(run_ids=[run_id, other_id])
+    nested = session.begin_nested()
+    session.execute(_delete_blobs_stmt([run_id, other_id]))
+    out["read_series_rows_ms"] = _time(lambda: get_backtest_series(run_id, format="rows", current_user=None, db=session), rounds)
+    out["read_compare_rows_ms"] = _time(lambda: compare_backtests(compare, current_user=None, db=session), rounds)
+    nested.rollback()
+    out["read_series_blob_ms"] = _time(lambda: get_backtest_series(run_id, format="rows", current_user=None, db=session), rounds)
+    out["read_series_columnar_ms"] = _time(lambda: get_backtest_series(run_id, format="columnar", current_user=None, db=session), rounds)
+    out["read_compare_blob_ms"] = _time(lambda: compare_backtests(compare, current_user=None, db=session), rounds)
+    out["write_speedup_copy"] = (
+        round(out["write_orm_per_row_ms"] / out["write_copy_ms"], 1) if out["write_copy_ms"] > 0 else None
+    )
+    return out
+
+
+def _delete_blobs_stmt(run_ids):
+    from sqlalchemy import delete
+
+    from database import BacktestSeriesBlob
+
+    return delete(BacktestSeriesBlob).where(BacktestSeriesBlob.run_id.in_(run_ids))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200], help="Instrument counts")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily bars")
+    parser.add_argument("--rounds", type=int, default=3, help="Timed runs per case (median reported)")
+    parser.add_argument("--no-db", action="store_true", help="Only time the in-memory steps")
+    args = parser.parse_args()
+    rounds = max(1, args.rounds)
+
+    results = [_bench_offline(size, args.years, rounds) for size in args.sizes]
+    if not args.no_db:
+        from services.portfolio_engine.clients.models import Client as _Client  # noqa: F401 — force mapper init
+        from database import SessionLocal, engine
+
+        connection = engine.connect()
+        trans = connection.begin()
+        session = SessionLocal(bind=connection)
+        try:
+            for row, size in zip(results, args.sizes):
+                row.update(_bench_db(session, size, args.years, rounds))
+                print(json.dumps(row), file=sys.stderr)
+        finally:
+            session.close()
+            trans.rollback()
+            connection.close()
+    print(json.dumps({"benchmark": "backtest_persistence", "years": args.years, "rounds": rounds, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark: per-row upsert_latest_quote loop vs single-statement bulk_upsert_latest_quotes
+(the bookTicker flush path of binance_ws_ingestion._flush_pending).
+
+Usage:
+  python scripts/bench_latest_quotes_upsert.py
+  python scripts/bench_latest_quotes_upsert.py --sizes 50 200 1000 --rounds 5
+
+Everything runs inside one transaction that is rolled back at the end (temporary BENCH*
+instruments and their quotes are never committed). Prints one JSON document.
+Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.portfolio_engine.clients.models import Client as _Client  # noqa: F401 — force mapper init
+from database import MarketDataInstrument, SessionLocal, engine
+from services.market_data.quotes_repo import bulk_upsert_latest_quotes, upsert_latest_quote
+
+
+def _rows(instrument_ids, tick: int):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "instrument_id": iid,
+            "provider": "binance",
+            "provider_symbol": f"BENCH{iid}USDT",
+            "last_price": 100.0 + tick + i * 0.01,
+            "bid_price": 99.9 + tick,
+            "ask_price": 100.1 + tick,
+            "volume": None,
+            "quote_time": now,
+        }
+        for i, iid in enumerate(instrument_ids)
+    ]
+
+
+def _bench_size(session, size: int, rounds: int) -> dict:
+    instruments = [
+        MarketDataInstrument(symbol=f"BENCH{size}_{i}", asset_class="crypto", provider="binance")
+        for i in range(size)
+    ]
+    session.add_all(instruments)
+    session.flush()
+    ids = [inst.id for inst in instruments]
+    # Steady state of the flush path: quotes already exist, each tick updates them.
+    bulk_upsert_latest_quotes(session, _rows(ids, -1))
+
+    per_row, bulk = [], []
+    for tick in range(rounds):
+        rows = _rows(ids, tick)
+        nested = session.begin_nested()
+        start = time.perf_counter()
+        for row in rows:
+            upsert_latest_quote(session, **row)
+        session.flush()
+        per_row.append((time.perf_counter() - start) * 1000.0)
+        nested.rollback()
+
+        nested = session.begin_nested()
+        start = time.perf_counter()
+        bulk_upsert_latest_quotes(session, rows)
+        bulk.append((time.perf_counter() - start) * 1000.0)
+        nested.rollback()
+
+    per_row_ms = statistics.median(per_row)
+    bulk_ms = statistics.median(bulk)
+    return {
+        "symbols": size,
+        "rounds": rounds,
+        "per_row_median_ms": round(per_row_ms, 2),
+        "bulk_median_ms": round(bulk_ms, 2),
+        "speedup": round(per_row_ms / bulk_ms, 1) if bulk_ms > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark latest-quote upsert: per-row loop vs bulk")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    trans = connection.begin()
+    session = SessionLocal(bind=connection)
+    try:
+        results = [_bench_size(session, size, max(1, args.rounds)) for size in args.sizes]
+    finally:
+        session.close()
+        trans.rollback()
+        connection.close()
+    print(json.dumps({"benchmark": "latest_quotes_upsert", "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Benchmark: per-position portfolio valuation (instrument, asset and quote lookup per
+position) vs set-based value_portfolios (fixed number of queries per chunk).
+
+Usage:
+  python scripts/bench_portfolio_valuation.py
+  python scripts/bench_portfolio_valuation.py --portfolios 10 100 --positions 20 --rounds 3
+
+Everything runs inside one transaction that is rolled back at the end (temporary BENCH*
+portfolios, instruments and quotes are never committed). Prints one JSON document.
+Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import event, func as sa_func
+
+from services.portfolio_engine.clients.models import Client as _Client  # noqa: F401 — force mapper init
+from database import MarketDataInstrument, SessionLocal, engine
+from services.market_data.quotes_repo import bulk_upsert_latest_quotes
+from services.portfolio_engine.assets.models import Asset
+from services.portfolio_engine.instruments.models import Instrument
+from services.portfolio_engine.portfolios.models import Portfolio
+from services.portfolio_engine.positions.models import PositionAtom
+from services.portfolio_engine.valuations.batch import value_portfolios
+from services.portfolio_engine.valuations.service import ValuationService
+
+
+class _QueryCounter:
+    def __init__(self, bind):
+        self.count = 0
+        event.listen(bind, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def _seed(session, portfolios: int, positions: int) -> list:
+    tag = uuid.uuid4().hex[:6]
+    md = [
+        MarketDataInstrument(symbol=f"BENCHVAL{tag}_{i}", asset_class="crypto", provider="binance")
+        for i in range(positions)
+    ]
+    session.add_all(md)
+    session.flush()
+    bulk_upsert_latest_quotes(session, [
+        {
+            "instrument_id": m.id,
+            "provider": "binance",
+            "provider_symbol": f"BENCHVAL{tag}{m.id}USDT",
+            "last_price": 100.0 + i,
+            "bid_price": 99.9 + i,
+            "ask_price": 100.1 + i,
+            "volume": None,
+            "quote_time": datetime.now(timezone.utc),
+        }
+        for i, m in enumerate(md)
+    ])
+
+    instruments = []
+    for i, m in enumerate(md):
+        asset = Asset(id=uuid.uuid4(), symbol=f"BV{tag}{i}", name=f"Bench {i}", asset_type="crypto", metadata_={})
+        instruments.append(Instrument(
+            id=uuid.uuid4(), asset_id=asset.id, code=f"BV{tag}{i}-SPOT", name=f"Bench {i} Spot",
+            instrument_type="spot", metadata_={"market_data_instrument_id": m.id},
+        ))
+        session.add(asset)
+    session.add_all(instruments)
+
+    ids = []
+    for p in range(portfolios):
+        pf = Portfolio(
+            id=uuid.uuid4(), client_id=uuid.uuid4(), portfolio_type="bundle_portfolio",
+            name=f"BENCH {tag} {p}", base_currency="EUR", status="active", metadata_={},
+        )
+        session.add(pf)
+        session.add_all(
+            PositionAtom(
+                id=uuid.uuid4(), portfolio_id=pf.id, instrument_id=inst.id, position_type="spot",
+                status="open", quantity=Decimal("1.5"), available_quantity=Decimal("1.5"),
+                average_entry_price=Decimal("90"), realized_pnl=Decimal("0"), metadata_={},
+            )
+            for inst in instruments
+        )
+        ids.append(pf.id)
+    session.flush()
+    return ids
+
+
+def _legacy_value(session, portfolio_ids) -> Decimal:
+    """Per-position path as it was before value_portfolios (same queries per position)."""
+    total = Decimal("0")
+    for pid in portfolio_ids:
+        session.query(Portfolio).filter(Portfolio.id == pid).first()
+        rows = (
+            session.query(PositionAtom)
+            .filter(PositionAtom.portfolio_id == pid, PositionAtom.status == "open")
+            .all()
+        )
+        for pos in rows:
+            ValuationService._resolve_instrument(session, pos.instrument_id)
+            price = ValuationService._position_price(session, pos)
+            if price is not None:
+                total += (price * pos.quantity).quantize(Decimal("0.01"))
+        session.query(sa_func.coalesce(sa_func.sum(PositionAtom.realized_pnl), 0)).filter(
+            PositionAtom.portfolio_id == pid
+        ).scalar()
+    return total
+
+
+def _timed(counter, fn) -> tuple[float, int, Decimal]:
+    before = counter.count
+    start = time.perf_counter()
+    nav = fn()
+    return (time.perf_counter() - start) * 1000.0, counter.count - before, nav
+
+
+def _bench(session, counter, portfolios: int, positions: int, rounds: int) -> dict:
+    ids = _seed(session, portfolios, positions)
+    session.expire_all()
+
+    legacy, batch = [], []
+    legacy_queries = batch_queries = 0
+    for _ in range(rounds):
+        ms, legacy_queries, legacy_nav = _timed(counter, lambda: _legacy_value(session, ids))
+        legacy.append(ms)
+        session.expire_all()
+        ms, batch_queries, batch_nav = _timed(
+            counter, lambda: sum((pf.nav for pf in value_portfolios(session, ids).values()), Decimal("0"))
+        )
+        batch.append(ms)
+        session.expire_all()
+        assert legacy_nav == batch_nav, (legacy_nav, batch_nav)
+
+    legacy_ms = statistics.median(legacy)
+    batch_ms = statistics.median(batch)
+    return {
+        "portfolios": portfolios,
+        "positions_per_portfolio": positions,
+        "rounds": rounds,
+        "per_position_median_ms": round(legacy_ms, 2),
+        "per_position_queries": legacy_queries,
+        "batch_median_ms": round(batch_ms, 2),
+        "batch_queries": batch_queries,
+        "speedup": round(legacy_ms / batch_ms, 1) if batch_ms > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark portfolio valuation: per-position vs set-based")
+    parser.add_argument("--portfolios", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    connection = engine.connect()
+    trans = connection.begin()
+    session = SessionLocal(bind=connection)
+    counter = _QueryCounter(connection)
+    try:
+        results = [
+            _bench(session, counter, n, max(1, args.positions), max(1, args.rounds))
+            for n in args.portfolios
+        ]
+    finally:
+        session.close()
+        trans.rollback()
+        connection.close()
+    print(json.dumps({"benchmark": "portfolio_valuation", "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,592 @@
+"""
+Benchmark: price alert engine (services/price_alerts) under load - N active alerts seeded in
+the Redis sorted sets, bookTicker batches replayed through PriceAlertEngine.on_price_batch.
+
+Usage:
+  python scripts/bench_price_alert_engine.py
+  python scripts/bench_price_alert_engine.py --alerts 1000000 --batches 2000 --buckets 1 4 16
+  python scripts/bench_price_alert_engine.py --replay ticks.jsonl --batch-symbols 20
+  python scripts/bench_price_alert_engine.py --redis-url redis://localhost:6379/15 --db-latency-ms 1
+
+Alerts: spread uniformly within +/- --spread-pct of the start price of each asset (direction
+from the side of the start price), price_source 80% mid / 10% bid / 10% ask, --recurring-share
+recurring alerts with a 60s cooldown. Only action_type='alert' (order execution runs on the
+OrderExecutor pool and has its own metrics); the notification dispatcher is not started.
+
+Stream: synthetic random walk (--tick-bps volatility per update, 1bp spread), every asset
+updated in every batch, or --replay of recorded Binance messages (JSON lines, combined stream
+{"stream": ..., "data": {...}} or raw bookTicker {"s", "b", "a"}), grouped into batches of
+--batch-symbols symbols like binance_ws_ingestion does before calling the engine.
+
+Per NUM_BUCKETS value (the cache module constant is patched, alerts re-seeded):
+  tick_to_trigger    batch arrival -> commit of the triggering transaction, per triggered alert
+  batch_latency      duration of on_price_batch per batch
+  redis_*_per_tick   Redis commands / round trips (a pipeline is one round trip) per symbol update
+  ticks_per_s        symbol updates processed per second
+
+The crossed alerts are claimed by the cache script (EVALSHA, emulated by the fake) unless
+--legacy-claim is given. Redis is an in-memory fake counting commands unless --redis-url is given (keys alerts:*,
+prices:* and notif_dedup:* of that database are deleted: use a dedicated database). The DB
+is an in-memory fake session; --db-latency-ms adds a sleep per query and per commit.
+Prints one JSON document. Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import bisect
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.sql import operators
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.price_alerts import cache
+from services.price_alerts import metrics as alert_metrics
+from services.price_alerts.engine import PriceAlertEngine
+
+DEFAULT_ASSETS = {
+    "BTC": 85000.0, "ETH": 3200.0, "SOL": 180.0, "BNB": 600.0, "XRP": 0.6,
+    "ADA": 0.45, "DOGE": 0.15, "AVAX": 35.0, "LINK": 18.0, "DOT": 7.0,
+}
+
+
+# ---------------------------------------------------------------------------
+# Redis: in-memory fake or counting proxy over a real client
+# ---------------------------------------------------------------------------
+
+class _CommandStats:
+    def __init__(self):
+        self.commands: Counter = Counter()
+        self.round_trips = 0
+
+    def reset(self) -> None:
+        self.commands.clear()
+        self.round_trips = 0
+
+
+class _SortedSet:
+    """member -> score, with parallel sorted score / member lists (rebuilt lazily after a bulk load)."""
+
+    def __init__(self):
+        self.scores: dict = {}
+        self._keys: list = []
+        self._members: list = []
+        self._dirty = False
+
+    def add(self, member: str, score: float) -> None:
+        if member in self.scores:
+            self.remove(member)
+        self.scores[member] = score
+        if self._dirty or not self._keys:
+            self._dirty = True  # bulk load: sorted once on the next read
+            return
+        i = bisect.bisect_right(self._keys, score)
+        self._keys.insert(i, score)
+        self._members.insert(i, member)
+
+    def remove(self, member: str) -> int:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return 0
+        if not self._dirty:
+            i = bisect.bisect_left(self._keys, score)
+            while i < len(self._keys) and self._members[i] != member:
+                i += 1
+            del self._keys[i]
+            del self._members[i]
+        return 1
+
+    def range(self, low: float, high: float) -> list:
+        if self._dirty:
+            ordered = sorted(self.scores.items(), key=lambda x: x[1])
+            self._members = [m for m, _ in ordered]
+            self._keys = [s for _, s in ordered]
+            self._dirty = False
+        lo = bisect.bisect_left(self._keys, low)
+        hi = bisect.bisect_right(self._keys, high)
+        return list(zip(self._members[lo:hi], self._keys[lo:hi]))
+
+    def pop_range(self, low: float, high: float) -> list:
+        pairs = self.range(low, high)
+        if pairs:
+            lo = bisect.bisect_left(self._keys, low)
+            del self._keys[lo:lo + len(pairs)]
+            del self._members[lo:lo + len(pairs)]
+            for member, _ in pairs:
+                del self.scores[member]
+        return pairs
+
+
+class FakeRedis:
+    """Subset of the redis-py API used by services/price_alerts (decode_responses=True)."""
+
+    def __init__(self, stats: _CommandStats):
+        self.stats = stats
+        self._strings: dict = {}
+        self._zsets: dict = {}
+
+    def _count(self, command: str, round_trip: bool = True) -> None:
+        self.stats.commands[command] += 1
+        if round_trip:
+            self.stats.round_trips += 1
+
+    def _zadd(self, key, mapping) -> None:
+        zset = self._zsets.setdefault(key, _SortedSet())
+        for member, score in mapping.items():
+            zset.add(member, float(score))
+
+    def _zrem(self, key, member) -> int:
+        zset = self._zsets.get(key)
+        return zset.remove(member) if zset is not None else 0
+
+    def _claim(self, sha, numkeys, key, low, high) -> list:
+        # cache._CLAIM_CROSSED_LUA: pop the members within [low, high], flat [member, score, ...]
+        zset = self._zsets.get(key)
+        pairs = zset.pop_range(float(low), float(high)) if zset is not None else []
+        return [x for member, score in pairs for x in (member, repr(score))]
+
+    def ping(self):
+        return True
+
+    def script_load(self, script):
+        self._count("script_load")
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        self._count("evalsha")
+        return self._claim(sha, numkeys, *keys_and_args)
+
+    def get(self, key):
+        self._count("get")
+        return self._strings.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        self._count("set")
+        if nx and key in self._strings:
+            return None
+        self._strings[key] = value
+        return True
+
+    def getset(self, key, value):
+        self._count("getset")
+        prev = self._strings.get(key)
+        self._strings[key] = value
+        return prev
+
+    def zadd(self, key, mapping):
+        self._count("zadd")
+        self._zadd(key, mapping)
+
+    def zrem(self, key, member):
+        self._count("zrem")
+        return self._zrem(key, member)
+
+    def zrangebyscore(self, key, min, max, withscores=False):
+        self._count("zrangebyscore")
+        zset = self._zsets.get(key)
+        pairs = zset.range(min, max) if zset is not None else []
+        return pairs if withscores else [m for m, _ in pairs]
+
+    def scan(self, cursor=0, match="*", count=None):
+        self._count("scan")
+        prefix = match.rstrip("*")
+        keys = [k for k in list(self._zsets) + list(self._strings) if k.startswith(prefix)]
+        return 0, keys
+
+    def delete(self, *keys):
+        self._count("del")
+        for key in keys:
+            self._zsets.pop(key, None)
+            self._strings.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self._redis = redis
+        self._ops: list = []
+
+    def zadd(self, key, mapping):
+        self._redis._count("zadd", round_trip=False)
+        self._ops.append((self._redis._zadd, key, mapping))
+
+    def zrem(self, key, member):
+        self._redis._count("zrem", round_trip=False)
+        self._ops.append((self._redis._zrem, key, member))
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        self._redis._count("evalsha", round_trip=False)
+        self._ops.append((self._redis._claim, sha, numkeys, *keys_and_args))
+
+    def execute(self):
+        self._redis.stats.round_trips += 1
+        ops, self._ops = self._ops, []
+        return [fn(*args) for fn, *args in ops]
+
+
+class CountingRedis:
+    """Real redis-py client; counts commands and round trips (pipelines included)."""
+
+    def __init__(self, client, stats: _CommandStats):
+        self._client = client
+        self.stats = stats
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def _call(*args, **kwargs):
+            self.stats.commands[name] += 1
+            self.stats.round_trips += 1
+            return attr(*args, **kwargs)
+        return _call
+
+    def pipeline(self, transaction=True):
+        return _CountingPipeline(self._client.pipeline(transaction=transaction), self.stats)
+
+
+class _CountingPipeline:
+    def __init__(self, pipe, stats: _CommandStats):
+        self._pipe = pipe
+        self._stats = stats
+
+    def __getattr__(self, name):
+        attr = getattr(self._pipe, name)
+        if name == "execute":
+            def _execute(*args, **kwargs):
+                self._stats.round_trips += 1
+                return attr(*args, **kwargs)
+            return _execute
+
+        def _queue(*args, **kwargs):
+            self._stats.commands[name] += 1
+            return attr(*args, **kwargs)
+        return _queue
+
+
+def _purge_redis(r) -> None:
+    for pattern in ("alerts:*", "prices:*", "notif_dedup:*"):
+        cursor = 0
+        while True:
+            cursor, keys = r.scan(cursor=cursor, match=pattern, count=1000)
+            if keys:
+                r.delete(*keys)
+            if cursor == 0:
+                break
+
+
+# ---------------------------------------------------------------------------
+# DB: in-memory session over the seeded alerts
+# ---------------------------------------------------------------------------
+
+class BenchAlert:
+    __slots__ = (
+        "id", "client_id", "asset", "target_price", "direction", "price_source", "status",
+        "action_type", "trigger_mode", "trigger_count", "order_payload", "cooldown_seconds",
+        "triggered_at", "last_triggered_at", "triggered_price", "execution_status", "metadata_",
+    )
+
+    def __init__(self, asset: str, target: float, direction: str, source: str, recurring: bool):
+        self.id = str(uuid.uuid4())
+        self.client_id = uuid.uuid4()
+        self.asset = asset
+        self.target_price = target
+        self.direction = direction
+        self.price_source = source
+        self.status = "active"
+        self.action_type = "alert"
+        self.trigger_mode = "recurring" if recurring else "once"
+        self.trigger_count = 0
+        self.order_payload = None
+        self.cooldown_seconds = 60 if recurring else 0
+        self.triggered_at = None
+        self.last_triggered_at = None
+        self.triggered_price = None
+        self.execution_status = None
+        self.metadata_ = None
+
+
+class TriggerClock:
+    """Arrival time of the batch being processed and tick-to-trigger samples (ms)."""
+
+    def __init__(self):
+        self.batch_start = 0.0
+        self.samples: list = []
+
+
+class BenchSession:
+    def __init__(self, alerts: dict, clock: TriggerClock, latency_s: float):
+        self._alerts = alerts
+        self._clock = clock
+        self._latency_s = latency_s
+        self._loaded: dict = {}
+
+    def _round_trip(self) -> None:
+        if self._latency_s:
+            time.sleep(self._latency_s)
+
+    def query(self, model):
+        return _BenchQuery(self)
+
+    def _select(self, criteria) -> list:
+        self._round_trip()
+        ids = None
+        equals = []
+        for c in criteria:
+            if c.operator is operators.in_op and c.left.key == "id":
+                ids = c.right.value
+            elif c.operator is operators.eq:
+                equals.append((c.left.key, c.right.value))
+        candidates = (self._alerts.get(i) for i in ids) if ids is not None else self._alerts.values()
+        rows = [a for a in candidates if a is not None and all(getattr(a, k) == v for k, v in equals)]
+        for a in rows:
+            self._loaded[a.id] = (a, a.trigger_count)
+        return rows
+
+    def commit(self) -> None:
+        self._round_trip()
+        elapsed_ms = (time.perf_counter() - self._clock.batch_start) * 1000.0
+        for aid, (alert, count) in list(self._loaded.items()):
+            if alert.trigger_count != count:
+                self._clock.samples.append(elapsed_ms)
+                self._loaded[aid] = (alert, alert.trigger_count)
+
+    def begin_nested(self):
+        return self
+
+    def rollback(self) -> None:
+        self._loaded.clear()
+
+    def close(self) -> None:
+        self._loaded.clear()
+
+
+class _BenchQuery:
+    def __init__(self, session: BenchSession):
+        self._session = session
+        self._criteria: list = []
+
+    def filter(self, *criteria):
+        self._criteria.extend(criteria)
+        return self
+
+    def with_for_update(self, **kwargs):
+        return self
+
+    def all(self):
+        return self._session._select(self._criteria)
+
+    def first(self):
+        rows = self._session._select(self._criteria)
+        return rows[0] if rows else None
+
+
+# ---------------------------------------------------------------------------
+# Alerts and tick streams
+# ---------------------------------------------------------------------------
+
+def _seed_alerts(n: int, start_prices: dict, spread_pct: float, recurring_share: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    assets = list(start_prices)
+    alerts = {}
+    for _ in range(n):
+        asset = rng.choice(assets)
+        start = start_prices[asset]
+        target = start * (1.0 + rng.uniform(-spread_pct, spread_pct) / 100.0)
+        u = rng.random()
+        source = "mid" if u < 0.8 else ("bid" if u < 0.9 else "ask")
+        alert = BenchAlert(asset, target, "up" if target > start else "down", source, rng.random() < recurring_share)
+        alerts[alert.id] = alert
+    return alerts
+
+
+def _book(symbol: str, bid: float, ask: float) -> dict:
+    # same shape as binance_ws_ingestion pending rows
+    return {symbol: {"last_price": (bid + ask) / 2.0, "bid_price": bid, "ask_price": ask}}
+
+
+def _synthetic_batches(start_prices: dict, batches: int, tick_bps: float, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    assets = list(start_prices)
+    steps = rng.normal(0.0, tick_bps / 10000.0, (batches, len(assets)))
+    paths = np.array([start_prices[a] for a in assets]) * np.exp(np.cumsum(steps, axis=0))
+    out = []
+    for row in paths:
+        batch: dict = {}
+        for asset, mid in zip(assets, row.tolist()):
+            half = mid * 0.00005
+            batch.update(_book(f"{asset}USDT", mid - half, mid + half))
+        out.append(batch)
+    return out
+
+
+def _replay_batches(path: Path, batch_symbols: int) -> tuple:
+    """(start prices per asset, batches) from recorded bookTicker messages."""
+    start_prices: dict = {}
+    batches: list = []
+    pending: dict = {}
+    with open(path) as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            msg = json.loads(line)
+            data = msg.get("data", msg)
+            symbol = (data.get("s") or msg.get("stream", "").replace("@bookTicker", "")).upper()
+            asset = PriceAlertEngine._symbol_to_asset(symbol)
+            if asset is None or data.get("b") is None or data.get("a") is None:
+                continue
+            bid, ask = float(data["b"]), float(data["a"])
+            start_prices.setdefault(asset, (bid + ask) / 2.0)
+            pending.update(_book(symbol, bid, ask))
+            if len(pending) >= batch_symbols:
+                batches.append(pending)
+                pending = {}
+    if pending:
+        batches.append(pending)
+    return start_prices, batches
+
+
+# ---------------------------------------------------------------------------
+# Run
+# ---------------------------------------------------------------------------
+
+def _pct(samples: list, q: float):
+    return round(float(np.percentile(samples, q)), 3) if samples else None
+
+
+def _run(num_buckets: int, args, start_prices: dict, batches: list, redis_client) -> dict:
+    cache.NUM_BUCKETS = num_buckets
+    alert_metrics._metrics = alert_metrics.AlertMetrics()
+    stats = _CommandStats()
+    if redis_client is None:
+        r = FakeRedis(stats)
+    else:
+        _purge_redis(redis_client)
+        r = CountingRedis(redis_client, stats)
+
+    alerts = _seed_alerts(args.alerts, start_prices, args.spread_pct, args.recurring_share, args.seed)
+    clock = TriggerClock()
+    latency_s = args.db_latency_ms / 1000.0
+    db_factory = lambda: BenchSession(alerts, clock, latency_s)  # noqa: E731
+
+    start = time.perf_counter()
+    loaded = cache.load_all_active_alerts(r, db_factory())
+    warmup_ms = (time.perf_counter() - start) * 1000.0
+
+    engine = PriceAlertEngine(r)
+    engine.atomic_claim = engine.atomic_claim and not args.legacy_claim
+    opening = {}
+    for asset, price in start_prices.items():
+        opening.update(_book(f"{asset}USDT", price, price))
+    engine.on_price_batch(opening, db_factory)  # sets the previous prices, nothing crosses
+    stats.reset()
+
+    batch_ms = []
+    triggered = 0
+    ticks = 0
+    start = time.perf_counter()
+    for batch in batches:
+        clock.batch_start = time.perf_counter()
+        triggered += engine.on_price_batch(batch, db_factory)
+        batch_ms.append((time.perf_counter() - clock.batch_start) * 1000.0)
+        ticks += len(batch)
+    elapsed = time.perf_counter() - start
+
+    snap = alert_metrics.get_metrics().snapshot()
+    return {
+        "num_buckets": num_buckets,
+        "atomic_claim": engine.atomic_claim,
+        "alerts_loaded": loaded,
+        "warmup_ms": round(warmup_ms, 1),
+        "batches": len(batches),
+        "ticks": ticks,
+        "triggered": triggered,
+        "deferred": snap.get("deferred_alerts", 0),
+        "still_deferred": len(engine._deferred),
+        "elapsed_s": round(elapsed, 3),
+        "ticks_per_s": round(ticks / elapsed, 1) if elapsed > 0 else None,
+        "batch_latency_p50_ms": _pct(batch_ms, 50),
+        "batch_latency_p99_ms": _pct(batch_ms, 99),
+        "tick_to_trigger_p50_ms": _pct(clock.samples, 50),
+        "tick_to_trigger_p99_ms": _pct(clock.samples, 99),
+        "tick_to_trigger_max_ms": round(max(clock.samples), 3) if clock.samples else None,
+        "redis_commands_per_tick": round(sum(stats.commands.values()) / ticks, 2) if ticks else None,
+        "redis_round_trips_per_tick": round(stats.round_trips / ticks, 2) if ticks else None,
+        "redis_commands": dict(stats.commands),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=100000, help="Active alerts seeded")
+    parser.add_argument("--batches", type=int, default=1000, help="Synthetic batches (every asset updated per batch)")
+    parser.add_argument("--buckets", type=int, nargs="+", default=[1, 4, 16], help="NUM_BUCKETS values to compare")
+    parser.add_argument("--spread-pct", type=float, default=5.0, help="Alert targets within +/- this %% of the start price")
+    parser.add_argument("--tick-bps", type=float, default=2.0, help="Random-walk volatility per update (bps)")
+    parser.add_argument("--recurring-share", type=float, default=0.05, help="Share of recurring alerts")
+    parser.add_argument("--replay", type=Path, help="Recorded bookTicker messages (JSON lines) instead of the random walk")
+    parser.add_argument("--batch-symbols", type=int, default=10, help="Symbols per batch when replaying")
+    parser.add_argument("--redis-url", help="Real Redis (dedicated database) instead of the in-memory fake")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="Simulated DB round trip per query / commit")
+    parser.add_argument("--legacy-claim", action="store_true", help="ZRANGEBYSCORE + ZREM path instead of the claim script")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--verbose", action="store_true", help="Keep the engine's INFO / WARNING logs")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger("services.price_alerts").setLevel(logging.ERROR)
+
+    if args.replay:
+        start_prices, batches = _replay_batches(args.replay, max(1, args.batch_symbols))
+    else:
+        start_prices = DEFAULT_ASSETS
+        batches = _synthetic_batches(start_prices, args.batches, args.tick_bps, args.seed)
+    if not batches:
+        print("No ticks to replay", file=sys.stderr)
+        return 1
+
+    redis_client = None
+    if args.redis_url:
+        import redis
+        redis_client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+        redis_client.ping()
+
+    default_buckets = cache.NUM_BUCKETS
+    results = []
+    try:
+        for num_buckets in args.buckets:
+            row = _run(num_buckets, args, start_prices, batches, redis_client)
+            results.append(row)
+            print(json.dumps(row), file=sys.stderr)
+    finally:
+        cache.NUM_BUCKETS = default_buckets
+        if redis_client is not None:
+            _purge_redis(redis_client)
+
+    base = results[0]["ticks_per_s"] or 0.0
+    for row in results:
+        row["throughput_vs_first"] = round(row["ticks_per_s"] / base, 2) if base and row["ticks_per_s"] else None
+
+    print(json.dumps({
+        "benchmark": "price_alert_engine",
+        "redis": "real" if args.redis_url else "fake",
+        "stream": str(args.replay) if args.replay else "synthetic",
+        "alerts": args.alerts,
+        "assets": len(start_prices),
+        "db_latency_ms": args.db_latency_ms,
+        "results": results,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
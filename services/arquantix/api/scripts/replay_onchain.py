@@ -6,6 +6,9 @@ Usage (depuis ``services/arquantix/api``)::
 
     python3 -m scripts.replay_onchain --chain base --from-block 123 --to-block 456 --dry-run
     python3 -m scripts.replay_onchain --chain base --from-block 123 --to-block 456 --no-dry-run
+    python3 -m scripts.replay_onchain --chain base --from-block 123 --to-block 456 --scan-mode all_transfers
+
+Le JSON de sortie inclut rpc_requests, rpc_batches, block_chunk et blocks_per_second.
 """
 from __future__ import annotations
 
@@ -19,7 +22,7 @@ if str(api_dir) not in sys.path:
     sys.path.insert(0, str(api_dir))
 
 from database import SessionLocal
-from services.onchain_indexer.block_range_replay import replay_block_range
+from services.onchain_indexer.block_range_replay import SCAN_MODES, replay_block_range
 from services.onchain_indexer.chain_config import resolve_chain_id
 
 
@@ -56,6 +59,18 @@ def main() -> int:
         default="",
         help="CSV symboles ERC20 à scanner (ex: USDC,EURC). Vide = tous.",
     )
+    parser.add_argument(
+        "--scan-mode",
+        choices=SCAN_MODES,
+        default=None,
+        help="topics (wallets OR'd, défaut) | all_transfers (filtrage local) | per_wallet (historique)",
+    )
+    parser.add_argument(
+        "--rpc-batch-size",
+        type=int,
+        default=None,
+        help="Requêtes eth_getLogs par batch JSON-RPC (défaut ONCHAIN_REPLAY_RPC_BATCH_SIZE)",
+    )
     args = parser.parse_args()
 
     dry_run = not args.no_dry_run
@@ -79,6 +94,8 @@ def main() -> int:
             block_chunk=args.block_chunk,
             wallet_addresses=wallets or None,
             assets=assets,
+            scan_mode=args.scan_mode,
+            rpc_batch_size=args.rpc_batch_size,
         )
         if not dry_run:
             db.commit()
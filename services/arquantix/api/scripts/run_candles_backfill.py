@@ -5,6 +5,7 @@ Usage:
   python scripts/run_candles_backfill.py --timeframe 1h --symbol BTCUSDT
   python scripts/run_candles_backfill.py --timeframe 1d --fallback-days 3650
   python scripts/run_candles_backfill.py --timeframe 1w --dry-run
+  python scripts/run_candles_backfill.py --timeframe 5m --workers 8 --weight-budget 3000
 
 Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
 """
@@ -23,6 +24,10 @@ from services.market_data.candles_backfill_service import (
     DEFAULT_COMMIT_BATCH,
     run_backfill,
 )
+from services.market_data.candles_backfill_concurrent import (
+    DEFAULT_WEIGHT_BUDGET_1M,
+    run_backfill_concurrent,
+)
 
 
 def _default_fallback_days(timeframe: str) -> int:
@@ -64,6 +69,18 @@ def main() -> int:
         default=DEFAULT_COMMIT_BATCH,
         help=f"Commit after this many fetch batches (default {DEFAULT_COMMIT_BATCH})",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Concurrent fetch workers across symbols (default 1 = sequential backfill)",
+    )
+    parser.add_argument(
+        "--weight-budget",
+        type=int,
+        default=DEFAULT_WEIGHT_BUDGET_1M,
+        help=f"Binance request weight per minute shared by the workers (default {DEFAULT_WEIGHT_BUDGET_1M})",
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -92,21 +109,43 @@ def main() -> int:
 
     db = SessionLocal()
     try:
-        summary = run_backfill(
-            db,
-            timeframe=args.timeframe,
-            symbol=args.symbol,
-            limit_per_request=limit,
-            fallback_days=fallback,
-            commit_batch=commit_batch,
-            dry_run=args.dry_run,
-        )
+        if args.workers > 1:
+            summary = run_backfill_concurrent(
+                db,
+                timeframe=args.timeframe,
+                symbol=args.symbol,
+                workers=args.workers,
+                weight_budget_per_min=max(1, args.weight_budget),
+                limit_per_request=limit,
+                fallback_days=fallback,
+                commit_batch=commit_batch,
+                dry_run=args.dry_run,
+            )
+        else:
+            summary = run_backfill(
+                db,
+                timeframe=args.timeframe,
+                symbol=args.symbol,
+                limit_per_request=limit,
+                fallback_days=fallback,
+                commit_batch=commit_batch,
+                dry_run=args.dry_run,
+            )
         print("Candle backfill summary:")
         print(f"  Timeframe: {args.timeframe}")
         print(f"  Instruments processed: {summary['instruments_processed']}")
         print(f"  Candles fetched: {summary['candles_fetched']}")
         print(f"  Candles upserted: {summary['candles_upserted']}")
         print(f"  Commits performed: {summary['commits_performed']}")
+        if "candles_per_sec" in summary:
+            print(f"  Workers: {summary['workers']}")
+            print(f"  Elapsed: {summary['elapsed_sec']}s ({summary['candles_per_sec']} candles/s)")
+            print(
+                f"  Request weight: {summary['weight_used']} over {summary['requests']} requests "
+                f"({summary['weight_per_min']}/min, budget {summary['weight_budget_per_min']}/min, "
+                f"max server-reported {summary['max_server_weight_1m']}/min, "
+                f"throttled {summary['weight_wait_sec']}s, rate-limited {summary['rate_limited']}x)"
+            )
         if summary["errors"]:
             print("  Errors:")
             for msg in summary["errors"]:
@@ -0,0 +1,53 @@
+"""
+Derive 1h/4h/1d/1w candles from stored 5m bars (incremental, watermark-based).
+Usage:
+  python scripts/run_candles_rollup.py
+  python scripts/run_candles_rollup.py --symbol BTCUSDT --timeframes 1h 4h
+  python scripts/run_candles_rollup.py --dry-run
+
+Only the buckets touched by 5m bars written since the last run are recomputed.
+Buckets overlapping a gap in the 5m series are reported and not written.
+Expects to be run from the api/ directory (or with api/ on PYTHONPATH).
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import SessionLocal
+from services.market_data.candles_backfill_service import load_binance_instruments
+from services.market_data.candles_rollup import ROLLUP_TARGETS, run_rollup
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Roll up 5m bars into 1h/4h/1d/1w candles")
+    parser.add_argument("--symbol", type=str, default=None, help="Only this provider symbol (e.g. BTCUSDT)")
+    parser.add_argument("--timeframes", nargs="+", choices=ROLLUP_TARGETS, default=list(ROLLUP_TARGETS))
+    parser.add_argument("--dry-run", action="store_true", help="Compute without writing candles or watermarks")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        instruments = load_binance_instruments(db, symbol=args.symbol)
+        if not instruments:
+            print("No Binance instruments found")
+            return 1 if args.symbol else 0
+        summary = run_rollup(db, [iid for iid, _ in instruments], targets=args.timeframes, dry_run=args.dry_run)
+        print("Candles rollup (5m -> %s)%s:" % (", ".join(args.timeframes), " [dry-run]" if args.dry_run else ""))
+        print(f"  Instruments processed: {summary['instruments_processed']}")
+        print(f"  Candles written: {summary['candles_written']}")
+        print(f"  Buckets flagged (gaps in 5m): {summary['gaps_flagged']}")
+        for msg in summary["errors"]:
+            print(f"    - {msg}")
+        return 1 if summary["errors"] else 0
+    except Exception as e:
+        print(f"Fatal error: {e}")
+        db.rollback()
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Snapshot de valorisation de toute la flotte de portefeuilles actifs à un cutoff (cron nocturne).
+
+Usage (depuis ``services/arquantix/api``)::
+
+    python3 -m scripts.run_valuation_snapshots                   # cutoff = minuit UTC du jour
+    python3 -m scripts.run_valuation_snapshots --as-of 2026-03-01T00:00:00+00:00 --workers 4
+
+Relancer le même --as-of reprend un run interrompu (idempotent par portefeuille et as_of).
+Variables : VALUATION_SNAPSHOT_WORKERS, VALUATION_SNAPSHOT_CHUNK_SIZE.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+api_dir = Path(__file__).resolve().parent.parent
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+from services.portfolio_engine.clients.models import Client as _Client  # noqa: F401 — force mapper init
+from database import SessionLocal
+from services.portfolio_engine.snapshots.service import (
+    VALUATION_SNAPSHOT_CHUNK_SIZE,
+    VALUATION_SNAPSHOT_WORKERS,
+    ValuationSnapshotService,
+)
+
+
+def _parse_as_of(value: str | None) -> datetime:
+    if not value:
+        return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    ts = datetime.fromisoformat(value)
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Snapshot de valorisation de la flotte de portefeuilles")
+    parser.add_argument("--as-of", default=None, help="Cutoff ISO 8601 (défaut : minuit UTC du jour)")
+    parser.add_argument("--workers", type=int, default=VALUATION_SNAPSHOT_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=VALUATION_SNAPSHOT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        as_of = _parse_as_of(args.as_of)
+    except ValueError as exc:
+        print(f"ERROR: --as-of invalide: {exc}", file=sys.stderr)
+        return 2
+
+    run = ValuationSnapshotService().run(
+        SessionLocal, as_of, workers=args.workers, chunk_size=args.chunk_size,
+    )
+    print(json.dumps({
+        "run_id": str(run.id),
+        "as_of": run.as_of.isoformat(),
+        "status": run.status,
+        "portfolios_total": run.portfolios_total,
+        "portfolios_done": run.portfolios_done,
+        "snapshots_written": run.snapshots_written,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Latence outbox / intents (created → processed), avant et après activation du listener NOTIFY.
+
+Usage (depuis ``services/arquantix/api``)::
+
+    python3 -m scripts.transaction_outbox_latency_report --hours 24
+    python3 -m scripts.transaction_outbox_latency_report --hours 72 --split-at 2026-10-18T09:00:00+00:00
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+api_dir = Path(__file__).resolve().parent.parent
+if str(api_dir) not in sys.path:
+    sys.path.insert(0, str(api_dir))
+
+from database import SessionLocal
+from services.transaction_outbox.latency_report import build_outbox_latency_report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Latence transaction_outbox (p50/p95 par type et par intent)")
+    parser.add_argument("--hours", type=float, default=24.0, help="Fenêtre glissante (heures)")
+    parser.add_argument("--split-at", default=None, help="ISO 8601 — compare avant / après ce moment")
+    args = parser.parse_args()
+
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(hours=args.hours)
+    split_at = datetime.fromisoformat(args.split_at) if args.split_at else None
+
+    db = SessionLocal()
+    try:
+        payload = build_outbox_latency_report(db, since=since, until=until, split_at=split_at)
+        print(json.dumps(payload, indent=2, default=str))
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,6 +17,7 @@ from services.custody.models import CustodyAccount, CustodyAccountBalance, Custo
 from services.exchange.assets import ASSET_PROVIDER_SYMBOL_MAP
 from services.exchange.models import CryptoPosition, ExchangeOrder
 from services.market_data.fx import get_eurusdt_rate, usdt_to_eur
+from services.market_data.price_snapshot import asset_provider_symbol, get_cached_price_snapshot
 from database import MarketDataInstrument, MarketDataLatestQuote
 
 
@@ -145,10 +146,14 @@ def _get_realized_unrealized(db: Session, client_id: UUID) -> tuple[Decimal, Dec
         .all()
     )
     traded_assets = {o.asset for o in orders}
+    # Un seul snapshot prix / FX pour tous les actifs (et le poids portefeuille de chacun)
+    snapshot = get_cached_price_snapshot(
+        db, [asset_provider_symbol(a) for a in traded_assets | {p.asset for p in positions}],
+    )
     realized = Decimal("0")
     unrealized = Decimal("0")
     for asset in traded_assets:
-        stats = build_wallet_statistics(db, client_id, asset, reference_currency="EUR")
+        stats = build_wallet_statistics(db, client_id, asset, reference_currency="EUR", snapshot=snapshot)
         realized += _dec(stats.get("realized_pnl", 0))
         unrealized += _dec(stats.get("unrealized_pnl", 0))
     return (realized, unrealized)
@@ -0,0 +1,180 @@
+"""
+Columnar series blob - one compact binary per backtest run (backtest_series_blobs).
+
+The blob is an .npz archive (zip-deflated NumPy arrays):
+- dates: int32 ordinals of the portfolio dates, one float64 array per portfolio column
+  (nav_base100, portfolio_return, drawdown, turnover, costs);
+- weights_json / tradable_json: the per-date dicts, JSON encoded (uint8 bytes);
+- instrument_ids, instrument_dates and base100 / instrument_return matrices
+  (instrument_dates x instruments, NaN = no row for that date).
+
+Values are rounded to the scale of the Numeric(20, 8) columns, so the series and compare
+endpoints return the same numbers from the blob as from the rows.
+"""
+import io
+import json
+import math
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+BLOB_FORMAT = "npz-v1"
+PORTFOLIO_COLUMNS = ("nav_base100", "portfolio_return", "drawdown", "turnover", "costs")
+PORTFOLIO_DEFAULTS = {"nav_base100": 100.0, "portfolio_return": 0.0, "drawdown": 0.0, "turnover": 0.0, "costs": 0.0}
+NUMERIC_SCALE = 8
+
+
+def clean_json_numbers(values: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """weights_json as stored: float values, NaN / inf / non-numeric become None; empty -> None."""
+    if not values:
+        return None
+    cleaned = {}
+    for k, v in values.items():
+        if v is None:
+            cleaned[k] = None
+            continue
+        try:
+            val = float(v)
+        except (ValueError, TypeError):
+            cleaned[k] = None
+            continue
+        cleaned[k] = val if math.isfinite(val) else None
+    return cleaned
+
+
+def _json_bytes(obj: Any) -> np.ndarray:
+    return np.frombuffer(json.dumps(obj, separators=(",", ":")).encode("utf-8"), dtype=np.uint8)
+
+
+def _to_ordinals(dates: List[date]) -> np.ndarray:
+    return np.array([d.toordinal() for d in dates], dtype=np.int32)
+
+
+@dataclass
+class ColumnarSeries:
+    dates: List[date]
+    portfolio: Dict[str, np.ndarray]
+    weights_json: List[Optional[Dict[str, Any]]]
+    tradable_json: List[Optional[Dict[str, Any]]]
+    instrument_ids: List[int]
+    instrument_dates: List[date]
+    base100: np.ndarray  # instrument_dates x instruments
+    instrument_return: np.ndarray
+
+
+def encode_series(
+    portfolio_series: List[Dict[str, Any]],
+    instrument_series: Dict[int, List[Dict[str, Any]]],
+) -> bytes:
+    """Blob of a strategy result (portfolio_series / instrument_series formats)."""
+    arrays: Dict[str, np.ndarray] = {
+        "dates": _to_ordinals([item["date"] for item in portfolio_series]),
+    }
+    for column in PORTFOLIO_COLUMNS:
+        default = PORTFOLIO_DEFAULTS[column]
+        values = np.array([item.get(column, default) for item in portfolio_series], dtype=np.float64)
+        arrays[column] = np.round(values, NUMERIC_SCALE)
+    arrays["weights_json"] = _json_bytes([clean_json_numbers(item.get("weights_json")) for item in portfolio_series])
+    arrays["tradable_json"] = _json_bytes([item.get("tradable_json") for item in portfolio_series])
+
+    instrument_ids = list(instrument_series.keys())
+    instrument_dates = sorted({item["date"] for rows in instrument_series.values() for item in rows})
+    row_of = {d: t for t, d in enumerate(instrument_dates)}
+    base100 = np.full((len(instrument_dates), len(instrument_ids)), np.nan)
+    returns = np.full_like(base100, np.nan)
+    for j, instrument_id in enumerate(instrument_ids):
+        rows = instrument_series[instrument_id]
+        idx = [row_of[item["date"]] for item in rows]
+        base100[idx, j] = [item.get("base100", 100.0) for item in rows]
+        returns[idx, j] = [
+            item["instrument_return"] if item.get("instrument_return") is not None else np.nan for item in rows
+        ]
+    arrays["instrument_ids"] = np.array(instrument_ids, dtype=np.int64)
+    arrays["instrument_dates"] = _to_ordinals(instrument_dates)
+    arrays["base100"] = np.round(base100, NUMERIC_SCALE)
+    arrays["instrument_return"] = np.round(returns, NUMERIC_SCALE)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_series(blob: bytes, with_instruments: bool = True, with_json: bool = True) -> ColumnarSeries:
+    """Arrays of a blob; with_instruments / with_json=False skip those members (compare)."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+        dates = [date.fromordinal(int(o)) for o in archive["dates"]]
+        portfolio = {column: archive[column] for column in PORTFOLIO_COLUMNS}
+        weights_json: List[Optional[Dict[str, Any]]] = []
+        tradable_json: List[Optional[Dict[str, Any]]] = []
+        if with_json:
+            weights_json = json.loads(archive["weights_json"].tobytes().decode("utf-8"))
+            tradable_json = json.loads(archive["tradable_json"].tobytes().decode("utf-8"))
+        instrument_ids: List[int] = []
+        instrument_dates: List[date] = []
+        base100 = returns = np.empty((0, 0))
+        if with_instruments:
+            instrument_ids = archive["instrument_ids"].tolist()
+            instrument_dates = [date.fromordinal(int(o)) for o in archive["instrument_dates"]]
+            base100 = archive["base100"]
+            returns = archive["instrument_return"]
+    return ColumnarSeries(dates, portfolio, weights_json, tradable_json, instrument_ids, instrument_dates, base100, returns)
+
+
+def portfolio_rows(series: ColumnarSeries) -> List[Dict[str, Any]]:
+    """Portfolio bars in the GET /{run_id}/series format."""
+    iso = [d.isoformat() for d in series.dates]
+    columns = [series.portfolio[c].tolist() for c in PORTFOLIO_COLUMNS]
+    weights = series.weights_json or [None] * len(iso)
+    tradable = series.tradable_json or [None] * len(iso)
+    return [
+        {
+            "date": iso[t],
+            "nav_base100": columns[0][t],
+            "portfolio_return": columns[1][t],
+            "drawdown": columns[2][t],
+            "turnover": columns[3][t],
+            "costs": columns[4][t],
+            "weights_json": weights[t] or {},
+            "tradable_json": tradable[t] or {},
+        }
+        for t in range(len(iso))
+    ]
+
+
+def instrument_rows(series: ColumnarSeries) -> Dict[int, List[Dict[str, Any]]]:
+    """instrument_id -> bars in the GET /{run_id}/series format (dates with a row only)."""
+    iso = [d.isoformat() for d in series.instrument_dates]
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    for j, instrument_id in enumerate(series.instrument_ids):
+        rows = np.flatnonzero(~np.isnan(series.base100[:, j]))
+        base = series.base100[rows, j].tolist()
+        rets = series.instrument_return[rows, j].tolist()
+        out[instrument_id] = [
+            # same as the row endpoint: a 0 (or missing) return is reported as None
+            {"date": iso[t], "base100": b, "instrument_return": r if r and not math.isnan(r) else None}
+            for t, b, r in zip(rows.tolist(), base, rets)
+        ]
+    return out
+
+
+def columnar_payload(series: ColumnarSeries) -> Dict[str, Any]:
+    """Column-oriented JSON (format=columnar): one array per series instead of one dict per bar."""
+    def _nullable(values: np.ndarray) -> List[Optional[float]]:
+        return [None if math.isnan(v) else v for v in values.tolist()]
+
+    payload: Dict[str, Any] = {
+        "dates": [d.isoformat() for d in series.dates],
+        **{column: series.portfolio[column].tolist() for column in PORTFOLIO_COLUMNS},
+    }
+    if series.weights_json:
+        payload["weights_json"] = series.weights_json
+    if series.instrument_ids:
+        payload["instruments"] = {
+            "instrument_ids": series.instrument_ids,
+            "dates": [d.isoformat() for d in series.instrument_dates],
+            "base100": [_nullable(series.base100[:, j]) for j in range(len(series.instrument_ids))],
+            "instrument_return": [_nullable(series.instrument_return[:, j]) for j in range(len(series.instrument_ids))],
+        }
+    return payload
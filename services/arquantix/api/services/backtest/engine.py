@@ -1,47 +1,403 @@
 """
-Backtest engine - Core backtest functions
+Backtest engine - Core backtest functions (NumPy)
+
+Everything works on a dense price matrix (dates x instruments, float64, NaN = no price):
+- build_calendar / align_prices: trading calendar and aligned PriceMatrix
+- compute_returns, rebalance_mask, apply_rebalance_schedule: returns and weight schedules
+- compute_nav, compute_drawdown, compute_metrics: NAV, turnover, costs, drawdown, metrics
+- RollingMoments: rolling-window mean / covariance updated incrementally (optimizer inputs)
+- holdings_value, instrument_series_records: helpers shared by the path-dependent
+  strategies (CPPI, Core-Satellite) that only loop over rebalance dates
+
+The executor and the strategies keep their dict/list output format (stored row by row);
+the per-date work in between is array ops.
 """
-from typing import List, Dict, Any
+from dataclasses import dataclass
 from datetime import date
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def _to_date(d: Any) -> date:
+    return d.date() if isinstance(d, pd.Timestamp) else d
+
+
+@dataclass
+class PriceMatrix:
+    """Dense prices: values[t, j] is the close of instrument_ids[j] on dates[t] (NaN if missing)."""
+    dates: List[date]
+    instrument_ids: List[int]
+    values: np.ndarray
+
+    @classmethod
+    def from_frame(cls, prices_df: pd.DataFrame, instrument_ids: Optional[Sequence[int]] = None) -> "PriceMatrix":
+        ids = list(instrument_ids) if instrument_ids is not None else list(prices_df.columns)
+        values = prices_df[ids].to_numpy(dtype=float, na_value=np.nan) if ids else np.empty((len(prices_df), 0))
+        return cls([_to_date(d) for d in prices_df.index], ids, values)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=pd.DatetimeIndex(self.dates), columns=self.instrument_ids)
+
+    def window(self, start_date: date, end_date: date) -> "PriceMatrix":
+        """Rows with start_date <= date <= end_date (dates assumed sorted)."""
+        rows = [i for i, d in enumerate(self.dates) if start_date <= d <= end_date]
+        return PriceMatrix([self.dates[i] for i in rows], self.instrument_ids, self.values[rows])
+
+
+def build_calendar(
+    start_date: date,
+    end_date: date,
+    available_dates: Optional[Iterable[Any]] = None,
+    allow_weekend_trading: bool = True,
+) -> List[date]:
+    """
+    Trading calendar between start and end dates (inclusive), sorted.
+
+    available_dates restricts the calendar to dates with data (union of the instruments'
+    bars); without it every calendar day is used.
+    """
+    if available_dates is None:
+        days = pd.date_range(start_date, end_date, freq="D")
+        calendar = [d.date() for d in days]
+    else:
+        calendar = sorted({_to_date(d) for d in available_dates})
+        calendar = [d for d in calendar if start_date <= d <= end_date]
+    if not allow_weekend_trading:
+        calendar = [d for d in calendar if d.weekday() < 5]
+    return calendar
+
+
+def _ffill(values: np.ndarray) -> np.ndarray:
+    """Forward fill NaN down each column."""
+    if values.size == 0:
+        return values.copy()
+    mask = np.isnan(values)
+    idx = np.where(~mask, np.arange(values.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    out = values[idx, np.arange(values.shape[1])]
+    return out
+
+
+def _bfill(values: np.ndarray) -> np.ndarray:
+    return _ffill(values[::-1])[::-1]
+
+
+def align_prices(price_series: Dict[int, pd.DataFrame], calendar: List[date]) -> PriceMatrix:
+    """
+    Align close prices to the calendar: each instrument is reindexed on the calendar and
+    forward filled, then the matrix is forward then backward filled.
+
+    Args:
+        price_series: instrument_id -> DataFrame indexed by date with a 'close' column
+            (repository.load_open_bars format).
+        calendar: Sorted trading dates.
+    """
+    ids = list(price_series.keys())
+    index = pd.DatetimeIndex(calendar)
+    values = np.full((len(calendar), len(ids)), np.nan)
+    for j, instrument_id in enumerate(ids):
+        close = price_series[instrument_id]["close"].reindex(index)
+        values[:, j] = close.to_numpy(dtype=float, na_value=np.nan)
+    values = _bfill(_ffill(values))
+    return PriceMatrix(list(calendar), ids, values)
+
+
+def compute_returns(prices: np.ndarray) -> np.ndarray:
+    """
+    Simple returns per date (first row 0), same as DataFrame.pct_change().fillna(0):
+    prices are forward filled before the ratio, dates without a previous price return 0.
+    """
+    filled = _ffill(np.asarray(prices, dtype=float))
+    returns = np.zeros_like(filled)
+    if len(filled) > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = filled[1:] / filled[:-1] - 1.0
+    returns[np.isnan(returns)] = 0.0
+    return returns
+
+
+def rebalance_mask(dates: Sequence[date], frequency: str) -> np.ndarray:
+    """
+    Rebalance dates of the strategies (CPPI, Core-Satellite): every date for "daily",
+    Mondays plus the first date for "weekly", first date of each month for "monthly".
+    """
+    n = len(dates)
+    if frequency == "weekly":
+        mask = np.array([d.weekday() == 0 for d in dates], dtype=bool)
+        if n:
+            mask[0] = True
+        return mask
+    if frequency == "monthly":
+        months = np.array([d.month for d in dates])
+        mask = np.ones(n, dtype=bool)
+        if n > 1:
+            mask[1:] = months[1:] != months[:-1]
+        return mask
+    return np.ones(n, dtype=bool)
+
+
+def apply_rebalance_schedule(weights: np.ndarray, dates: Sequence[date], frequency: str) -> np.ndarray:
+    """
+    Hold target weights between rebalance dates (executor strategies).
+
+    Same schedule as the previous pandas implementation (resample + reindex + ffill):
+    - weekly: each Monday of the calendar takes the target of the first date of the week
+      ending that Monday (after the previous Monday), held until the next Monday;
+    - monthly: each calendar date that is the 1st of a month takes its own target;
+    - daily (or unknown): targets as is.
+    Dates before the first rebalance date have no weights (NaN rows).
+    """
+    weights = np.asarray(weights, dtype=float)
+    if frequency not in ("weekly", "monthly"):
+        return weights.copy()
+    n = len(dates)
+    out = np.full_like(weights, np.nan)
+    ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+    if frequency == "weekly":
+        rows = [i for i, d in enumerate(dates) if d.weekday() == 0]
+        # first calendar row strictly after the previous Monday
+        sources = np.searchsorted(ordinals, ordinals[rows] - 6, side="left") if rows else []
+    else:
+        rows = [i for i, d in enumerate(dates) if d.day == 1]
+        sources = rows
+    if n and len(rows):
+        out[rows] = weights[np.asarray(sources)]
+    return _ffill(out)
+
+
+def compute_target_weights(returns: np.ndarray, strategy_type: str, params: Dict[str, Any]) -> np.ndarray:
+    """
+    Target weights per date (dates x instruments) for the executor strategies.
+
+    Args:
+        returns: Daily returns matrix.
+        strategy_type: "bundle_strategy", "equal_weight" or "momentum" (anything else is
+            equal weight).
+        params: "bundle_weights" (vector, for bundle_strategy), "lookback" (momentum, 20).
+    """
+    n_dates, n_instruments = returns.shape
+    equal = 1.0 / n_instruments if n_instruments > 0 else 0.0
+    if strategy_type == "bundle_strategy" and params.get("bundle_weights") is not None:
+        w = np.asarray(params["bundle_weights"], dtype=float)
+        return np.broadcast_to(w, (n_dates, n_instruments)).copy()
+    if strategy_type == "momentum":
+        lookback = int(params.get("lookback", 20))
+        csum = np.cumsum(returns, axis=0)
+        window_sum = csum.copy()
+        if n_dates > lookback:
+            window_sum[lookback:] = csum[lookback:] - csum[:-lookback]
+        counts = np.minimum(np.arange(1, n_dates + 1), lookback)[:, None]
+        momentum = np.clip(window_sum / counts, 0.0, None)
+        row_sums = momentum.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weights = momentum / row_sums
+        weights[~np.isfinite(weights)] = equal
+        return weights
+    return np.full((n_dates, n_instruments), equal)
+
+
+def apply_tradability_constraints(weights: np.ndarray, tradable_mask: np.ndarray) -> np.ndarray:
+    """
+    Zero the weights of non-tradable instruments and spread their weight over the tradable
+    ones of the same date (pro rata). Rows with nothing tradable are left at 0.
+    """
+    weights = np.asarray(weights, dtype=float)
+    tradable = np.asarray(tradable_mask, dtype=bool)
+    kept = np.where(tradable, weights, 0.0)
+    gross = np.nansum(weights, axis=1, keepdims=True)
+    kept_sum = np.nansum(kept, axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(kept_sum > 0, gross / kept_sum, 0.0)
+    return kept * scale
+
+
+class RollingMoments:
+    """
+    Mean and sample covariance of the rows [max(0, end - window), end) of a returns matrix,
+    updated incrementally as the window end moves forward: rows entering the window are
+    added to the running sums and rows leaving it subtracted, O(N^2) per date instead of
+    O(window * N^2). The window grows from the first row until it holds `window` rows.
+
+    Sums are kept on data centered on an anchor (the window mean at the last full
+    recompute) and recomputed from scratch once `window` rows have been added since, which
+    bounds floating point drift. Moving backwards or past the whole window also recomputes.
+    """
+
+    def __init__(self, values: np.ndarray, window: int, covariance: bool = True):
+        if window < 1:
+            raise ValueError(f"window must be >= 1, got {window}")
+        self.values = np.asarray(values, dtype=float)
+        self.window = int(window)
+        self.covariance = covariance
+        self.start = 0
+        self.end = 0
+        n = self.values.shape[1]
+        self._anchor = np.zeros(n)
+        self._s1 = np.zeros(n)
+        self._s2 = np.zeros((n, n)) if covariance else None
+        self._rows_since_recompute = 0
+
+    @property
+    def count(self) -> int:
+        return self.end - self.start
+
+    def advance(self, end: int) -> "RollingMoments":
+        """Move the window to the rows [max(0, end - window), end)."""
+        end = min(max(int(end), 0), len(self.values))
+        start = max(0, end - self.window)
+        added = end - self.end
+        if added < 0 or start >= self.end or self._rows_since_recompute + added > self.window:
+            self._recompute(start, end)
+        else:
+            self._accumulate(self.end, end, 1.0)
+            self._accumulate(self.start, start, -1.0)
+            self._rows_since_recompute += added
+        self.start, self.end = start, end
+        return self
+
+    def _recompute(self, start: int, end: int) -> None:
+        block = self.values[start:end]
+        self._anchor = block.mean(axis=0) if len(block) else np.zeros(self.values.shape[1])
+        self._s1 = np.zeros_like(self._anchor)
+        if self.covariance:
+            self._s2 = np.zeros((len(self._anchor), len(self._anchor)))
+        self._accumulate(start, end, 1.0)
+        self._rows_since_recompute = 0
+
+    def _accumulate(self, lo: int, hi: int, sign: float) -> None:
+        if hi <= lo:
+            return
+        centered = self.values[lo:hi] - self._anchor
+        self._s1 += sign * centered.sum(axis=0)
+        if self.covariance:
+            self._s2 += sign * (centered.T @ centered)
 
+    def mean(self) -> np.ndarray:
+        """Column means of the window (NaN when empty)."""
+        if self.count == 0:
+            return np.full_like(self._anchor, np.nan)
+        return self._anchor + self._s1 / self.count
 
-def build_calendar(start_date: date, end_date: date) -> List[date]:
-    """Build trading calendar between start and end dates"""
-    # Stub implementation
-    return []
+    def cov(self, ddof: int = 1) -> np.ndarray:
+        """Sample covariance of the window, same as DataFrame.cov() (NaN when count <= ddof)."""
+        if not self.covariance:
+            raise ValueError("RollingMoments built with covariance=False")
+        count = self.count
+        if count <= ddof:
+            return np.full_like(self._s2, np.nan)
+        return (self._s2 - np.outer(self._s1, self._s1) / count) / (count - ddof)
 
 
-def align_prices(price_series: Any, calendar: List[date]) -> Any:
-    """Align prices to calendar"""
-    # Stub implementation
-    return price_series
+class NavResult(NamedTuple):
+    portfolio_returns: np.ndarray  # net of costs, fraction
+    costs: np.ndarray              # fraction of NAV charged per date
+    nav_base100: np.ndarray
+    drawdown: np.ndarray           # percent (<= 0)
+    turnover: np.ndarray           # percent (sum of absolute weight changes)
 
 
-def compute_returns(prices: Any) -> Any:
-    """Compute returns from prices"""
-    # Stub implementation
-    return prices
+def compute_drawdown(nav: np.ndarray) -> np.ndarray:
+    """Drawdown in percent from the running maximum."""
+    nav = np.asarray(nav, dtype=float)
+    if nav.size == 0:
+        return nav.copy()
+    running_max = np.maximum.accumulate(nav)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (nav - running_max) / running_max * 100.0
 
 
-def compute_target_weights(returns: Any, strategy_type: str, params: Dict[str, Any]) -> Any:
-    """Compute target weights based on strategy"""
-    # Stub implementation
-    return {}
+def compute_nav(
+    weights: np.ndarray,
+    returns: np.ndarray,
+    fees_bps: float,
+    slippage_bps: float,
+    rebalance_threshold: float = 0.001,
+) -> NavResult:
+    """
+    NAV of a weight schedule: date t earns the weights held at t-1; a date whose weights
+    move by more than rebalance_threshold (sum of absolute changes) pays
+    fees + slippage on NAV. NaN weights count as not invested.
+    """
+    weights = np.asarray(weights, dtype=float)
+    returns = np.asarray(returns, dtype=float)
+    n = len(returns)
+    gross = np.zeros(n)
+    if n > 1:
+        gross[1:] = np.nansum(weights[:-1] * returns[1:], axis=1)
+    changes = np.zeros(n)
+    if n > 1:
+        changes[1:] = np.nansum(np.abs(np.diff(weights, axis=0)), axis=1)
+    costs = np.where(changes > rebalance_threshold, (fees_bps + slippage_bps) / 10000.0, 0.0)
+    portfolio_returns = gross - costs
+    nav = np.cumprod(1.0 + portfolio_returns)
+    nav_base100 = nav * 100.0 / nav[0] if n else np.array([100.0])
+    return NavResult(portfolio_returns, costs, nav_base100, compute_drawdown(nav_base100), changes * 100.0)
 
 
-def apply_tradability_constraints(weights: Any, tradable_mask: Any) -> Any:
-    """Apply tradability constraints to weights"""
-    # Stub implementation
-    return weights
+def compute_metrics(
+    nav_base100: np.ndarray,
+    returns: np.ndarray,
+    periods_per_year: int = 252,
+    ddof: int = 1,
+    n_periods: Optional[int] = None,
+) -> Dict[str, float]:
+    """
+    Portfolio metrics (percent): total_return, annualized_return, volatility, sharpe_ratio,
+    max_drawdown. annualized_return uses periods_per_year / n_periods (default len(nav));
+    volatility is std(returns, ddof) * sqrt(periods_per_year).
+    """
+    nav = np.asarray(nav_base100, dtype=float)
+    rets = np.asarray(returns, dtype=float)
+    n_periods = n_periods if n_periods is not None else len(nav)
+    if len(nav) == 0 or n_periods == 0:
+        return {"total_return": 0.0, "annualized_return": 0.0, "volatility": 0.0, "sharpe_ratio": 0.0, "max_drawdown": 0.0}
+    total_return = (nav[-1] / nav[0] - 1) * 100.0
+    annualized_return = ((1 + total_return / 100.0) ** (periods_per_year / n_periods) - 1) * 100.0
+    if len(rets) > ddof:
+        volatility = float(np.std(rets, ddof=ddof)) * np.sqrt(periods_per_year) * 100.0
+    else:
+        volatility = float("nan") if ddof else 0.0
+    sharpe = (annualized_return / volatility) if volatility > 0 else 0.0
+    return {
+        "total_return": float(total_return),
+        "annualized_return": float(annualized_return),
+        "volatility": float(volatility),
+        "sharpe_ratio": float(sharpe),
+        "max_drawdown": float(np.nanmin(compute_drawdown(nav))),
+    }
 
 
-def compute_nav(weights: Any, returns: Any, fees: float, slippage: float) -> Any:
-    """Compute NAV from weights and returns"""
-    # Stub implementation
-    return {}
+def holdings_value(prices: np.ndarray, holdings: np.ndarray) -> np.ndarray:
+    """Value of fixed holdings (units) per date; missing or non-positive prices count as 0."""
+    prices = np.asarray(prices, dtype=float)
+    usable = np.where(np.isfinite(prices) & (prices > 0), prices, 0.0)
+    return usable @ np.asarray(holdings, dtype=float)
 
 
-def compute_metrics(nav_series: Any, returns: Any) -> Dict[str, float]:
-    """Compute performance metrics"""
-    # Stub implementation
-    return {}
+def instrument_series_records(
+    dates: Sequence[date],
+    instrument_ids: Sequence[int],
+    prices: np.ndarray,
+    first_prices: np.ndarray,
+    returns: Optional[np.ndarray] = None,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Per-instrument base100 series (instrument_series format), skipping dates without price.
+    base100 is 100 when the first price is missing or not positive; instrument_return is
+    in percent (0.0 when returns is None).
+    """
+    out: Dict[int, List[Dict[str, Any]]] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base100 = np.where(first_prices > 0, prices / first_prices * 100.0, 100.0)
+    pct = returns * 100.0 if returns is not None else None
+    for j, instrument_id in enumerate(instrument_ids):
+        rows = np.flatnonzero(~np.isnan(prices[:, j]))
+        b = base100[rows, j].tolist()
+        r = pct[rows, j].tolist() if pct is not None else [0.0] * len(rows)
+        out[instrument_id] = [
+            {"date": dates[t], "base100": bv, "instrument_return": rv}
+            for t, bv, rv in zip(rows.tolist(), b, r)
+        ]
+    return out
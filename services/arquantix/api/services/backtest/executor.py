@@ -1,22 +1,211 @@
 """
 Backtest executor - Execute backtest runs
 """
-import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from datetime import date, timedelta
 from sqlalchemy.orm import Session
 import numpy as np
 
 from services.backtest.repository import (
     load_instruments, load_open_bars,
-    update_backtest_run_status, store_portfolio_series, store_instrument_series, store_metrics
+    update_backtest_run_status, store_run_results
 )
+from services.backtest.engine import (
+    PriceMatrix, align_prices, apply_rebalance_schedule, build_calendar, compute_metrics, compute_nav,
+    compute_returns, compute_target_weights, instrument_series_records,
+)
+from services.backtest.jobs import BacktestCancelled
+
+
+class PriceDataError(ValueError):
+    """Price data missing for the requested instruments / dates (the run fails with this message)."""
+
+
+def load_backtest_prices(db: Session, instrument_ids: List[int], start_date: date, end_date: date,
+                         allow_weekend_trading: bool) -> Tuple[List[date], PriceMatrix]:
+    """
+    Load bars from market_data_bars_d1 and align close prices on the trading calendar
+    (forward then backward filled). Shared by execute_backtest and parameter sweeps.
+    
+    Raises PriceDataError when instruments, bars or trading dates are missing.
+    """
+    # Load instruments
+    instruments = load_instruments(db, instrument_ids)
+    if not instruments:
+        raise PriceDataError("No instruments found")
+    
+    # Load price data from market_data_bars_d1
+    price_data = load_open_bars(db, instrument_ids, start_date, end_date)
+    
+    if not price_data:
+        raise PriceDataError("No price data found for instruments in date range")
+    
+    # Check if we have data for all instruments
+    missing_instruments = [inst.id for inst in instruments if inst.id not in price_data or price_data[inst.id].empty]
+    if missing_instruments:
+        missing_symbols = [inst.symbol for inst in instruments if inst.id in missing_instruments]
+        raise PriceDataError(f"No price data found for instruments: {', '.join(missing_symbols)}")
+    
+    # Build calendar from available dates (date range, weekends filtered if needed)
+    all_dates = set()
+    for df in price_data.values():
+        all_dates.update(df.index)
+    
+    if not all_dates:
+        raise PriceDataError("No dates in calendar")
+    
+    calendar = build_calendar(start_date, end_date, available_dates=all_dates,
+                              allow_weekend_trading=allow_weekend_trading)
+    
+    if not calendar:
+        raise PriceDataError("No trading dates in calendar after filtering")
+    
+    # Close prices aligned on the calendar (forward then backward filled), instruments as columns
+    return calendar, align_prices(price_data, calendar)
+
+
+def cppi_params(params: Optional[Dict]) -> Dict[str, Any]:
+    """run_cppi_backtest keyword arguments from strategy_params_json (defaults applied)."""
+    params = params or {}
+    return {
+        'floor_ratio': params.get('floor_ratio', 0.90),
+        'multiplier': params.get('multiplier', 4.0),
+        'risky_cap': params.get('risky_cap', 1.0),
+        'core_min': params.get('core_min', 0.0),
+        'core_yield': params.get('core_yield', 0.035),
+        'day_count': params.get('day_count', 365),
+        # Enable debug if strategy_params_json has debug flag
+        'debug': params.get('debug', False),
+    }
+
+
+def core_satellite_params(params: Optional[Dict]) -> Dict[str, Any]:
+    """run_core_satellite_backtest keyword arguments from strategy_params_json (V1 + V2 + V2.1 defaults)."""
+    params = params or {}
+    return {
+        'core_yield': params.get('core_yield', 0.035),
+        'target_te': params.get('target_te', 0.10),
+        'te_tolerance': params.get('te_tolerance', 0.0025),
+        'te_max_hard_mult': params.get('te_max_hard_mult', 1.10),
+        'lookback_risk_days': params.get('lookback_risk_days', 63),
+        'lookback_return_days': params.get('lookback_return_days', 63),
+        'day_count': params.get('day_count', 252),
+        'core_min': params.get('core_min', 0.0),
+        'max_weight_per_asset': params.get('max_weight_per_asset', 0.40),
+        'core_grid_step': params.get('core_grid_step', 0.01),
+        'top_k_satellite': params.get('top_k_satellite'),
+        # V2 params (optional, defaults maintain V1 behavior)
+        'sat_min': params.get('sat_min', 0.0),
+        'shrinkage': params.get('shrinkage', False),
+        'turnover_penalty': params.get('turnover_penalty', 0.0),
+        'stability_penalty': params.get('stability_penalty', 0.0),
+        'optimization_method': params.get('optimization_method', 'grid'),  # 'grid' (V1) or 'quadratic' (V2)
+        # V2.1 EDHEC-style allocation params
+        'allocation_mode': params.get('allocation_mode', 'te_target'),
+        'lambda_risk': params.get('lambda_risk', 0.2),
+        'multiplier': params.get('multiplier', 4.0),
+        'floor_rel_ratio': params.get('floor_rel_ratio', 0.95),
+        'floor_accrues_with_core': params.get('floor_accrues_with_core', True),
+        'sat_max': params.get('sat_max'),  # None means 1 - core_min
+        'debug': params.get('debug', False),
+    }
+
+
+def run_weight_strategy_backtest(prices_df, instrument_ids: List[int], calendar: List[date], strategy_type: str,
+                                 rebalance: str, fees_bps: float, slippage_bps: float,
+                                 bundle_allocations: Optional[Dict[int, float]] = None) -> Dict[str, Any]:
+    """
+    Weight-schedule strategies (bundle_strategy, equal_weight, momentum) on the NumPy engine.
+    
+    prices_df: aligned close prices (calendar x instruments, no gaps). Returns the same
+    structure as the path-dependent strategies: portfolio_series, instrument_series, metrics.
+    """
+    prices = prices_df[instrument_ids].to_numpy(dtype=float)
+    returns = compute_returns(prices)
+    
+    if strategy_type == "bundle_strategy" and bundle_allocations:
+        # Bundle strategy: use fixed allocations from bundle (in percentage 0-100)
+        # Convert percentages to decimal weights (0-1)
+        # Allocations should already sum to 100%, so we divide by 100 to get weights
+        bundle_weights = {}
+        total_allocation = sum(bundle_allocations.values()) if bundle_allocations else 0.0
+        
+        if total_allocation > 0:
+            # Normalize: allocations are in percentage (0-100), convert to decimal (0-1)
+            # If total is exactly 100%, each allocation / 100 gives the weight
+            # If total is not 100%, normalize to sum to 1
+            for inst_id in instrument_ids:
+                allocation_pct = bundle_allocations.get(inst_id, 0.0)
+                if abs(total_allocation - 100.0) < 0.01:  # Already normalized to 100%
+                    bundle_weights[inst_id] = allocation_pct / 100.0
+                else:
+                    # Normalize to sum to 1 (handle case where total != 100%)
+                    bundle_weights[inst_id] = allocation_pct / total_allocation
+        else:
+            # Fallback to equal weight if no allocations defined
+            target_weight = 1.0 / len(instrument_ids) if len(instrument_ids) > 0 else 0.0
+            bundle_weights = {inst_id: target_weight for inst_id in instrument_ids}
+        
+        # Fixed weights for all dates (bundle strategy is static)
+        target_weights = compute_target_weights(returns, "bundle_strategy", {
+            "bundle_weights": [bundle_weights.get(inst_id, 0.0) for inst_id in instrument_ids],
+        })
+    elif strategy_type == "momentum":
+        # Momentum: weight by positive 20-day mean return (long-only)
+        target_weights = compute_target_weights(returns, "momentum", {"lookback": 20})
+    else:
+        # Equal weight (default): 1/n for each instrument
+        target_weights = compute_target_weights(returns, "equal_weight", {})
+    
+    # Hold targets between rebalance dates, then NAV with costs on rebalancing days
+    weights = apply_rebalance_schedule(target_weights, calendar, rebalance)
+    nav = compute_nav(weights, returns, fees_bps, slippage_bps)
+    
+    # Prepare portfolio series
+    weight_keys = [str(k) for k in instrument_ids]
+    weight_rows = np.where(np.isfinite(weights), weights, np.nan).tolist()
+    nav_l = np.nan_to_num(nav.nav_base100, nan=100.0).tolist()
+    ret_l = np.nan_to_num(nav.portfolio_returns * 100.0, nan=0.0).tolist()  # In percentage
+    dd_l = np.nan_to_num(nav.drawdown, nan=0.0).tolist()
+    turnover_l = np.nan_to_num(nav.turnover, nan=0.0).tolist()
+    costs_l = (nav.costs * 100.0).tolist()  # In percentage
+    tradable = {str(k): True for k in instrument_ids}  # Simplified: all tradable
+    portfolio_series = []
+    for i, date_val in enumerate(calendar):
+        # NaN weights (before the first rebalance date) are stored as null
+        weights_dict = {k: (v if v == v else None) for k, v in zip(weight_keys, weight_rows[i])}
+        portfolio_series.append({
+            'date': date_val,
+            'nav_base100': nav_l[i],
+            'portfolio_return': ret_l[i],
+            'drawdown': dd_l[i],
+            'turnover': turnover_l[i],
+            'costs': costs_l[i],
+            'weights_json': weights_dict,
+            'tradable_json': dict(tradable),
+        })
+    
+    # Prepare instrument series (base100 for each instrument)
+    instrument_series = instrument_series_records(calendar, instrument_ids, prices, prices[0], returns)
+    
+    # Compute basic metrics
+    metrics = {
+        'portfolio': compute_metrics(nav.nav_base100, nav.portfolio_returns, periods_per_year=252, ddof=1),
+        'instruments': {}
+    }
+    
+    return {
+        'portfolio_series': portfolio_series,
+        'instrument_series': instrument_series,
+        'metrics': metrics,
+    }
 
 
 def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_date: date, end_date: date,
                      strategy_type: str, rebalance: str, fees_bps: float, slippage_bps: float,
                      allow_weekend_trading: bool, bundle_allocations: Optional[Dict[int, float]] = None,
-                     strategy_params_json: Optional[Dict] = None) -> None:
+                     strategy_params_json: Optional[Dict] = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
     """
     Execute a backtest run
     
@@ -25,70 +214,27 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
     2. Computes equal-weight portfolio (or momentum if specified)
     3. Computes NAV series
     4. Stores results in database
+    
+    progress_callback(dates_done, dates_total) is called as the calendar is processed
+    (jobs.ProgressReporter); raising BacktestCancelled from it marks the run CANCELLED.
     """
     try:
         # Update status to RUNNING
         update_backtest_run_status(db, run_id, "RUNNING")
         
-        # Load instruments
-        instruments = load_instruments(db, instrument_ids)
-        if not instruments:
-            update_backtest_run_status(db, run_id, "FAILED", "No instruments found")
-            return
-        
-        # Load price data from market_data_bars_d1
-        price_data = load_open_bars(db, instrument_ids, start_date, end_date)
-        
-        if not price_data:
-            update_backtest_run_status(db, run_id, "FAILED", "No price data found for instruments in date range")
-            return
-        
-        # Check if we have data for all instruments
-        missing_instruments = [inst.id for inst in instruments if inst.id not in price_data or price_data[inst.id].empty]
-        if missing_instruments:
-            missing_symbols = [inst.symbol for inst in instruments if inst.id in missing_instruments]
-            update_backtest_run_status(db, run_id, "FAILED", f"No price data found for instruments: {', '.join(missing_symbols)}")
-            return
-        
-        # Build calendar from available dates
-        all_dates = set()
-        for df in price_data.values():
-            all_dates.update(df.index)
-        
-        calendar = sorted([d.date() if isinstance(d, pd.Timestamp) else d for d in all_dates])
-        
-        if not calendar:
-            update_backtest_run_status(db, run_id, "FAILED", "No dates in calendar")
-            return
-        
-        # Filter calendar by date range
-        calendar = [d for d in calendar if start_date <= d <= end_date]
-        
-        # Filter out weekends if needed
-        if not allow_weekend_trading:
-            calendar = [d for d in calendar if d.weekday() < 5]
-        
-        if not calendar:
-            update_backtest_run_status(db, run_id, "FAILED", "No trading dates in calendar after filtering")
+        try:
+            calendar, price_matrix = load_backtest_prices(db, instrument_ids, start_date, end_date, allow_weekend_trading)
+        except PriceDataError as e:
+            update_backtest_run_status(db, run_id, "FAILED", str(e))
             return
         
         effective_start = calendar[0]
         effective_end = calendar[-1]
         
-        # Create aligned price DataFrames (close prices)
-        aligned_prices = {}
-        for instrument_id, df in price_data.items():
-            # Reindex to calendar, forward fill missing values
-            df_aligned = df.reindex(pd.DatetimeIndex(calendar))
-            df_aligned = df_aligned.ffill()  # Forward fill (pandas 2.0+ syntax)
-            aligned_prices[instrument_id] = df_aligned['close']
-        
-        # Combine into single DataFrame (instruments as columns)
-        prices_df = pd.DataFrame(aligned_prices, index=pd.DatetimeIndex(calendar))
-        prices_df = prices_df.ffill().bfill()  # Forward then backward fill (pandas 2.0+ syntax)
+        if progress_callback is not None:
+            progress_callback(0, len(calendar))
         
-        # Compute returns
-        returns_df = prices_df.pct_change().fillna(0)
+        prices_df = price_matrix.to_frame()
         
         # CPPI strategy
         if strategy_type == "CPPI":
@@ -97,15 +243,6 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
             from services.bundles.errors import BundleValidationError
             from database import MarketDataBundle
             
-            # Parse CPPI params
-            params = strategy_params_json or {}
-            floor_ratio = params.get('floor_ratio', 0.90)
-            multiplier = params.get('multiplier', 4.0)
-            risky_cap = params.get('risky_cap', 1.0)
-            core_min = params.get('core_min', 0.0)
-            core_yield = params.get('core_yield', 0.035)
-            day_count = params.get('day_count', 365)
-            
             # Get bundle_id from run (stored in backtest_run)
             from database import BacktestRun
             backtest_run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
@@ -165,9 +302,6 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
             
             # Run CPPI
             try:
-                # Enable debug if strategy_params_json has debug flag
-                debug_mode = (strategy_params_json or {}).get('debug', False)
-                
                 result = run_cppi_backtest(
                     prices_df=prices_df,
                     weights_resolver=weights_resolver,
@@ -177,19 +311,12 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
                     rebalance_frequency=rebalance,
                     fees_bps=fees_bps,
                     slippage_bps=slippage_bps,
-                    floor_ratio=floor_ratio,
-                    multiplier=multiplier,
-                    risky_cap=risky_cap,
-                    core_min=core_min,
-                    core_yield=core_yield,
-                    day_count=day_count,
-                    debug=debug_mode,
+                    progress_callback=progress_callback,
+                    **cppi_params(strategy_params_json),
                 )
                 
                 # Store results
-                store_portfolio_series(db, run_id, result['portfolio_series'])
-                store_instrument_series(db, run_id, result['instrument_series'])
-                store_metrics(db, run_id, result['metrics'])
+                store_run_results(db, run_id, result)
                 
                 # Update status to SUCCESS
                 update_backtest_run_status(db, run_id, "SUCCESS", None, effective_start, effective_end)
@@ -205,34 +332,6 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
             from services.backtest.strategies.core_satellite import run_core_satellite_backtest
             from database import BacktestRun
             
-            # Parse Core-Satellite params (V1 + V2 + V2.1)
-            params = strategy_params_json or {}
-            core_yield = params.get('core_yield', 0.035)
-            target_te = params.get('target_te', 0.10)
-            te_tolerance = params.get('te_tolerance', 0.0025)
-            te_max_hard_mult = params.get('te_max_hard_mult', 1.10)
-            lookback_risk_days = params.get('lookback_risk_days', 63)
-            lookback_return_days = params.get('lookback_return_days', 63)
-            day_count = params.get('day_count', 252)
-            core_min = params.get('core_min', 0.0)
-            max_weight_per_asset = params.get('max_weight_per_asset', 0.40)
-            core_grid_step = params.get('core_grid_step', 0.01)
-            top_k_satellite = params.get('top_k_satellite')
-            # V2 params (optional, defaults maintain V1 behavior)
-            sat_min = params.get('sat_min', 0.0)
-            shrinkage = params.get('shrinkage', False)
-            turnover_penalty = params.get('turnover_penalty', 0.0)
-            stability_penalty = params.get('stability_penalty', 0.0)
-            optimization_method = params.get('optimization_method', 'grid')  # 'grid' (V1) or 'quadratic' (V2)
-            # V2.1 EDHEC-style allocation params
-            allocation_mode = params.get('allocation_mode', 'te_target')
-            lambda_risk = params.get('lambda_risk', 0.2)
-            multiplier = params.get('multiplier', 4.0)
-            floor_rel_ratio = params.get('floor_rel_ratio', 0.95)
-            floor_accrues_with_core = params.get('floor_accrues_with_core', True)
-            sat_max = params.get('sat_max')  # None means 1 - core_min
-            debug = params.get('debug', False)
-            
             # Get bundle_id from run (if present)
             backtest_run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
             bundle_id = backtest_run.bundle_id if backtest_run else None
@@ -275,215 +374,41 @@ def execute_backtest(db: Session, run_id: int, instrument_ids: List[int], start_
                     rebalance_frequency=rebalance,
                     fees_bps=fees_bps,
                     slippage_bps=slippage_bps,
-                    core_yield=core_yield,
-                    target_te=target_te,
-                    te_tolerance=te_tolerance,
-                    te_max_hard_mult=te_max_hard_mult,
-                    lookback_risk_days=lookback_risk_days,
-                    lookback_return_days=lookback_return_days,
-                    day_count=day_count,
-                    core_min=core_min,
-                    max_weight_per_asset=max_weight_per_asset,
-                    core_grid_step=core_grid_step,
-                    top_k_satellite=top_k_satellite,
-                    sat_min=sat_min,  # V2
-                    shrinkage=shrinkage,  # V2
-                    turnover_penalty=turnover_penalty,  # V2
-                    stability_penalty=stability_penalty,  # V2
-                    optimization_method=optimization_method,  # V2
-                    allocation_mode=allocation_mode,  # V2.1
-                    lambda_risk=lambda_risk,  # V2.1
-                    multiplier=multiplier,  # V2.1
-                    floor_rel_ratio=floor_rel_ratio,  # V2.1
-                    floor_accrues_with_core=floor_accrues_with_core,  # V2.1
-                    sat_max=sat_max,  # V2.1
-                    debug=debug,
+                    progress_callback=progress_callback,
+                    **core_satellite_params(strategy_params_json),
                 )
                 
                 # Store results
-                store_portfolio_series(db, run_id, result['portfolio_series'])
-                store_instrument_series(db, run_id, result['instrument_series'])
-                store_metrics(db, run_id, result['metrics'])
+                store_run_results(db, run_id, result)
                 
                 # Update status to SUCCESS
                 update_backtest_run_status(db, run_id, "SUCCESS", None, effective_start, effective_end)
                 return
+            except BacktestCancelled:
+                raise
             except Exception as e:
                 error_msg = f"CORE_SATELLITE backtest failed: {str(e)}"
                 update_backtest_run_status(db, run_id, "FAILED", error_msg)
                 raise ValueError(error_msg)
         
-        # Compute strategy weights
-        if strategy_type == "bundle_strategy" and bundle_allocations:
-            # Bundle strategy: use fixed allocations from bundle (in percentage 0-100)
-            # Convert percentages to decimal weights (0-1)
-            # Allocations should already sum to 100%, so we divide by 100 to get weights
-            bundle_weights = {}
-            total_allocation = sum(bundle_allocations.values()) if bundle_allocations else 0.0
-            
-            if total_allocation > 0:
-                # Normalize: allocations are in percentage (0-100), convert to decimal (0-1)
-                # If total is exactly 100%, each allocation / 100 gives the weight
-                # If total is not 100%, normalize to sum to 1
-                for inst_id in instrument_ids:
-                    allocation_pct = bundle_allocations.get(inst_id, 0.0)
-                    if abs(total_allocation - 100.0) < 0.01:  # Already normalized to 100%
-                        bundle_weights[inst_id] = allocation_pct / 100.0
-                    else:
-                        # Normalize to sum to 1 (handle case where total != 100%)
-                        bundle_weights[inst_id] = allocation_pct / total_allocation
-            else:
-                # Fallback to equal weight if no allocations defined
-                target_weight = 1.0 / len(instrument_ids) if len(instrument_ids) > 0 else 0.0
-                bundle_weights = {inst_id: target_weight for inst_id in instrument_ids}
-            
-            # Create DataFrame with fixed weights for all dates (bundle strategy is static)
-            weights_df = pd.DataFrame(
-                {inst_id: bundle_weights.get(inst_id, 0.0) for inst_id in instrument_ids},
-                index=prices_df.index
-            )
-        elif strategy_type == "equal_weight":
-            # Equal weight: 1/n for each instrument
-            n_instruments = len(instrument_ids)
-            target_weight = 1.0 / n_instruments if n_instruments > 0 else 0.0
-            weights_df = pd.DataFrame(
-                {inst_id: target_weight for inst_id in instrument_ids},
-                index=prices_df.index
-            )
-        elif strategy_type == "momentum":
-            # Momentum: weight by past returns (simple momentum)
-            lookback = 20  # 20 days lookback
-            momentum = returns_df.rolling(window=lookback, min_periods=1).mean()
-            # Normalize to sum to 1 (long-only)
-            momentum = momentum.clip(lower=0)  # Only positive momentum
-            row_sums = momentum.sum(axis=1)
-            weights_df = momentum.div(row_sums, axis=0).fillna(1.0 / len(instrument_ids))
-        else:
-            # Default to equal weight
-            n_instruments = len(instrument_ids)
-            target_weight = 1.0 / n_instruments if n_instruments > 0 else 0.0
-            weights_df = pd.DataFrame(
-                {inst_id: target_weight for inst_id in instrument_ids},
-                index=prices_df.index
-            )
-        
-        # Rebalance based on frequency
-        if rebalance == "daily":
-            # Already daily, no change
-            pass
-        elif rebalance == "weekly":
-            # Only rebalance on Mondays
-            weekly_weights = weights_df.resample('W-MON').first()
-            weights_df = weekly_weights.reindex(weights_df.index).ffill()
-        elif rebalance == "monthly":
-            # Only rebalance on first trading day of month
-            monthly_rebalance = weights_df.resample('MS').first()
-            weights_df = monthly_rebalance.reindex(weights_df.index).ffill()
-        
-        # Compute portfolio returns
-        portfolio_returns = (weights_df.shift(1) * returns_df).sum(axis=1).fillna(0)
-        
-        # Apply fees and slippage (on rebalancing days)
-        fees_per_trade = fees_bps / 10000.0
-        slippage_per_trade = slippage_bps / 10000.0
-        
-        # Detect rebalancing: weight changes
-        weight_changes = weights_df.diff().abs().sum(axis=1)
-        rebalance_days = weight_changes > 0.001  # Threshold for rebalancing
-        
-        # Apply costs
-        costs = pd.Series(0.0, index=portfolio_returns.index)
-        costs[rebalance_days] = fees_per_trade + slippage_per_trade
-        portfolio_returns = portfolio_returns - costs
-        
-        # Compute NAV (cumulative product)
-        nav_series = (1 + portfolio_returns).cumprod()
-        nav_base100 = nav_series * 100.0 / nav_series.iloc[0] if len(nav_series) > 0 else pd.Series([100.0])
-        
-        # Compute drawdown
-        running_max = nav_base100.cummax()
-        drawdown = (nav_base100 - running_max) / running_max * 100.0
-        
-        # Compute turnover
-        turnover = weight_changes * 100.0
-        
-        # Prepare portfolio series
-        portfolio_series = []
-        for i, (idx, row) in enumerate(nav_base100.items()):
-            date_val = idx.date() if isinstance(idx, pd.Timestamp) else idx
-            # Handle NaN values in weights: convert to None (null in JSON)
-            weights_dict = {}
-            for k, v in weights_df.loc[idx].items():
-                val = float(v) if not pd.isna(v) else None
-                if val is not None and (np.isnan(val) or np.isinf(val)):
-                    val = None
-                weights_dict[str(k)] = val
-            
-            portfolio_series.append({
-                'date': date_val,
-                'nav_base100': float(nav_base100.iloc[i]) if not pd.isna(nav_base100.iloc[i]) else 100.0,
-                'portfolio_return': float(portfolio_returns.iloc[i]) * 100.0 if not pd.isna(portfolio_returns.iloc[i]) else 0.0,  # In percentage
-                'drawdown': float(drawdown.iloc[i]) if not pd.isna(drawdown.iloc[i]) else 0.0,
-                'turnover': float(turnover.iloc[i]) if not pd.isna(turnover.iloc[i]) else 0.0,
-                'costs': float(costs.iloc[i]) * 100.0 if not pd.isna(costs.iloc[i]) else 0.0,  # In percentage
-                'weights_json': weights_dict,
-                'tradable_json': {str(k): True for k in instrument_ids},  # Simplified: all tradable
-            })
-        
-        # Prepare instrument series (base100 for each instrument)
-        instrument_series = {}
-        for instrument_id in instrument_ids:
-            inst_prices = prices_df[instrument_id]
-            inst_base100 = inst_prices / inst_prices.iloc[0] * 100.0 if len(inst_prices) > 0 else pd.Series([100.0])
-            inst_returns = returns_df[instrument_id] * 100.0  # In percentage
-            
-            instrument_series[instrument_id] = []
-            for i, (idx, price) in enumerate(inst_prices.items()):
-                date_val = idx.date() if isinstance(idx, pd.Timestamp) else idx
-                base100_val = float(inst_base100.iloc[i]) if i < len(inst_base100) and not pd.isna(inst_base100.iloc[i]) else 100.0
-                return_val = float(inst_returns.iloc[i]) if i < len(inst_returns) and not pd.isna(inst_returns.iloc[i]) else 0.0
-                
-                # Check for NaN or inf and replace with defaults
-                if np.isnan(base100_val) or np.isinf(base100_val):
-                    base100_val = 100.0
-                if np.isnan(return_val) or np.isinf(return_val):
-                    return_val = 0.0
-                
-                instrument_series[instrument_id].append({
-                    'date': date_val,
-                    'base100': base100_val,
-                    'instrument_return': return_val,
-                })
-        
-        # Compute basic metrics
-        total_return = (nav_base100.iloc[-1] / nav_base100.iloc[0] - 1) * 100.0 if len(nav_base100) > 0 else 0.0
-        annualized_return = (1 + total_return / 100.0) ** (252.0 / len(calendar)) - 1 if len(calendar) > 0 else 0.0
-        annualized_return_pct = annualized_return * 100.0
-        
-        volatility = portfolio_returns.std() * np.sqrt(252) * 100.0  # Annualized volatility
-        sharpe = (annualized_return_pct / volatility) if volatility > 0 else 0.0
-        
-        max_drawdown = drawdown.min()
-        
-        metrics = {
-            'portfolio': {
-                'total_return': total_return,
-                'annualized_return': annualized_return_pct,
-                'volatility': volatility,
-                'sharpe_ratio': sharpe,
-                'max_drawdown': float(max_drawdown),
-            },
-            'instruments': {}
-        }
+        # Weight-schedule strategies (bundle_strategy, equal_weight, momentum)
+        result = run_weight_strategy_backtest(
+            prices_df, instrument_ids, calendar, strategy_type, rebalance, fees_bps, slippage_bps,
+            bundle_allocations=bundle_allocations,
+        )
+        if progress_callback is not None:
+            progress_callback(len(calendar), len(calendar))
         
         # Store results
-        store_portfolio_series(db, run_id, portfolio_series)
-        store_instrument_series(db, run_id, instrument_series)
-        store_metrics(db, run_id, metrics)
+        store_run_results(db, run_id, result)
         
         # Update status to SUCCESS
         update_backtest_run_status(db, run_id, "SUCCESS", None, effective_start, effective_end)
         
+    except BacktestCancelled:
+        db.rollback()
+        update_backtest_run_status(db, run_id, "CANCELLED", "Cancelled by user")
+        raise
     except Exception as e:
         import traceback
         error_msg = f"Backtest execution failed: {str(e)}\n{traceback.format_exc()}"
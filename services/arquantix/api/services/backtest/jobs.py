@@ -0,0 +1,255 @@
+"""
+Backtest job queue - run execute_backtest on a process pool instead of inside the HTTP request.
+
+- The route creates the BacktestRun (PENDING) and submits its id; a worker process opens its
+  own session and runs execute_backtest (CPU-bound strategies scale across cores).
+- Progress: the strategies report (dates processed, total dates); the worker writes it to
+  backtest_runs.progress_done / progress_total, throttled to one UPDATE per
+  PROGRESS_MIN_INTERVAL_SEC.
+- Cancellation is cooperative: POST /{run_id}/cancel sets cancel_requested, the next progress
+  write sees it and aborts the run (status CANCELLED).
+- Reuse: params_hash fingerprints the inputs; an identical request returns the latest
+  SUCCESS run, or a run in flight on this process's pool, instead of recomputing. PENDING /
+  RUNNING rows not tracked by the live pool (left behind by a restart, or owned by another
+  API process) are never reused: they may never finish.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import BacktestRun
+
+logger = logging.getLogger(__name__)
+
+# Exécution asynchrone (false = exécution dans la requête, comportement historique)
+BACKTEST_ASYNC_ENABLED = os.getenv("BACKTEST_ASYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+# Nombre de processus de calcul
+BACKTEST_WORKERS = max(1, int(os.getenv("BACKTEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1)))))
+# Intervalle minimal entre deux écritures de progression
+PROGRESS_MIN_INTERVAL_SEC = float(os.getenv("BACKTEST_PROGRESS_MIN_INTERVAL_SEC", "1.0"))
+
+TERMINAL_STATUSES = ("SUCCESS", "FAILED", "CANCELLED")
+INFLIGHT_STATUSES = ("PENDING", "RUNNING")
+
+
+class BacktestCancelled(Exception):
+    """Raised from the progress callback when cancellation was requested for the run."""
+
+
+def compute_params_hash(
+    instrument_ids: List[int],
+    start_date: date,
+    end_date: date,
+    strategy_type: str,
+    rebalance: str,
+    fees_bps: float,
+    slippage_bps: float,
+    allow_weekend_trading: bool,
+    bundle_id: Optional[str] = None,
+    bundle_allocations: Optional[Dict[int, float]] = None,
+    strategy_params_json: Optional[Dict[str, Any]] = None,
+) -> str:
+    """SHA-256 of the canonical JSON of every input that changes a backtest result."""
+    payload = {
+        "instrument_ids": sorted(int(i) for i in instrument_ids),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "strategy_type": strategy_type,
+        "rebalance": rebalance,
+        "fees_bps": float(fees_bps),
+        "slippage_bps": float(slippage_bps),
+        "allow_weekend_trading": bool(allow_weekend_trading),
+        "bundle_id": str(bundle_id) if bundle_id is not None else None,
+        "bundle_allocations": {str(k): float(v) for k, v in (bundle_allocations or {}).items()},
+        "strategy_params": strategy_params_json or {},
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def find_reusable_run(db: Session, params_hash: str) -> Optional[BacktestRun]:
+    """
+    Latest run with the same inputs that is either SUCCESS or in flight on this process's
+    pool (submitted here, not finished, not being cancelled). None otherwise.
+    """
+    candidates = (
+        db.query(BacktestRun)
+        .filter(
+            BacktestRun.params_hash == params_hash,
+            BacktestRun.status.in_(("SUCCESS",) + INFLIGHT_STATUSES),
+        )
+        .order_by(BacktestRun.id.desc())
+        .limit(5)
+        .all()
+    )
+    for run in candidates:
+        if run.status == "SUCCESS":
+            return run
+        if not run.cancel_requested and is_tracked(run.id):
+            return run
+    return None
+
+
+_PROGRESS_SQL = text(
+    "UPDATE public.backtest_runs SET progress_done = :done, progress_total = :total "
+    "WHERE id = :run_id RETURNING cancel_requested"
+)
+
+
+class ProgressReporter:
+    """
+    progress_callback for execute_backtest: persists (done, total) at most once per
+    min_interval_sec (always on the last date) and raises BacktestCancelled when
+    cancel_requested is set on the run.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        run_id: int,
+        min_interval_sec: float = PROGRESS_MIN_INTERVAL_SEC,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.db = db
+        self.run_id = run_id
+        self.min_interval_sec = min_interval_sec
+        self.clock = clock
+        self._last_write: Optional[float] = None
+        self.writes = 0
+
+    def __call__(self, done: int, total: int) -> None:
+        now = self.clock()
+        if (
+            self._last_write is not None
+            and done < total
+            and now - self._last_write < self.min_interval_sec
+        ):
+            return
+        self._last_write = now
+        cancel = self.db.execute(
+            _PROGRESS_SQL, {"done": int(done), "total": int(total), "run_id": self.run_id}
+        ).scalar()
+        self.db.commit()
+        self.writes += 1
+        if cancel:
+            raise BacktestCancelled(f"Backtest run {self.run_id} cancelled")
+
+
+def run_backtest_job(run_id: int, job_kwargs: Dict[str, Any]) -> Optional[str]:
+    """
+    Worker entry point (runs in a pool process): execute one queued run with its own session.
+    job_kwargs are the execute_backtest arguments except db, run_id and progress_callback.
+    Returns the final status (None if the run no longer exists).
+    """
+    from database import SessionLocal
+    from services.backtest.executor import execute_backtest
+
+    db = SessionLocal()
+    try:
+        run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
+        if run is None:
+            return None
+        if run.status in TERMINAL_STATUSES:
+            return run.status
+        if run.cancel_requested:
+            run.status = "CANCELLED"
+            run.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            return run.status
+        run.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        try:
+            execute_backtest(db=db, run_id=run_id, progress_callback=ProgressReporter(db, run_id), **job_kwargs)
+        except BacktestCancelled:
+            pass  # status already CANCELLED (executor)
+        except Exception:
+            logger.exception("Backtest run %s failed", run_id)
+            db.rollback()
+
+        run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
+        if run is None:
+            return None
+        if run.status not in TERMINAL_STATUSES:
+            run.status = "FAILED"
+            run.error_message = run.error_message or "Backtest worker stopped before completion"
+        run.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        return run.status
+    finally:
+        db.close()
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Runs soumis au pool de ce process et pas encore terminés
+_tracked: Set[int] = set()
+_tracked_lock = threading.Lock()
+
+
+def is_tracked(run_id: int) -> bool:
+    with _tracked_lock:
+        return run_id in _tracked
+
+
+def _untrack(run_id: int) -> None:
+    with _tracked_lock:
+        _tracked.discard(run_id)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: les workers ne doivent pas hériter des connexions du pool SQLAlchemy du parent
+            _pool = ProcessPoolExecutor(
+                max_workers=BACKTEST_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _on_job_done(run_id: int, future: Future) -> None:
+    _untrack(run_id)
+    try:
+        logger.info("Backtest run %s finished: %s", run_id, future.result())
+    except Exception:
+        logger.exception("Backtest run %s: worker error", run_id)
+
+
+def submit_backtest(run_id: int, job_kwargs: Dict[str, Any]) -> Future:
+    """Queue a PENDING run on the process pool (recreated once if a worker crashed)."""
+    with _tracked_lock:
+        _tracked.add(run_id)
+    try:
+        try:
+            future = _get_pool().submit(run_backtest_job, run_id, job_kwargs)
+        except BrokenProcessPool:
+            logger.warning("Backtest process pool broken, recreating it")
+            _reset_pool()
+            future = _get_pool().submit(run_backtest_job, run_id, job_kwargs)
+    except Exception:
+        _untrack(run_id)
+        raise
+    future.add_done_callback(lambda f: _on_job_done(run_id, f))
+    return future
+
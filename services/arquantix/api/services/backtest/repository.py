@@ -1,14 +1,27 @@
 """
 Backtest repository - Database operations for backtests
 """
+import csv
+import io
+import json
+import os
 from typing import List, Dict, Any, Optional
 from datetime import date
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
-from decimal import Decimal
+from sqlalchemy import and_, func, insert, JSON
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import pandas as pd
 
 from database import MarketDataInstrument, MarketDataBarD1
+from services.backtest.columnar import BLOB_FORMAT, clean_json_numbers, encode_series
+
+# Lignes par INSERT multi-valeurs (plafonné pour rester sous la limite de 65535 paramètres)
+BULK_INSERT_BATCH = int(os.getenv("BACKTEST_BULK_INSERT_BATCH", "5000"))
+# À partir de ce nombre de lignes, COPY FROM STDIN (psycopg2) remplace les INSERT
+BULK_COPY_MIN_ROWS = int(os.getenv("BACKTEST_BULK_COPY_MIN_ROWS", "2000"))
+# Écrit aussi le blob colonnaire (backtest_series_blobs) lu par /series et /compare
+SERIES_BLOB_ENABLED = os.getenv("BACKTEST_SERIES_BLOB_ENABLED", "true").lower() in ("1", "true", "yes")
+_MAX_BIND_PARAMS = 60000
 
 
 def load_instruments(db: Session, instrument_ids: List[int]) -> List[Any]:
@@ -92,108 +105,180 @@ def update_backtest_run_status(db: Session, run_id: int, status: str, error_mess
         db.commit()
 
 
-def store_portfolio_series(db: Session, run_id: int, series: List[Dict[str, Any]]) -> None:
+def portfolio_series_rows(run_id: int, series: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """backtest_portfolio_series rows of a strategy portfolio_series"""
+    return [
+        {
+            'run_id': run_id,
+            'date': item['date'],
+            'nav_base100': float(item.get('nav_base100', 100.0)),
+            'portfolio_return': float(item.get('portfolio_return', 0.0)),
+            'drawdown': float(item.get('drawdown', 0.0)),
+            'turnover': float(item.get('turnover', 0.0)),
+            'costs': float(item.get('costs', 0.0)),
+            # NaN / inf weights are not valid JSON: stored as null
+            'weights_json': clean_json_numbers(item.get('weights_json')),
+            'tradable_json': item.get('tradable_json'),
+        }
+        for item in series
+    ]
+
+
+def instrument_series_rows(run_id: int, series: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """backtest_instrument_series rows of a strategy instrument_series"""
+    return [
+        {
+            'run_id': run_id,
+            'instrument_id': instrument_id,
+            'date': item['date'],
+            'base100': float(item.get('base100', 100.0)),
+            'instrument_return': float(item['instrument_return']) if item.get('instrument_return') is not None else None,
+        }
+        for instrument_id, instrument_series in series.items()
+        for item in instrument_series
+    ]
+
+
+def metrics_rows(run_id: int, metrics: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """backtest_metrics rows of {'portfolio': {...}, 'instruments': {id: {...}}}; None values are skipped"""
+    rows = [
+        {'run_id': run_id, 'scope': 'portfolio', 'instrument_id': None, 'key': key, 'value': float(value)}
+        for key, value in metrics.get('portfolio', {}).items()
+        if value is not None
+    ]
+    for instrument_id, inst_metrics in metrics.get('instruments', {}).items():
+        rows.extend(
+            {'run_id': run_id, 'scope': 'instrument', 'instrument_id': instrument_id, 'key': key, 'value': float(value)}
+            for key, value in inst_metrics.items()
+            if value is not None
+        )
+    return rows
+
+
+def _copy_value(value: Any, is_json: bool) -> Any:
+    if is_json:
+        return json.dumps(value)
+    if value is None:
+        return ''  # unquoted empty field = NULL in COPY csv
+    return value
+
+
+def _copy_rows(db: Session, table: Any, rows: List[Dict[str, Any]]) -> None:
+    """COPY FROM STDIN (csv) on the session's connection / transaction"""
+    columns = [c for c in table.columns if c.name in rows[0]]
+    names = [c.name for c in columns]
+    is_json = [isinstance(c.type, JSON) for c in columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[name], j) for name, j in zip(names, is_json)])
+    buffer.seek(0)
+    column_list = ', '.join(f'"{name}"' for name in names)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {table.schema}.{table.name} ({column_list}) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+        cursor.close()
+
+
+def bulk_insert_rows(db: Session, model: Any, rows: List[Dict[str, Any]]) -> None:
+    """
+    Insert plain row dicts without ORM objects: COPY for large sets on psycopg2,
+    multi-row INSERT ... VALUES batches otherwise. Does not commit.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    db.flush()
+    if len(rows) >= BULK_COPY_MIN_ROWS and db.get_bind().dialect.driver == 'psycopg2':
+        _copy_rows(db, table, rows)
+        return
+    batch = max(1, min(BULK_INSERT_BATCH, _MAX_BIND_PARAMS // len(rows[0])))
+    for start in range(0, len(rows), batch):
+        db.execute(insert(table).values(rows[start:start + batch]))
+
+
+def store_portfolio_series(db: Session, run_id: int, series: List[Dict[str, Any]], commit: bool = True) -> None:
     """Store portfolio series data"""
     from database import BacktestPortfolioSeries
-    from decimal import Decimal
-    import json
-    
+
     # Delete existing series for this run
     db.query(BacktestPortfolioSeries).filter(BacktestPortfolioSeries.run_id == run_id).delete()
-    
-    # Insert new series
-    for item in series:
-        # Clean weights_json: remove None values and ensure valid JSON
-        weights_json = item.get('weights_json', {})
-        if weights_json:
-            # Remove None values and convert to valid JSON-serializable dict
-            weights_json = {k: (v if v is not None else None) for k, v in weights_json.items()}
-            # Ensure all values are valid (not NaN, inf, etc.)
-            cleaned_weights = {}
-            for k, v in weights_json.items():
-                if v is None:
-                    cleaned_weights[k] = None
-                else:
-                    try:
-                        val = float(v)
-                        if not (val != val or val == float('inf') or val == float('-inf')):  # Check for NaN or inf
-                            cleaned_weights[k] = val
-                        else:
-                            cleaned_weights[k] = None
-                    except (ValueError, TypeError):
-                        cleaned_weights[k] = None
-            weights_json = cleaned_weights
-        
-        portfolio_series = BacktestPortfolioSeries(
-            run_id=run_id,
-            date=item['date'],
-            nav_base100=Decimal(str(item.get('nav_base100', 100.0))),
-            portfolio_return=Decimal(str(item.get('portfolio_return', 0.0))),
-            drawdown=Decimal(str(item.get('drawdown', 0.0))),
-            turnover=Decimal(str(item.get('turnover', 0.0))),
-            costs=Decimal(str(item.get('costs', 0.0))),
-            weights_json=weights_json if weights_json else None,
-            tradable_json=item.get('tradable_json'),
-        )
-        db.add(portfolio_series)
-    
-    db.commit()
+    bulk_insert_rows(db, BacktestPortfolioSeries, portfolio_series_rows(run_id, series))
+    if commit:
+        db.commit()
 
 
-def store_instrument_series(db: Session, run_id: int, series: Dict[int, List[Dict[str, Any]]]) -> None:
+def store_instrument_series(db: Session, run_id: int, series: Dict[int, List[Dict[str, Any]]], commit: bool = True) -> None:
     """Store instrument series data"""
     from database import BacktestInstrumentSeries
-    from decimal import Decimal
-    
+
     # Delete existing series for this run
     db.query(BacktestInstrumentSeries).filter(BacktestInstrumentSeries.run_id == run_id).delete()
-    
-    # Insert new series for each instrument
-    for instrument_id, instrument_series in series.items():
-        for item in instrument_series:
-            instrument_series_obj = BacktestInstrumentSeries(
-                run_id=run_id,
-                instrument_id=instrument_id,
-                date=item['date'],
-                base100=Decimal(str(item.get('base100', 100.0))),
-                instrument_return=Decimal(str(item['instrument_return'])) if item.get('instrument_return') is not None else None,
-            )
-            db.add(instrument_series_obj)
-    
-    db.commit()
+    bulk_insert_rows(db, BacktestInstrumentSeries, instrument_series_rows(run_id, series))
+    if commit:
+        db.commit()
 
 
-def store_metrics(db: Session, run_id: int, metrics: Dict[str, Any]) -> None:
+def store_metrics(db: Session, run_id: int, metrics: Dict[str, Any], commit: bool = True) -> None:
     """Store computed metrics"""
     from database import BacktestMetrics
-    from decimal import Decimal
-    
+
     # Delete existing metrics for this run
     db.query(BacktestMetrics).filter(BacktestMetrics.run_id == run_id).delete()
-    
-    # Store portfolio metrics
-    portfolio_metrics = metrics.get('portfolio', {})
-    for key, value in portfolio_metrics.items():
-        metric = BacktestMetrics(
-            run_id=run_id,
-            scope='portfolio',
-            instrument_id=None,
-            key=key,
-            value=Decimal(str(value)),
+    bulk_insert_rows(db, BacktestMetrics, metrics_rows(run_id, metrics))
+    if commit:
+        db.commit()
+
+
+def store_series_blob(
+    db: Session,
+    run_id: int,
+    portfolio_series: List[Dict[str, Any]],
+    instrument_series: Dict[int, List[Dict[str, Any]]],
+    commit: bool = True,
+) -> None:
+    """Store (or replace) the columnar blob of a run; removes it when SERIES_BLOB_ENABLED is off"""
+    from database import BacktestSeriesBlob
+
+    if not SERIES_BLOB_ENABLED:
+        db.query(BacktestSeriesBlob).filter(BacktestSeriesBlob.run_id == run_id).delete()
+    else:
+        values = {
+            'run_id': run_id,
+            'format': BLOB_FORMAT,
+            'n_dates': len(portfolio_series),
+            'n_instruments': len(instrument_series),
+            'payload': encode_series(portfolio_series, instrument_series),
+        }
+        stmt = pg_insert(BacktestSeriesBlob).values(values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['run_id'],
+            set_={k: stmt.excluded[k] for k in ('format', 'n_dates', 'n_instruments', 'payload')},
         )
-        db.add(metric)
-    
-    # Store instrument metrics
-    instrument_metrics = metrics.get('instruments', {})
-    for instrument_id, inst_metrics in instrument_metrics.items():
-        for key, value in inst_metrics.items():
-            metric = BacktestMetrics(
-                run_id=run_id,
-                scope='instrument',
-                instrument_id=instrument_id,
-                key=key,
-                value=Decimal(str(value)),
-            )
-            db.add(metric)
-    
-    db.commit()
+        db.execute(stmt)
+    if commit:
+        db.commit()
+
+
+def store_run_results(db: Session, run_id: int, result: Dict[str, Any], metrics: Optional[Dict[str, Any]] = None, commit: bool = True) -> None:
+    """Series, metrics (result['metrics'] unless given) and columnar blob of a run, in one transaction"""
+    store_portfolio_series(db, run_id, result['portfolio_series'], commit=False)
+    store_instrument_series(db, run_id, result['instrument_series'], commit=False)
+    store_metrics(db, run_id, result['metrics'] if metrics is None else metrics, commit=False)
+    store_series_blob(db, run_id, result['portfolio_series'], result['instrument_series'], commit=False)
+    if commit:
+        db.commit()
+
+
+def load_series_blobs(db: Session, run_ids: List[int]) -> Dict[int, bytes]:
+    """run_id -> columnar blob payload, for the runs that have one in a known format"""
+    from database import BacktestSeriesBlob
+
+    if not run_ids:
+        return {}
+    rows = db.query(BacktestSeriesBlob.run_id, BacktestSeriesBlob.payload).filter(
+        BacktestSeriesBlob.run_id.in_(run_ids),
+        BacktestSeriesBlob.format == BLOB_FORMAT,
+    ).all()
+    return {run_id: bytes(payload) for run_id, payload in rows}
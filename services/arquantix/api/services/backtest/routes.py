@@ -1,14 +1,16 @@
 """
 Backtest routes - API endpoints for backtest operations
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, Response, status
 from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import date, datetime
+from typing import Any, Dict, Optional, List
+from datetime import date, datetime, timezone
 from pydantic import BaseModel
 
-from database import get_db, BacktestRun, MarketDataInstrument, BundleComponent, MarketDataBundle
+from database import get_db, BacktestRun, BacktestSweep, BacktestSweepResult, MarketDataInstrument, BundleComponent, MarketDataBundle
 from auth import get_current_user, AdminUser
+from services.backtest.columnar import columnar_payload, decode_series, encode_series, instrument_rows, portfolio_rows
+from services.backtest.repository import load_series_blobs
 
 router = APIRouter(prefix="/api/backtests", tags=["backtests"])
 
@@ -79,27 +81,23 @@ class BacktestRunResponse(BaseModel):
     message: Optional[str] = None
 
 
+class BacktestSweepRequest(BacktestRunRequest):
+    """Base run request (strategy.params shared by every combination) plus the params grid."""
+    grid: Dict[str, List[Any]]  # strategy param name -> values to try
+    top_k: int = 5  # best combinations stored as full backtest runs (series)
+    rank_metric: str = "sharpe_ratio"
+    rank_ascending: bool = False
+
+
 # ============================================================================
 # Routes
 # ============================================================================
 
-@router.post("/run", status_code=status.HTTP_201_CREATED)
-def create_backtest_run(
-    request: BacktestRunRequest,
-    current_user: AdminUser = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Create and run a new backtest"""
-    # Validate dates
-    try:
-        start_date = date.fromisoformat(request.start_date)
-        end_date = date.fromisoformat(request.end_date)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
-    
-    if start_date >= end_date:
-        raise HTTPException(status_code=400, detail="start_date must be before end_date")
-    
+def _resolve_universe(db: Session, request: BacktestRunRequest):
+    """
+    (instrument_ids, bundle_allocations, strategy_type) of a run request: bundle constituents
+    and allocations when bundle_id is set, then validation that every instrument exists.
+    """
     # Get instrument IDs from bundle if bundle_id is provided
     instrument_ids = request.instrument_ids
     bundle_allocations = None  # Map of instrument_id -> allocation percentage (0-100)
@@ -156,6 +154,69 @@ def create_backtest_run(
             detail=f"Some instrument IDs not found: {list(missing_ids)}"
         )
     
+    return instrument_ids, bundle_allocations, final_strategy_type
+
+
+@router.post("/run", status_code=status.HTTP_201_CREATED)
+def create_backtest_run(
+    request: BacktestRunRequest,
+    current_user: AdminUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a backtest run and queue it on the worker pool (services/backtest/jobs.py).
+    Poll GET /{run_id} for status and progress. An identical request returns the latest
+    finished (or in-flight) run with the same inputs instead of recomputing ("reused": true).
+    """
+    # Validate dates
+    try:
+        start_date = date.fromisoformat(request.start_date)
+        end_date = date.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    instrument_ids, bundle_allocations, final_strategy_type = _resolve_universe(db, request)
+    
+    from services.backtest.jobs import (
+        BACKTEST_ASYNC_ENABLED, compute_params_hash, find_reusable_run, submit_backtest,
+    )
+    
+    strategy_params = request.strategy.params.dict() if request.strategy.params else None
+    params_hash = compute_params_hash(
+        instrument_ids=instrument_ids,
+        start_date=start_date,
+        end_date=end_date,
+        strategy_type=final_strategy_type,
+        rebalance=request.rebalance,
+        fees_bps=request.fees_bps,
+        slippage_bps=request.slippage_bps,
+        allow_weekend_trading=request.allow_weekend_trading,
+        bundle_id=request.bundle_id,
+        bundle_allocations=bundle_allocations,
+        strategy_params_json=strategy_params,
+    )
+    
+    existing_run = find_reusable_run(db, params_hash)
+    if existing_run is not None:
+        if existing_run.status == "SUCCESS":
+            message = f"Identical backtest already completed (run {existing_run.id}), reusing its results."
+        else:
+            message = f"Identical backtest already in progress (run {existing_run.id})."
+        return {
+            "run_id": existing_run.id,
+            "id": existing_run.id,
+            "name": existing_run.name,
+            "status": existing_run.status,
+            "created_at": existing_run.created_at.isoformat() if existing_run.created_at else "",
+            "start_date": existing_run.start_date.isoformat(),
+            "end_date": existing_run.end_date.isoformat(),
+            "message": message,
+            "reused": True,
+        }
+    
     # Create backtest run (final_strategy_type already set above)
     backtest_run = BacktestRun(
         name=request.name,
@@ -171,37 +232,53 @@ def create_backtest_run(
         instrument_ids_json=instrument_ids,
         bundle_id=request.bundle_id,
         status="PENDING",
+        params_hash=params_hash,
     )
     
     db.add(backtest_run)
     db.commit()
     db.refresh(backtest_run)
     
-    # Execute backtest synchronously (for now)
-    # TODO: In production, this should be queued as an async task
+    job_kwargs = {
+        "instrument_ids": instrument_ids,
+        "start_date": start_date,
+        "end_date": end_date,
+        "strategy_type": final_strategy_type,
+        "rebalance": request.rebalance,
+        "fees_bps": request.fees_bps,
+        "slippage_bps": request.slippage_bps,
+        "allow_weekend_trading": request.allow_weekend_trading,
+        "bundle_allocations": bundle_allocations,  # Still used for bundle_strategy, not CPPI
+        "strategy_params_json": strategy_params,
+    }
+    
+    if BACKTEST_ASYNC_ENABLED:
+        try:
+            submit_backtest(backtest_run.id, job_kwargs)
+            message = "Backtest queued."
+        except Exception as e:
+            backtest_run.status = "FAILED"
+            backtest_run.error_message = f"Failed to queue backtest: {str(e)}"
+            db.commit()
+            message = f"Backtest execution error: {str(e)}"
+        return {
+            "run_id": backtest_run.id,
+            "id": backtest_run.id,
+            "name": backtest_run.name,
+            "status": backtest_run.status,
+            "created_at": backtest_run.created_at.isoformat() if backtest_run.created_at else "",
+            "start_date": backtest_run.start_date.isoformat(),
+            "end_date": backtest_run.end_date.isoformat(),
+            "message": message,
+            "reused": False,
+        }
+    
+    # Inline execution (BACKTEST_ASYNC_ENABLED=false)
     try:
         from services.backtest.executor import execute_backtest
         
-        # Parse strategy params
-        strategy_params = None
-        if request.strategy.params:
-            strategy_params = request.strategy.params.dict()
-        
         try:
-            execute_backtest(
-                db=db,
-                run_id=backtest_run.id,
-                instrument_ids=instrument_ids,
-                start_date=start_date,
-                end_date=end_date,
-                strategy_type=final_strategy_type,
-                rebalance=request.rebalance,
-                fees_bps=request.fees_bps,
-                slippage_bps=request.slippage_bps,
-                allow_weekend_trading=request.allow_weekend_trading,
-                bundle_allocations=bundle_allocations,  # Still used for bundle_strategy, not CPPI
-                strategy_params_json=strategy_params,
-            )
+            execute_backtest(db=db, run_id=backtest_run.id, **job_kwargs)
         except ValueError as e:
             # Catch bundle validation errors (raised as ValueError from executor)
             error_msg = str(e)
@@ -247,6 +324,7 @@ def create_backtest_run(
         "start_date": backtest_run.start_date.isoformat(),
         "end_date": backtest_run.end_date.isoformat(),
         "message": message,
+        "reused": False,
     }
 
 
@@ -280,21 +358,81 @@ def get_backtest_run(
             "instrument_ids_json": backtest_run.instrument_ids_json,
             "bundle_id": backtest_run.bundle_id,
             "error_message": backtest_run.error_message,
+            "progress_done": backtest_run.progress_done,
+            "progress_total": backtest_run.progress_total,
+            "cancel_requested": bool(backtest_run.cancel_requested),
+            "started_at": backtest_run.started_at.isoformat() if backtest_run.started_at else None,
+            "finished_at": backtest_run.finished_at.isoformat() if backtest_run.finished_at else None,
         }
     }
 
 
+@router.post("/{run_id}/cancel")
+def cancel_backtest_run(
+    run_id: int,
+    current_user: AdminUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a queued or running backtest. A PENDING run is cancelled immediately; a RUNNING
+    run stops at its next progress update (status becomes CANCELLED).
+    """
+    backtest_run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
+    if not backtest_run:
+        raise HTTPException(status_code=404, detail="Backtest run not found")
+    if backtest_run.status not in ("PENDING", "RUNNING"):
+        raise HTTPException(
+            status_code=409,
+            detail=f"Backtest run is already {backtest_run.status}",
+        )
+    
+    backtest_run.cancel_requested = True
+    if backtest_run.status == "PENDING":
+        backtest_run.status = "CANCELLED"
+        backtest_run.error_message = "Cancelled by user"
+        backtest_run.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    
+    return {
+        "run_id": backtest_run.id,
+        "status": backtest_run.status,
+        "cancel_requested": True,
+    }
+
+
 @router.get("/{run_id}/series")
 def get_backtest_series(
     run_id: int,
+    format: str = Query("rows", pattern="^(rows|columnar|npz)$"),
     current_user: AdminUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get backtest series data (portfolio and instrument series)"""
+    """
+    Get backtest series data (portfolio and instrument series)
+
+    format=rows (default): one dict per bar, as expected by the frontend.
+    format=columnar: one JSON array per series. format=npz: the raw columnar blob.
+    Runs stored with a columnar blob are served from it without reading the series rows.
+    """
     backtest_run = db.query(BacktestRun).filter(BacktestRun.id == run_id).first()
     if not backtest_run:
         raise HTTPException(status_code=404, detail="Backtest run not found")
     
+    blob = load_series_blobs(db, [run_id]).get(run_id)
+    if blob is None:
+        blob = _encode_series_rows(db, run_id) if format != "rows" else None
+    if format == "npz":
+        return Response(
+            content=blob,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="backtest_{run_id}_series.npz"'},
+        )
+    if format == "columnar":
+        return columnar_payload(decode_series(blob))
+    if blob is not None:
+        decoded = decode_series(blob)
+        return _series_response(db, portfolio_rows(decoded), instrument_rows(decoded))
+    
     from database import BacktestPortfolioSeries, BacktestInstrumentSeries
     from collections import defaultdict
     
@@ -323,18 +461,22 @@ def get_backtest_series(
         for ps in portfolio_series
     ]
     
-    # Group instrument series by instrument_id and get symbols
+    # Group instrument series by instrument_id
     instrument_dict = defaultdict(list)
-    instrument_ids = set()
-    
     for is_ in instrument_series:
-        instrument_ids.add(is_.instrument_id)
         instrument_dict[is_.instrument_id].append({
             "date": is_.date.isoformat(),
             "base100": float(is_.base100),
             "instrument_return": float(is_.instrument_return) if is_.instrument_return else None,
         })
     
+    return _series_response(db, portfolio, instrument_dict)
+
+
+def _series_response(db: Session, portfolio: List[Dict[str, Any]], instrument_dict: Dict[int, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """{ portfolio: PortfolioBar[], instruments: InstrumentSeries[] } with instrument symbols"""
+    instrument_ids = set(instrument_dict.keys())
+    
     # Get instrument symbols
     instruments_data = {}
     if instrument_ids:
@@ -360,6 +502,38 @@ def get_backtest_series(
     }
 
 
+def _encode_series_rows(db: Session, run_id: int) -> bytes:
+    """Columnar blob built from the series rows (runs stored before backtest_series_blobs)"""
+    from database import BacktestPortfolioSeries, BacktestInstrumentSeries
+    from collections import defaultdict
+    
+    portfolio_series = [
+        {
+            "date": ps.date,
+            "nav_base100": float(ps.nav_base100),
+            "portfolio_return": float(ps.portfolio_return),
+            "drawdown": float(ps.drawdown),
+            "turnover": float(ps.turnover),
+            "costs": float(ps.costs),
+            "weights_json": ps.weights_json,
+            "tradable_json": ps.tradable_json,
+        }
+        for ps in db.query(BacktestPortfolioSeries).filter(
+            BacktestPortfolioSeries.run_id == run_id
+        ).order_by(BacktestPortfolioSeries.date)
+    ]
+    instrument_series = defaultdict(list)
+    for is_ in db.query(BacktestInstrumentSeries).filter(
+        BacktestInstrumentSeries.run_id == run_id
+    ).order_by(BacktestInstrumentSeries.date):
+        instrument_series[is_.instrument_id].append({
+            "date": is_.date,
+            "base100": float(is_.base100),
+            "instrument_return": float(is_.instrument_return) if is_.instrument_return is not None else None,
+        })
+    return encode_series(portfolio_series, dict(instrument_series))
+
+
 def should_rebalance(current_date: date, last_rebalance_date: date, rebalance_freq: str) -> bool:
     """Determine if rebalancing should occur"""
     # Stub implementation
@@ -474,7 +648,7 @@ def compare_backtests(
     """Compare multiple backtest runs"""
     from collections import defaultdict
     from sqlalchemy import and_
-    from database import BacktestPortfolioSeries, BacktestInstrumentSeries, BacktestMetrics
+    from database import BacktestPortfolioSeries, BacktestMetrics
     
     # Validate run_ids
     if len(request.run_ids) < 1:
@@ -521,18 +695,27 @@ def compare_backtests(
             "bundle_id": run.bundle_id,
         }
     
-    # Load portfolio series for all runs
-    portfolio_series_all = db.query(BacktestPortfolioSeries).filter(
-        BacktestPortfolioSeries.run_id.in_(request.run_ids)
-    ).order_by(BacktestPortfolioSeries.date).all()
-    
-    # Group by run_id
+    # Load nav_base100 series: columnar blobs first, rows for runs stored without one
+    blobs = load_series_blobs(db, request.run_ids)
     series_by_run = defaultdict(list)
-    for ps in portfolio_series_all:
-        series_by_run[ps.run_id].append({
-            "date": ps.date.isoformat(),
-            "nav_base100": float(ps.nav_base100),
-        })
+    for run_id, blob in blobs.items():
+        decoded = decode_series(blob, with_instruments=False, with_json=False)
+        series_by_run[run_id] = [
+            {"date": d.isoformat(), "nav_base100": nav}
+            for d, nav in zip(decoded.dates, decoded.portfolio["nav_base100"].tolist())
+        ]
+    row_run_ids = [run_id for run_id in request.run_ids if run_id not in blobs]
+    if row_run_ids:
+        portfolio_series_all = db.query(
+            BacktestPortfolioSeries.run_id, BacktestPortfolioSeries.date, BacktestPortfolioSeries.nav_base100
+        ).filter(
+            BacktestPortfolioSeries.run_id.in_(row_run_ids)
+        ).order_by(BacktestPortfolioSeries.date).all()
+        for ps in portfolio_series_all:
+            series_by_run[ps.run_id].append({
+                "date": ps.date.isoformat(),
+                "nav_base100": float(ps.nav_base100),
+            })
     
     # Get date sets for each run
     date_sets = {run_id: {item["date"] for item in series} for run_id, series in series_by_run.items()}
@@ -553,24 +736,18 @@ def compare_backtests(
     
     aligned_dates = sorted(list(aligned_dates))
     
-    # Build aligned series
-    aligned_series = []
-    for date_str in aligned_dates:
-        values = {}
-        for run_id in request.run_ids:
-            # Find nav_base100 for this run_id and date
-            nav_value = None
-            run_series = series_by_run.get(run_id, [])
-            for item in run_series:
-                if item["date"] == date_str:
-                    nav_value = item["nav_base100"]
-                    break
-            values[str(run_id)] = nav_value
-        
-        aligned_series.append({
+    # Build aligned series (nav_base100 by date for each run)
+    nav_by_run = {
+        run_id: {item["date"]: item["nav_base100"] for item in series}
+        for run_id, series in series_by_run.items()
+    }
+    aligned_series = [
+        {
             "date": date_str,
-            "values": values,
-        })
+            "values": {str(run_id): nav_by_run.get(run_id, {}).get(date_str) for run_id in request.run_ids},
+        }
+        for date_str in aligned_dates
+    ]
     
     # Load metrics for all runs
     metrics_all = db.query(BacktestMetrics).filter(
@@ -677,3 +854,152 @@ def compare_backtests(
         "series": aligned_series,
         "stats": stats_by_run,
     }
+
+
+# ============================================================================
+# Parameter sweeps
+# ============================================================================
+
+@router.post("/sweeps", status_code=status.HTTP_201_CREATED)
+def create_backtest_sweep(
+    request: BacktestSweepRequest,
+    current_user: AdminUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Run one backtest per combination of the strategy params grid (services/backtest/sweep.py).
+    Prices are loaded once and shared by the worker processes; every combination gets summary
+    metrics, the top_k by rank_metric are also stored as regular runs (run_id in the results).
+    Poll GET /sweeps/{sweep_id}.
+    """
+    from pydantic import ValidationError
+    from services.backtest.sweep import (
+        SUMMARY_METRIC_KEYS, SWEEP_MAX_TOP_K, SweepError, expand_grid, submit_sweep,
+    )
+    
+    try:
+        start_date = date.fromisoformat(request.start_date)
+        end_date = date.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    if start_date >= end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    
+    unknown = set(request.grid) - set(BacktestStrategyParams.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown strategy params in grid: {sorted(unknown)}")
+    if request.rank_metric not in SUMMARY_METRIC_KEYS:
+        raise HTTPException(status_code=400, detail=f"rank_metric must be one of {list(SUMMARY_METRIC_KEYS)}")
+    if not 0 <= request.top_k <= SWEEP_MAX_TOP_K:
+        raise HTTPException(status_code=400, detail=f"top_k must be between 0 and {SWEEP_MAX_TOP_K}")
+    
+    base_params = request.strategy.params.dict() if request.strategy.params else {}
+    try:
+        combos = expand_grid(base_params, request.grid)
+        for combo in combos:
+            BacktestStrategyParams(**combo)
+    except SweepError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid grid value: {e.errors()}")
+    
+    instrument_ids, _, final_strategy_type = _resolve_universe(db, request)
+    
+    sweep = BacktestSweep(
+        name=request.name,
+        created_by_email=current_user.email,
+        start_date=start_date,
+        end_date=end_date,
+        rebalance=request.rebalance,
+        strategy_type=final_strategy_type,
+        base_params_json=base_params,
+        grid_json=request.grid,
+        fees_bps=request.fees_bps,
+        slippage_bps=request.slippage_bps,
+        allow_weekend_trading="true" if request.allow_weekend_trading else "false",
+        instrument_ids_json=instrument_ids,
+        bundle_id=request.bundle_id,
+        rank_metric=request.rank_metric,
+        rank_ascending=request.rank_ascending,
+        top_k=request.top_k,
+        status="PENDING",
+        combinations_total=len(combos),
+        combinations_done=0,
+    )
+    db.add(sweep)
+    db.commit()
+    db.refresh(sweep)
+    
+    try:
+        submit_sweep(sweep.id)
+        message = f"Sweep queued ({len(combos)} combinations)."
+    except Exception as e:
+        sweep.status = "FAILED"
+        sweep.error_message = f"Failed to queue sweep: {str(e)}"
+        db.commit()
+        message = f"Sweep execution error: {str(e)}"
+    
+    return {
+        "sweep_id": sweep.id,
+        "status": sweep.status,
+        "combinations_total": len(combos),
+        "message": message,
+    }
+
+
+@router.get("/sweeps/{sweep_id}")
+def get_backtest_sweep(
+    sweep_id: int,
+    limit: int = 100,
+    current_user: AdminUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Sweep status and results, best rank first (unranked and failed combinations last)."""
+    sweep = db.query(BacktestSweep).filter(BacktestSweep.id == sweep_id).first()
+    if not sweep:
+        raise HTTPException(status_code=404, detail="Backtest sweep not found")
+    
+    results = (
+        db.query(BacktestSweepResult)
+        .filter(BacktestSweepResult.sweep_id == sweep_id)
+        .order_by(BacktestSweepResult.rank.asc().nulls_last(), BacktestSweepResult.combo_index)
+        .limit(limit)
+        .all()
+    )
+    
+    return {
+        "sweep": {
+            "id": sweep.id,
+            "name": sweep.name,
+            "status": sweep.status,
+            "created_at": sweep.created_at.isoformat() if sweep.created_at else None,
+            "start_date": sweep.start_date.isoformat(),
+            "end_date": sweep.end_date.isoformat(),
+            "rebalance": sweep.rebalance,
+            "strategy_type": sweep.strategy_type,
+            "base_params_json": sweep.base_params_json,
+            "grid_json": sweep.grid_json,
+            "rank_metric": sweep.rank_metric,
+            "rank_ascending": bool(sweep.rank_ascending),
+            "top_k": sweep.top_k,
+            "combinations_total": sweep.combinations_total,
+            "combinations_done": sweep.combinations_done,
+            "error_message": sweep.error_message,
+            "started_at": sweep.started_at.isoformat() if sweep.started_at else None,
+            "finished_at": sweep.finished_at.isoformat() if sweep.finished_at else None,
+        },
+        "results": [
+            {
+                "combo_index": r.combo_index,
+                "rank": r.rank,
+                "status": r.status,
+                "params": {k: r.params_json.get(k) for k in (sweep.grid_json or {})},
+                "metrics": r.metrics_json,
+                "error_message": r.error_message,
+                "elapsed_ms": r.elapsed_ms,
+                "run_id": r.run_id,
+            }
+            for r in results
+        ],
+    }
@@ -21,6 +21,15 @@ from typing import Dict, List, Callable, Optional, Tuple
 from datetime import date, timedelta
 import warnings
 
+from services.backtest.engine import (
+    PriceMatrix,
+    RollingMoments,
+    compute_metrics,
+    compute_returns,
+    instrument_series_records,
+    rebalance_mask,
+)
+
 
 def run_core_satellite_backtest(
     prices_df: pd.DataFrame,  # Index: date, Columns: instrument_id
@@ -55,6 +64,7 @@ def run_core_satellite_backtest(
     floor_accrues_with_core: bool = True,  # Whether floor accrues with core_yield
     sat_max: Optional[float] = None,  # Maximum satellite weight (default: 1 - core_min)
     debug: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,  # (dates_done, dates_total)
 ) -> Dict:
     """
     Run Core-Satellite backtest
@@ -93,464 +103,344 @@ def run_core_satellite_backtest(
     instrument_ids = available_inst_ids
     prices_df = prices_df[instrument_ids].copy()
     
-    # Rebalance dates
-    rebalance_dates = set()
-    if rebalance_frequency == "daily":
-        rebalance_dates = set(calendar)
-    elif rebalance_frequency == "weekly":
-        for d in calendar:
-            if d.weekday() == 0:  # Monday
-                rebalance_dates.add(d)
-        if calendar and calendar[0] not in rebalance_dates:
-            rebalance_dates.add(calendar[0])
-    elif rebalance_frequency == "monthly":
-        current_month = None
-        for d in calendar:
-            if current_month is None or d.month != current_month:
-                rebalance_dates.add(d)
-                current_month = d.month
-    else:
-        rebalance_dates = set(calendar)
-    
-    rebalance_dates = sorted(rebalance_dates)
-    
-    # Compute returns
-    returns_df = prices_df.pct_change().fillna(0)
+    # Dense arrays (calendar x instruments); calendar positions index every per-date array
+    matrix = PriceMatrix.from_frame(prices_df, instrument_ids)
+    row_of = {d: t for t, d in enumerate(matrix.dates)}
+    cal_rows = [row_of[d] for d in calendar]
+    P = matrix.values[cal_rows]
+    R = compute_returns(matrix.values)[cal_rows]
+    R_held = np.where(np.isnan(P), 0.0, R)  # dates without price contribute nothing
+    first_prices = matrix.values[0]
+    n = len(calendar)
+    n_inst = len(instrument_ids)
     
     # Core daily growth factor
     core_daily_growth = (1 + core_yield) ** (1.0 / day_count)
     core_daily_return = core_daily_growth - 1
     
+    # Relative floor (dynamic_cushion) accrues per calendar day elapsed
+    ordinals = np.array([d.toordinal() for d in calendar])
+    days_since_last = np.zeros(n, dtype=int)
+    days_since_last[1:] = np.diff(ordinals)
+    day_growth = np.where(days_since_last > 0, core_daily_growth ** np.maximum(days_since_last, 0), 1.0)
+    dynamic = allocation_mode == "dynamic_cushion"
+    if dynamic and floor_accrues_with_core:
+        rel_floor_path = np.cumprod(np.concatenate(([floor_rel_ratio], day_growth[1:])))
+    else:
+        rel_floor_path = np.full(n, float(floor_rel_ratio))
+    
+    # Optimizer inputs: mean return / covariance over the lookback windows ending on each
+    # rebalance date, updated incrementally (rows [e + 1 - lookback, e + 1) of R)
+    return_moments = RollingMoments(R, lookback_return_days, covariance=False)
+    risk_moments = RollingMoments(R, lookback_risk_days)
+    
+    # Rebalance dates (the first date never rebalances: start 100% core)
+    events = [int(e) for e in np.flatnonzero(rebalance_mask(calendar, rebalance_frequency)) if e > 0]
+    
     # State
     portfolio_nav = initial_capital
     core_weight = 1.0  # Start 100% core
     satellite_weights = {inst_id: 0.0 for inst_id in instrument_ids}
-    core_nav = initial_capital
+    sat_vec = np.zeros(n_inst)  # satellite_weights in instrument_ids order
     last_rebalance_date = None
     
     # V2.1: State for dynamic_cushion mode
     rel_index = 1.0  # Relative performance index (portfolio vs core)
     rel_floor = floor_rel_ratio  # Relative floor (starts at floor_rel_ratio)
     
-    # Storage
-    portfolio_series = []
-    instrument_series = {inst_id: [] for inst_id in instrument_ids}
+    # Per-date paths
+    portfolio_return = np.empty(n)
+    nav_path = np.empty(n)
+    rel_index_path = np.ones(n)
+    core_weight_path = np.empty(n)
+    sat_weight_path = np.empty((n, n_inst))
     debug_log = []  # Debug output
-    
-    # For TE calculation
-    portfolio_returns_list = []
-    core_returns_list = []
-    
-    # Daily loop
-    for i, current_date in enumerate(calendar):
-        date_ts = pd.Timestamp(current_date)
+    rebalance_info: Dict[int, Dict] = {}  # date index -> debug rebalance entry (debug=True only)
+    
+    if progress_callback is not None:
+        progress_callback(0, n)
+    
+    # Weights are constant between rebalance dates: each segment is array ops
+    seg_start = 0
+    for e in events + [n]:
+        if e > seg_start:
+            w_vec = sat_vec
+            seg = slice(seg_start, e)
+            rp = core_weight * core_daily_return + R_held[seg] @ w_vec
+            portfolio_return[seg] = rp
+            nav_path[seg] = np.cumprod(np.concatenate(([portfolio_nav], 1 + rp)))[1:]
+            portfolio_nav = nav_path[e - 1]
+            core_weight_path[seg] = core_weight
+            sat_weight_path[seg] = w_vec
+            if dynamic:
+                factors = (1 + rp) / (1 + core_daily_return)
+                if seg_start == 0:
+                    factors[0] = 1.0  # rel_index starts at 1.0 on the first date
+                rel_index_path[seg] = np.cumprod(np.concatenate(([rel_index], factors)))[1:]
+                rel_index = rel_index_path[e - 1]
+                rel_floor = rel_floor_path[e - 1]
+        if e == n:
+            break
         
-        # Get prices for this date
-        current_prices = prices_df.loc[date_ts] if date_ts in prices_df.index else None
+        if progress_callback is not None:
+            progress_callback(e, n)
+        current_date = calendar[e]
+        current_prices = P[e]
         
-        # Check if rebalance day
-        should_rebalance = current_date in rebalance_dates
-        prices_available = True
-        missing_instruments = []
+        # Check prices available
+        unavailable = np.isnan(current_prices) | ~(current_prices > 0)
+        if unavailable.any():
+            # Skip rebalance, keep last weights
+            if debug:
+                debug_log.append({
+                    'date': current_date.isoformat(),
+                    'event': 'rebalance_skipped',
+                    'reason': 'missing_prices',
+                    'missing_instruments': [instrument_ids[j] for j in np.flatnonzero(unavailable)],
+                    'nav': float(portfolio_nav),
+                })
+            seg_start = e
+            continue
         
-        if should_rebalance and i > 0:
-            # Check prices available
-            if current_prices is None:
-                prices_available = False
-            else:
-                for inst_id in instrument_ids:
-                    if inst_id not in current_prices.index or pd.isna(current_prices[inst_id]) or current_prices[inst_id] <= 0:
-                        prices_available = False
-                        missing_instruments.append(inst_id)
+        # Rebalance: optimize weights
+        try:
+            # Get historical data up to (and including) current_date
+            hist_end_idx = e + 1
+            hist_start_idx = max(0, hist_end_idx - max(lookback_risk_days, lookback_return_days))
             
-            if not prices_available:
-                # Skip rebalance, keep last weights
+            if hist_end_idx - hist_start_idx < 5:
+                # Not enough history, skip optimization
                 if debug:
                     debug_log.append({
                         'date': current_date.isoformat(),
                         'event': 'rebalance_skipped',
-                        'reason': 'missing_prices',
-                        'missing_instruments': missing_instruments,
+                        'reason': 'insufficient_history',
                         'nav': float(portfolio_nav),
                     })
             else:
-                # Rebalance: optimize weights
-                try:
-                    # Get historical data up to (and including) current_date
-                    hist_end_idx = calendar.index(current_date) + 1
-                    hist_start_idx = max(0, hist_end_idx - max(lookback_risk_days, lookback_return_days))
-                    hist_dates = calendar[hist_start_idx:hist_end_idx]
-                    
-                    if len(hist_dates) < 5:
-                        # Not enough history, skip optimization
-                        if debug:
-                            debug_log.append({
-                                'date': current_date.isoformat(),
-                                'event': 'rebalance_skipped',
-                                'reason': 'insufficient_history',
-                                'nav': float(portfolio_nav),
-                            })
+                # Window statistics of the historical returns
+                mu_all = return_moments.advance(hist_end_idx).mean()
+                cov_all = risk_moments.advance(hist_end_idx).cov()
+                
+                # V2.1: Build unit satellite portfolio (w_unit sums to 1)
+                previous_satellite_weights_unit = {inst_id: sat_weight / (1 - core_weight) if (1 - core_weight) > 1e-6 else 0.0 for inst_id, sat_weight in satellite_weights.items()} if core_weight < 1.0 - 1e-6 else {inst_id: 0.0 for inst_id in instrument_ids}
+                
+                w_unit_result = build_unit_satellite_portfolio_from_moments(
+                    mu_all=mu_all,
+                    cov_all=cov_all,
+                    core_daily_return=core_daily_return,
+                    day_count=day_count,
+                    max_weight_per_asset=max_weight_per_asset,
+                    top_k_satellite=top_k_satellite,
+                    shrinkage=shrinkage,
+                    turnover_penalty=turnover_penalty,
+                    stability_penalty=stability_penalty,
+                    optimization_method=optimization_method,
+                    previous_satellite_weights=previous_satellite_weights_unit,
+                    instrument_ids=instrument_ids,
+                )
+                
+                w_unit = w_unit_result['w_unit']  # Dict[instrument_id, float], sums to 1.0
+                te_sat = w_unit_result['te_sat']  # Annualized TE for unit portfolio
+                ir_sat = w_unit_result['ir_sat']  # IR for unit portfolio
+                cov_matrix_use = w_unit_result.get('cov_matrix_shrunk') if shrinkage else w_unit_result['cov_matrix']
+                
+                # V2.1: Compute scalar satellite weight w using allocation_mode
+                # Default sat_max
+                sat_max_computed = sat_max if sat_max is not None else (1.0 - core_min)
+                
+                w_scalar, alloc_metadata = compute_scalar_satellite_weight(
+                    w_unit_result=w_unit_result,
+                    allocation_mode=allocation_mode,
+                    target_te=target_te,
+                    lambda_risk=lambda_risk,
+                    multiplier=multiplier,
+                    sat_min=sat_min,
+                    sat_max=sat_max_computed,
+                    rel_index=rel_index,
+                    rel_floor=rel_floor,
+                    core_daily_return=core_daily_return,
+                    day_count=day_count,
+                    te_max_hard_mult=te_max_hard_mult,
+                )
+                
+                # Apply scalar: final satellite weights = w_scalar * w_unit
+                new_satellite_weights = {inst_id: w_scalar * w_unit.get(inst_id, 0.0) for inst_id in instrument_ids}
+                
+                # Core weight = 1 - w_scalar, but enforce core_min
+                new_core_weight = max(1.0 - w_scalar, core_min)
+                
+                # If core_min forces core_weight up, reduce satellite accordingly
+                if new_core_weight > 1.0 - w_scalar:
+                    actual_sat_weight = 1.0 - new_core_weight
+                    if actual_sat_weight < 1e-6:
+                        new_satellite_weights = {inst_id: 0.0 for inst_id in instrument_ids}
                     else:
-                        # Get historical prices/returns
-                        hist_prices = prices_df.loc[pd.DatetimeIndex(hist_dates)]
-                        hist_returns = returns_df.loc[pd.DatetimeIndex(hist_dates)]
-                        
-                        # V2.1: Build unit satellite portfolio (w_unit sums to 1)
-                        previous_satellite_weights_unit = {inst_id: sat_weight / (1 - core_weight) if (1 - core_weight) > 1e-6 else 0.0 for inst_id, sat_weight in satellite_weights.items()} if core_weight < 1.0 - 1e-6 else {inst_id: 0.0 for inst_id in instrument_ids}
-                        
-                        w_unit_result = build_unit_satellite_portfolio(
-                            hist_returns=hist_returns,
-                            core_daily_return=core_daily_return,
-                            lookback_risk_days=lookback_risk_days,
-                            lookback_return_days=lookback_return_days,
-                            day_count=day_count,
-                            max_weight_per_asset=max_weight_per_asset,
-                            top_k_satellite=top_k_satellite,
-                            shrinkage=shrinkage,
-                            turnover_penalty=turnover_penalty,
-                            stability_penalty=stability_penalty,
-                            optimization_method=optimization_method,
-                            previous_satellite_weights=previous_satellite_weights_unit,
-                            instrument_ids=instrument_ids,
-                        )
-                        
-                        w_unit = w_unit_result['w_unit']  # Dict[instrument_id, float], sums to 1.0
-                        te_sat = w_unit_result['te_sat']  # Annualized TE for unit portfolio
-                        ir_sat = w_unit_result['ir_sat']  # IR for unit portfolio
-                        cov_matrix_use = w_unit_result.get('cov_matrix_shrunk') if shrinkage else w_unit_result['cov_matrix']
-                        
-                        # V2.1: Compute scalar satellite weight w using allocation_mode
-                        # Default sat_max
-                        sat_max_computed = sat_max if sat_max is not None else (1.0 - core_min)
-                        
-                        w_scalar, alloc_metadata = compute_scalar_satellite_weight(
-                            w_unit_result=w_unit_result,
-                            allocation_mode=allocation_mode,
-                            target_te=target_te,
-                            lambda_risk=lambda_risk,
-                            multiplier=multiplier,
-                            sat_min=sat_min,
-                            sat_max=sat_max_computed,
-                            rel_index=rel_index,
-                            rel_floor=rel_floor,
-                            core_daily_return=core_daily_return,
-                            day_count=day_count,
-                            te_max_hard_mult=te_max_hard_mult,
-                        )
-                        
-                        # Apply scalar: final satellite weights = w_scalar * w_unit
-                        new_satellite_weights = {inst_id: w_scalar * w_unit.get(inst_id, 0.0) for inst_id in instrument_ids}
-                        
-                        # Core weight = 1 - w_scalar, but enforce core_min
-                        new_core_weight = max(1.0 - w_scalar, core_min)
-                        
-                        # If core_min forces core_weight up, reduce satellite accordingly
-                        if new_core_weight > 1.0 - w_scalar:
-                            actual_sat_weight = 1.0 - new_core_weight
-                            if actual_sat_weight < 1e-6:
-                                new_satellite_weights = {inst_id: 0.0 for inst_id in instrument_ids}
-                            else:
-                                # Scale down satellite weights proportionally
-                                scale = actual_sat_weight / w_scalar if w_scalar > 1e-6 else 0.0
-                                new_satellite_weights = {inst_id: scale * new_satellite_weights.get(inst_id, 0.0) for inst_id in instrument_ids}
-                            w_scalar = actual_sat_weight
-                        
-                        # Compute predicted TE for final portfolio
-                        w_sat_vector = np.array([new_satellite_weights.get(inst_id, 0.0) for inst_id in instrument_ids])
-                        if len(w_sat_vector) > 0 and cov_matrix_use.size > 0:
-                            te_pred = float(np.sqrt(w_sat_vector @ cov_matrix_use @ w_sat_vector))
-                        else:
-                            te_pred = 0.0
-                        
-                        te_pred_shrunk = te_pred if shrinkage else None
-                        optimization_score = None  # Not available with V2.1 approach
-                        
-                        # Compute turnover (based on unit portfolio changes if available, else use absolute changes)
-                        satellite_turnover = sum(abs(new_satellite_weights.get(inst_id, 0.0) - satellite_weights.get(inst_id, 0.0)) for inst_id in instrument_ids) / 2.0
-                        portfolio_turnover = abs(new_core_weight - core_weight) + satellite_turnover
-                        
-                        # Apply transaction costs
-                        if last_rebalance_date is not None:
-                            cost_amount = portfolio_turnover * (fees_bps + slippage_bps) / 10000.0 * portfolio_nav
-                            portfolio_nav = portfolio_nav - cost_amount
-                        else:
-                            cost_amount = 0.0
-                        
-                        # Update weights
-                        core_weight = new_core_weight
-                        satellite_weights = new_satellite_weights.copy()
-                        last_rebalance_date = current_date
-                        
-                        # Store V2.1 metadata for debug log
-                        v2_1_metadata = {
-                            'alloc_mode': allocation_mode,
-                            'w_scalar': float(w_scalar),
-                            'te_sat': float(te_sat),
-                            'ir_sat': float(ir_sat) if ir_sat is not None and not np.isnan(ir_sat) else None,
-                        }
-                        if allocation_mode == "dynamic_cushion":
-                            cushion = max(rel_index - rel_floor, 0.0)
-                            v2_1_metadata.update({
-                                'rel_index': float(rel_index),
-                                'rel_floor': float(rel_floor),
-                                'cushion': float(cushion),
-                            })
-                        
-                        if debug:
-                            debug_log.append({
-                                'date': current_date.isoformat(),
-                                'event': 'rebalance',
-                                'core_weight': float(core_weight),
-                                'satellite_weights': {str(k): float(v) for k, v in satellite_weights.items()},
-                                'te_pred': float(te_pred),
-                                'te_pred_shrunk': float(te_pred_shrunk) if te_pred_shrunk is not None else None,
-                                'optimization_score': float(optimization_score) if optimization_score is not None else None,
-                                'satellite_turnover': float(satellite_turnover),
-                                'portfolio_turnover': float(portfolio_turnover),
-                                'nav': float(portfolio_nav),
-                                'cost': float(cost_amount),
-                                **v2_1_metadata,
-                            })
-                        
-                except Exception as e:
-                    # Optimization failed, skip rebalance
-                    if debug:
-                        debug_log.append({
-                            'date': current_date.isoformat(),
-                            'event': 'rebalance_skipped',
-                            'reason': f'optimization_error: {str(e)}',
-                            'nav': float(portfolio_nav),
-                        })
-        
-        # Compute portfolio return for this day (BEFORE updating NAV)
-        # Portfolio return = core_weight * core_return + sum(satellite_weights * instrument_returns)
-        portfolio_return = core_weight * core_daily_return
-        
-        if current_prices is not None:
-            for inst_id in instrument_ids:
-                if inst_id in current_prices.index and not pd.isna(current_prices[inst_id]) and inst_id in satellite_weights:
-                    inst_return = returns_df.loc[date_ts, inst_id] if date_ts in returns_df.index else 0.0
-                    if not pd.isna(inst_return):
-                        portfolio_return += satellite_weights[inst_id] * inst_return
-        
-        # Store portfolio return BEFORE updating NAV (for TE calculation)
-        portfolio_returns_list.append(portfolio_return)
-        core_returns_list.append(core_daily_return)
-        
-        # V2.1: Update relative performance index (for dynamic_cushion mode)
-        if allocation_mode == "dynamic_cushion":
-            if i > 0:
-                # rel_index(t) = rel_index(t-1) * (1 + r_p(t)) / (1 + r_c(t))
-                rel_index = rel_index * (1 + portfolio_return) / (1 + core_daily_return)
+                        # Scale down satellite weights proportionally
+                        scale = actual_sat_weight / w_scalar if w_scalar > 1e-6 else 0.0
+                        new_satellite_weights = {inst_id: scale * new_satellite_weights.get(inst_id, 0.0) for inst_id in instrument_ids}
+                    w_scalar = actual_sat_weight
                 
-                # Update relative floor (if floor_accrues_with_core)
-                if floor_accrues_with_core:
-                    days_since_last = (current_date - calendar[i-1]).days
-                    if days_since_last > 0:
-                        rel_floor = rel_floor * (core_daily_growth ** days_since_last)
-                # else: rel_floor stays at initial floor_rel_ratio
-            else:
-                # Initialize on first date
-                rel_index = 1.0
-                rel_floor = floor_rel_ratio
-        
-        # Update NAV
-        portfolio_nav = portfolio_nav * (1 + portfolio_return)
-        
-        # Update core NAV (for benchmark)
-        if i > 0:
-            days_since_last = (current_date - calendar[i-1]).days
-            if days_since_last > 0:
-                core_nav = core_nav * (core_daily_growth ** days_since_last)
+                # Compute predicted TE for final portfolio
+                w_sat_vector = np.array([new_satellite_weights.get(inst_id, 0.0) for inst_id in instrument_ids])
+                if len(w_sat_vector) > 0 and cov_matrix_use.size > 0:
+                    te_pred = float(np.sqrt(w_sat_vector @ cov_matrix_use @ w_sat_vector))
+                else:
+                    te_pred = 0.0
+                
+                te_pred_shrunk = te_pred if shrinkage else None
+                optimization_score = None  # Not available with V2.1 approach
+                
+                # Compute turnover (based on unit portfolio changes if available, else use absolute changes)
+                satellite_turnover = float(np.abs(w_sat_vector - sat_vec).sum()) / 2.0
+                portfolio_turnover = abs(new_core_weight - core_weight) + satellite_turnover
+                
+                # Apply transaction costs
+                if last_rebalance_date is not None:
+                    cost_amount = portfolio_turnover * (fees_bps + slippage_bps) / 10000.0 * portfolio_nav
+                    portfolio_nav = portfolio_nav - cost_amount
+                else:
+                    cost_amount = 0.0
+                
+                # Update weights
+                core_weight = new_core_weight
+                satellite_weights = new_satellite_weights.copy()
+                sat_vec = w_sat_vector
+                last_rebalance_date = current_date
+                
+                # Store V2.1 metadata for debug log
+                v2_1_metadata = {
+                    'alloc_mode': allocation_mode,
+                    'w_scalar': float(w_scalar),
+                    'te_sat': float(te_sat),
+                    'ir_sat': float(ir_sat) if ir_sat is not None and not np.isnan(ir_sat) else None,
+                }
+                if dynamic:
+                    cushion = max(rel_index - rel_floor, 0.0)
+                    v2_1_metadata.update({
+                        'rel_index': float(rel_index),
+                        'rel_floor': float(rel_floor),
+                        'cushion': float(cushion),
+                    })
+                
+                if debug:
+                    entry = {
+                        'date': current_date.isoformat(),
+                        'event': 'rebalance',
+                        'core_weight': float(core_weight),
+                        'satellite_weights': {str(k): float(v) for k, v in satellite_weights.items()},
+                        'te_pred': float(te_pred),
+                        'te_pred_shrunk': float(te_pred_shrunk) if te_pred_shrunk is not None else None,
+                        'optimization_score': float(optimization_score) if optimization_score is not None else None,
+                        'satellite_turnover': float(satellite_turnover),
+                        'portfolio_turnover': float(portfolio_turnover),
+                        'nav': float(portfolio_nav),
+                        'cost': float(cost_amount),
+                        **v2_1_metadata,
+                    }
+                    debug_log.append(entry)
+                    rebalance_info[e] = entry
+                
+        except Exception as exc:
+            # Optimization failed, skip rebalance
+            if debug:
+                debug_log.append({
+                    'date': current_date.isoformat(),
+                    'event': 'rebalance_skipped',
+                    'reason': f'optimization_error: {str(exc)}',
+                    'nav': float(portfolio_nav),
+                })
+        seg_start = e
+    
+    # Realized TE (rolling window of active returns)
+    active = portfolio_return - core_daily_return
+    te_realized = np.full(n, np.nan)
+    if n >= lookback_risk_days >= 2:
+        windows = np.lib.stride_tricks.sliding_window_view(active, lookback_risk_days)
+        te_realized[lookback_risk_days - 1:] = windows.std(axis=1, ddof=1) * np.sqrt(day_count)
+    
+    # Store portfolio series
+    nav_base100 = nav_path / initial_capital * 100.0
+    ret_pct = portfolio_return * 100.0
+    sat_totals = sat_weight_path.sum(axis=1)
+    cushion_path = np.maximum(rel_index_path - rel_floor_path, 0.0)
+    ids_str = [str(inst_id) for inst_id in instrument_ids]
+    tradable = {k: True for k in ids_str}
+    nav_l, ret_l, cw_l, te_l = nav_base100.tolist(), ret_pct.tolist(), core_weight_path.tolist(), te_realized.tolist()
+    sat_rows = sat_weight_path.tolist()
+    
+    portfolio_series = []
+    for t in range(n):
+        info = rebalance_info.get(t)
+        weights_dict = dict(zip(ids_str, sat_rows[t]))
+        weights_dict['_core_weight'] = cw_l[t]
+        if not np.isnan(te_l[t]):
+            weights_dict['_te_realized'] = te_l[t]
+        portfolio_turnover_t = 0.0
+        if info is not None:
+            weights_dict['_te_pred'] = info['te_pred']
+            if info['te_pred_shrunk'] is not None:
+                weights_dict['_te_pred_shrunk'] = info['te_pred_shrunk']
+            if info['satellite_turnover'] > 0:
+                weights_dict['_satellite_turnover'] = info['satellite_turnover']
+            if info['portfolio_turnover'] > 0:
+                portfolio_turnover_t = info['portfolio_turnover']
+                weights_dict['_portfolio_turnover'] = portfolio_turnover_t
+            if info['optimization_score'] is not None:
+                weights_dict['_optimization_score'] = info['optimization_score']
+            w_scalar_current = info['w_scalar']
         else:
-            core_nav = initial_capital
-        
-        # Compute realized TE (rolling window)
-        te_realized = None
-        if len(portfolio_returns_list) >= lookback_risk_days:
-            # Get active returns for last lookback_risk_days
-            active_returns_window = []
-            start_idx = max(0, len(portfolio_returns_list) - lookback_risk_days)
-            for j in range(start_idx, len(portfolio_returns_list)):
-                port_ret = portfolio_returns_list[j]
-                core_ret = core_returns_list[j]
-                active_return = port_ret - core_ret
-                active_returns_window.append(active_return)
-            
-            if len(active_returns_window) >= 2:
-                te_realized = np.std(active_returns_window, ddof=1) * np.sqrt(day_count)
-        
-        # Store portfolio series
-        nav_base100 = (portfolio_nav / initial_capital) * 100.0
-        core_nav_base100 = (core_nav / initial_capital) * 100.0
-        
-        # Get V2 metrics from last rebalance (if available)
-        satellite_turnover = 0.0
-        portfolio_turnover = 0.0
-        te_pred_current = None
-        te_pred_shrunk_current = None
-        optimization_score_current = None
-        
-        # V2.1: Get metadata from last rebalance
-        w_scalar_current = None
-        te_sat_current = None
-        ir_sat_current = None
-        alloc_mode_current = allocation_mode
-        rel_index_current = rel_index if allocation_mode == "dynamic_cushion" else None
-        rel_floor_current = rel_floor if allocation_mode == "dynamic_cushion" else None
-        cushion_current = None
-        
-        if debug_log and debug_log[-1].get('event') == 'rebalance' and debug_log[-1].get('date') == current_date.isoformat():
-            satellite_turnover = debug_log[-1].get('satellite_turnover', 0.0)
-            portfolio_turnover = debug_log[-1].get('portfolio_turnover', 0.0)
-            te_pred_current = debug_log[-1].get('te_pred')
-            te_pred_shrunk_current = debug_log[-1].get('te_pred_shrunk')
-            optimization_score_current = debug_log[-1].get('optimization_score')
-            # V2.1 fields
-            w_scalar_current = debug_log[-1].get('w_scalar')
-            te_sat_current = debug_log[-1].get('te_sat')
-            ir_sat_current = debug_log[-1].get('ir_sat')
-            if allocation_mode == "dynamic_cushion":
-                rel_index_current = debug_log[-1].get('rel_index', rel_index)
-                rel_floor_current = debug_log[-1].get('rel_floor', rel_floor)
-                cushion_current = debug_log[-1].get('cushion')
-        
-        # For dates after rebalance, use last rebalance's w_scalar, or compute from current weights
-        if w_scalar_current is None:
             # Estimate w_scalar from current weights
-            total_sat_weight = sum(satellite_weights.values())
-            w_scalar_current = total_sat_weight if total_sat_weight > 1e-6 else 0.0
-        
-        # Compute cushion for current date (dynamic_cushion mode)
-        if allocation_mode == "dynamic_cushion":
-            cushion_current = max(rel_index - rel_floor, 0.0) if rel_index_current is not None and rel_floor_current is not None else None
-        
-        weights_dict = {str(inst_id): float(satellite_weights.get(inst_id, 0.0)) for inst_id in instrument_ids}
-        weights_dict['_core_weight'] = float(core_weight)
-        if te_realized is not None:
-            weights_dict['_te_realized'] = float(te_realized)
-        if te_pred_current is not None:
-            weights_dict['_te_pred'] = float(te_pred_current)
-        if te_pred_shrunk_current is not None:
-            weights_dict['_te_pred_shrunk'] = float(te_pred_shrunk_current)
-        if satellite_turnover > 0:
-            weights_dict['_satellite_turnover'] = float(satellite_turnover)
-        if portfolio_turnover > 0:
-            weights_dict['_portfolio_turnover'] = float(portfolio_turnover)
-        if optimization_score_current is not None:
-            weights_dict['_optimization_score'] = float(optimization_score_current)
+            w_scalar_current = float(sat_totals[t]) if sat_totals[t] > 1e-6 else 0.0
         
         # V2.1: Store EDHEC-style allocation fields (ALWAYS stored)
-        weights_dict['_cs_alloc_mode'] = str(alloc_mode_current)
-        weights_dict['_cs_sat_weight_scalar'] = float(w_scalar_current) if w_scalar_current is not None else 0.0
-        if te_sat_current is not None:
-            weights_dict['_cs_te_sat'] = float(te_sat_current)
-        else:
-            weights_dict['_cs_te_sat'] = 0.0
-        if ir_sat_current is not None and not (isinstance(ir_sat_current, float) and np.isnan(ir_sat_current)):
-            weights_dict['_cs_ir_sat'] = float(ir_sat_current)
-        else:
-            weights_dict['_cs_ir_sat'] = None
+        weights_dict['_cs_alloc_mode'] = str(allocation_mode)
+        weights_dict['_cs_sat_weight_scalar'] = float(w_scalar_current)
+        weights_dict['_cs_te_sat'] = info['te_sat'] if info is not None else 0.0
+        weights_dict['_cs_ir_sat'] = info['ir_sat'] if info is not None else None
         
         # V2.1: Store dynamic_cushion fields (if applicable)
-        if allocation_mode == "dynamic_cushion":
-            if rel_index_current is not None:
-                weights_dict['_cs_rel_index'] = float(rel_index_current)
-            if rel_floor_current is not None:
-                weights_dict['_cs_rel_floor'] = float(rel_floor_current)
-            if cushion_current is not None:
-                weights_dict['_cs_cushion'] = float(cushion_current)
+        if dynamic:
+            weights_dict['_cs_rel_index'] = float(info.get('rel_index', rel_index_path[t]) if info is not None else rel_index_path[t])
+            weights_dict['_cs_rel_floor'] = float(info.get('rel_floor', rel_floor_path[t]) if info is not None else rel_floor_path[t])
+            weights_dict['_cs_cushion'] = float(cushion_path[t])
         
-        portfolio_bar = {
-            'date': current_date,  # date object, not ISO string
-            'nav_base100': float(nav_base100),
-            'portfolio_return': float(portfolio_return) * 100.0,  # In percentage
+        portfolio_series.append({
+            'date': calendar[t],  # date object, not ISO string
+            'nav_base100': nav_l[t],
+            'portfolio_return': ret_l[t],  # In percentage
             'drawdown': 0.0,  # Computed later if needed
-            'turnover': float(portfolio_turnover) * 100.0,  # In percentage (V2)
+            'turnover': float(portfolio_turnover_t) * 100.0,  # In percentage (V2)
             'costs': 0.0,  # Computed later if needed
             'weights_json': weights_dict,
-            'tradable_json': {str(inst_id): True for inst_id in instrument_ids},
-        }
-        
-        portfolio_series.append(portfolio_bar)
-        
-        # Store instrument series
-        for inst_id in instrument_ids:
-            if current_prices is not None and inst_id in current_prices.index and not pd.isna(current_prices[inst_id]):
-                price = float(current_prices[inst_id])
-                inst_return = returns_df.loc[date_ts, inst_id] if date_ts in returns_df.index else 0.0
-                if pd.isna(inst_return):
-                    inst_return = 0.0
-                
-                # Compute base100
-                first_price = prices_df.iloc[0][inst_id] if len(prices_df) > 0 else price
-                inst_base100 = (price / first_price) * 100.0 if first_price > 0 else 100.0
-                
-                instrument_series[inst_id].append({
-                    'date': current_date,  # date object, not ISO string
-                    'base100': float(inst_base100),
-                    'instrument_return': float(inst_return) * 100.0,  # In percentage
-                })
+            'tradable_json': dict(tradable),
+        })
+    
+    # Store instrument series
+    instrument_series = instrument_series_records(calendar, instrument_ids, P, first_prices, R)
+    
+    if progress_callback is not None:
+        progress_callback(n, n)
     
     # Compute metrics
-    if len(portfolio_series) > 1:
-        nav_base100_series = [bar['nav_base100'] for bar in portfolio_series]
-        returns_series = [bar['portfolio_return'] / 100.0 for bar in portfolio_series[1:]]  # Convert from percentage
-        
-        total_return = (nav_base100_series[-1] / nav_base100_series[0] - 1) * 100.0
-        annualized_return = (1 + total_return / 100.0) ** (day_count / len(calendar)) - 1
-        annualized_return_pct = annualized_return * 100.0
-        volatility = np.std(returns_series) * np.sqrt(day_count) * 100.0 if returns_series else 0.0
-        sharpe = (annualized_return_pct / volatility) if volatility > 0 else 0.0
-        
-        # Max drawdown
-        running_max = []
-        max_val = nav_base100_series[0]
-        for nav in nav_base100_series:
-            max_val = max(max_val, nav)
-            running_max.append(max_val)
-        drawdowns = [(nav - max_nav) / max_nav * 100.0 for nav, max_nav in zip(nav_base100_series, running_max)]
-        max_drawdown = min(drawdowns) if drawdowns else 0.0
-        
-        # Realized TE (final) - use stored portfolio_returns_list
-        te_realized_final = None
-        if len(portfolio_returns_list) >= lookback_risk_days:
-            active_returns_final = []
-            start_idx = max(0, len(portfolio_returns_list) - lookback_risk_days)
-            for j in range(start_idx, len(portfolio_returns_list)):
-                port_ret = portfolio_returns_list[j]
-                core_ret = core_returns_list[j]
-                active_return = port_ret - core_ret
-                active_returns_final.append(active_return)
-            
-            if len(active_returns_final) >= 2:
-                te_realized_final = np.std(active_returns_final, ddof=1) * np.sqrt(day_count)
-        
-        # Average core weight
-        avg_core_weight = np.mean([bar['weights_json'].get('_core_weight', 1.0) for bar in portfolio_series]) * 100.0
-        
-        # V2 metrics
-        te_realized_list = [bar['weights_json'].get('_te_realized') for bar in portfolio_series if bar['weights_json'].get('_te_realized') is not None]
-        avg_realized_te = np.mean(te_realized_list) if te_realized_list else None
-        
-        te_pred_list = [bar['weights_json'].get('_te_pred') for bar in portfolio_series if bar['weights_json'].get('_te_pred') is not None]
-        avg_predicted_te = np.mean(te_pred_list) if te_pred_list else None
-        
-        turnover_list = [bar['weights_json'].get('_portfolio_turnover', 0.0) for bar in portfolio_series if bar['weights_json'].get('_portfolio_turnover') is not None]
-        avg_turnover = np.mean(turnover_list) if turnover_list else 0.0
-        
+    if n > 1:
+        base_metrics = compute_metrics(nav_base100, ret_pct[1:] / 100.0, periods_per_year=day_count, ddof=0)
+        te_realized_final = te_realized[-1] if not np.isnan(te_realized[-1]) else None
+        avg_core_weight = float(np.mean(core_weight_path)) * 100.0
+        te_values = te_realized[~np.isnan(te_realized)]
+        avg_realized_te = float(np.mean(te_values)) if te_values.size else None
+        te_pred_list = [info['te_pred'] for info in rebalance_info.values()]
+        avg_predicted_te = float(np.mean(te_pred_list)) if te_pred_list else None
+        turnover_list = [info['portfolio_turnover'] for info in rebalance_info.values() if info['portfolio_turnover'] > 0]
+        avg_turnover = float(np.mean(turnover_list)) if turnover_list else 0.0
         te_ratio = (te_realized_final / target_te) if te_realized_final is not None and target_te > 0 else None
         
         metrics = {
-            'total_return': float(total_return),
-            'annualized_return': float(annualized_return_pct),
-            'volatility': float(volatility),
-            'sharpe_ratio': float(sharpe),
-            'max_drawdown': float(max_drawdown),
+            **base_metrics,
             'realized_te': float(te_realized_final) if te_realized_final is not None else None,
             'avg_core_weight': float(avg_core_weight),
-            'avg_realized_te': float(avg_realized_te) if avg_realized_te is not None else None,
-            'avg_predicted_te': float(avg_predicted_te) if avg_predicted_te is not None else None,
+            'avg_realized_te': avg_realized_te,
+            'avg_predicted_te': avg_predicted_te,
             'avg_turnover': float(avg_turnover) * 100.0,  # In percentage
             'te_ratio': float(te_ratio) if te_ratio is not None else None,
         }
@@ -700,6 +590,96 @@ def build_unit_satellite_portfolio(
     # Compute covariance matrix (annualized)
     cov_matrix = risk_hist_filtered.cov().values * day_count  # Annualized, convert to numpy array
     
+    result = _build_unit_portfolio(
+        mu_values=mu_sat.values,
+        cov_matrix=cov_matrix,
+        instrument_ids=instrument_ids,
+        core_daily_return=core_daily_return,
+        day_count=day_count,
+        max_weight_per_asset=max_weight_per_asset,
+        shrinkage=shrinkage,
+        turnover_penalty=turnover_penalty,
+        stability_penalty=stability_penalty,
+        optimization_method=optimization_method,
+        previous_satellite_weights=previous_satellite_weights,
+    )
+    result['mu_sat'] = mu_sat
+    return result
+
+
+def build_unit_satellite_portfolio_from_moments(
+    mu_all: np.ndarray,
+    cov_all: np.ndarray,
+    core_daily_return: float,
+    day_count: int,
+    max_weight_per_asset: float,
+    top_k_satellite: Optional[int],
+    shrinkage: bool,
+    turnover_penalty: float,
+    stability_penalty: float,
+    optimization_method: str,
+    previous_satellite_weights: Optional[Dict[int, float]],
+    instrument_ids: List[int],
+) -> Dict:
+    """
+    Same as build_unit_satellite_portfolio, from precomputed window statistics
+    (engine.RollingMoments) instead of the returns history.
+    
+    Args:
+        mu_all: Mean daily return per instrument over the return lookback window
+        cov_all: Daily sample covariance over the risk lookback window (not annualized)
+        instrument_ids: Instruments, in the order of mu_all / cov_all
+    
+    Returns the build_unit_satellite_portfolio dict, with mu_sat as an np.ndarray
+    aligned with the selected instruments.
+    """
+    cols = np.arange(len(instrument_ids))
+    
+    # Filter top-K if requested (same selection as Series.nlargest: ties keep the first)
+    if top_k_satellite and top_k_satellite < len(instrument_ids):
+        cols = np.sort(np.argsort(-mu_all, kind="stable")[:top_k_satellite])
+        instrument_ids = [instrument_ids[j] for j in cols]
+    
+    mu_sat = mu_all[cols]
+    cov_matrix = cov_all[np.ix_(cols, cols)] * day_count  # Annualized
+    
+    result = _build_unit_portfolio(
+        mu_values=mu_sat,
+        cov_matrix=cov_matrix,
+        instrument_ids=instrument_ids,
+        core_daily_return=core_daily_return,
+        day_count=day_count,
+        max_weight_per_asset=max_weight_per_asset,
+        shrinkage=shrinkage,
+        turnover_penalty=turnover_penalty,
+        stability_penalty=stability_penalty,
+        optimization_method=optimization_method,
+        previous_satellite_weights=previous_satellite_weights,
+    )
+    result['mu_sat'] = mu_sat
+    return result
+
+
+def _descending_order(values: np.ndarray) -> np.ndarray:
+    """Positions sorted by value, descending: same order as Series.sort_values(ascending=False)."""
+    positions = np.arange(len(values))[::-1]
+    return positions[values[::-1].argsort(kind="quicksort")][::-1]
+
+
+def _build_unit_portfolio(
+    mu_values: np.ndarray,
+    cov_matrix: np.ndarray,
+    instrument_ids: List[int],
+    core_daily_return: float,
+    day_count: int,
+    max_weight_per_asset: float,
+    shrinkage: bool,
+    turnover_penalty: float,
+    stability_penalty: float,
+    optimization_method: str,
+    previous_satellite_weights: Optional[Dict[int, float]],
+) -> Dict:
+    """Unit portfolio from expected returns and annualized covariance (shared by both builders)."""
     # Apply shrinkage if enabled
     cov_matrix_shrunk = None
     if shrinkage:
@@ -714,7 +694,7 @@ def build_unit_satellite_portfolio(
     if optimization_method == "quadratic":
         # V2: Quadratic optimization
         w_unit_dict = _optimize_satellite_weights_quadratic(
-            mu_sat=mu_sat.values,
+            mu_sat=mu_values,
             cov_matrix=cov_matrix_use,
             budget=1.0,  # Unit portfolio
             max_weight_per_asset=max_weight_per_asset,
@@ -730,15 +710,13 @@ def build_unit_satellite_portfolio(
         remaining_budget = 1.0
         
         # Sort by mu (descending)
-        sorted_inst_ids = mu_sat.sort_values(ascending=False).index.tolist()
-        
-        for inst_id in sorted_inst_ids:
+        for j in _descending_order(mu_values):
             if remaining_budget <= 0:
                 break
             
             # Allocate up to max_weight_per_asset
             allocation = min(remaining_budget, max_weight_per_asset)
-            w_unit_dict[inst_id] = allocation
+            w_unit_dict[instrument_ids[j]] = allocation
             remaining_budget -= allocation
         
         # Normalize to sum = 1.0
@@ -753,11 +731,10 @@ def build_unit_satellite_portfolio(
     # Compute TE_sat and IR_sat for unit portfolio
     w_unit_vector = np.array([full_w_unit.get(inst_id, 0.0) for inst_id in instrument_ids])
     te_sat = compute_te_sat(w_unit_vector, cov_matrix_use, day_count)
-    ir_sat, _ = compute_ir_sat(w_unit_vector, mu_sat.values, core_daily_return, cov_matrix_use, day_count)
+    ir_sat, _ = compute_ir_sat(w_unit_vector, mu_values, core_daily_return, cov_matrix_use, day_count)
     
     return {
         'w_unit': full_w_unit,
-        'mu_sat': mu_sat,
         'cov_matrix': cov_matrix,
         'cov_matrix_shrunk': cov_matrix_shrunk,
         'te_sat': te_sat,
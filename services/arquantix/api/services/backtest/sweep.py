@@ -0,0 +1,503 @@
+"""
+Backtest parameter sweeps - one base backtest run over a grid of strategy params.
+
+- Prices are loaded and aligned once (executor.load_backtest_prices) and published in a
+  shared memory block; pool workers map it read-only instead of reloading bars per run.
+- Combinations run on a process pool (spawn, BACKTEST_WORKERS processes); a worker returns
+  compact summary metrics only, written to backtest_sweep_results in batches.
+- Results are ranked by rank_metric; the top_k combinations are recomputed and stored as
+  regular backtest runs (full series), so /{run_id}/series and /compare work on them.
+"""
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database import BacktestRun, BacktestSweep, BacktestSweepResult
+from services.backtest.engine import PriceMatrix, rebalance_mask
+from services.backtest.jobs import BACKTEST_WORKERS, compute_params_hash
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de combinaisons par balayage
+SWEEP_MAX_COMBINATIONS = int(os.getenv("BACKTEST_SWEEP_MAX_COMBINATIONS", "500"))
+# Nombre maximal de combinaisons conservées en runs complets (limite de /compare)
+SWEEP_MAX_TOP_K = 10
+# Lignes de résultats écrites par INSERT
+SWEEP_RESULT_BATCH = int(os.getenv("BACKTEST_SWEEP_RESULT_BATCH", "50"))
+
+SUMMARY_METRIC_KEYS = (
+    "total_return",
+    "annualized_return",
+    "volatility",
+    "sharpe_ratio",
+    "max_drawdown",
+    # Core-Satellite
+    "realized_te",
+    "avg_core_weight",
+    "avg_realized_te",
+    "avg_predicted_te",
+    "avg_turnover",
+    "te_ratio",
+)
+
+
+class SweepError(ValueError):
+    """Invalid sweep request (grid, rank metric, size)."""
+
+
+def expand_grid(base_params: Optional[Dict[str, Any]], grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Strategy params of every combination: base_params overridden by one value per grid key
+    (cartesian product, grid keys in request order, last key varying fastest).
+    """
+    if not grid:
+        raise SweepError("grid must contain at least one parameter")
+    for key, values in grid.items():
+        if not isinstance(values, (list, tuple)) or len(values) == 0:
+            raise SweepError(f"grid[{key!r}] must be a non-empty list")
+    total = math.prod(len(values) for values in grid.values())
+    if total > SWEEP_MAX_COMBINATIONS:
+        raise SweepError(f"grid has {total} combinations, maximum is {SWEEP_MAX_COMBINATIONS}")
+    keys = list(grid.keys())
+    base = dict(base_params or {})
+    return [{**base, **dict(zip(keys, combo))} for combo in itertools.product(*(grid[k] for k in keys))]
+
+
+def summarize_metrics(metrics: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """
+    Compact portfolio metrics of a strategy result: the 'portfolio' dict of the executor
+    strategies and CPPI, or the flat Core-Satellite dict. NaN / inf become None.
+    """
+    source = metrics.get("portfolio", metrics) if isinstance(metrics, dict) else {}
+    summary: Dict[str, Optional[float]] = {}
+    for key in SUMMARY_METRIC_KEYS:
+        if key not in source:
+            continue
+        value = source[key]
+        try:
+            value = float(value) if value is not None else None
+        except (TypeError, ValueError):
+            value = None
+        summary[key] = value if value is not None and math.isfinite(value) else None
+    return summary
+
+
+def rank_results(results: List[Dict[str, Any]], rank_metric: str, ascending: bool = False) -> List[Dict[str, Any]]:
+    """
+    Set 'rank' (1 = best) on the successful results that have rank_metric; the others get
+    None. Ties keep the combination order. Returns the ranked results, best first.
+    """
+    ranked = [
+        r for r in results
+        if r.get("status") == "SUCCESS" and (r.get("metrics") or {}).get(rank_metric) is not None
+    ]
+    sign = 1.0 if ascending else -1.0
+    ranked.sort(key=lambda r: (sign * r["metrics"][rank_metric], r["combo_index"]))
+    for r in results:
+        r["rank"] = None
+    for position, r in enumerate(ranked, start=1):
+        r["rank"] = position
+    return ranked
+
+
+# ============================================================================
+# Shared prices (one copy for every worker)
+# ============================================================================
+
+@dataclass
+class SharedPricesSpec:
+    """Where a worker finds the aligned price matrix (picklable, sent once per worker)."""
+    shm_name: str
+    shape: Tuple[int, int]
+    date_ordinals: List[int]
+    instrument_ids: List[int]
+
+
+def publish_prices(matrix: PriceMatrix) -> Tuple[shared_memory.SharedMemory, SharedPricesSpec]:
+    """Copy the price matrix into a new shared memory block (caller closes and unlinks it)."""
+    values = np.ascontiguousarray(matrix.values, dtype=np.float64)
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[...] = values
+    spec = SharedPricesSpec(
+        shm_name=shm.name,
+        shape=values.shape,
+        date_ordinals=[d.toordinal() for d in matrix.dates],
+        instrument_ids=list(matrix.instrument_ids),
+    )
+    return shm, spec
+
+
+def attach_prices(spec: SharedPricesSpec) -> Tuple[shared_memory.SharedMemory, PriceMatrix]:
+    """Map a published price matrix read-only (keep the SharedMemory open while in use)."""
+    shm = shared_memory.SharedMemory(name=spec.shm_name)
+    values = np.ndarray(spec.shape, dtype=np.float64, buffer=shm.buf)
+    values.flags.writeable = False
+    dates = [date.fromordinal(o) for o in spec.date_ordinals]
+    return shm, PriceMatrix(dates, list(spec.instrument_ids), values)
+
+
+# ============================================================================
+# One combination
+# ============================================================================
+
+@dataclass
+class SweepStrategySpec:
+    """Everything but the strategy params, resolved once by the coordinator (picklable)."""
+    strategy_type: str
+    rebalance: str
+    fees_bps: float
+    slippage_bps: float
+    instrument_ids: List[int]
+    bundle_allocations: Optional[Dict[int, float]] = None
+    # CPPI: target risky weights per rebalance date (bundle); None = equal weight
+    cppi_weights: Optional[Dict[date, Dict[int, float]]] = None
+
+
+def run_combination(
+    prices_df: pd.DataFrame,
+    calendar: List[date],
+    spec: SweepStrategySpec,
+    params: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Run one backtest on already aligned prices (no database access). Strategy result dict."""
+    from services.backtest.executor import core_satellite_params, cppi_params, run_weight_strategy_backtest
+
+    start, end = calendar[0], calendar[-1]
+    if spec.strategy_type == "CPPI":
+        from services.backtest.strategies.cppi import run_cppi_backtest
+
+        ids = spec.instrument_ids
+        if spec.cppi_weights is not None:
+            table = spec.cppi_weights
+
+            def weights_resolver(d: date) -> Dict[int, float]:
+                return table[d]
+        else:
+            equal = {inst_id: 1.0 / len(ids) for inst_id in ids}
+
+            def weights_resolver(d: date) -> Dict[int, float]:
+                return equal
+
+        return run_cppi_backtest(
+            prices_df=prices_df,
+            weights_resolver=weights_resolver,
+            start_date=start,
+            end_date=end,
+            initial_capital=100.0,
+            rebalance_frequency=spec.rebalance,
+            fees_bps=spec.fees_bps,
+            slippage_bps=spec.slippage_bps,
+            **cppi_params(params),
+        )
+    if spec.strategy_type == "CORE_SATELLITE":
+        from services.backtest.strategies.core_satellite import run_core_satellite_backtest
+
+        return run_core_satellite_backtest(
+            prices_df=prices_df,
+            instrument_ids=spec.instrument_ids,
+            start_date=start,
+            end_date=end,
+            initial_capital=100.0,
+            rebalance_frequency=spec.rebalance,
+            fees_bps=spec.fees_bps,
+            slippage_bps=spec.slippage_bps,
+            **core_satellite_params(params),
+        )
+    return run_weight_strategy_backtest(
+        prices_df, spec.instrument_ids, calendar, spec.strategy_type, spec.rebalance,
+        spec.fees_bps, spec.slippage_bps, bundle_allocations=spec.bundle_allocations,
+    )
+
+
+def evaluate_combination(
+    prices_df: pd.DataFrame,
+    calendar: List[date],
+    spec: SweepStrategySpec,
+    combo_index: int,
+    params: Dict[str, Any],
+    full: bool = False,
+) -> Dict[str, Any]:
+    """Summary of one combination (status, metrics, elapsed_ms); the full result if full=True."""
+    started = time.perf_counter()
+    out: Dict[str, Any] = {"combo_index": combo_index, "params": params}
+    try:
+        result = run_combination(prices_df, calendar, spec, params)
+        out.update(status="SUCCESS", metrics=summarize_metrics(result.get("metrics") or {}), error=None)
+        if full:
+            out["result"] = result
+    except Exception as exc:
+        out.update(status="FAILED", metrics=None, error=str(exc)[:2000])
+    out["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+    return out
+
+
+# Worker process state (set once per worker by _init_worker)
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(prices_spec: SharedPricesSpec, strategy_spec: SweepStrategySpec) -> None:
+    shm, matrix = attach_prices(prices_spec)
+    _worker["shm"] = shm  # keep the mapping alive for the worker's lifetime
+    _worker["calendar"] = matrix.dates
+    _worker["prices_df"] = matrix.to_frame()
+    _worker["spec"] = strategy_spec
+
+
+def _evaluate_in_worker(combo_index: int, params: Dict[str, Any], full: bool = False) -> Dict[str, Any]:
+    return evaluate_combination(
+        _worker["prices_df"], _worker["calendar"], _worker["spec"], combo_index, params, full=full,
+    )
+
+
+# ============================================================================
+# Coordinator
+# ============================================================================
+
+def _resolve_strategy_spec(db: Session, sweep: BacktestSweep, calendar: List[date], price_ids: List[int]) -> SweepStrategySpec:
+    """Bundle lookups done once in the coordinator (workers have no database session)."""
+    instrument_ids = list(sweep.instrument_ids_json or [])
+    spec = SweepStrategySpec(
+        strategy_type=sweep.strategy_type,
+        rebalance=sweep.rebalance,
+        fees_bps=float(sweep.fees_bps or 0.0),
+        slippage_bps=float(sweep.slippage_bps or 0.0),
+        instrument_ids=instrument_ids,
+    )
+    bundle_id = int(sweep.bundle_id) if sweep.bundle_id else None
+    if bundle_id:
+        # Bundle allocations (percent), used by bundle_strategy and in the params hash
+        from database import BundleComponent
+
+        components = db.query(BundleComponent).filter(
+            BundleComponent.bundle_id == bundle_id,
+            BundleComponent.component_type == "instrument",
+            BundleComponent.instrument_id.isnot(None),
+        ).all()
+        spec.bundle_allocations = {
+            c.instrument_id: float(c.weight) for c in components if c.instrument_id and c.weight is not None
+        } or None
+
+    if sweep.strategy_type == "CPPI" and bundle_id:
+        from services.bundles.resolver import resolve_bundle_effective_weights
+
+        mask = rebalance_mask(calendar, sweep.rebalance)
+        spec.cppi_weights = {
+            d: resolve_bundle_effective_weights(db, bundle_id, d) for d, m in zip(calendar, mask) if m
+        }
+        missing_ids = set().union(*(w.keys() for w in spec.cppi_weights.values())) - set(price_ids)
+        if missing_ids:
+            raise SweepError(f"Bundle {bundle_id} contains instrument_ids {missing_ids} without prices")
+    elif sweep.strategy_type == "CORE_SATELLITE":
+        if bundle_id:
+            from services.bundles.resolver import resolve_bundle_effective_weights
+
+            try:
+                spec.instrument_ids = list(resolve_bundle_effective_weights(db, bundle_id, calendar[0]).keys())
+            except Exception:
+                pass  # same fallback as the executor: request instrument_ids
+        missing_ids = set(spec.instrument_ids) - set(price_ids)
+        if missing_ids:
+            raise SweepError(f"CORE_SATELLITE instrument_ids {missing_ids} have no prices")
+    return spec
+
+
+def _insert_results(db: Session, sweep_id: int, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    values = [
+        {
+            "sweep_id": sweep_id,
+            "combo_index": r["combo_index"],
+            "params_json": r["params"],
+            "metrics_json": r["metrics"],
+            "status": r["status"],
+            "error_message": r["error"],
+            "elapsed_ms": r["elapsed_ms"],
+        }
+        for r in rows
+    ]
+    stmt = insert(BacktestSweepResult).values(values).on_conflict_do_nothing(
+        index_elements=[BacktestSweepResult.sweep_id, BacktestSweepResult.combo_index]
+    )
+    db.execute(stmt)
+
+
+def _store_top_run(
+    db: Session,
+    sweep: BacktestSweep,
+    spec: SweepStrategySpec,
+    entry: Dict[str, Any],
+    calendar: List[date],
+) -> int:
+    """Persist a top-k combination as a regular SUCCESS backtest run with its full series."""
+    from services.backtest.repository import store_run_results
+
+    result = entry["result"]
+    now = datetime.now(timezone.utc)
+    run = BacktestRun(
+        name=f"{sweep.name or f'Sweep #{sweep.id}'} - rank {entry['rank']}",
+        created_by_email=sweep.created_by_email,
+        start_date=sweep.start_date,
+        end_date=sweep.end_date,
+        effective_start_date=calendar[0],
+        effective_end_date=calendar[-1],
+        rebalance=sweep.rebalance,
+        strategy_type=sweep.strategy_type,
+        strategy_params_json=entry["params"],
+        fees_bps=sweep.fees_bps,
+        slippage_bps=sweep.slippage_bps,
+        allow_weekend_trading=sweep.allow_weekend_trading,
+        instrument_ids_json=sweep.instrument_ids_json,
+        bundle_id=sweep.bundle_id,
+        status="RUNNING",
+        params_hash=compute_params_hash(
+            instrument_ids=sweep.instrument_ids_json,
+            start_date=sweep.start_date,
+            end_date=sweep.end_date,
+            strategy_type=sweep.strategy_type,
+            rebalance=sweep.rebalance,
+            fees_bps=float(sweep.fees_bps or 0.0),
+            slippage_bps=float(sweep.slippage_bps or 0.0),
+            allow_weekend_trading=sweep.allow_weekend_trading == "true",
+            bundle_id=sweep.bundle_id,
+            bundle_allocations=spec.bundle_allocations,
+            strategy_params_json=entry["params"],
+        ),
+        progress_done=len(calendar),
+        progress_total=len(calendar),
+        started_at=now,
+    )
+    db.add(run)
+    db.flush()
+    metrics = {k: v for k, v in entry["metrics"].items() if v is not None}
+    store_run_results(db, run.id, result, metrics={"portfolio": metrics, "instruments": {}}, commit=False)
+    run.status = "SUCCESS"
+    run.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    return run.id
+
+
+def run_sweep_job(sweep_id: int, workers: int = BACKTEST_WORKERS) -> Optional[str]:
+    """
+    Coordinator (runs in the API process, see submit_sweep): load prices once, fan the grid
+    out on a process pool, store summaries, rank, store the top_k as full runs.
+    Returns the final status (None if the sweep no longer exists).
+    """
+    from database import SessionLocal
+    from services.backtest.executor import load_backtest_prices
+
+    db = SessionLocal()
+    shm = None
+    try:
+        sweep = db.query(BacktestSweep).filter(BacktestSweep.id == sweep_id).first()
+        if sweep is None:
+            return None
+        sweep.status = "RUNNING"
+        sweep.started_at = datetime.now(timezone.utc)
+        db.commit()
+
+        combos = expand_grid(sweep.base_params_json, sweep.grid_json)
+        calendar, matrix = load_backtest_prices(
+            db, list(sweep.instrument_ids_json), sweep.start_date, sweep.end_date,
+            sweep.allow_weekend_trading == "true",
+        )
+        spec = _resolve_strategy_spec(db, sweep, calendar, list(matrix.instrument_ids))
+        sweep.combinations_total = len(combos)
+        sweep.combinations_done = 0
+        db.commit()
+
+        shm, prices_spec = publish_prices(matrix)
+        results: List[Dict[str, Any]] = []
+        pending_rows: List[Dict[str, Any]] = []
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(workers, len(combos))),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(prices_spec, spec),
+        ) as pool:
+            futures = [pool.submit(_evaluate_in_worker, i, params) for i, params in enumerate(combos)]
+            for future in as_completed(futures):
+                row = future.result()
+                results.append(row)
+                pending_rows.append(row)
+                if len(pending_rows) >= SWEEP_RESULT_BATCH:
+                    _insert_results(db, sweep_id, pending_rows)
+                    sweep.combinations_done = len(results)
+                    db.commit()
+                    pending_rows = []
+            _insert_results(db, sweep_id, pending_rows)
+            sweep.combinations_done = len(results)
+            db.commit()
+
+            # Ranking, then full series for the top_k (recomputed: workers only return summaries)
+            ranked = rank_results(results, sweep.rank_metric, bool(sweep.rank_ascending))
+            top = ranked[: max(0, min(sweep.top_k or 0, SWEEP_MAX_TOP_K))]
+            full_futures = [pool.submit(_evaluate_in_worker, r["combo_index"], r["params"], True) for r in top]
+            full_results = [f.result() for f in full_futures]
+        full_by_index = {r["combo_index"]: r for r in full_results}
+
+        run_ids: Dict[int, int] = {}
+        for r in top:
+            full = full_by_index.get(r["combo_index"])
+            if full is None or full["status"] != "SUCCESS":
+                continue
+            run_ids[r["combo_index"]] = _store_top_run(db, sweep, spec, {**r, "result": full["result"]}, calendar)
+
+        rows = db.query(BacktestSweepResult).filter(BacktestSweepResult.sweep_id == sweep_id).all()
+        rank_by_index = {r["combo_index"]: r["rank"] for r in results}
+        for row in rows:
+            row.rank = rank_by_index.get(row.combo_index)
+            row.run_id = run_ids.get(row.combo_index)
+        failed = sum(1 for r in results if r["status"] != "SUCCESS")
+        sweep.status = "SUCCESS" if failed < len(results) else "FAILED"
+        if failed:
+            sweep.error_message = f"{failed} of {len(results)} combinations failed"
+        sweep.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        return sweep.status
+    except Exception as exc:
+        logger.exception("Backtest sweep %s failed", sweep_id)
+        db.rollback()
+        sweep = db.query(BacktestSweep).filter(BacktestSweep.id == sweep_id).first()
+        if sweep is None:
+            return None
+        sweep.status = "FAILED"
+        sweep.error_message = str(exc)[:2000]
+        sweep.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        return sweep.status
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        db.close()
+
+
+# One sweep at a time: each one already fans out on BACKTEST_WORKERS processes
+_coordinator: Optional[ThreadPoolExecutor] = None
+_coordinator_lock = threading.Lock()
+
+
+def submit_sweep(sweep_id: int) -> Future:
+    """Queue a PENDING sweep on the coordinator thread."""
+    global _coordinator
+    with _coordinator_lock:
+        if _coordinator is None:
+            _coordinator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backtest-sweep")
+        future = _coordinator.submit(run_sweep_job, sweep_id)
+    future.add_done_callback(lambda f: logger.info("Backtest sweep %s finished: %s", sweep_id, f.exception() or f.result()))
+    return future
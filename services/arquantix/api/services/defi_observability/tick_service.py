@@ -404,15 +404,17 @@ def run_defi_observability_tick(
         # 2c — Outbox worker intent.created (Phase 2 S2b — flag OFF par défaut)
         try:
             from services.lifi.config import lifi_outbox_worker_enabled
+            from services.transaction_outbox.consumer import outbox_consumer_enabled
             from services.transaction_outbox.worker import process_transaction_outbox_intent_created
 
-            if lifi_outbox_worker_enabled() and not dry_run:
+            if lifi_outbox_worker_enabled() and not dry_run and not outbox_consumer_enabled():
                 outbox_step = process_transaction_outbox_intent_created(db, limit=20)
             else:
                 outbox_step = {
                     "skipped": True,
                     "enabled": lifi_outbox_worker_enabled(),
                     "dry_run": dry_run,
+                    "consumer_runtime": outbox_consumer_enabled(),
                 }
             summary["transaction_outbox"] = outbox_step
             summary["steps"]["transaction_outbox"] = outbox_step
@@ -451,17 +453,19 @@ def run_defi_observability_tick(
         # 2d — Outbox worker intent.settle (Phase 2 S3a — settlement skeleton NOOP, flag OFF)
         try:
             from services.lifi.config import lifi_outbox_worker_enabled
+            from services.transaction_outbox.consumer import outbox_consumer_enabled
             from services.transaction_outbox.settlement_worker import (
                 process_transaction_outbox_intent_settle,
             )
 
-            if lifi_outbox_worker_enabled() and not dry_run:
+            if lifi_outbox_worker_enabled() and not dry_run and not outbox_consumer_enabled():
                 outbox_settle_step = process_transaction_outbox_intent_settle(db, limit=20)
             else:
                 outbox_settle_step = {
                     "skipped": True,
                     "enabled": lifi_outbox_worker_enabled(),
                     "dry_run": dry_run,
+                    "consumer_runtime": outbox_consumer_enabled(),
                 }
             summary["transaction_outbox_intent_settle"] = outbox_settle_step
             summary["steps"]["transaction_outbox_intent_settle"] = outbox_settle_step
@@ -9,7 +9,6 @@ from uuid import UUID
 
 from sqlalchemy.orm import Session
 
-from database import MarketDataInstrument, MarketDataLatestQuote
 from services.market_data.fx import (
     EURUSDT_PROVIDER_SYMBOL,
     FxQuoteStaleError,
@@ -18,6 +17,7 @@ from services.market_data.fx import (
     usdt_to_eur,
 )
 from services.market_data.market_summary_repo import refresh_binance_quotes_for_provider_symbols
+from services.market_data.price_snapshot import PriceSnapshot, load_price_snapshot
 from services.custody.enums import (
     CustodyAccountType,
     TransactionDirection,
@@ -174,7 +174,13 @@ class ExchangeService:
         }
 
     def preview_sell(
-        self, db: Session, asset: str, amount_crypto: Decimal, currency: str = "EUR"
+        self,
+        db: Session,
+        asset: str,
+        amount_crypto: Decimal,
+        currency: str = "EUR",
+        *,
+        snapshot: Optional[PriceSnapshot] = None,
     ) -> dict:
         """Compute a SELL preview using the exact same pricing logic as the real sell.
 
@@ -185,7 +191,7 @@ class ExchangeService:
         if asset not in SUPPORTED_ASSETS:
             raise UnsupportedAssetError(f"unsupported_asset: {asset}")
 
-        price = self._resolve_price(db, asset, override_price=None, side="sell")
+        price = self._resolve_price(db, asset, override_price=None, side="sell", snapshot=snapshot)
 
         eur_quant = Decimal("0.01")
         gross_eur = (amount_crypto * price).quantize(eur_quant, rounding=ROUND_DOWN)
@@ -752,8 +758,9 @@ class ExchangeService:
         if from_asset == to_asset:
             raise ExchangeError("swap_same_asset: from_asset must differ from to_asset")
 
-        price_from = self._resolve_price(db, from_asset, override_price=None, side="sell")
-        price_to = self._resolve_price(db, to_asset, override_price=None, side="buy")
+        snapshot = self._load_price_snapshot(db, [from_asset, to_asset])
+        price_from = self._resolve_price(db, from_asset, override_price=None, side="sell", snapshot=snapshot)
+        price_to = self._resolve_price(db, to_asset, override_price=None, side="buy", snapshot=snapshot)
 
         eur_quant = Decimal("0.01")
         gross = (payload.amount_from * price_from).quantize(eur_quant, rounding=ROUND_DOWN)
@@ -833,8 +840,9 @@ class ExchangeService:
                 }
 
         # Resolve prices (same freshness guard as buy/sell)
-        price_from = self._resolve_price(db, from_asset, override_price=None, side="sell")
-        price_to = self._resolve_price(db, to_asset, override_price=None, side="buy")
+        snapshot = self._load_price_snapshot(db, [from_asset, to_asset])
+        price_from = self._resolve_price(db, from_asset, override_price=None, side="sell", snapshot=snapshot)
+        price_to = self._resolve_price(db, to_asset, override_price=None, side="buy", snapshot=snapshot)
 
         eur_quant = Decimal("0.01")
         gross = (amount_from * price_from).quantize(eur_quant, rounding=ROUND_DOWN)
@@ -1145,19 +1153,43 @@ class ExchangeService:
     # Helpers
     # ------------------------------------------------------------------
 
+    def _load_price_snapshot(self, db: Session, assets: list[str]) -> PriceSnapshot:
+        """Refresh stale Binance quotes for *assets* + EURUSDT, then snapshot them in one query.
+
+        One snapshot per operation: both legs of a swap (or every position of a
+        sell-all preview) are priced against the same quotes and FX rate.
+        """
+        provider_symbols = sorted({
+            ps for ps in (ASSET_PROVIDER_SYMBOL_MAP.get(a) for a in assets) if ps
+        })
+        if provider_symbols:
+            try:
+                refresh_binance_quotes_for_provider_symbols(
+                    db, [*provider_symbols, EURUSDT_PROVIDER_SYMBOL],
+                )
+            except Exception:
+                logger.warning(
+                    "Failed to refresh Binance quotes for %s / EURUSDT",
+                    ", ".join(provider_symbols), exc_info=True,
+                )
+        return load_price_snapshot(db, provider_symbols)
+
     def _resolve_price(
         self,
         db: Session,
         asset: str,
         override_price: Optional[Decimal],
         side: Literal["buy", "sell"] = "buy",
+        *,
+        snapshot: Optional[PriceSnapshot] = None,
     ) -> Decimal:
         """Return the price per 1 unit of crypto in **EUR**.
 
         If override_price is provided, it is assumed to already be in EUR and
         freshness checks are skipped (operator-driven).
 
-        Otherwise, fetch the latest quote from market_data_latest_quotes:
+        Otherwise, read the latest quote from the price snapshot (loaded after a
+        Binance refresh when none is given):
         - Enforce freshness: quote_time must be within MAX_QUOTE_AGE_SECONDS.
         - If bid_price and ask_price are available:
             BUY → use ask_price, SELL → use bid_price.
@@ -1175,33 +1207,19 @@ class ExchangeService:
             if upper in EUR_PEGGED_STABLECOINS:
                 return self._eur_pegged_fallback_price(asset)
             if upper in USD_PEGGED_STABLECOINS:
-                return self._stablecoin_fallback_price(db, asset)
+                return self._stablecoin_fallback_price(db, asset, snapshot=snapshot)
             raise PriceUnavailableError(f"no_provider_symbol_for_{asset}")
 
-        # Refresh stale quotes from Binance REST before reading from DB
-        try:
-            refresh_binance_quotes_for_provider_symbols(
-                db, [provider_symbol, EURUSDT_PROVIDER_SYMBOL],
-            )
-        except Exception:
-            logger.warning("Failed to refresh Binance quotes for %s / EURUSDT", provider_symbol, exc_info=True)
-
-        quote = (
-            db.query(MarketDataLatestQuote)
-            .join(
-                MarketDataInstrument,
-                MarketDataLatestQuote.instrument_id == MarketDataInstrument.id,
-            )
-            .filter(MarketDataInstrument.provider_symbol == provider_symbol)
-            .first()
-        )
+        if snapshot is None or not snapshot.covers([provider_symbol]):
+            snapshot = self._load_price_snapshot(db, [asset])
+        quote = snapshot.quote(provider_symbol)
 
         if quote is None or quote.last_price is None:
             if upper in EUR_PEGGED_STABLECOINS:
                 return self._eur_pegged_fallback_price(asset)
             if upper in USD_PEGGED_STABLECOINS:
                 logger.info("No live quote for %s, using stablecoin fallback (1.0 USDT)", asset)
-                return self._stablecoin_fallback_price(db, asset)
+                return self._stablecoin_fallback_price(db, asset, snapshot=snapshot)
             raise PriceUnavailableError(f"no_market_quote_for_{asset}")
 
         # --- Freshness guard ---
@@ -1210,16 +1228,12 @@ class ExchangeService:
                 return self._eur_pegged_fallback_price(asset)
             if upper in USD_PEGGED_STABLECOINS:
                 logger.info("No quote_time for %s, using stablecoin fallback (1.0 USDT)", asset)
-                return self._stablecoin_fallback_price(db, asset)
+                return self._stablecoin_fallback_price(db, asset, snapshot=snapshot)
             raise MarketQuoteStaleError(
                 f"market_quote_stale: no quote_time for {asset}"
             )
 
-        now_utc = datetime.now(timezone.utc)
-        quote_time = quote.quote_time
-        if quote_time.tzinfo is None:
-            quote_time = quote_time.replace(tzinfo=timezone.utc)
-        age_seconds = (now_utc - quote_time).total_seconds()
+        age_seconds = snapshot.quote_age_seconds(provider_symbol)
 
         max_age = (
             MAX_QUOTE_AGE_SECONDS_STABLECOIN
@@ -1234,20 +1248,20 @@ class ExchangeService:
                     "%s quote is %ds old (max %ds), using stablecoin fallback (1.0 USDT)",
                     asset, int(age_seconds), max_age,
                 )
-                return self._stablecoin_fallback_price(db, asset)
+                return self._stablecoin_fallback_price(db, asset, snapshot=snapshot)
             raise MarketQuoteStaleError(
                 f"market_quote_stale: {asset} quote is {int(age_seconds)}s old "
                 f"(max {max_age}s)"
             )
 
         # --- Select price based on side ---
-        bid = Decimal(str(quote.bid_price)) if quote.bid_price else None
-        ask = Decimal(str(quote.ask_price)) if quote.ask_price else None
+        bid = quote.bid_price
+        ask = quote.ask_price
 
         if bid and ask and bid > 0 and ask > 0:
             price_usdt = ask if side == "buy" else bid
         else:
-            mid = Decimal(str(quote.last_price))
+            mid = quote.last_price
             spread_bps = self._fee_repo.get_active_spread_bps(db, asset)
             half_spread = Decimal(str(spread_bps)) / Decimal("20000")
             if side == "buy":
@@ -1256,17 +1270,19 @@ class ExchangeService:
                 price_usdt = mid * (1 - half_spread)
 
         try:
-            eurusdt_rate = get_eurusdt_rate(db, strict=True)
+            eurusdt_rate = get_eurusdt_rate(db, strict=True, snapshot=snapshot)
         except (FxQuoteUnavailableError, FxQuoteStaleError) as exc:
             raise FxUnavailableError(f"fx_unavailable: {exc}") from exc
         price_eur = usdt_to_eur(price_usdt, eurusdt_rate)
 
         return price_eur
 
-    def _stablecoin_fallback_price(self, db: Session, asset: str) -> Decimal:
+    def _stablecoin_fallback_price(
+        self, db: Session, asset: str, *, snapshot: Optional[PriceSnapshot] = None
+    ) -> Decimal:
         """Return a synthetic EUR price for a USD-pegged stablecoin (≈ 1.0 USDT → EUR)."""
         try:
-            eurusdt_rate = get_eurusdt_rate(db, strict=False)
+            eurusdt_rate = get_eurusdt_rate(db, strict=False, snapshot=snapshot)
         except Exception:
             eurusdt_rate = Decimal("1.08")
         return usdt_to_eur(Decimal("1"), eurusdt_rate)
@@ -1291,6 +1307,9 @@ class ExchangeService:
         positions = self._position_repo.list_by_client(db, client_id)
         items: list[dict] = []
         total_estimated = Decimal("0")
+        snapshot = self._load_price_snapshot(
+            db, [p.asset.upper() for p in positions if Decimal(str(p.balance)) > 0],
+        )
 
         for pos in positions:
             balance = Decimal(str(pos.balance))
@@ -1298,7 +1317,7 @@ class ExchangeService:
                 continue
             asset = pos.asset.upper()
             try:
-                preview = self.preview_sell(db, asset, balance, currency)
+                preview = self.preview_sell(db, asset, balance, currency, snapshot=snapshot)
                 net = Decimal(str(preview["estimated_fiat_net"]))
                 total_estimated += net
                 items.append({
@@ -2,12 +2,13 @@
 Repository for MarketDataBar1d (1-day OHLCV candles).
 Caller is responsible for committing the session.
 """
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from database import MarketDataBar1d
+from services.market_data.bars_bulk_repo import BulkInsertResult, bulk_insert_bars
 
 
 def get_bars_1d(
@@ -93,3 +94,20 @@ def upsert_bar_1d(
     session.flush()
     session.refresh(row)
     return row
+
+
+def upsert_bars_1d(
+    session: Session,
+    *,
+    instrument_id: int,
+    candles: Iterable[Dict[str, Any]],
+    source: str = "binance",
+) -> BulkInsertResult:
+    """
+    Insert many 1d bars of one instrument in bulk (see bars_bulk_repo). Existing bars are
+    left unchanged, like upsert_bar_1d. Caller must commit.
+
+    Returns:
+        BulkInsertResult(inserted, skipped).
+    """
+    return bulk_insert_bars(session, "1d", instrument_id, candles, source=source)
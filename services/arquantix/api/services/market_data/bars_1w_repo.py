@@ -2,12 +2,13 @@
 Repository for MarketDataBar1w (1-week OHLCV candles).
 Caller is responsible for committing the session.
 """
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from database import MarketDataBar1w
+from services.market_data.bars_bulk_repo import BulkInsertResult, bulk_insert_bars
 
 
 def get_bars_1w(
@@ -93,3 +94,20 @@ def upsert_bar_1w(
     session.flush()
     session.refresh(row)
     return row
+
+
+def upsert_bars_1w(
+    session: Session,
+    *,
+    instrument_id: int,
+    candles: Iterable[Dict[str, Any]],
+    source: str = "binance",
+) -> BulkInsertResult:
+    """
+    Insert many 1w bars of one instrument in bulk (see bars_bulk_repo). Existing bars are
+    left unchanged, like upsert_bar_1w. Caller must commit.
+
+    Returns:
+        BulkInsertResult(inserted, skipped).
+    """
+    return bulk_insert_bars(session, "1w", instrument_id, candles, source=source)
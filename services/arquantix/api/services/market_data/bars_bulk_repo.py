@@ -0,0 +1,138 @@
+"""
+Bulk insert of OHLCV candles, shared by all market_data_bars_* tables (1m, 5m, 1h, 4h, 1d, 1w).
+
+One INSERT ... SELECT FROM unnest(<arrays>) ... ON CONFLICT DO NOTHING per chunk: the SQL
+text is constant per table (one array parameter per column, whatever the batch size),
+existing bars are left unchanged (same semantics as upsert_bar_*), and no ORM object is
+loaded. Caller is responsible for committing the session; the chart-history cache is
+invalidated once it commits (chart_history_cache.note_bars_written).
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import (
+    MarketDataBar1m,
+    MarketDataBar5m,
+    MarketDataBar1h,
+    MarketDataBar4h,
+    MarketDataBar1d,
+    MarketDataBar1w,
+)
+from services.market_data.chart_history_cache import note_bars_written
+
+BAR_MODELS = {
+    "1m": MarketDataBar1m,
+    "5m": MarketDataBar5m,
+    "1h": MarketDataBar1h,
+    "4h": MarketDataBar4h,
+    "1d": MarketDataBar1d,
+    "1w": MarketDataBar1w,
+}
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class BulkInsertResult(NamedTuple):
+    inserted: int
+    skipped: int
+
+    @property
+    def total(self) -> int:
+        return self.inserted + self.skipped
+
+
+_ON_CONFLICT_DO_NOTHING = "ON CONFLICT (instrument_id, open_time) DO NOTHING"
+_ON_CONFLICT_OVERWRITE = (
+    "ON CONFLICT (instrument_id, open_time) DO UPDATE SET "
+    "open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low, close = EXCLUDED.close, "
+    "volume = EXCLUDED.volume, source = EXCLUDED.source, updated_at = now()"
+)
+
+
+def _insert_sql(table_fullname: str, overwrite: bool = False) -> str:
+    return (
+        f"INSERT INTO {table_fullname} "
+        "(instrument_id, open_time, open, high, low, close, volume, source) "
+        "SELECT :instrument_id, t.open_time, t.open, t.high, t.low, t.close, t.volume, :source "
+        "FROM unnest("
+        "CAST(:open_times AS timestamptz[]), "
+        "CAST(:opens AS numeric[]), "
+        "CAST(:highs AS numeric[]), "
+        "CAST(:lows AS numeric[]), "
+        "CAST(:closes AS numeric[]), "
+        "CAST(:volumes AS numeric[])"
+        ") AS t(open_time, open, high, low, close, volume) "
+        + (_ON_CONFLICT_OVERWRITE if overwrite else _ON_CONFLICT_DO_NOTHING)
+    )
+
+
+def _candle_columns(candles: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Normalize candles (binance_client kline dicts) into column arrays, deduplicated on open_time."""
+    by_open: Dict[datetime, Dict[str, Any]] = {}
+    for c in candles:
+        ot = c.get("open_time")
+        if ot is None:
+            continue
+        if isinstance(ot, datetime) and ot.tzinfo is None:
+            ot = ot.replace(tzinfo=timezone.utc)
+        by_open[ot] = c
+    keys = sorted(by_open)
+    return {
+        "open_times": keys,
+        "opens": [by_open[k]["open"] for k in keys],
+        "highs": [by_open[k]["high"] for k in keys],
+        "lows": [by_open[k]["low"] for k in keys],
+        "closes": [by_open[k]["close"] for k in keys],
+        "volumes": [by_open[k]["volume"] for k in keys],
+    }
+
+
+def bulk_insert_bars(
+    session: Session,
+    timeframe: str,
+    instrument_id: int,
+    candles: Iterable[Dict[str, Any]],
+    source: str = "binance",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overwrite: bool = False,
+) -> BulkInsertResult:
+    """
+    Insert candles of one instrument into the timeframe table; existing bars are skipped.
+    Caller must commit.
+
+    Args:
+        session: Database session.
+        timeframe: One of BAR_MODELS ("1m", "5m", "1h", "4h", "1d", "1w").
+        instrument_id: Instrument ID.
+        candles: Dicts with open_time, open, high, low, close, volume (binance_client format).
+            Candles without open_time are ignored; duplicates on open_time keep the last one.
+        source: Source identifier (default "binance").
+        chunk_size: Max candles per statement.
+        overwrite: Replace existing bars (DO UPDATE) instead of skipping them; used by the
+            rollup engine, whose buckets change while they fill.
+
+    Returns:
+        BulkInsertResult(inserted, skipped) where skipped counts bars already present
+        (always 0 with overwrite=True: inserted then counts rows written).
+    """
+    model = BAR_MODELS.get(timeframe)
+    if model is None:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    cols = _candle_columns(candles)
+    n = len(cols["open_times"])
+    if n == 0:
+        return BulkInsertResult(0, 0)
+    stmt = text(_insert_sql(model.__table__.fullname, overwrite=overwrite))
+    step = max(1, chunk_size)
+    inserted = 0
+    for start in range(0, n, step):
+        params = {k: v[start:start + step] for k, v in cols.items()}
+        params["instrument_id"] = instrument_id
+        params["source"] = source
+        result = session.execute(stmt, params)
+        inserted += max(result.rowcount or 0, 0)
+    note_bars_written(session, timeframe, instrument_id, cols["open_times"][:1])
+    return BulkInsertResult(inserted, n - inserted)
@@ -3,7 +3,7 @@ Minimal Binance REST client for latest quote (ticker) data.
 Uses public market data only; no API key required.
 """
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, NamedTuple, Optional
 
 import httpx
 
@@ -399,3 +399,104 @@ def fetch_klines_1w(
             "volume": v,
         })
     return out
+
+
+# Poids "REQUEST_WEIGHT" de GET /api/v3/klines selon limit (doc Binance Spot).
+KLINES_WEIGHT_TIERS = ((99, 1), (499, 2), (1000, 5))
+KLINES_WEIGHT_MAX = 10
+USED_WEIGHT_HEADER = "x-mbx-used-weight-1m"
+
+
+def klines_request_weight(limit: int) -> int:
+    """Request weight charged by Binance for one klines call with this limit."""
+    for upper, weight in KLINES_WEIGHT_TIERS:
+        if limit <= upper:
+            return weight
+    return KLINES_WEIGHT_MAX
+
+
+class KlinesPage(NamedTuple):
+    """
+    One klines call: candles (None on failure), server-reported weight used over the
+    current minute (X-MBX-USED-WEIGHT-1M, None if absent) and retry_after (seconds, set
+    on 429/418 rate-limit responses only).
+    """
+    candles: Optional[List[Dict[str, Any]]]
+    used_weight_1m: Optional[int]
+    retry_after: Optional[float] = None
+
+
+def _parse_klines(data: Any) -> Optional[List[Dict[str, Any]]]:
+    if not isinstance(data, list):
+        return None
+    out = []
+    for candle in data:
+        if not isinstance(candle, (list, tuple)) or len(candle) < 6:
+            continue
+        open_time = _klines_open_time_ms(candle)
+        if open_time is None:
+            continue
+        try:
+            o = float(candle[1])
+            h = float(candle[2])
+            l = float(candle[3])
+            c = float(candle[4])
+            v = float(candle[5])
+        except (TypeError, ValueError, IndexError):
+            continue
+        out.append({
+            "open_time": open_time,
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+            "volume": v,
+        })
+    return out
+
+
+def _header_int(resp: httpx.Response, name: str) -> Optional[int]:
+    raw = resp.headers.get(name)
+    if raw is None:
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def fetch_klines_page(
+    client: httpx.Client,
+    symbol: str,
+    interval: str,
+    limit: int = 500,
+    start_time_ms: Optional[int] = None,
+    end_time_ms: Optional[int] = None,
+) -> KlinesPage:
+    """
+    Fetch one page of klines on a caller-owned (keep-alive) client, exposing rate-limit info.
+
+    Same normalized candles as fetch_klines_<interval>. Used by the concurrent backfill,
+    which shares one client between its workers and paces them on the reported weight.
+    """
+    base = (BINANCE_REST_BASE_URL or "https://api.binance.com").rstrip("/")
+    url = f"{base}/api/v3/klines"
+    params = {"symbol": symbol.upper(), "interval": interval, "limit": min(limit, 1000)}
+    if start_time_ms is not None:
+        params["startTime"] = start_time_ms
+    if end_time_ms is not None:
+        params["endTime"] = end_time_ms
+    try:
+        resp = client.get(url, params=params)
+    except httpx.HTTPError:
+        return KlinesPage(None, None)
+    used = _header_int(resp, USED_WEIGHT_HEADER)
+    if resp.status_code in (418, 429):
+        retry_after = _header_int(resp, "retry-after")
+        return KlinesPage(None, used, float(retry_after if retry_after is not None else 60))
+    try:
+        resp.raise_for_status()
+        data = resp.json()
+    except (httpx.HTTPError, ValueError):
+        return KlinesPage(None, used)
+    return KlinesPage(_parse_klines(data), used)
@@ -22,7 +22,8 @@ from services.market_data.config import (
     BINANCE_WS_RECONNECT_BASE_DELAY_SEC,
     BINANCE_WS_RECONNECT_MAX_DELAY_SEC,
 )
-from services.market_data.quotes_repo import upsert_latest_quote
+from services.market_data.quote_bus import publish_quote_deltas
+from services.market_data.quotes_repo import bulk_upsert_latest_quotes
 
 logger = logging.getLogger(__name__)
 
@@ -88,28 +89,32 @@ def _flush_pending(
     pending: Dict[str, Dict[str, Any]],
     symbol_to_id: Dict[str, int],
 ) -> int:
-    """Sync: open session, upsert each pending quote, commit, return count. Caller clears pending after."""
+    """Sync: publish deltas on the quote bus, then bulk-upsert all pending quotes in one
+    statement, commit, return count. Caller clears pending after."""
     if not pending:
         return 0
+    publish_quote_deltas(pending, symbol_to_id)
+    rows = []
+    for symbol_upper, row in pending.items():
+        instrument_id = symbol_to_id.get(symbol_upper)
+        if instrument_id is None:
+            continue
+        rows.append({
+            "instrument_id": instrument_id,
+            "provider": PROVIDER,
+            "provider_symbol": symbol_upper,
+            "last_price": row["last_price"],
+            "bid_price": row["bid_price"],
+            "ask_price": row["ask_price"],
+            "volume": None,
+            "quote_time": row["quote_time"],
+        })
     db = SessionLocal()
     try:
         for attempt in range(3):
             try:
-                for symbol_upper, row in pending.items():
-                    instrument_id = symbol_to_id.get(symbol_upper)
-                    if instrument_id is None:
-                        continue
-                    upsert_latest_quote(
-                        db,
-                        instrument_id=instrument_id,
-                        provider=PROVIDER,
-                        provider_symbol=symbol_upper,
-                        last_price=row["last_price"],
-                        bid_price=row["bid_price"],
-                        ask_price=row["ask_price"],
-                        volume=None,
-                        quote_time=row["quote_time"],
-                    )
+                # Single INSERT ... ON CONFLICT, rows in instrument_id order (see quotes_repo).
+                bulk_upsert_latest_quotes(db, rows)
                 db.commit()
                 break
             except OperationalError as e:
@@ -267,7 +272,7 @@ def _init_price_alert_subsystem() -> None:
 
         init_dispatcher(SessionLocal)
         r = get_redis()
-        engine = init_alert_engine(r)
+        engine = init_alert_engine(r, SessionLocal)
         if engine is None:
             logger.warning("PriceAlertEngine disabled (Redis unavailable)")
             return
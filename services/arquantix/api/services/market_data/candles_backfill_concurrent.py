@@ -0,0 +1,420 @@
+"""
+Concurrent multi-symbol candle backfill, paced on the Binance request weight.
+
+Same contract as candles_backfill_service.run_backfill (missing candles from the latest DB
+candle, or now - fallback_days, up to now), but:
+- fetch workers (thread pool) download several instruments at once over one keep-alive
+  httpx client; each instrument is still paged sequentially (the next page starts after
+  the last candle received);
+- every request takes its weight (klines_request_weight) from a shared WeightTokenBucket
+  refilled at weight_budget_per_min; the X-MBX-USED-WEIGHT-1M header reported by Binance
+  (all clients of the IP) shrinks the bucket further, and a 429/418 blocks every worker
+  for Retry-After;
+- fetches and DB writes are pipelined: workers push pages into a bounded queue, the
+  calling thread is the single writer (bulk_insert_bars, the session is not shared
+  between threads) and commits every commit_batch pages.
+
+Checkpoint / resume: pages of one instrument are written in order, so the committed
+max(open_time) of an instrument is its checkpoint; a crashed or interrupted run restarts
+each instrument from there. When a commit fails, every instrument with uncommitted pages
+is stopped (later pages would otherwise move the checkpoint past the lost ones).
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+from sqlalchemy.orm import Session
+
+from services.market_data.bars_bulk_repo import bulk_insert_bars
+from services.market_data.binance_client import KlinesPage, fetch_klines_page, klines_request_weight
+from services.market_data.candles_backfill_service import (
+    DEFAULT_COMMIT_BATCH,
+    DEFAULT_LIMIT_PER_REQUEST,
+    PROVIDER,
+    TIMEFRAME_CONFIG,
+    _dt_to_ms,
+    get_latest_open_time,
+    load_binance_instruments,
+)
+from services.market_data.config import (
+    BINANCE_BACKFILL_WEIGHT_BUDGET_1M,
+    BINANCE_BACKFILL_WORKERS,
+    BINANCE_REQUEST_WEIGHT_LIMIT_1M,
+    BINANCE_TIMEOUT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = BINANCE_BACKFILL_WORKERS
+DEFAULT_WEIGHT_BUDGET_1M = BINANCE_BACKFILL_WEIGHT_BUDGET_1M
+MAX_RATE_LIMIT_RETRIES = 5
+QUEUE_PAGES_PER_WORKER = 4
+
+# (client, provider_symbol, interval, limit, start_time_ms, end_time_ms) -> KlinesPage
+FetchPageFn = Callable[[Any, str, str, int, Optional[int], Optional[int]], KlinesPage]
+
+
+class WeightTokenBucket:
+    """
+    Thread-safe token bucket in Binance request-weight units.
+
+    Holds at most weight_per_minute tokens and refills continuously at weight_per_minute / 60
+    per second; acquire() blocks until the requested weight is available.
+    """
+
+    def __init__(
+        self,
+        weight_per_minute: int,
+        server_limit_1m: int = BINANCE_REQUEST_WEIGHT_LIMIT_1M,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.capacity = float(max(1, weight_per_minute))
+        self.server_limit_1m = server_limit_1m
+        self._rate = self.capacity / 60.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self.weight_used = 0
+        self.requests = 0
+        self.waited_sec = 0.0
+        self.rate_limited = 0
+        self.max_server_weight_1m = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self._rate)
+            self._updated = now
+
+    def acquire(self, weight: int) -> float:
+        """Take weight tokens, sleeping as needed. Returns the time spent waiting (seconds)."""
+        weight = min(float(weight), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._tokens >= weight:
+                    self._tokens -= weight
+                    self.weight_used += int(weight)
+                    self.requests += 1
+                    self.waited_sec += waited
+                    return waited
+                else:
+                    delay = (weight - self._tokens) / self._rate
+            self._sleep(delay)
+            waited += delay
+
+    def observe_server_weight(self, used_weight_1m: Optional[int]) -> None:
+        """Align on the weight Binance reports for the IP (other processes included)."""
+        if used_weight_1m is None:
+            return
+        with self._lock:
+            self.max_server_weight_1m = max(self.max_server_weight_1m, used_weight_1m)
+            self._refill(self._clock())
+            remaining = float(self.server_limit_1m - used_weight_1m)
+            if remaining < self._tokens:
+                self._tokens = max(0.0, remaining)
+
+    def penalize(self, retry_after_sec: float) -> None:
+        """Rate limited (429/418): block every caller for retry_after_sec and empty the bucket."""
+        with self._lock:
+            now = self._clock()
+            self._blocked_until = max(self._blocked_until, now + max(0.0, retry_after_sec))
+            self._tokens = 0.0
+            self._updated = now
+            self.rate_limited += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "weight_used": self.weight_used,
+                "requests": self.requests,
+                "weight_wait_sec": round(self.waited_sec, 3),
+                "rate_limited": self.rate_limited,
+                "max_server_weight_1m": self.max_server_weight_1m,
+            }
+
+
+def _fetch_instrument(
+    client: Any,
+    fetch_page_fn: FetchPageFn,
+    bucket: WeightTokenBucket,
+    out: "queue.Queue[Tuple[str, Any]]",
+    cancelled: Set[int],
+    timeframe: str,
+    instrument_id: int,
+    provider_symbol: str,
+    start_ms: int,
+    end_ms: int,
+    limit: int,
+) -> None:
+    """Fetch worker: page one instrument and push ("page" | "error" | "done", ...) messages."""
+    step = TIMEFRAME_CONFIG[timeframe]["step"]
+    weight = klines_request_weight(limit)
+    last_open: Optional[datetime] = None
+    try:
+        while instrument_id not in cancelled:
+            retries = 0
+            while True:
+                bucket.acquire(weight)
+                page = fetch_page_fn(client, provider_symbol, timeframe, limit, start_ms, end_ms)
+                bucket.observe_server_weight(page.used_weight_1m)
+                if page.retry_after is None or retries >= MAX_RATE_LIMIT_RETRIES:
+                    break
+                retries += 1
+                logger.warning(
+                    "%s: Binance rate limit, retry %s in %.0fs", provider_symbol, retries, page.retry_after
+                )
+                bucket.penalize(page.retry_after)
+            if page.candles is None:
+                out.put(("error", (
+                    instrument_id,
+                    f"{provider_symbol} ({timeframe}): appel Binance échoué (start={start_ms}, end={end_ms})",
+                )))
+                return
+            valid = []
+            batch_last: Optional[datetime] = None
+            for c in page.candles:
+                ot = c.get("open_time")
+                if ot is None:
+                    continue
+                if isinstance(ot, datetime) and ot.tzinfo is None:
+                    ot = ot.replace(tzinfo=timezone.utc)
+                batch_last = ot
+                valid.append(c)
+            if batch_last is None:
+                return
+            if last_open is not None and batch_last <= last_open:
+                logger.warning(
+                    "%s: batch did not advance cursor (last=%s), stop to avoid loop",
+                    provider_symbol,
+                    batch_last.isoformat(),
+                )
+                return
+            out.put(("page", (instrument_id, len(page.candles), valid, batch_last)))
+            last_open = batch_last
+            next_start_ms = _dt_to_ms(batch_last + step)
+            if next_start_ms >= end_ms:
+                return
+            start_ms = next_start_ms
+    except Exception as e:
+        logger.exception("Backfill fetch failed for %s", provider_symbol)
+        out.put(("error", (instrument_id, f"{provider_symbol}: {e!s}")))
+    finally:
+        out.put(("done", (instrument_id, None)))
+
+
+def run_backfill_concurrent(
+    session: Session,
+    timeframe: str,
+    symbol: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    weight_budget_per_min: int = DEFAULT_WEIGHT_BUDGET_1M,
+    limit_per_request: int = DEFAULT_LIMIT_PER_REQUEST,
+    fallback_days: Optional[int] = None,
+    commit_batch: int = DEFAULT_COMMIT_BATCH,
+    dry_run: bool = False,
+    fetch_page_fn: FetchPageFn = fetch_klines_page,
+    bucket: Optional[WeightTokenBucket] = None,
+) -> Dict[str, Any]:
+    """
+    Run the incremental backfill for all instruments with `workers` concurrent fetchers.
+
+    The session is only used from the calling thread (writer). commit_batch counts pages
+    across all instruments.
+
+    Returns the run_backfill summary (instruments_processed, candles_fetched, candles_upserted,
+    candles_inserted, candles_already_present, commits_performed, errors, skipped,
+    instrument_details with a "checkpoint" per instrument) plus workers, elapsed_sec,
+    candles_per_sec, requests, weight_used, weight_budget_per_min, weight_per_min,
+    weight_wait_sec, rate_limited and max_server_weight_1m.
+    """
+    started = time.monotonic()
+    summary: Dict[str, Any] = {
+        "instruments_processed": 0,
+        "candles_fetched": 0,
+        "candles_upserted": 0,
+        "candles_inserted": 0,
+        "candles_already_present": 0,
+        "commits_performed": 0,
+        "errors": [],
+        "skipped": [],
+        "instrument_details": [],
+        "workers": max(1, workers),
+        "weight_budget_per_min": weight_budget_per_min,
+    }
+    if timeframe not in TIMEFRAME_CONFIG:
+        summary["errors"].append(f"Unsupported timeframe: {timeframe}")
+        return summary
+
+    config = TIMEFRAME_CONFIG[timeframe]
+    step = config["step"]
+    days = fallback_days if fallback_days is not None else config["fallback_days"]
+    limit = max(1, min(limit_per_request, 1000))
+    instruments = load_binance_instruments(session, symbol=symbol)
+    if not instruments:
+        if symbol:
+            summary["errors"].append(f"Symbol not found or inactive: {symbol}")
+        return summary
+
+    now_utc = datetime.now(timezone.utc)
+    end_ms = _dt_to_ms(now_utc)
+    details: Dict[int, Dict[str, Any]] = {}
+    jobs: List[Tuple[int, str, int]] = []
+    for instrument_id, provider_symbol in instruments:
+        latest = get_latest_open_time(session, timeframe, instrument_id)
+        start_dt = latest + step if latest is not None else now_utc - timedelta(days=days)
+        details[instrument_id] = {
+            "instrument_id": instrument_id,
+            "provider_symbol": provider_symbol,
+            "candles_fetched": 0,
+            "candles_upserted": 0,
+            "checkpoint": latest.isoformat() if latest is not None else None,
+        }
+        start_ms = _dt_to_ms(start_dt)
+        if start_ms >= end_ms:
+            logger.info("%s: already up to date, skip", provider_symbol)
+            continue
+        jobs.append((instrument_id, provider_symbol, start_ms))
+    # Close the read transaction before the pipeline starts.
+    session.rollback()
+
+    bucket = bucket or WeightTokenBucket(weight_budget_per_min)
+    pages: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max(1, workers) * QUEUE_PAGES_PER_WORKER)
+    cancelled: Set[int] = set()
+    uncommitted: Dict[int, datetime] = {}
+    pages_since_commit = 0
+    errors: List[str] = summary["errors"]
+    remaining = 0
+
+    def _commit() -> None:
+        nonlocal pages_since_commit
+        try:
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            lost = sorted(uncommitted)
+            errors.append(f"commit failed ({len(lost)} instrument(s) stopped): {e!s}")
+            logger.exception("Backfill commit failed, stopping instruments %s", lost)
+            for iid in lost:
+                cancelled.add(iid)
+                details[iid]["error"] = "commit failed"
+        else:
+            summary["commits_performed"] += 1
+            for iid, last in uncommitted.items():
+                details[iid]["checkpoint"] = last.isoformat()
+        uncommitted.clear()
+        pages_since_commit = 0
+
+    def _drain_pages() -> int:
+        """Writer loop; returns once every worker has finished (0 remaining)."""
+        nonlocal remaining, pages_since_commit
+        while remaining:
+            kind, payload = pages.get()
+            instrument_id = payload[0]
+            detail = details[instrument_id]
+            if kind == "done":
+                remaining -= 1
+                continue
+            if kind == "error":
+                errors.append(payload[1])
+                detail["error"] = "fetch failed"
+                continue
+            _, fetched, candles, last_open = payload
+            summary["candles_fetched"] += fetched
+            detail["candles_fetched"] += len(candles)
+            if instrument_id in cancelled:
+                continue
+            if dry_run:
+                detail["checkpoint"] = last_open.isoformat()
+                continue
+            try:
+                result = bulk_insert_bars(session, timeframe, instrument_id, candles, source=PROVIDER)
+            except Exception as e:
+                session.rollback()
+                cancelled.update(uncommitted)
+                cancelled.add(instrument_id)
+                errors.append(f"{detail['provider_symbol']}: {e!s}")
+                detail["error"] = str(e)
+                logger.exception("Backfill write failed for %s", detail["provider_symbol"])
+                for iid in uncommitted:
+                    details[iid]["error"] = "rolled back"
+                uncommitted.clear()
+                pages_since_commit = 0
+                continue
+            summary["candles_upserted"] += result.total
+            summary["candles_inserted"] += result.inserted
+            summary["candles_already_present"] += result.skipped
+            detail["candles_upserted"] += result.total
+            uncommitted[instrument_id] = last_open
+            pages_since_commit += 1
+            if commit_batch > 0 and pages_since_commit >= commit_batch:
+                _commit()
+        return remaining
+
+    logger.info(
+        "Concurrent backfill %s: timeframe=%s instruments=%s to_fetch=%s workers=%s weight_budget=%s/min",
+        "DRY-RUN" if dry_run else "START",
+        timeframe,
+        len(instruments),
+        len(jobs),
+        max(1, workers),
+        weight_budget_per_min,
+    )
+
+    with httpx.Client(timeout=BINANCE_TIMEOUT_SECONDS) as client, ThreadPoolExecutor(
+        max_workers=max(1, workers), thread_name_prefix="candles-backfill"
+    ) as pool:
+        for instrument_id, provider_symbol, start_ms in jobs:
+            pool.submit(
+                _fetch_instrument, client, fetch_page_fn, bucket, pages, cancelled,
+                timeframe, instrument_id, provider_symbol, start_ms, end_ms, limit,
+            )
+        remaining = len(jobs)
+        try:
+            remaining = _drain_pages()
+        except BaseException:
+            # Stop the workers and unblock their put() so the pool can shut down.
+            cancelled.update(iid for iid, _, _ in jobs)
+            while remaining:
+                if pages.get()[0] == "done":
+                    remaining -= 1
+            raise
+        if not dry_run and uncommitted:
+            _commit()
+
+    elapsed = time.monotonic() - started
+    summary["instruments_processed"] = len(instruments)
+    summary["instrument_details"] = [details[iid] for iid, _ in instruments]
+    summary.update(bucket.snapshot())
+    summary["elapsed_sec"] = round(elapsed, 3)
+    summary["candles_per_sec"] = round(summary["candles_fetched"] / elapsed, 1) if elapsed > 0 else None
+    summary["weight_per_min"] = round(summary["weight_used"] * 60.0 / elapsed, 1) if elapsed > 0 else None
+    logger.info(
+        "Concurrent backfill %scomplete: instruments=%s fetched=%s upserted=%s commits=%s "
+        "elapsed=%.1fs candles/s=%s weight=%s (%s/min) rate_limited=%s errors=%s",
+        "DRY-RUN " if dry_run else "",
+        summary["instruments_processed"],
+        summary["candles_fetched"],
+        summary["candles_upserted"],
+        summary["commits_performed"],
+        elapsed,
+        summary["candles_per_sec"],
+        summary["weight_used"],
+        summary["weight_per_min"],
+        summary["rate_limited"],
+        len(errors),
+    )
+    return summary
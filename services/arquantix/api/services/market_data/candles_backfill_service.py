@@ -26,58 +26,47 @@ from services.market_data.binance_client import (
     fetch_klines_1d,
     fetch_klines_1w,
 )
-from services.market_data.bars_1m_repo import upsert_bar_1m
-from services.market_data.bars_5m_repo import upsert_bar_5m
-from services.market_data.bars_1h_repo import upsert_bar_1h
-from services.market_data.bars_4h_repo import upsert_bar_4h
-from services.market_data.bars_1d_repo import upsert_bar_1d
-from services.market_data.bars_1w_repo import upsert_bar_1w
+from services.market_data.bars_bulk_repo import bulk_insert_bars
 
 logger = logging.getLogger(__name__)
 
 PROVIDER = "binance"
 
-# Timeframe -> (model, fetch_fn, upsert_fn, step_delta, default_fallback_days)
+# Timeframe -> (model, fetch_fn, step_delta, default_fallback_days); writes go through bulk_insert_bars
 TIMEFRAME_CONFIG: Dict[str, Dict[str, Any]] = {
     "1m": {
         "model": MarketDataBar1m,
         "fetch_fn": fetch_klines_1m,
-        "upsert_fn": upsert_bar_1m,
         "step": timedelta(minutes=1),
         "fallback_days": 7,
     },
     "5m": {
         "model": MarketDataBar5m,
         "fetch_fn": fetch_klines_5m,
-        "upsert_fn": upsert_bar_5m,
         "step": timedelta(minutes=5),
         "fallback_days": 7,
     },
     "1h": {
         "model": MarketDataBar1h,
         "fetch_fn": fetch_klines_1h,
-        "upsert_fn": upsert_bar_1h,
         "step": timedelta(hours=1),
         "fallback_days": 30,
     },
     "4h": {
         "model": MarketDataBar4h,
         "fetch_fn": fetch_klines_4h,
-        "upsert_fn": upsert_bar_4h,
         "step": timedelta(hours=4),
         "fallback_days": 120,
     },
     "1d": {
         "model": MarketDataBar1d,
         "fetch_fn": fetch_klines_1d,
-        "upsert_fn": upsert_bar_1d,
         "step": timedelta(days=1),
         "fallback_days": 730,
     },
     "1w": {
         "model": MarketDataBar1w,
         "fetch_fn": fetch_klines_1w,
-        "upsert_fn": upsert_bar_1w,
         "step": timedelta(weeks=1),
         "fallback_days": 3650,
     },
@@ -156,8 +145,10 @@ def run_backfill(
     Run incremental backfill for the given timeframe.
     Fetches missing candles from (latest DB candle + 1 step) or (now - fallback_days) up to now.
 
-    Returns a summary dict: instruments_processed, candles_fetched, candles_upserted,
-    commits_performed, errors (list), skipped (list).
+    Each kline batch is written with one bulk statement (bars_bulk_repo.bulk_insert_bars).
+
+    Returns a summary dict: instruments_processed, candles_fetched, candles_upserted
+    (= candles_inserted + candles_already_present), commits_performed, errors (list), skipped (list).
     """
     if timeframe not in TIMEFRAME_CONFIG:
         return {
@@ -171,7 +162,6 @@ def run_backfill(
 
     config = TIMEFRAME_CONFIG[timeframe]
     fetch_fn = config["fetch_fn"]
-    upsert_fn = config["upsert_fn"]
     step = config["step"]
     days = fallback_days if fallback_days is not None else config["fallback_days"]
 
@@ -200,6 +190,8 @@ def run_backfill(
     end_ms = _dt_to_ms(now_utc)
     total_fetched = 0
     total_upserted = 0
+    total_inserted = 0
+    total_skipped_existing = 0
     commits_performed = 0
     errors: List[str] = []
     skipped: List[str] = []
@@ -278,6 +270,7 @@ def run_backfill(
 
                 batch_last_open: Optional[datetime] = None
                 batch_upserted = 0
+                valid_candles = []
                 for c in batch:
                     ot = c.get("open_time")
                     if ot is None:
@@ -286,20 +279,20 @@ def run_backfill(
                         ot = ot.replace(tzinfo=timezone.utc)
                     batch_last_open = ot
                     instrument_fetched += 1
-                    if not dry_run:
-                        upsert_fn(
-                            session,
-                            instrument_id=instrument_id,
-                            open_time=ot,
-                            open=c["open"],
-                            high=c["high"],
-                            low=c["low"],
-                            close=c["close"],
-                            volume=c["volume"],
-                            source=PROVIDER,
-                        )
-                        instrument_upserted += 1
-                        batch_upserted += 1
+                    valid_candles.append(c)
+                if not dry_run and valid_candles:
+                    # Un seul INSERT ... ON CONFLICT DO NOTHING par lot de klines.
+                    result = bulk_insert_bars(
+                        session,
+                        timeframe,
+                        instrument_id,
+                        valid_candles,
+                        source=PROVIDER,
+                    )
+                    batch_upserted = result.total
+                    instrument_upserted += result.total
+                    total_inserted += result.inserted
+                    total_skipped_existing += result.skipped
 
                 total_fetched += len(batch)
                 total_upserted += batch_upserted
@@ -381,6 +374,8 @@ def run_backfill(
         "instruments_processed": len(instruments),
         "candles_fetched": total_fetched,
         "candles_upserted": total_upserted,
+        "candles_inserted": total_inserted,
+        "candles_already_present": total_skipped_existing,
         "commits_performed": commits_performed,
         "errors": errors,
         "skipped": skipped,
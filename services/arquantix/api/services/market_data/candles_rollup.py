@@ -0,0 +1,295 @@
+"""
+Rollup of higher-timeframe candles (1h, 4h, 1d, 1w) from stored 5m bars.
+
+Replaces fetching every timeframe from Binance: only the 5m series is downloaded, the
+other tables are derived from it so they can never disagree with each other.
+
+Incremental: a watermark per (instrument, target timeframe) stores the max updated_at of
+the base bars already aggregated (market_data_rollup_watermarks). A run reads only the
+base bars written since the watermark (minus WATERMARK_OVERLAP for late commits),
+derives the set of touched buckets, and recomputes those buckets only.
+
+Gaps: base holes are detected with ohlc_holes.find_holes (same rule as the OHLC holes
+admin). A closed bucket overlapping a hole, or with fewer base bars than expected, is
+not written and is reported in "gaps"; it is recomputed automatically once a backfill
+writes the missing base bars (their updated_at moves past the watermark). The bucket
+still in progress (after the last base bar) is written as a partial candle.
+
+Bucket alignment follows Binance klines: UTC epoch for 1h/4h/1d, Monday 00:00 UTC for 1w.
+Caller is responsible for committing the session.
+"""
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import MarketDataBar5m, MarketDataRollupWatermark
+from services.market_data.bars_bulk_repo import bulk_insert_bars
+from services.market_data.ohlc_holes import find_holes
+
+logger = logging.getLogger(__name__)
+
+BASE_TIMEFRAME = "5m"
+BASE_STEP = timedelta(minutes=5)
+ROLLUP_TARGETS = ("1h", "4h", "1d", "1w")
+ROLLUP_SOURCE = "rollup_5m"
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_WEEK_ORIGIN = datetime(1970, 1, 5, tzinfo=timezone.utc)  # premier lundi après l'epoch
+
+TARGET_STEPS = {
+    "1h": timedelta(hours=1),
+    "4h": timedelta(hours=4),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+}
+
+
+def bucket_start(open_time: datetime, timeframe: str) -> datetime:
+    """Open time of the timeframe bucket containing open_time (UTC, Binance alignment)."""
+    if open_time.tzinfo is None:
+        open_time = open_time.replace(tzinfo=timezone.utc)
+    step = TARGET_STEPS[timeframe]
+    origin = _WEEK_ORIGIN if timeframe == "1w" else _EPOCH
+    n = (open_time - origin) // step
+    return origin + n * step
+
+
+def aggregate_bucket(bars: Sequence[Tuple[Any, ...]]) -> Dict[str, Any]:
+    """OHLCV of one bucket from base rows (open_time, open, high, low, close, volume) sorted by time."""
+    return {
+        "open": bars[0][1],
+        "high": max(b[2] for b in bars),
+        "low": min(b[3] for b in bars),
+        "close": bars[-1][4],
+        "volume": sum(b[5] for b in bars),
+    }
+
+
+def build_rollup_candles(
+    base_rows: Sequence[Tuple[Any, ...]],
+    timeframe: str,
+    touched_buckets: Iterable[datetime],
+    last_base_open: datetime,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Aggregate the touched buckets of one target timeframe.
+
+    Args:
+        base_rows: Base bars (open_time, open, high, low, close, volume) sorted by open_time,
+            covering at least every touched bucket entirely.
+        timeframe: Target timeframe ("1h", "4h", "1d", "1w").
+        touched_buckets: Bucket open times to recompute.
+        last_base_open: Latest base bar open_time of the instrument (buckets ending after it
+            are in progress and written partially).
+
+    Returns:
+        (candles, gaps): candles to write (binance_client dict format) and flagged buckets
+        {"open_time", "base_bars", "expected_base_bars", "holes"} left unwritten.
+    """
+    step = TARGET_STEPS[timeframe]
+    expected = int(step / BASE_STEP)
+    targets = set(touched_buckets)
+    grouped: Dict[datetime, List[Tuple[Any, ...]]] = {}
+    for row in base_rows:
+        b = bucket_start(row[0], timeframe)
+        if b in targets:
+            grouped.setdefault(b, []).append(row)
+
+    open_times = [r[0] for r in base_rows]
+    holes = find_holes(open_times, BASE_STEP)
+
+    candles: List[Dict[str, Any]] = []
+    gaps: List[Dict[str, Any]] = []
+    for b in sorted(grouped):
+        bars = grouped[b]
+        end = b + step
+        in_progress = end > last_base_open + BASE_STEP
+        bucket_holes = [(hs, he) for hs, he in holes if hs < end and he > b]
+        incomplete = len(bars) < expected and not in_progress
+        if bucket_holes or incomplete:
+            gaps.append({
+                "open_time": b.isoformat(),
+                "base_bars": len(bars),
+                "expected_base_bars": expected,
+                "holes": [{"start": hs.isoformat(), "end": he.isoformat()} for hs, he in bucket_holes],
+            })
+            continue
+        candle = aggregate_bucket(bars)
+        candle["open_time"] = b
+        candles.append(candle)
+    return candles, gaps
+
+
+def _load_watermarks(session: Session, instrument_id: int, targets: Sequence[str]) -> Dict[str, Optional[datetime]]:
+    rows = (
+        session.query(MarketDataRollupWatermark.target_timeframe, MarketDataRollupWatermark.watermark)
+        .filter(
+            MarketDataRollupWatermark.instrument_id == instrument_id,
+            MarketDataRollupWatermark.target_timeframe.in_(list(targets)),
+        )
+        .all()
+    )
+    out: Dict[str, Optional[datetime]] = {tf: None for tf in targets}
+    for tf, wm in rows:
+        out[tf] = wm
+    return out
+
+
+def _save_watermark(session: Session, instrument_id: int, timeframe: str, watermark: datetime) -> None:
+    row = session.get(MarketDataRollupWatermark, (instrument_id, timeframe))
+    if row is None:
+        session.add(MarketDataRollupWatermark(
+            instrument_id=instrument_id,
+            target_timeframe=timeframe,
+            base_timeframe=BASE_TIMEFRAME,
+            watermark=watermark,
+        ))
+    else:
+        row.watermark = watermark
+    session.flush()
+
+
+def run_rollup_for_instrument(
+    session: Session,
+    instrument_id: int,
+    targets: Sequence[str] = ROLLUP_TARGETS,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Recompute the target buckets touched by base bars written since each watermark.
+    Caller must commit.
+
+    Returns a summary dict: instrument_id, base_bars_read, by_timeframe
+    {tf: {"buckets_touched", "candles_written", "gaps"}}, watermark (ISO or None).
+    """
+    targets = [tf for tf in targets if tf in TARGET_STEPS]
+    summary: Dict[str, Any] = {
+        "instrument_id": instrument_id,
+        "base_bars_read": 0,
+        "by_timeframe": {},
+        "watermark": None,
+    }
+    if not targets:
+        return summary
+
+    watermarks = _load_watermarks(session, instrument_id, targets)
+    known = [wm for wm in watermarks.values() if wm is not None]
+    since = min(known) - WATERMARK_OVERLAP if known and len(known) == len(targets) else None
+
+    touched_q = session.query(MarketDataBar5m.open_time, MarketDataBar5m.updated_at).filter(
+        MarketDataBar5m.instrument_id == instrument_id
+    )
+    if since is not None:
+        touched_q = touched_q.filter(MarketDataBar5m.updated_at > since)
+    touched = touched_q.all()
+    if not touched:
+        for tf in targets:
+            summary["by_timeframe"][tf] = {"buckets_touched": 0, "candles_written": 0, "gaps": []}
+        return summary
+
+    new_watermark = max(u for _, u in touched)
+    last_base_open = (
+        session.query(func.max(MarketDataBar5m.open_time))
+        .filter(MarketDataBar5m.instrument_id == instrument_id)
+        .scalar()
+    )
+
+    touched_by_tf: Dict[str, set] = {}
+    for tf in targets:
+        wm = watermarks.get(tf)
+        cutoff = wm - WATERMARK_OVERLAP if wm is not None else None
+        touched_by_tf[tf] = {
+            bucket_start(ot, tf) for ot, upd in touched if cutoff is None or upd > cutoff
+        }
+
+    all_buckets = [(b, b + TARGET_STEPS[tf]) for tf, bs in touched_by_tf.items() for b in bs]
+    if all_buckets:
+        range_start = min(s for s, _ in all_buckets)
+        range_end = max(e for _, e in all_buckets)
+        base_rows = (
+            session.query(
+                MarketDataBar5m.open_time,
+                MarketDataBar5m.open,
+                MarketDataBar5m.high,
+                MarketDataBar5m.low,
+                MarketDataBar5m.close,
+                MarketDataBar5m.volume,
+            )
+            .filter(
+                MarketDataBar5m.instrument_id == instrument_id,
+                MarketDataBar5m.open_time >= range_start,
+                MarketDataBar5m.open_time < range_end,
+            )
+            .order_by(MarketDataBar5m.open_time)
+            .all()
+        )
+    else:
+        base_rows = []
+    summary["base_bars_read"] = len(base_rows)
+
+    for tf in targets:
+        candles, gaps = build_rollup_candles(base_rows, tf, touched_by_tf[tf], last_base_open)
+        written = 0
+        if candles and not dry_run:
+            written = bulk_insert_bars(
+                session, tf, instrument_id, candles, source=ROLLUP_SOURCE, overwrite=True
+            ).inserted
+        summary["by_timeframe"][tf] = {
+            "buckets_touched": len(touched_by_tf[tf]),
+            "candles_written": written if not dry_run else len(candles),
+            "gaps": gaps,
+        }
+        if gaps:
+            logger.warning(
+                "Rollup %s instrument=%s: %d bucket(s) not written (gaps in 5m base)",
+                tf, instrument_id, len(gaps),
+            )
+        if not dry_run:
+            _save_watermark(session, instrument_id, tf, new_watermark)
+
+    summary["watermark"] = new_watermark.isoformat() if new_watermark else None
+    return summary
+
+
+def run_rollup(
+    session: Session,
+    instrument_ids: Iterable[int],
+    targets: Sequence[str] = ROLLUP_TARGETS,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Run the incremental rollup for several instruments, committing after each one.
+
+    Returns a summary dict: instruments_processed, candles_written, gaps_flagged,
+    errors (list), instrument_details (list of run_rollup_for_instrument summaries).
+    """
+    details: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    written = 0
+    gaps = 0
+    ids = list(instrument_ids)
+    for instrument_id in ids:
+        try:
+            detail = run_rollup_for_instrument(session, instrument_id, targets=targets, dry_run=dry_run)
+            if not dry_run:
+                session.commit()
+        except Exception as e:
+            session.rollback()
+            errors.append(f"instrument {instrument_id}: {e!s}")
+            logger.exception("Rollup failed for instrument %s", instrument_id)
+            continue
+        details.append(detail)
+        for tf_summary in detail["by_timeframe"].values():
+            written += tf_summary["candles_written"]
+            gaps += len(tf_summary["gaps"])
+    return {
+        "instruments_processed": len(ids),
+        "candles_written": written,
+        "gaps_flagged": gaps,
+        "errors": errors,
+        "instrument_details": details,
+    }
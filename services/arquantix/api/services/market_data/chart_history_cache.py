@@ -0,0 +1,487 @@
+"""
+In-process cache for /api/market-data/chart-history, keyed by (instrument_id, period).
+
+Historical candles never change except the tail, so each entry keeps the closed bars of
+the period window pre-encoded as JSON bytes (one fragment per bar, with byte offsets so
+the sliding window start is a slice). A request only queries the bars after the last
+cached closed bar (normally the open bar alone); bars that closed since the entry was
+built are moved into the prefix on the way. The response body is assembled from bytes,
+byte-identical to the uncached JSONResponse of chart_history_service.get_chart_history.
+
+Invalidation: bars_bulk_repo.bulk_insert_bars records (timeframe, instrument_id, min
+open_time written) on the session (note_bars_written); after commit they are applied to
+the local cache and published on MARKET_DATA_CHART_CACHE_CHANNEL (same pub/sub classes
+as the quote bus) so every API process drops the entries whose cached prefix overlaps
+the write. Writes strictly after an entry's last closed bar are picked up by the tail
+query and invalidate nothing. MARKET_DATA_CHART_CACHE_TTL_SEC bounds staleness if an
+invalidation message is lost (listener reconnect).
+
+ETag: weak validator over the candles bytes (start_time/end_time are informative and
+move with every request); If-None-Match returns 304 without a body.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import (
+    MarketDataBar5m,
+    MarketDataBar1h,
+    MarketDataBar4h,
+    MarketDataBar1d,
+    MarketDataBar1w,
+    MarketDataInstrument,
+)
+from services.market_data.chart_period_config import TIMEFRAME_STEPS, get_chart_period_rule
+from services.market_data.config import (
+    MARKET_DATA_CHART_CACHE_CHANNEL,
+    MARKET_DATA_CHART_CACHE_ENABLED,
+    MARKET_DATA_CHART_CACHE_TTL_SEC,
+)
+from services.market_data.quote_bus import FallbackQuoteBus
+
+logger = logging.getLogger(__name__)
+
+CHART_MODELS = {
+    "5m": MarketDataBar5m,
+    "1h": MarketDataBar1h,
+    "4h": MarketDataBar4h,
+    "1d": MarketDataBar1d,
+    "1w": MarketDataBar1w,
+}
+MESSAGE_VERSION = 1
+_SESSION_INFO_KEY = "market_data_bars_written"
+# Compact an entry once this many bars have slid out of the window.
+_COMPACT_MIN_DROPPED = 64
+
+
+def _encode(value: Any) -> bytes:
+    # Same settings as starlette JSONResponse.render.
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_bar(instrument_id: int, provider_symbol: str, row: Tuple[Any, ...]) -> bytes:
+    """One candle (open_time, open, high, low, close, volume) as chart_history_service._normalize_bar JSON."""
+    open_time, o, h, l, c, v = row
+    return _encode({
+        "instrument_id": instrument_id,
+        "symbol": provider_symbol,
+        "open_time": open_time.isoformat() if open_time else None,
+        "open": float(o),
+        "high": float(h),
+        "low": float(l),
+        "close": float(c),
+        "volume": float(v),
+    })
+
+
+class ChartCacheMetrics:
+    """Thread-safe in-process counters (same approach as services/price_alerts/metrics)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.expired = 0
+        self.bars_appended = 0
+        self.build_latency_samples: list[float] = []
+        self.serve_latency_samples: list[float] = []
+
+    @staticmethod
+    def _append(samples: list, value: float) -> list:
+        samples.append(value)
+        if len(samples) > 1000:
+            return samples[-500:]
+        return samples
+
+    def record(self, hit: bool, latency_ms: float, not_modified: bool = False) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.serve_latency_samples = self._append(self.serve_latency_samples, latency_ms)
+            else:
+                self.misses += 1
+                self.build_latency_samples = self._append(self.build_latency_samples, latency_ms)
+            if not_modified:
+                self.not_modified += 1
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    @staticmethod
+    def _stats(samples: list) -> Dict[str, Optional[float]]:
+        if not samples:
+            return {"avg": None, "p99": None}
+        ordered = sorted(samples)
+        return {
+            "avg": round(sum(ordered) / len(ordered), 3),
+            "p99": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+        }
+
+    def snapshot(self, entries: int = 0) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "expired": self.expired,
+                "bars_appended": self.bars_appended,
+                "build_latency_ms": self._stats(self.build_latency_samples),
+                "serve_latency_ms": self._stats(self.serve_latency_samples),
+            }
+
+
+class _Entry:
+    """Closed bars of one (instrument, period): concatenated JSON fragments + offsets."""
+
+    __slots__ = (
+        "instrument_id", "provider_symbol", "timeframe", "open_times", "offsets", "body", "built_at",
+    )
+
+    def __init__(self, instrument_id: int, provider_symbol: str, timeframe: str, built_at: float):
+        self.instrument_id = instrument_id
+        self.provider_symbol = provider_symbol
+        self.timeframe = timeframe
+        self.open_times: List[datetime] = []
+        self.offsets: List[int] = [0]  # offsets[i] = start of bar i; offsets[-1] = len(body)
+        self.body = bytearray()
+        self.built_at = built_at
+
+    @property
+    def last_closed(self) -> Optional[datetime]:
+        return self.open_times[-1] if self.open_times else None
+
+    def append(self, open_time: datetime, fragment: bytes) -> None:
+        self.open_times.append(open_time)
+        self.body += fragment
+        self.body += b","
+        self.offsets.append(len(self.body))
+
+    def compact(self, first: int) -> None:
+        """Drop bars [0, first) that slid out of the window."""
+        cut = self.offsets[first]
+        del self.body[:cut]
+        del self.open_times[:first]
+        self.offsets = [o - cut for o in self.offsets[first:]]
+
+
+class ChartHistoryResponse(NamedTuple):
+    """body is None when If-None-Match matched (304)."""
+    body: Optional[bytes]
+    etag: str
+    cache_hit: bool
+
+
+def _utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+class ChartHistoryCache:
+    def __init__(self, ttl_sec: float = MARKET_DATA_CHART_CACHE_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        self.metrics = ChartCacheMetrics()
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[int, str], _Entry] = {}
+        self._symbols: Dict[str, Tuple[int, str, float]] = {}
+
+    # --- instrument resolution -------------------------------------------------------
+
+    def _resolve(
+        self, session: Session, symbol: Optional[str], instrument_id: Optional[int]
+    ) -> Optional[Tuple[int, str]]:
+        now = time.monotonic()
+        key = symbol.strip().upper() if symbol else f"#{instrument_id}"
+        with self._lock:
+            cached = self._symbols.get(key)
+        if cached is not None and now - cached[2] < self.ttl_sec:
+            return cached[0], cached[1]
+        query = session.query(MarketDataInstrument.id, MarketDataInstrument.provider_symbol)
+        if symbol:
+            row = query.filter(MarketDataInstrument.provider_symbol == key).first()
+        else:
+            row = query.filter(MarketDataInstrument.id == instrument_id).first()
+        if row is None:
+            return None
+        resolved = (row[0], row[1] or (key if symbol else ""))
+        with self._lock:
+            self._symbols[key] = (resolved[0], resolved[1], now)
+        return resolved
+
+    # --- bars ------------------------------------------------------------------------
+
+    @staticmethod
+    def _query_bars(
+        session: Session, timeframe: str, instrument_id: int, after: datetime, end: datetime, limit: int,
+        inclusive: bool,
+    ) -> List[Tuple[Any, ...]]:
+        model = CHART_MODELS[timeframe]
+        lower = model.open_time >= after if inclusive else model.open_time > after
+        return (
+            session.query(model.open_time, model.open, model.high, model.low, model.close, model.volume)
+            .filter(model.instrument_id == instrument_id, lower, model.open_time <= end)
+            .order_by(model.open_time)
+            .limit(limit)
+            .all()
+        )
+
+    def _build(
+        self, session: Session, instrument_id: int, provider_symbol: str, timeframe: str,
+        start_time: datetime, end_time: datetime, limit: int,
+    ) -> Tuple[_Entry, List[Tuple[Any, ...]]]:
+        """New entry with the closed bars of the window; returns (entry, open bars)."""
+        step = TIMEFRAME_STEPS[timeframe]
+        entry = _Entry(instrument_id, provider_symbol, timeframe, time.monotonic())
+        open_rows = []
+        for row in self._query_bars(session, timeframe, instrument_id, start_time, end_time, limit, True):
+            ot = _utc(row[0])
+            if ot + step <= end_time and not open_rows:
+                entry.append(ot, encode_bar(instrument_id, provider_symbol, row))
+            else:
+                open_rows.append(row)
+        return entry, open_rows
+
+    # --- public API ------------------------------------------------------------------
+
+    def get(
+        self,
+        session: Session,
+        *,
+        symbol: Optional[str] = None,
+        instrument_id: Optional[int] = None,
+        period: str,
+        if_none_match: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Optional[ChartHistoryResponse]:
+        """
+        Chart history JSON for (symbol | instrument_id, period), same payload as
+        chart_history_service.get_chart_history. Returns None if the instrument or period is unknown.
+        """
+        started = time.perf_counter()
+        rule = get_chart_period_rule(period)
+        if not rule or rule.timeframe not in CHART_MODELS:
+            return None
+        resolved = self._resolve(session, symbol, instrument_id)
+        if resolved is None:
+            return None
+        resolved_id, provider_symbol = resolved
+        end_time = now or datetime.now(timezone.utc)
+        start_time = end_time - rule.lookback
+        step = TIMEFRAME_STEPS[rule.timeframe]
+        key = (resolved_id, period)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                time.monotonic() - entry.built_at > self.ttl_sec or entry.provider_symbol != provider_symbol
+            ):
+                del self._entries[key]
+                entry = None
+                self.metrics.inc("expired")
+
+        hit = entry is not None
+        if entry is None:
+            entry, open_rows = self._build(
+                session, resolved_id, provider_symbol, rule.timeframe, start_time, end_time, rule.limit
+            )
+            with self._lock:
+                self._entries[key] = entry
+        else:
+            after = entry.last_closed or start_time
+            tail = self._query_bars(
+                session, rule.timeframe, resolved_id, after, end_time, rule.limit, entry.last_closed is None
+            )
+            open_rows = []
+            appended = 0
+            with self._lock:
+                for row in tail:
+                    ot = _utc(row[0])
+                    if entry.last_closed is not None and ot <= entry.last_closed:
+                        continue  # appended meanwhile by a concurrent request
+                    if ot + step <= end_time and not open_rows:
+                        entry.append(ot, encode_bar(resolved_id, provider_symbol, row))
+                        appended += 1
+                    else:
+                        open_rows.append(row)
+            if appended:
+                self.metrics.inc("bars_appended", appended)
+
+        with self._lock:
+            first = bisect.bisect_left(entry.open_times, start_time)
+            last = min(len(entry.open_times), first + rule.limit)
+            prefix = bytes(entry.body[entry.offsets[first]:entry.offsets[last]])
+            if first >= _COMPACT_MIN_DROPPED and first * 2 >= len(entry.open_times):
+                entry.compact(first)
+        room = rule.limit - (last - first)
+        fragments = [encode_bar(resolved_id, provider_symbol, row) for row in open_rows[:max(0, room)]]
+        if fragments:
+            candles = prefix + b",".join(fragments)
+        else:
+            candles = prefix[:-1]  # trailing comma of the last prefix bar (or empty)
+
+        etag = f'W/"{zlib.crc32(candles):08x}-{len(candles):x}"'
+        if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+            self.metrics.record(hit, (time.perf_counter() - started) * 1000.0, not_modified=True)
+            return ChartHistoryResponse(None, etag, hit)
+
+        header = _encode({
+            "symbol": provider_symbol,
+            "period": period,
+            "timeframe": rule.timeframe,
+            "start_time": start_time.isoformat(),
+            "end_time": end_time.isoformat(),
+        })
+        body = header[:-1] + b',"candles":[' + candles + b"]}"
+        self.metrics.record(hit, (time.perf_counter() - started) * 1000.0)
+        return ChartHistoryResponse(body, etag, hit)
+
+    def invalidate(self, timeframe: str, instrument_id: int, min_open_time: Optional[datetime] = None) -> int:
+        """
+        Drop the entries of this instrument/timeframe whose closed prefix reaches min_open_time
+        (all of them when None). Returns the number of entries dropped.
+        """
+        if min_open_time is not None:
+            min_open_time = _utc(min_open_time)
+        dropped = 0
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if k[0] == instrument_id and e.timeframe == timeframe]:
+                entry = self._entries[key]
+                if min_open_time is None or (entry.last_closed is not None and min_open_time <= entry.last_closed):
+                    del self._entries[key]
+                    dropped += 1
+        if dropped:
+            self.metrics.inc("invalidations", dropped)
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._symbols.clear()
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self.metrics.snapshot(entries=self.size())
+
+    # --- invalidation messages ---------------------------------------------------------
+
+    def apply_message(self, message: str) -> None:
+        for timeframe, instrument_id, min_ms in decode_invalidations(message):
+            min_open = datetime.fromtimestamp(min_ms / 1000.0, tz=timezone.utc) if min_ms is not None else None
+            self.invalidate(timeframe, instrument_id, min_open)
+
+
+def encode_invalidations(written: Dict[Tuple[str, int], Optional[datetime]]) -> Optional[str]:
+    """{"v": 1, "w": [[timeframe, instrument_id, min_open_time_ms | null], ...]}"""
+    items = []
+    for (timeframe, instrument_id), min_open in sorted(written.items(), key=lambda kv: (kv[0][0], kv[0][1])):
+        items.append([timeframe, instrument_id, int(_utc(min_open).timestamp() * 1000) if min_open else None])
+    if not items:
+        return None
+    return json.dumps({"v": MESSAGE_VERSION, "w": items}, separators=(",", ":"))
+
+
+def decode_invalidations(message: str) -> List[Tuple[str, int, Optional[int]]]:
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(data, dict) or data.get("v") != MESSAGE_VERSION:
+        return []
+    out = []
+    for item in data.get("w") or []:
+        try:
+            timeframe, instrument_id, min_ms = item
+            out.append((str(timeframe), int(instrument_id), int(min_ms) if min_ms is not None else None))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+_cache = ChartHistoryCache()
+_bus = FallbackQuoteBus(MARKET_DATA_CHART_CACHE_CHANNEL, name="Chart cache invalidation bus")
+_bus_lock = threading.Lock()
+_listener_started = False
+
+
+def get_chart_history_cache() -> ChartHistoryCache:
+    return _cache
+
+
+def _get_invalidation_bus() -> FallbackQuoteBus:
+    return _bus
+
+
+def publish_bars_written(written: Dict[Tuple[str, int], Optional[datetime]]) -> None:
+    """Apply to the local cache and broadcast to the other processes. Fail-safe."""
+    for (timeframe, instrument_id), min_open in written.items():
+        _cache.invalidate(timeframe, instrument_id, min_open)
+    if not MARKET_DATA_CHART_CACHE_ENABLED:
+        return
+    try:
+        message = encode_invalidations(written)
+        if message is not None:
+            _get_invalidation_bus().publish(message)
+    except Exception:
+        logger.warning("Chart cache invalidation publish failed", exc_info=True)
+
+
+def note_bars_written(session: Any, timeframe: str, instrument_id: int, open_times: Iterable[datetime]) -> None:
+    """
+    Writer side (bulk_insert_bars): remember what was written; published after commit.
+    Objects without a session .info dict (test doubles) only invalidate the local cache.
+    """
+    if timeframe not in CHART_MODELS:
+        return
+    min_open = min(open_times, default=None)
+    info = getattr(session, "info", None)
+    if not isinstance(info, dict):
+        _cache.invalidate(timeframe, instrument_id, min_open)
+        return
+    written = info.setdefault(_SESSION_INFO_KEY, {})
+    key = (timeframe, instrument_id)
+    if key not in written:
+        written[key] = min_open
+    elif written[key] is not None and (min_open is None or min_open < written[key]):
+        written[key] = min_open
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    written = session.info.pop(_SESSION_INFO_KEY, None)
+    if written:
+        publish_bars_written(written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_SESSION_INFO_KEY, None)
+
+
+def start_chart_cache_listener() -> bool:
+    """API side: drop cached entries on invalidations published by other processes (idempotent)."""
+    global _listener_started
+    if not MARKET_DATA_CHART_CACHE_ENABLED:
+        return False
+    bus = _get_invalidation_bus()
+    with _bus_lock:
+        if _listener_started:
+            return True
+        bus.subscribe(_cache.apply_message)
+        _listener_started = True
+        return True
@@ -34,6 +34,16 @@ CHART_PERIOD_RULES: dict[str, ChartPeriodRule] = {
 }
 
 
+# Candle duration per timeframe (a bar is closed once open_time + step <= now).
+TIMEFRAME_STEPS: dict[str, timedelta] = {
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "4h": timedelta(hours=4),
+    "1d": timedelta(days=1),
+    "1w": timedelta(weeks=1),
+}
+
+
 def get_chart_period_rule(period: str) -> Optional[ChartPeriodRule]:
     """Return the rule for a given UI period, or None if invalid."""
     return CHART_PERIOD_RULES.get(period)
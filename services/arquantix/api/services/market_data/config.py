@@ -28,7 +28,36 @@ BINANCE_WS_INGESTION_COMMIT_INTERVAL_SEC = float(os.getenv("BINANCE_WS_INGESTION
 BINANCE_WS_RECONNECT_BASE_DELAY_SEC = float(os.getenv("BINANCE_WS_RECONNECT_BASE_DELAY_SEC", "1.0") or "1.0")
 BINANCE_WS_RECONNECT_MAX_DELAY_SEC = float(os.getenv("BINANCE_WS_RECONNECT_MAX_DELAY_SEC", "60.0") or "60.0")
 
+# Backfill concurrent (candles_backfill_concurrent) : budget de poids REST par minute partagé par
+# les workers. La limite Binance est de 6000/min par IP ; on en laisse une part aux autres jobs.
+BINANCE_REQUEST_WEIGHT_LIMIT_1M = int(os.getenv("BINANCE_REQUEST_WEIGHT_LIMIT_1M", "6000") or "6000")
+BINANCE_BACKFILL_WEIGHT_BUDGET_1M = int(os.getenv("BINANCE_BACKFILL_WEIGHT_BUDGET_1M", "3000") or "3000")
+BINANCE_BACKFILL_WORKERS = int(os.getenv("BINANCE_BACKFILL_WORKERS", "4") or "4")
 
 
 
 
+
+
+# Quote bus (Redis pub/sub) : l'ingester WS publie les deltas bookTicker, les process API
+# tiennent une table en mémoire alimentée par ce canal (lecture hot path sans aller-retour DB).
+MARKET_DATA_QUOTE_BUS_ENABLED = (os.getenv("MARKET_DATA_QUOTE_BUS_ENABLED", "true").lower() in ("true", "1", "yes"))
+MARKET_DATA_QUOTE_BUS_CHANNEL = os.getenv("MARKET_DATA_QUOTE_BUS_CHANNEL", "market_data:quotes") or "market_data:quotes"
+MARKET_DATA_QUOTE_BUS_MAX_AGE_SEC = float(os.getenv("MARKET_DATA_QUOTE_BUS_MAX_AGE_SEC", "10") or "10")
+
+# Rollup 1h/4h/1d/1w depuis les barres 5m (candles_rollup) : quand actif, le refresh (cron / backfill-lag)
+# ne télécharge plus que les 5m chez Binance et dérive les timeframes supérieurs.
+MARKET_DATA_ROLLUP_ENABLED = (os.getenv("MARKET_DATA_ROLLUP_ENABLED", "false").lower() in ("true", "1", "yes"))
+
+# Cache chart-history (chart_history_cache) : préfixe de barres clôturées pré-encodé en JSON par
+# (instrument, période), invalidé par les écritures de barres (pub/sub Redis), TTL en filet de sécurité.
+MARKET_DATA_CHART_CACHE_ENABLED = (os.getenv("MARKET_DATA_CHART_CACHE_ENABLED", "true").lower() in ("true", "1", "yes"))
+MARKET_DATA_CHART_CACHE_TTL_SEC = float(os.getenv("MARKET_DATA_CHART_CACHE_TTL_SEC", "300") or "300")
+MARKET_DATA_CHART_CACHE_ETAG = (os.getenv("MARKET_DATA_CHART_CACHE_ETAG", "true").lower() in ("true", "1", "yes"))
+MARKET_DATA_CHART_CACHE_CHANNEL = (
+    os.getenv("MARKET_DATA_CHART_CACHE_CHANNEL", "market_data:chart_invalidations") or "market_data:chart_invalidations"
+)
+
+# PriceSnapshot (price_snapshot) : cache process à TTL court derrière les snapshots de prix / FX des
+# endpoints en lecture seule (0 = désactivé). Les trades exchange rechargent toujours un snapshot frais.
+MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC = float(os.getenv("MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC", "2") or "2")
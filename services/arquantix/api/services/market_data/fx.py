@@ -8,12 +8,15 @@ from __future__ import annotations
 import logging
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy.orm import Session
 
 from database import MarketDataInstrument, MarketDataLatestQuote
 
+if TYPE_CHECKING:
+    from services.market_data.price_snapshot import PriceSnapshot
+
 logger = logging.getLogger(__name__)
 
 EURUSDT_PROVIDER_SYMBOL = "EURUSDT"
@@ -21,7 +24,9 @@ DEFAULT_EURUSDT_RATE = Decimal("1.08")
 MAX_FX_QUOTE_AGE_SECONDS = 300
 
 
-def get_eurusdt_rate(db: Session, *, strict: bool = False) -> Decimal:
+def get_eurusdt_rate(
+    db: Session, *, strict: bool = False, snapshot: Optional["PriceSnapshot"] = None
+) -> Decimal:
     """Return the current EUR/USDT exchange rate.
 
     When strict=True (e.g. for exchange trades), raises if the quote is
@@ -29,7 +34,12 @@ def get_eurusdt_rate(db: Session, *, strict: bool = False) -> Decimal:
 
     When strict=False (e.g. for display/valuation), falls back to
     DEFAULT_EURUSDT_RATE if unavailable.
+
+    With a PriceSnapshot, the rate is read from it (no query).
     """
+    if snapshot is not None:
+        return snapshot.eurusdt_rate(strict=strict)
+
     quote = (
         db.query(MarketDataLatestQuote)
         .join(MarketDataInstrument, MarketDataLatestQuote.instrument_id == MarketDataInstrument.id)
@@ -9,7 +9,7 @@ from sqlalchemy.orm import Session
 
 from database import MarketDataInstrument
 from services.market_data.binance_client import fetch_klines_1m
-from services.market_data.bars_1m_repo import upsert_bar_1m
+from services.market_data.bars_1m_repo import upsert_bars_1m
 
 logger = logging.getLogger(__name__)
 
@@ -55,19 +55,13 @@ def run_one_cycle(session: Session, limit_per_symbol: int = DEFAULT_KLINES_LIMIT
             if not candles:
                 failures.append(f"{provider_symbol}: no klines from Binance")
                 continue
-            for c in candles:
-                upsert_bar_1m(
-                    session,
-                    instrument_id=instrument_id,
-                    open_time=c["open_time"],
-                    open=c["open"],
-                    high=c["high"],
-                    low=c["low"],
-                    close=c["close"],
-                    volume=c["volume"],
-                    source=PROVIDER,
-                )
-                total_upserted += 1
+            result = upsert_bars_1m(
+                session,
+                instrument_id=instrument_id,
+                candles=candles,
+                source=PROVIDER,
+            )
+            total_upserted += result.total
         except Exception as e:
             msg = f"{provider_symbol}: {e!s}"
             failures.append(msg)
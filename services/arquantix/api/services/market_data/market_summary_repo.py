@@ -1,17 +1,24 @@
 """
 Market summary: derived data from latest quotes + 5m candles (24h window).
+Prices fresh in the quote bus table (services.market_data.quote_bus) take precedence over the DB row.
 When live_fallback_binance_sec is set, may fetch from Binance REST and commit
 for instruments with provider=binance if the quote is missing or stale.
+
+Set-based: one range query over market_data_bars_5m for all requested instruments, grouped
+and reduced with NumPy (reference close, volume, optional sparkline downsampling); stale
+Binance quotes are fetched concurrently and written with one bulk upsert + one commit.
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 from sqlalchemy.orm import Session
 
-from database import MarketDataInstrument
-from services.market_data.quotes_repo import get_latest_quotes_by_instrument_ids, upsert_latest_quote
-from services.market_data.bars_5m_repo import get_bars_5m
+from database import MarketDataBar5m, MarketDataInstrument
+from services.market_data.quote_bus import get_latest_quote_table
+from services.market_data.quotes_repo import bulk_upsert_latest_quotes, get_latest_quotes_by_instrument_ids
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +28,8 @@ WINDOW_24H_HOURS = 24
 MAX_5M_BARS_24H = 300
 # Default: consider quote stale after this many seconds (Binance REST fallback)
 LIVE_FALLBACK_STALE_SEC = 60
+# Concurrent Binance REST calls when refreshing stale quotes
+LIVE_FALLBACK_MAX_WORKERS = 8
 
 
 def _resolve_instruments(
@@ -78,6 +87,7 @@ def refresh_binance_quotes_for_provider_symbols(
     quotes = get_latest_quotes_by_instrument_ids(session, ids)
     quote_by_id = {q.instrument_id: q for q in quotes}
     now_utc = datetime.now(timezone.utc)
+    targets = []
     for instrument_id, provider_symbol, provider in instruments:
         if provider != "binance" or not provider_symbol:
             continue
@@ -87,7 +97,8 @@ def refresh_binance_quotes_for_provider_symbols(
                 utc_updated = q.updated_at if q.updated_at.tzinfo else q.updated_at.replace(tzinfo=timezone.utc)
                 if (now_utc - utc_updated).total_seconds() < max_age_sec:
                     continue
-        _fetch_binance_and_upsert(session, instrument_id, provider_symbol)
+        targets.append((instrument_id, provider_symbol))
+    _fetch_binance_and_upsert_many(session, targets)
 
 
 def _quote_is_stale(quote, now_utc: datetime, max_age_sec: int) -> bool:
@@ -109,40 +120,123 @@ def _price_from_quote(quote) -> Optional[float]:
         return 0.0
 
 
-def _fetch_binance_and_upsert(
+def _fetch_ticker_safe(provider_symbol: str) -> Optional[Dict[str, Any]]:
+    try:
+        from services.market_data.binance_client import fetch_ticker
+        return fetch_ticker(provider_symbol)
+    except Exception as e:
+        logger.warning("Binance live fallback failed for %s: %s", provider_symbol, e)
+        return None
+
+
+def _fetch_binance_and_upsert_many(
     session: Session,
-    instrument_id: int,
-    provider_symbol: str,
-) -> Optional[float]:
+    targets: Sequence[Tuple[int, str]],
+) -> Dict[int, float]:
     """
-    Fetch latest price from Binance REST, upsert into market_data_latest_quotes, commit.
-    Returns last_price or None on failure.
+    Fetch latest prices from Binance REST concurrently (at most LIVE_FALLBACK_MAX_WORKERS
+    calls in flight), upsert them into market_data_latest_quotes in one statement, commit.
+    Returns {instrument_id: last_price} for the tickers fetched successfully.
     """
-    try:
-        from services.market_data.binance_client import fetch_ticker
-        quote = fetch_ticker(provider_symbol)
+    if not targets:
+        return {}
+    workers = max(1, min(LIVE_FALLBACK_MAX_WORKERS, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="binance-ticker") as pool:
+        tickers = list(pool.map(_fetch_ticker_safe, [sym for _, sym in targets]))
+    rows = []
+    prices: Dict[int, float] = {}
+    for (instrument_id, provider_symbol), quote in zip(targets, tickers):
         if not quote:
-            return None
-        upsert_latest_quote(
-            session,
-            instrument_id=instrument_id,
-            provider="binance",
-            provider_symbol=quote.get("provider_symbol") or provider_symbol,
-            last_price=quote["last_price"],
-            bid_price=quote.get("bid_price"),
-            ask_price=quote.get("ask_price"),
-            volume=quote.get("volume"),
-            quote_time=quote.get("quote_time"),
-        )
+            continue
+        rows.append({
+            "instrument_id": instrument_id,
+            "provider": "binance",
+            "provider_symbol": quote.get("provider_symbol") or provider_symbol,
+            "last_price": quote["last_price"],
+            "bid_price": quote.get("bid_price"),
+            "ask_price": quote.get("ask_price"),
+            "volume": quote.get("volume"),
+            "quote_time": quote.get("quote_time"),
+        })
+        prices[instrument_id] = float(quote["last_price"])
+    if not rows:
+        return {}
+    try:
+        bulk_upsert_latest_quotes(session, rows)
         session.commit()
-        return float(quote["last_price"])
     except Exception as e:
-        logger.warning("Binance live fallback failed for %s: %s", provider_symbol, e)
+        logger.warning("Binance live fallback upsert failed for %d quote(s): %s", len(rows), e)
         try:
             session.rollback()
         except Exception:
             pass
-        return None
+    # Prices are returned even if the write failed: they are live values.
+    return prices
+
+
+def downsample_sparkline(closes: np.ndarray, max_points: Optional[int]) -> np.ndarray:
+    """
+    Evenly spaced subset of closes (first and last kept). Unchanged when max_points is None
+    or when the series is already short enough.
+    """
+    n = closes.shape[0]
+    if max_points is None or n <= max_points:
+        return closes
+    if max_points < 2:
+        return closes[-1:]
+    idx = np.linspace(0, n - 1, max_points).round().astype(np.int64)
+    return closes[idx]
+
+
+def compute_24h_stats(
+    instrument_ids: np.ndarray,
+    closes: np.ndarray,
+    volumes: np.ndarray,
+    max_bars: int = MAX_5M_BARS_24H,
+    sparkline_points: Optional[int] = None,
+) -> Dict[int, Tuple[float, float, List[float]]]:
+    """
+    Per-instrument (reference_close, volume_24h, sparkline) from bar columns sorted by
+    (instrument_id, open_time). At most max_bars earliest bars are used per instrument
+    (same as the former per-instrument get_bars_5m(limit=max_bars) query).
+    """
+    if instrument_ids.shape[0] == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, instrument_ids[1:] != instrument_ids[:-1]])
+    ends = np.r_[starts[1:], instrument_ids.shape[0]]
+    ends = np.minimum(ends, starts + max_bars)
+    out: Dict[int, Tuple[float, float, List[float]]] = {}
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        spark = downsample_sparkline(closes[s:e], sparkline_points)
+        out[int(instrument_ids[s])] = (float(closes[s]), float(volumes[s:e].sum()), spark.tolist())
+    return out
+
+
+def _load_24h_bars(
+    session: Session,
+    instrument_ids: Sequence[int],
+    start_time: datetime,
+    end_time: datetime,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """One range query over market_data_bars_5m for all instruments -> (ids, closes, volumes) arrays."""
+    if not instrument_ids:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty, empty
+    rows = (
+        session.query(MarketDataBar5m.instrument_id, MarketDataBar5m.close, MarketDataBar5m.volume)
+        .filter(
+            MarketDataBar5m.instrument_id.in_(list(instrument_ids)),
+            MarketDataBar5m.open_time >= start_time,
+            MarketDataBar5m.open_time <= end_time,
+        )
+        .order_by(MarketDataBar5m.instrument_id, MarketDataBar5m.open_time)
+        .all()
+    )
+    n = len(rows)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    closes = np.fromiter((float(r[1]) for r in rows), dtype=np.float64, count=n)
+    volumes = np.fromiter((float(r[2]) for r in rows), dtype=np.float64, count=n)
+    return ids, closes, volumes
 
 
 def get_market_summaries(
@@ -151,14 +245,17 @@ def get_market_summaries(
     provider_symbols: Optional[List[str]] = None,
     live_fallback_binance_sec: Optional[int] = LIVE_FALLBACK_STALE_SEC,
     include_eur: bool = False,
+    sparkline_points: Optional[int] = None,
 ) -> List[dict]:
     """
     Compute market summary per instrument: price, 24h change (abs/pct), volume_24h, sparkline_24h.
     Uses latest quote + 5m candles over last 24h. Instruments without a latest quote are skipped.
 
     When live_fallback_binance_sec is set (default 60), for provider=binance instruments with
-    no quote or quote older than that many seconds, fetches from Binance REST and upserts to DB
-    so the returned price is up to date even when the WebSocket worker is not running.
+    no quote or quote older than that many seconds, fetches from Binance REST (concurrently) and
+    upserts to DB so the returned price is up to date even when the WebSocket worker is not running.
+
+    sparkline_points: downsample sparkline_24h to at most this many closes (None = every 5m close).
     """
     if not instrument_ids and not provider_symbols:
         return []
@@ -167,10 +264,11 @@ def get_market_summaries(
         return []
 
     ids = [iid for iid, _, _ in instruments]
-    id_to_symbol = {iid: sym for iid, sym, _ in instruments}
 
     quotes = get_latest_quotes_by_instrument_ids(session, ids)
     quote_by_id = {q.instrument_id: q for q in quotes}
+    # Fresh bookTicker prices from the quote bus (no REST fallback needed for those).
+    bus_quotes = get_latest_quote_table().get_fresh([sym for _, sym, _ in instruments if sym])
 
     eurusdt_rate = None
     if include_eur:
@@ -180,24 +278,34 @@ def get_market_summaries(
     now_utc = datetime.now(timezone.utc)
     start_24h = now_utc - timedelta(hours=WINDOW_24H_HOURS)
 
-    summaries = []
+    prices: Dict[int, Optional[float]] = {}
+    fallback_targets: List[Tuple[int, str]] = []
     for instrument_id, provider_symbol, provider in instruments:
         quote = quote_by_id.get(instrument_id)
         price = _price_from_quote(quote)
-
+        bus_quote = bus_quotes.get(provider_symbol.upper()) if provider_symbol else None
+        if bus_quote is not None:
+            price = bus_quote.last_price
+        prices[instrument_id] = price
         needs_binance_fallback = (
-            live_fallback_binance_sec is not None
+            bus_quote is None
+            and live_fallback_binance_sec is not None
             and provider == "binance"
             and provider_symbol
             and (price is None or _quote_is_stale(quote, now_utc, live_fallback_binance_sec))
         )
         if needs_binance_fallback:
-            live_price = _fetch_binance_and_upsert(session, instrument_id, provider_symbol)
-            if live_price is not None:
-                price = live_price
-            elif price is None:
-                price = _price_from_quote(quote_by_id.get(instrument_id))
+            fallback_targets.append((instrument_id, provider_symbol))
+    prices.update(_fetch_binance_and_upsert_many(session, fallback_targets))
 
+    bar_ids, closes, volumes = _load_24h_bars(
+        session, [iid for iid in ids if prices.get(iid) is not None], start_24h, now_utc
+    )
+    stats = compute_24h_stats(bar_ids, closes, volumes, sparkline_points=sparkline_points)
+
+    summaries = []
+    for instrument_id, provider_symbol, _ in instruments:
+        price = prices.get(instrument_id)
         if price is None:
             continue
 
@@ -205,15 +313,8 @@ def get_market_summaries(
         if eurusdt_rate and eurusdt_rate > 0:
             price_eur = price / eurusdt_rate
 
-        bars = get_bars_5m(
-            session,
-            instrument_id,
-            start_time=start_24h,
-            end_time=now_utc,
-            limit=MAX_5M_BARS_24H,
-        )
-
-        if not bars:
+        instrument_stats = stats.get(instrument_id)
+        if instrument_stats is None:
             entry = {
                 "instrument_id": instrument_id,
                 "symbol": provider_symbol,
@@ -228,9 +329,7 @@ def get_market_summaries(
             summaries.append(entry)
             continue
 
-        reference_price = float(bars[0].close)
-        volume_24h = sum(float(b.volume) for b in bars)
-        sparkline_24h = [float(b.close) for b in bars]
+        reference_price, volume_24h, sparkline_24h = instrument_stats
 
         if reference_price == 0:
             change_24h_abs = None
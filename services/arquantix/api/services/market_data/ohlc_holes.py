@@ -4,7 +4,7 @@ Un trou = absence de barre attendue entre deux barres consécutives.
 Analyse aussi le retard entre la dernière barre en base et la datetime courante (UTC).
 """
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
@@ -86,6 +86,20 @@ def _missing_bars_to_now(last_ot: Any, step: timedelta) -> int:
     return int(delta.total_seconds() / step.total_seconds())
 
 
+def find_holes(open_times: List[Any], step: timedelta) -> List[Tuple[Any, Any]]:
+    """Trous entre barres consécutives (open_times triés) : liste de (premier open_time manquant,
+    open_time de la barre suivante présente). Partagé avec le rollup des bougies (candles_rollup)."""
+    holes: List[Tuple[Any, Any]] = []
+    tolerance = timedelta(seconds=1)
+    for i in range(len(open_times) - 1):
+        prev = open_times[i]
+        next_ot = open_times[i + 1]
+        expected_next = prev + step
+        if next_ot > expected_next + tolerance:
+            holes.append((expected_next, next_ot))
+    return holes
+
+
 def compute_holes_for_period(
     session: Session,
     instrument_id: int,
@@ -151,18 +165,10 @@ def compute_holes_for_period(
     start_iso = open_times[0].isoformat()
     end_iso = open_times[-1].isoformat()
     expected = _expected_bar_count(open_times[0], open_times[-1], step)
-    holes: List[Dict[str, str]] = []
-    tolerance = timedelta(seconds=1)
-
-    for i in range(len(open_times) - 1):
-        prev = open_times[i]
-        next_ot = open_times[i + 1]
-        expected_next = prev + step
-        if next_ot > expected_next + tolerance:
-            holes.append({
-                "start": expected_next.isoformat(),
-                "end": next_ot.isoformat(),
-            })
+    holes: List[Dict[str, str]] = [
+        {"start": start.isoformat(), "end": end.isoformat()}
+        for start, end in find_holes(open_times, step)
+    ]
 
     if bar_count == expected and len(holes) == 0:
         consistency_note = "Cohérent"
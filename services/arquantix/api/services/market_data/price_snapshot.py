@@ -0,0 +1,187 @@
+"""Request-scoped price and FX snapshot.
+
+A PriceSnapshot is an immutable view of market_data_latest_quotes for a set of
+provider symbols plus EURUSDT, loaded with a single query at the start of a
+request or job and passed down to every pricing call site (valuation, exchange,
+drift, wallet statistics) instead of each one querying the same quotes again.
+
+Quote ages are measured once, at load time (``taken_at``): every consumer of a
+snapshot sees the same prices and the same freshness verdict.
+
+``get_cached_price_snapshot`` keeps the last snapshot in process for
+MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC — for read-only endpoints only. Trades load
+their own snapshot (``load_price_snapshot``) right after refreshing quotes.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+from sqlalchemy.orm import Session
+
+from database import MarketDataInstrument, MarketDataLatestQuote
+from services.exchange.assets import ASSET_PROVIDER_SYMBOL_MAP
+from services.market_data.config import MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC
+from services.market_data.fx import (
+    DEFAULT_EURUSDT_RATE,
+    EURUSDT_PROVIDER_SYMBOL,
+    MAX_FX_QUOTE_AGE_SECONDS,
+    FxQuoteStaleError,
+    FxQuoteUnavailableError,
+    usdt_to_eur,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def asset_provider_symbol(asset: str) -> str:
+    """Provider symbol used to price *asset* (``<ASSET>USDT`` when not mapped)."""
+    return ASSET_PROVIDER_SYMBOL_MAP.get(asset, f"{asset.upper()}USDT")
+
+
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    if ts is None:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _dec_or_none(v) -> Optional[Decimal]:
+    return Decimal(str(v)) if v is not None else None
+
+
+@dataclass(frozen=True)
+class SnapshotQuote:
+    provider_symbol: str
+    instrument_id: int
+    last_price: Optional[Decimal]
+    bid_price: Optional[Decimal]
+    ask_price: Optional[Decimal]
+    quote_time: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class PriceSnapshot:
+    taken_at: datetime
+    quotes: Mapping[str, SnapshotQuote]
+    # Symbols the snapshot was loaded for, including those without a quote.
+    symbols: frozenset[str] = field(default_factory=frozenset)
+
+    def covers(self, provider_symbols: Iterable[str]) -> bool:
+        return all(s in self.symbols for s in provider_symbols)
+
+    def quote(self, provider_symbol: str) -> Optional[SnapshotQuote]:
+        return self.quotes.get(provider_symbol)
+
+    def instrument_id(self, provider_symbol: str) -> Optional[int]:
+        q = self.quotes.get(provider_symbol)
+        return q.instrument_id if q else None
+
+    def price_usdt(self, provider_symbol: str) -> Optional[Decimal]:
+        q = self.quotes.get(provider_symbol)
+        return q.last_price if q else None
+
+    def quote_age_seconds(self, provider_symbol: str) -> Optional[float]:
+        """Age of the quote (quote_time) at ``taken_at``; None if unknown."""
+        q = self.quotes.get(provider_symbol)
+        if q is None or q.quote_time is None:
+            return None
+        return (self.taken_at - q.quote_time).total_seconds()
+
+    def eurusdt_rate(self, *, strict: bool = False) -> Decimal:
+        """Same contract as ``fx.get_eurusdt_rate``, evaluated at ``taken_at``."""
+        q = self.quotes.get(EURUSDT_PROVIDER_SYMBOL)
+        if q is None or q.last_price is None:
+            if strict:
+                raise FxQuoteUnavailableError("eurusdt_quote_not_found")
+            logger.warning("EURUSDT quote not found, using default rate %s", DEFAULT_EURUSDT_RATE)
+            return DEFAULT_EURUSDT_RATE
+
+        rate = q.last_price
+        if rate <= 0:
+            if strict:
+                raise FxQuoteUnavailableError("eurusdt_rate_is_zero")
+            return DEFAULT_EURUSDT_RATE
+
+        if strict and q.updated_at:
+            age = (self.taken_at - q.updated_at).total_seconds()
+            if age > MAX_FX_QUOTE_AGE_SECONDS:
+                raise FxQuoteStaleError(
+                    f"eurusdt_quote_stale: age={int(age)}s, max={MAX_FX_QUOTE_AGE_SECONDS}s"
+                )
+        return rate
+
+    def price_eur(self, asset: str) -> Optional[Decimal]:
+        """Last price of 1 unit of *asset* in EUR (display / valuation, non-strict FX)."""
+        price = self.price_usdt(asset_provider_symbol(asset))
+        if price is None:
+            return None
+        return usdt_to_eur(price, self.eurusdt_rate(strict=False))
+
+
+def load_price_snapshot(db: Session, provider_symbols: Iterable[str] = ()) -> PriceSnapshot:
+    """Load the latest quotes of *provider_symbols* plus EURUSDT in one query."""
+    symbols = frozenset(s for s in provider_symbols if s) | {EURUSDT_PROVIDER_SYMBOL}
+    rows = (
+        db.query(MarketDataInstrument.provider_symbol, MarketDataLatestQuote)
+        .join(MarketDataLatestQuote, MarketDataLatestQuote.instrument_id == MarketDataInstrument.id)
+        .filter(MarketDataInstrument.provider_symbol.in_(sorted(symbols)))
+        .all()
+    )
+    quotes: dict[str, SnapshotQuote] = {}
+    for provider_symbol, quote in rows:
+        # provider_symbol is not unique on instruments: first match wins, like .first()
+        if provider_symbol in quotes:
+            continue
+        quotes[provider_symbol] = SnapshotQuote(
+            provider_symbol=provider_symbol,
+            instrument_id=quote.instrument_id,
+            last_price=_dec_or_none(quote.last_price),
+            bid_price=_dec_or_none(quote.bid_price),
+            ask_price=_dec_or_none(quote.ask_price),
+            quote_time=_utc(quote.quote_time),
+            updated_at=_utc(quote.updated_at),
+        )
+    return PriceSnapshot(
+        taken_at=datetime.now(timezone.utc),
+        quotes=MappingProxyType(quotes),
+        symbols=symbols,
+    )
+
+
+# ── Process cache (read-only endpoints) ────────────────────────────
+
+_cache_lock = threading.Lock()
+_cached: Optional[PriceSnapshot] = None
+_cached_at = 0.0
+
+
+def get_cached_price_snapshot(db: Session, provider_symbols: Iterable[str] = ()) -> PriceSnapshot:
+    """Snapshot from the process cache when it covers *provider_symbols* and is
+    younger than MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC; otherwise reload (the symbols
+    already cached are reloaded too, so the next page finds them)."""
+    global _cached, _cached_at
+    wanted = frozenset(s for s in provider_symbols if s)
+    if MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC <= 0:
+        return load_price_snapshot(db, wanted)
+    with _cache_lock:
+        cached, cached_at = _cached, _cached_at
+    fresh = cached is not None and time.monotonic() - cached_at < MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC
+    if fresh and cached.covers(wanted):
+        return cached
+    snapshot = load_price_snapshot(db, wanted | (cached.symbols if fresh else frozenset()))
+    with _cache_lock:
+        _cached, _cached_at = snapshot, time.monotonic()
+    return snapshot
+
+
+def clear_price_snapshot_cache() -> None:
+    global _cached, _cached_at
+    with _cache_lock:
+        _cached, _cached_at = None, 0.0
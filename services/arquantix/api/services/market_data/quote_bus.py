@@ -0,0 +1,342 @@
+"""
+Quote bus: bookTicker deltas from the Binance WS ingester to API processes.
+
+The ingester publishes each flushed batch as one compact message on a Redis channel
+(MARKET_DATA_QUOTE_BUS_CHANNEL). Every API process runs a listener thread that feeds an
+in-memory LatestQuoteTable, so hot paths (WS quote hub, market summaries) read quotes
+without a DB round trip. Postgres stays the durable store (batched by the ingester);
+callers fall back to it for symbols missing from the table or older than max_age_sec.
+
+When Redis is unavailable, LocalQuoteBus is used: an in-process stand-in with the same
+publish/subscribe interface (single-process dev, tests). The fallback is not permanent:
+FallbackQuoteBus logs it and retries Redis every _REDIS_RETRY_SEC, on publish and, for
+subscribe-only processes (API listeners), from a background reconnect thread; its
+subscribers move to the Redis channel once it is reachable.
+
+Message format (JSON, positional to keep it small):
+    {"v": 1, "q": [[provider_symbol, instrument_id, last, bid, ask, quote_time_ms], ...]}
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from services.market_data.config import (
+    MARKET_DATA_QUOTE_BUS_CHANNEL,
+    MARKET_DATA_QUOTE_BUS_ENABLED,
+    MARKET_DATA_QUOTE_BUS_MAX_AGE_SEC,
+)
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_VERSION = 1
+_RECONNECT_BASE_DELAY_SEC = 1.0
+_RECONNECT_MAX_DELAY_SEC = 30.0
+_REDIS_RETRY_SEC = 30.0
+
+
+@dataclass(frozen=True)
+class CachedQuote:
+    instrument_id: int
+    provider_symbol: str
+    last_price: float
+    bid_price: Optional[float]
+    ask_price: Optional[float]
+    quote_time: Optional[datetime]
+    received_at: float  # time.time() when applied to the table
+
+
+def encode_quote_deltas(pending: Dict[str, Dict[str, Any]], symbol_to_id: Dict[str, int]) -> Optional[str]:
+    """Encode an ingester batch (symbol -> row) as one bus message. None when nothing to send."""
+    rows = []
+    for symbol in sorted(pending):
+        instrument_id = symbol_to_id.get(symbol)
+        if instrument_id is None:
+            continue
+        row = pending[symbol]
+        qt = row.get("quote_time")
+        rows.append([
+            symbol,
+            instrument_id,
+            row["last_price"],
+            row.get("bid_price"),
+            row.get("ask_price"),
+            int(qt.timestamp() * 1000) if isinstance(qt, datetime) else None,
+        ])
+    if not rows:
+        return None
+    return json.dumps({"v": MESSAGE_VERSION, "q": rows}, separators=(",", ":"))
+
+
+def decode_quote_deltas(message: str, received_at: Optional[float] = None) -> List[CachedQuote]:
+    """Decode a bus message; malformed rows are skipped, unknown versions ignored."""
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(data, dict) or data.get("v") != MESSAGE_VERSION:
+        return []
+    now = received_at if received_at is not None else time.time()
+    out = []
+    for row in data.get("q") or []:
+        try:
+            symbol, instrument_id, last, bid, ask, qt_ms = row
+            out.append(CachedQuote(
+                instrument_id=int(instrument_id),
+                provider_symbol=str(symbol).upper(),
+                last_price=float(last),
+                bid_price=float(bid) if bid is not None else None,
+                ask_price=float(ask) if ask is not None else None,
+                quote_time=datetime.fromtimestamp(qt_ms / 1000.0, tz=timezone.utc) if qt_ms is not None else None,
+                received_at=now,
+            ))
+        except (TypeError, ValueError):
+            continue
+    return out
+
+
+class LatestQuoteTable:
+    """Thread-safe provider_symbol -> CachedQuote table fed by the bus."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quotes: Dict[str, CachedQuote] = {}
+        self.messages_applied = 0
+
+    def apply(self, quotes: Iterable[CachedQuote]) -> None:
+        with self._lock:
+            for q in quotes:
+                self._quotes[q.provider_symbol] = q
+            self.messages_applied += 1
+
+    def apply_message(self, message: str) -> None:
+        self.apply(decode_quote_deltas(message))
+
+    def get_fresh(
+        self,
+        provider_symbols: Iterable[str],
+        max_age_sec: float = MARKET_DATA_QUOTE_BUS_MAX_AGE_SEC,
+    ) -> Dict[str, CachedQuote]:
+        """Return the cached quotes received less than max_age_sec ago (missing/stale omitted)."""
+        cutoff = time.time() - max_age_sec
+        out = {}
+        with self._lock:
+            for s in provider_symbols:
+                q = self._quotes.get((s or "").upper())
+                if q is not None and q.received_at >= cutoff:
+                    out[q.provider_symbol] = q
+        return out
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._quotes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._quotes.clear()
+
+
+def cached_quotes_to_payload(quotes: List[CachedQuote], eurusdt_rate: Optional[float] = None) -> List[dict]:
+    """Same shape as quotes_repo.quotes_to_payload, built from the in-memory table."""
+    out = []
+    for q in quotes:
+        entry = {
+            "instrument_id": q.instrument_id,
+            "symbol": q.provider_symbol,
+            "price": q.last_price,
+            "bid_price": q.bid_price,
+            "ask_price": q.ask_price,
+            "volume": None,
+            "quote_time": q.quote_time.isoformat() if q.quote_time else None,
+            "updated_at": datetime.fromtimestamp(q.received_at, tz=timezone.utc).isoformat(),
+        }
+        if eurusdt_rate and eurusdt_rate > 0:
+            entry["price_eur"] = q.last_price / eurusdt_rate
+        out.append(entry)
+    return out
+
+
+class LocalQuoteBus:
+    """In-process stand-in for the Redis channel: handlers are called synchronously."""
+
+    def __init__(self):
+        self._handlers: List[Callable[[str], None]] = []
+
+    def publish(self, message: str) -> None:
+        for handler in list(self._handlers):
+            try:
+                handler(message)
+            except Exception:
+                logger.warning("Quote bus handler failed", exc_info=True)
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        self._handlers.append(handler)
+
+
+class RedisQuoteBus:
+    """Redis pub/sub channel. subscribe() starts a daemon listener thread with reconnect backoff."""
+
+    def __init__(self, redis_client, channel: str = MARKET_DATA_QUOTE_BUS_CHANNEL):
+        self._redis = redis_client
+        self.channel = channel
+        self._threads: List[threading.Thread] = []
+
+    def publish(self, message: str) -> None:
+        self._redis.publish(self.channel, message)
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        t = threading.Thread(target=self._listen_forever, args=(handler,), daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _listen_forever(self, handler: Callable[[str], None]) -> None:
+        delay = _RECONNECT_BASE_DELAY_SEC
+        while True:
+            pubsub = None
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                logger.info("Quote bus listener subscribed to %s", self.channel)
+                delay = _RECONNECT_BASE_DELAY_SEC
+                for msg in pubsub.listen():
+                    if msg.get("type") != "message":
+                        continue
+                    data = msg.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8", errors="replace")
+                    handler(data)
+            except Exception as e:
+                logger.warning("Quote bus listener error (reconnecting in %.1fs): %s", delay, e)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(delay)
+            delay = min(delay * 2, _RECONNECT_MAX_DELAY_SEC)
+
+
+class FallbackQuoteBus:
+    """Redis bus when reachable, else LocalQuoteBus; Redis is retried at most every
+    *retry_sec* and the handlers subscribed meanwhile are re-subscribed on Redis.
+
+    A handler subscribed while on the fallback starts a daemon reconnect thread, so a
+    process that only subscribes still moves to Redis without ever publishing."""
+
+    def __init__(self, channel: str, *, name: str, retry_sec: float = _REDIS_RETRY_SEC):
+        self.channel = channel
+        self.name = name
+        self.retry_sec = retry_sec
+        self._redis_bus: Optional[RedisQuoteBus] = None
+        self._local = LocalQuoteBus()
+        self._handlers: List[Callable[[str], None]] = []
+        self._next_retry = 0.0
+        self._fell_back = False
+        self._lock = threading.Lock()
+        self._reconnect_thread: Optional[threading.Thread] = None
+
+    def _current(self):
+        with self._lock:
+            if self._redis_bus is not None:
+                return self._redis_bus
+            now = time.monotonic()
+            if now < self._next_retry:
+                return self._local
+            from services.redis_client import get_redis
+            r = get_redis()
+            if r is None:
+                self._next_retry = now + self.retry_sec
+                if not self._fell_back:
+                    logger.warning(
+                        "%s: Redis unavailable, using the in-process bus (other processes do not "
+                        "receive these messages); retrying every %.0fs", self.name, self.retry_sec,
+                    )
+                self._fell_back = True
+                return self._local
+            self._redis_bus = RedisQuoteBus(r, channel=self.channel)
+            if self._fell_back:
+                logger.info("%s: Redis reachable, leaving the in-process bus", self.name)
+            handlers = list(self._handlers)
+        for handler in handlers:
+            self._redis_bus.subscribe(handler)
+        return self._redis_bus
+
+    def publish(self, message: str) -> None:
+        self._current().publish(message)
+
+    def subscribe(self, handler: Callable[[str], None]) -> None:
+        bus = self._current()
+        with self._lock:
+            self._handlers.append(handler)
+            if bus is self._local and self._redis_bus is not None:
+                # Moved to Redis in between: the handler list was already re-subscribed without it
+                bus = self._redis_bus
+        bus.subscribe(handler)
+        if bus is self._local:
+            self._start_reconnect()
+
+    def _start_reconnect(self) -> None:
+        with self._lock:
+            if self._reconnect_thread is not None and self._reconnect_thread.is_alive():
+                return
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_forever, name=f"{self.name} reconnect", daemon=True,
+            )
+            self._reconnect_thread.start()
+
+    def _reconnect_forever(self) -> None:
+        while self._redis_bus is None:
+            time.sleep(max(self._next_retry - time.monotonic(), 0.0))
+            try:
+                self._current()
+            except Exception:
+                logger.warning("%s: Redis reconnect attempt failed", self.name, exc_info=True)
+                time.sleep(self.retry_sec)
+
+
+_bus = FallbackQuoteBus(MARKET_DATA_QUOTE_BUS_CHANNEL, name="Quote bus")
+_bus_lock = threading.Lock()
+_table = LatestQuoteTable()
+_listener_started = False
+
+
+def get_latest_quote_table() -> LatestQuoteTable:
+    return _table
+
+
+def get_quote_bus() -> Optional[FallbackQuoteBus]:
+    """Redis bus when reachable, else the in-process stand-in. None when disabled by config."""
+    if not MARKET_DATA_QUOTE_BUS_ENABLED:
+        return None
+    return _bus
+
+
+def publish_quote_deltas(pending: Dict[str, Dict[str, Any]], symbol_to_id: Dict[str, int]) -> None:
+    """Ingester side. Fail-safe: a bus error never blocks the DB flush."""
+    try:
+        bus = get_quote_bus()
+        if bus is None:
+            return
+        message = encode_quote_deltas(pending, symbol_to_id)
+        if message is not None:
+            bus.publish(message)
+    except Exception:
+        logger.warning("Quote bus publish failed", exc_info=True)
+
+
+def start_quote_bus_listener() -> bool:
+    """API side: feed the in-memory table from the bus (idempotent). Returns True if listening."""
+    global _listener_started
+    bus = get_quote_bus()
+    if bus is None:
+        return False
+    with _bus_lock:
+        if _listener_started:
+            return True
+        bus.subscribe(_table.apply_message)
+        _listener_started = True
+    return True
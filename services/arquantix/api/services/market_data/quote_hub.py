@@ -0,0 +1,333 @@
+"""
+In-process quote hub for /ws/market-data.
+
+One poll loop per API process fetches the union of all subscribed symbols once per
+tick (from the quote bus table when fresh, else one Binance REST refresh pass, one
+quotes query, one FX lookup), then fans the result out to every WebSocket.
+Subscribers are grouped into channels by symbol set: each channel computes its diff
+and serializes it once, and all its subscribers receive the same JSON text.
+
+Protocol (unchanged shape, clients merge by symbol):
+- first message after subscribe: {"quotes": [...]} with every known quote of the set;
+- then only {"quotes": [...changed quotes...]}; nothing is sent when nothing changed.
+
+Backpressure: each subscriber has a single pending slot drained by its own sender task.
+If a diff arrives while the previous one is still pending, the slot is replaced by the
+channel's full snapshot (conflation) so a slow client never blocks the others and
+never misses a final price. A send that exceeds SEND_TIMEOUT_SEC closes the socket.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, FrozenSet, List, Optional, Set
+
+from fastapi import WebSocket
+
+from database import SessionLocal
+from services.market_data.market_summary_repo import refresh_binance_quotes_for_provider_symbols
+from services.market_data.quote_bus import cached_quotes_to_payload, get_latest_quote_table
+from services.market_data.quotes_repo import get_latest_quotes_by_provider_symbols, quotes_to_payload
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SEC = 1.0
+SEND_TIMEOUT_SEC = 10.0
+# Fields ignored when deciding whether a quote changed (bumped on every upsert).
+_DIFF_IGNORED_FIELDS = ("updated_at",)
+
+
+class QuoteHubMetrics:
+    """Thread-safe in-process counters (same approach as services/price_alerts/metrics)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.subscribers = 0
+        self.channels = 0
+        self.polls_total = 0
+        self.poll_errors = 0
+        self.broadcasts_total = 0
+        self.messages_sent = 0
+        self.messages_conflated = 0
+        self.slow_client_disconnects = 0
+        self.fetch_latency_samples: list[float] = []
+        self.broadcast_latency_samples: list[float] = []
+
+    @staticmethod
+    def _append(samples: list, value: float) -> list:
+        samples.append(value)
+        if len(samples) > 1000:
+            return samples[-500:]
+        return samples
+
+    def set_gauges(self, subscribers: int, channels: int) -> None:
+        with self._lock:
+            self.subscribers = subscribers
+            self.channels = channels
+
+    def record_poll(self, fetch_ms: float) -> None:
+        with self._lock:
+            self.polls_total += 1
+            self.fetch_latency_samples = self._append(self.fetch_latency_samples, fetch_ms)
+
+    def record_poll_error(self) -> None:
+        with self._lock:
+            self.poll_errors += 1
+
+    def record_broadcast(self, channels: int, latency_ms: float) -> None:
+        with self._lock:
+            self.broadcasts_total += channels
+            self.broadcast_latency_samples = self._append(self.broadcast_latency_samples, latency_ms)
+
+    def record_sent(self) -> None:
+        with self._lock:
+            self.messages_sent += 1
+
+    def record_conflated(self) -> None:
+        with self._lock:
+            self.messages_conflated += 1
+
+    def record_slow_disconnect(self) -> None:
+        with self._lock:
+            self.slow_client_disconnects += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            fetch = sorted(self.fetch_latency_samples)
+            bcast = sorted(self.broadcast_latency_samples)
+            return {
+                "subscribers": self.subscribers,
+                "channels": self.channels,
+                "polls_total": self.polls_total,
+                "poll_errors": self.poll_errors,
+                "broadcasts_total": self.broadcasts_total,
+                "messages_sent": self.messages_sent,
+                "messages_conflated": self.messages_conflated,
+                "slow_client_disconnects": self.slow_client_disconnects,
+                "fetch_latency_avg_ms": round(sum(fetch) / len(fetch), 2) if fetch else 0.0,
+                "fetch_latency_p99_ms": round(fetch[int(len(fetch) * 0.99)], 2) if fetch else 0.0,
+                "broadcast_latency_avg_ms": round(sum(bcast) / len(bcast), 2) if bcast else 0.0,
+                "broadcast_latency_p99_ms": round(bcast[int(len(bcast) * 0.99)], 2) if bcast else 0.0,
+            }
+
+
+def _diff_key(entry: dict) -> tuple:
+    return tuple((k, entry.get(k)) for k in sorted(entry) if k not in _DIFF_IGNORED_FIELDS)
+
+
+def _serialize(quotes: List[dict]) -> str:
+    return json.dumps({"quotes": quotes}, separators=(",", ":"))
+
+
+class _Subscriber:
+    """One WebSocket: a single conflating slot drained by a dedicated sender task."""
+
+    def __init__(self, websocket: WebSocket, channel: "_Channel"):
+        self.websocket = websocket
+        self.channel = channel
+        self._slot: Optional[str] = None
+        self._ready = asyncio.Event()
+        self.closed = asyncio.Event()
+
+    def offer(self, diff_text: str, full_text: str, metrics: QuoteHubMetrics) -> None:
+        if self._slot is not None:
+            # Previous message not yet sent: replace by the cumulative state.
+            self._slot = full_text
+            metrics.record_conflated()
+        else:
+            self._slot = diff_text
+        self._ready.set()
+
+    async def run_sender(self, metrics: QuoteHubMetrics) -> None:
+        try:
+            while not self.closed.is_set():
+                await self._ready.wait()
+                self._ready.clear()
+                text, self._slot = self._slot, None
+                if text is None:
+                    continue
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(text), timeout=SEND_TIMEOUT_SEC)
+                except asyncio.TimeoutError:
+                    metrics.record_slow_disconnect()
+                    logger.info("Closing slow market-data WebSocket (send > %.0fs)", SEND_TIMEOUT_SEC)
+                    try:
+                        await self.websocket.close(code=1013, reason="Client too slow")
+                    except Exception:
+                        pass
+                    break
+                metrics.record_sent()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            err_msg = str(e).lower()
+            if "disconnect" not in err_msg and "closed" not in err_msg and "connection" not in err_msg:
+                logger.warning("WebSocket market-data send failed: %s", e)
+        finally:
+            self.closed.set()
+
+
+class _Channel:
+    """Subscribers sharing the same symbol set, with the last state sent to them."""
+
+    def __init__(self, symbols: FrozenSet[str]):
+        self.symbols = symbols
+        self.subscribers: Set[_Subscriber] = set()
+        self.primed = False
+        self.state: Dict[str, dict] = {}
+        self._state_keys: Dict[str, tuple] = {}
+        self._full_text: Optional[str] = None
+
+    def full_text(self) -> str:
+        if self._full_text is None:
+            self._full_text = _serialize([self.state[s] for s in sorted(self.state)])
+        return self._full_text
+
+    def apply(self, quotes_by_symbol: Dict[str, dict]) -> List[dict]:
+        """Update state from the latest tick and return the changed quotes (sorted by symbol)."""
+        changed = []
+        for symbol in sorted(self.symbols):
+            entry = quotes_by_symbol.get(symbol)
+            if entry is None:
+                continue
+            key = _diff_key(entry)
+            if self._state_keys.get(symbol) == key:
+                continue
+            self._state_keys[symbol] = key
+            self.state[symbol] = entry
+            changed.append(entry)
+        if changed:
+            self._full_text = None
+        return changed
+
+
+class QuoteHub:
+    """Single poller + per-channel fan-out for the market-data WebSocket."""
+
+    def __init__(self, poll_interval_sec: float = POLL_INTERVAL_SEC):
+        self.poll_interval_sec = poll_interval_sec
+        self.metrics = QuoteHubMetrics()
+        self._channels: Dict[FrozenSet[str], _Channel] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def _update_gauges(self) -> None:
+        self.metrics.set_gauges(
+            subscribers=sum(len(c.subscribers) for c in self._channels.values()),
+            channels=len(self._channels),
+        )
+
+    def _symbols_union(self) -> List[str]:
+        union: Set[str] = set()
+        for symbols in self._channels:
+            union.update(symbols)
+        return sorted(union)
+
+    def _ensure_poller(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    def subscribe(self, websocket: WebSocket, symbols: List[str]) -> _Subscriber:
+        key = frozenset(symbols)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = _Channel(key)
+            self._channels[key] = channel
+        sub = _Subscriber(websocket, channel)
+        channel.subscribers.add(sub)
+        self._update_gauges()
+        if channel.primed:
+            # Late joiner: start from the channel's full snapshot.
+            full = channel.full_text()
+            sub.offer(full, full, self.metrics)
+        self._ensure_poller()
+        # New symbols: do not wait for the next tick.
+        self._wakeup.set()
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        sub.closed.set()
+        sub._ready.set()
+        channel = sub.channel
+        channel.subscribers.discard(sub)
+        if not channel.subscribers and self._channels.get(channel.symbols) is channel:
+            del self._channels[channel.symbols]
+        self._update_gauges()
+
+    def broadcast(self, quotes: List[dict]) -> int:
+        """Fan out one tick of quote payloads to every channel. Returns number of channels notified."""
+        start = time.monotonic()
+        by_symbol = {q.get("symbol"): q for q in quotes if q.get("symbol")}
+        notified = 0
+        for channel in list(self._channels.values()):
+            first_fill = not channel.primed
+            changed = channel.apply(by_symbol)
+            if not changed and not first_fill:
+                continue
+            channel.primed = True
+            full_text = channel.full_text()
+            diff_text = full_text if first_fill else _serialize(changed)
+            for sub in list(channel.subscribers):
+                sub.offer(diff_text, full_text, self.metrics)
+            notified += 1
+        if notified:
+            self.metrics.record_broadcast(notified, (time.monotonic() - start) * 1000.0)
+        return notified
+
+    async def _poll_loop(self) -> None:
+        while self._channels:
+            symbols = self._symbols_union()
+            start = time.monotonic()
+            try:
+                payload = await asyncio.to_thread(_fetch_quotes_sync, symbols)
+                self.metrics.record_poll((time.monotonic() - start) * 1000.0)
+                self.broadcast(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.metrics.record_poll_error()
+                logger.exception("Quote hub poll failed: %s", e)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_sec)
+            except asyncio.TimeoutError:
+                pass
+        self._poll_task = None
+
+
+def _fetch_quotes_sync(symbols: List[str]) -> list:
+    """One pass for the whole hub. Fresh quotes come from the quote bus table; only the
+    missing ones go to the DB (refresh stale Binance quotes, read quotes + FX)."""
+    from services.market_data.fx import EURUSDT_PROVIDER_SYMBOL, get_eurusdt_rate
+
+    table = get_latest_quote_table()
+    cached = table.get_fresh(symbols)
+    fx_quote = table.get_fresh([EURUSDT_PROVIDER_SYMBOL]).get(EURUSDT_PROVIDER_SYMBOL)
+    missing = [s for s in symbols if s not in cached]
+    if not missing and fx_quote is not None:
+        return cached_quotes_to_payload([cached[s] for s in symbols], eurusdt_rate=fx_quote.last_price)
+
+    db = SessionLocal()
+    try:
+        rate = fx_quote.last_price if fx_quote is not None else float(get_eurusdt_rate(db, strict=False))
+        payload = cached_quotes_to_payload([cached[s] for s in symbols if s in cached], eurusdt_rate=rate)
+        if missing:
+            refresh_binance_quotes_for_provider_symbols(db, missing)
+            quotes = get_latest_quotes_by_provider_symbols(db, missing)
+            payload.extend(quotes_to_payload(quotes, eurusdt_rate=rate))
+        return payload
+    finally:
+        db.close()
+
+
+_hub: Optional[QuoteHub] = None
+
+
+def get_quote_hub() -> QuoteHub:
+    global _hub
+    if _hub is None:
+        _hub = QuoteHub()
+    return _hub
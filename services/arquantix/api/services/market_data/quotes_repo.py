@@ -3,8 +3,10 @@ Repository for MarketDataLatestQuote (snapshot of latest price per instrument).
 Caller is responsible for committing the session.
 """
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from database import MarketDataInstrument, MarketDataLatestQuote
@@ -172,3 +174,72 @@ def upsert_latest_quote(
     session.flush()
     session.refresh(row)
     return row
+
+
+_BULK_UPSERT_COLUMNS = (
+    "instrument_id",
+    "provider",
+    "provider_symbol",
+    "last_price",
+    "bid_price",
+    "ask_price",
+    "volume",
+    "quote_time",
+)
+
+
+def build_bulk_upsert_latest_quotes_stmt(rows: List[Dict[str, Any]]):
+    """
+    Build one INSERT ... ON CONFLICT (instrument_id) DO UPDATE over all rows.
+
+    Rows are deduplicated on instrument_id (last wins) and sorted by instrument_id so
+    concurrent flushes always lock rows in the same order (no deadlock cycles).
+    Returns None when rows is empty.
+    """
+    by_id: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        by_id[int(row["instrument_id"])] = row
+    if not by_id:
+        return None
+    values = [
+        {col: by_id[iid].get(col) for col in _BULK_UPSERT_COLUMNS}
+        for iid in sorted(by_id)
+    ]
+    stmt = insert(MarketDataLatestQuote).values(values)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[MarketDataLatestQuote.instrument_id],
+        set_={
+            "provider": excluded.provider,
+            "provider_symbol": excluded.provider_symbol,
+            "last_price": excluded.last_price,
+            "bid_price": excluded.bid_price,
+            "ask_price": excluded.ask_price,
+            "volume": excluded.volume,
+            "quote_time": excluded.quote_time,
+            "updated_at": func.now(),
+        },
+    )
+
+
+def bulk_upsert_latest_quotes(
+    session: Session,
+    rows: List[Dict[str, Any]],
+) -> int:
+    """
+    Insert or update the latest quote of many instruments in a single statement.
+    Caller must commit the session. No ORM objects are loaded.
+
+    Args:
+        session: Database session (caller commits).
+        rows: Dicts with instrument_id, provider, provider_symbol, last_price and optional
+            bid_price, ask_price, volume, quote_time (same meaning as upsert_latest_quote).
+
+    Returns:
+        Number of distinct instruments written.
+    """
+    stmt = build_bulk_upsert_latest_quotes_stmt(rows)
+    if stmt is None:
+        return 0
+    result = session.execute(stmt)
+    return result.rowcount
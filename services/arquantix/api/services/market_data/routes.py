@@ -2,7 +2,7 @@
 Market Data routes - Instrument management and data fetching
 """
 import os
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
@@ -25,11 +25,18 @@ from services.market_data.bars_1d_repo import get_bars_1d
 from services.market_data.bars_1w_repo import get_bars_1w
 from services.market_data.chart_period_config import CHART_PERIODS
 from services.market_data.chart_history_service import get_chart_history
-from services.market_data.market_summary_repo import get_market_summaries
+from services.market_data.chart_history_cache import get_chart_history_cache
+from services.market_data.market_summary_repo import MAX_5M_BARS_24H, get_market_summaries
 from services.market_data.top_movers_repo import get_top_movers
 from config.base_allowed_assets import BASE_ALLOWED_ASSETS, BASE_MARKET_PROVIDER_SYMBOLS
 from services.market_data.ohlc_holes import compute_ohlc_holes_for_instruments
 from services.market_data.candles_backfill_service import run_backfill
+from services.market_data.candles_rollup import ROLLUP_TARGETS, run_rollup
+from services.market_data.config import (
+    MARKET_DATA_CHART_CACHE_ENABLED,
+    MARKET_DATA_CHART_CACHE_ETAG,
+    MARKET_DATA_ROLLUP_ENABLED,
+)
 
 router = APIRouter(prefix="/api/market-data", tags=["market-data"])
 
@@ -199,6 +206,8 @@ def run_backfill_lag_logic(db: Session):
             "summary": {"total_holes_remaining": 0, "total_missing_bars_to_now_remaining": 0, "message": "Aucun instrument Binance."},
         }
     holes_before = compute_ohlc_holes_for_instruments(db, ids)
+    id_to_symbol = {row.get("instrument_id"): (row.get("symbol") or "").strip() for row in holes_before}
+    rollup_targets = set(ROLLUP_TARGETS) if MARKET_DATA_ROLLUP_ENABLED else set()
     need_backfill_set = set()
     for row in holes_before:
         symbol = (row.get("symbol") or "").strip()
@@ -208,7 +217,7 @@ def run_backfill_lag_logic(db: Session):
             info = row.get(period) or {}
             if _need_backfill(info):
                 tf = PERIOD_TO_TIMEFRAME.get(period)
-                if tf:
+                if tf and tf not in rollup_targets:
                     need_backfill_set.add((symbol, tf))
     results = {}
     for (symbol, tf) in sorted(need_backfill_set, key=lambda x: (x[1], x[0])):
@@ -224,6 +233,20 @@ def run_backfill_lag_logic(db: Session):
     except Exception:
         db.rollback()
 
+    # 1h/4h/1d/1w dérivés des 5m (seuls les buckets touchés depuis le watermark sont recalculés)
+    rollup_summary = None
+    if rollup_targets:
+        rollup_summary = run_rollup(db, ids)
+        for detail in rollup_summary.get("instrument_details") or []:
+            for tf, tf_summary in (detail.get("by_timeframe") or {}).items():
+                results.setdefault(tf, {"instrument_details": [], "candles_upserted": 0})
+                results[tf]["instrument_details"].append({
+                    "instrument_id": detail.get("instrument_id"),
+                    "provider_symbol": id_to_symbol.get(detail.get("instrument_id"), ""),
+                    "candles_upserted": tf_summary.get("candles_written") or 0,
+                })
+                results[tf]["candles_upserted"] += tf_summary.get("candles_written") or 0
+
     holes_after = compute_ohlc_holes_for_instruments(db, ids)
     total_holes_remaining = 0
     total_missing_bars_to_now_remaining = 0
@@ -249,6 +272,7 @@ def run_backfill_lag_logic(db: Session):
 
     return {
         "download_summary": download_summary,
+        "rollup": rollup_summary,
         "holes_analysis_after": holes_after,
         "summary": {
             "total_holes_remaining": total_holes_remaining,
@@ -288,6 +312,23 @@ def post_cron_refresh_status(
     return {"enabled": bool(enabled)}
 
 
+@router.get("/ws-metrics")
+def get_ws_metrics(
+    current_user: AdminUser = Depends(get_current_user),
+):
+    """Observabilite du hub /ws/market-data : abonnes, canaux, latences de poll et de broadcast."""
+    from services.market_data.quote_hub import get_quote_hub
+    return get_quote_hub().metrics.snapshot()
+
+
+@router.get("/chart-cache-metrics")
+def get_chart_cache_metrics(
+    current_user: AdminUser = Depends(get_current_user),
+):
+    """Observabilite du cache chart-history : entrees, hit ratio, 304, invalidations, latences."""
+    return get_chart_history_cache().snapshot()
+
+
 @router.post("/backfill-lag")
 def post_backfill_lag(
     current_user: AdminUser = Depends(get_current_user),
@@ -460,10 +501,12 @@ def get_latest_quotes(
 def get_market_summary(
     symbols: Optional[str] = None,
     instrument_ids: Optional[str] = None,
+    sparkline_points: Optional[int] = Query(None, ge=2, le=MAX_5M_BARS_24H),
     db: Session = Depends(get_db),
 ):
     """Get market summary per instrument: price, 24h change (abs/pct), volume_24h, sparkline_24h.
     At least one of symbols or instrument_ids must be provided. If both, results are merged and deduplicated by instrument_id.
+    sparkline_points (optional) downsamples sparkline_24h to at most that many closes.
     Public (no auth) for dev / mobile client."""
     if not symbols and not instrument_ids:
         raise HTTPException(
@@ -485,7 +528,13 @@ def get_market_summary(
     sym_list: Optional[List[str]] = None
     if symbols:
         sym_list = [s.strip().upper() for s in symbols.split(",") if s.strip()]
-    summaries = get_market_summaries(db, instrument_ids=ids, provider_symbols=sym_list, include_eur=True)
+    summaries = get_market_summaries(
+        db,
+        instrument_ids=ids,
+        provider_symbols=sym_list,
+        include_eur=True,
+        sparkline_points=sparkline_points,
+    )
     if summaries:
         id_list = [s["instrument_id"] for s in summaries]
         logo_rows = (
@@ -1099,11 +1148,13 @@ def get_chart_history_endpoint(
     symbol: Optional[str] = None,
     instrument_id: Optional[int] = None,
     period: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
 ):
     """Unified chart history for UI period selectors. Backend drives timeframe and date range.
     Query params: exactly one of symbol or instrument_id, and period (1j, 1s, 1m, 1a, 5a).
-    Public (no auth) for mobile."""
+    Public (no auth) for mobile. Served from chart_history_cache when enabled (weak ETag,
+    304 on If-None-Match)."""
     if not symbol and instrument_id is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -1119,6 +1170,25 @@ def get_chart_history_endpoint(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid or missing 'period'. Allowed: {list(CHART_PERIODS)}",
         )
+    if MARKET_DATA_CHART_CACHE_ENABLED:
+        cached = get_chart_history_cache().get(
+            db,
+            symbol=symbol,
+            instrument_id=instrument_id,
+            period=period,
+            if_none_match=if_none_match if MARKET_DATA_CHART_CACHE_ETAG else None,
+        )
+        if cached is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Instrument not found",
+            )
+        headers = {"X-Cache": "HIT" if cached.cache_hit else "MISS"}
+        if MARKET_DATA_CHART_CACHE_ETAG:
+            headers["ETag"] = cached.etag
+        if cached.body is None:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
     payload = get_chart_history(
         db,
         symbol=symbol,
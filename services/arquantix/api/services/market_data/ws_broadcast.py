@@ -1,6 +1,9 @@
 """
-WebSocket broadcast of latest market quotes (poll DB every 1s for real-time feel).
+WebSocket broadcast of latest market quotes (shared quote hub, 1s tick for real-time feel).
 No auth in V1; document for V2.
+
+Quotes are polled once per process by services.market_data.quote_hub and fanned out to
+every connected socket; this handler only registers the subscription and drains it.
 """
 import asyncio
 import logging
@@ -8,16 +11,11 @@ from typing import List, Optional
 from urllib.parse import parse_qs
 
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
 
-from database import SessionLocal
-from services.market_data.market_summary_repo import refresh_binance_quotes_for_provider_symbols
-from services.market_data.quotes_repo import get_latest_quotes_by_provider_symbols, quotes_to_payload
+from services.market_data.quote_hub import get_quote_hub
 
 logger = logging.getLogger(__name__)
 
-BROADCAST_INTERVAL_SEC = 1.0
-
 
 def _parse_symbols_from_query(websocket: WebSocket) -> Optional[List[str]]:
     """Parse and normalize symbols from WebSocket query string. Returns None if missing or empty."""
@@ -39,19 +37,19 @@ def _parse_symbols_from_query(websocket: WebSocket) -> Optional[List[str]]:
     return symbols if symbols else None
 
 
-def _fetch_quotes_sync(session: Session, symbols: List[str]) -> list:
-    """Sync DB fetch for use from async context via to_thread. Rafraîchit d'abord les quotes Binance en REST."""
-    from services.market_data.fx import get_eurusdt_rate
-    refresh_binance_quotes_for_provider_symbols(session, symbols)
-    quotes = get_latest_quotes_by_provider_symbols(session, symbols)
-    rate = float(get_eurusdt_rate(session, strict=False))
-    return quotes_to_payload(quotes, eurusdt_rate=rate)
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    """Drain client frames until the socket is closed (clients are not expected to send)."""
+    while True:
+        message = await websocket.receive()
+        if message.get("type") == "websocket.disconnect":
+            return
 
 
 async def handle_market_data_ws(websocket: WebSocket) -> None:
     """
-    Handle /ws/market-data: require symbols in query, then broadcast quotes every 1 second.
-    Closes with error if symbols missing or empty. Sends {"quotes": []} when no data; does not close.
+    Handle /ws/market-data: require symbols in query, then stream quotes from the shared hub.
+    First message is the full snapshot of the symbol set ({"quotes": []} when no data), then
+    only changed quotes. Closes with error if symbols missing or empty.
     """
     await websocket.accept()
     symbols = _parse_symbols_from_query(websocket)
@@ -59,23 +57,12 @@ async def handle_market_data_ws(websocket: WebSocket) -> None:
         await websocket.close(code=4000, reason="Missing or empty query parameter: symbols (e.g. ?symbols=BTCUSDT,ETHUSDT)")
         return
 
-    db = SessionLocal()
+    hub = get_quote_hub()
+    sub = hub.subscribe(websocket, symbols)
+    sender = asyncio.create_task(sub.run_sender(hub.metrics))
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
     try:
-        while True:
-            try:
-                payload = await asyncio.to_thread(_fetch_quotes_sync, db, symbols)
-                await websocket.send_json({"quotes": payload})
-            except Exception as e:
-                err_msg = str(e).lower()
-                if "close" in err_msg or "disconnect" in err_msg or "connection" in err_msg:
-                    break
-                logger.exception("WebSocket market-data broadcast error: %s", e)
-                try:
-                    await websocket.close(code=1011, reason="Server error")
-                except Exception:
-                    pass
-                return
-            await asyncio.sleep(BROADCAST_INTERVAL_SEC)
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
     except asyncio.CancelledError:
         pass
     except Exception as e:
@@ -83,4 +70,7 @@ async def handle_market_data_ws(websocket: WebSocket) -> None:
         if "disconnect" not in err_msg and "closed" not in err_msg and "connection" not in err_msg:
             logger.warning("WebSocket market-data closed: %s", e)
     finally:
-        db.close()
+        hub.unsubscribe(sub)
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
@@ -1,7 +1,22 @@
-"""Replay eth_getLogs ERC20 Transfer sur une plage de blocs (Base pilote)."""
+"""Replay eth_getLogs ERC20 Transfer sur une plage de blocs (Base pilote).
+
+Modes de scan (``scan_mode``) :
+  - ``topics`` (défaut) : un filtre par plage de blocs sur la liste des contrats, topic ``to``
+    = OR des wallets (groupes de ``WALLET_TOPICS_PER_FILTER``) ;
+  - ``all_transfers`` : tous les Transfer des contrats, filtrés localement sur l'ensemble
+    des wallets (beaucoup de wallets, tokens peu actifs) ;
+  - ``per_wallet`` : historique, un appel par contrat × wallet × plage.
+
+En ``topics`` / ``all_transfers`` les requêtes sont envoyées par batch JSON-RPC et la taille
+des plages s'adapte : moitié sur une erreur de limite du provider (trop de résultats, plage
+trop large), remontée progressive jusqu'à ``effective_block_chunk``.
+"""
 from __future__ import annotations
 
 import logging
+import os
+import time
+from collections import deque
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -9,7 +24,13 @@ from sqlalchemy.orm import Session
 
 from services.privy_wallet.asset_mapping import ERC20_CONTRACT_TO_ASSET, normalize_evm_address
 from services.privy_wallet.evm_chain_config import is_alchemy_rpc, resolve_chain_rpc_url
-from services.privy_wallet.evm_rpc_client import TRANSFER_TOPIC, hex_to_int, json_rpc_call
+from services.privy_wallet.evm_rpc_client import (
+    TRANSFER_TOPIC,
+    EvmRpcError,
+    hex_to_int,
+    json_rpc_batch_call,
+    json_rpc_call,
+)
 
 from database import PersonCryptoWallet
 from .repository import RawOnChainEventRepository
@@ -20,6 +41,33 @@ DEFAULT_BLOCK_CHUNK = 2_000
 ALCHEMY_FREE_MAX_BLOCK_CHUNK = 10
 MAX_BLOCK_RANGE = 50_000
 
+SCAN_MODE_TOPICS = "topics"
+SCAN_MODE_ALL_TRANSFERS = "all_transfers"
+SCAN_MODE_PER_WALLET = "per_wallet"
+SCAN_MODES = (SCAN_MODE_TOPICS, SCAN_MODE_ALL_TRANSFERS, SCAN_MODE_PER_WALLET)
+
+# Mode de scan par défaut (topics | all_transfers | per_wallet)
+DEFAULT_SCAN_MODE = os.getenv("ONCHAIN_REPLAY_SCAN_MODE", SCAN_MODE_TOPICS).strip().lower()
+# Requêtes eth_getLogs par batch JSON-RPC
+DEFAULT_RPC_BATCH_SIZE = max(1, int(os.getenv("ONCHAIN_REPLAY_RPC_BATCH_SIZE", "10")))
+# Wallets OR'd dans le topic ``to`` d'un même filtre
+WALLET_TOPICS_PER_FILTER = max(1, int(os.getenv("ONCHAIN_REPLAY_WALLET_TOPICS_PER_FILTER", "500")))
+# Succès consécutifs avant de doubler à nouveau la taille des plages
+CHUNK_GROW_AFTER = 4
+
+# Erreurs provider signalant une plage / réponse trop grande (on coupe la plage en deux)
+_RANGE_LIMIT_MARKERS = (
+    "more than",
+    "too many results",
+    "too many logs",
+    "response size",
+    "block range",
+    "range is too large",
+    "range too large",
+    "limited to",
+    "rpc http 413",
+)
+
 
 @dataclass
 class BlockRangeReplayResult:
@@ -33,9 +81,25 @@ class BlockRangeReplayResult:
     events_prepared: int = 0
     events_inserted: int = 0
     events_skipped_existing: int = 0
+    scan_mode: str = SCAN_MODE_TOPICS
+    rpc_requests: int = 0
+    rpc_batches: int = 0
+    chunk_splits: int = 0
+    block_chunk: int = 0
+    elapsed_ms: float = 0.0
     preview: list[dict[str, Any]] = field(default_factory=list)
     errors: list[str] = field(default_factory=list)
 
+    @property
+    def blocks_scanned(self) -> int:
+        return self.to_block - self.from_block + 1
+
+    @property
+    def blocks_per_second(self) -> float | None:
+        if self.elapsed_ms <= 0:
+            return None
+        return round(self.blocks_scanned / (self.elapsed_ms / 1000.0), 1)
+
     def to_dict(self) -> dict[str, Any]:
         return {
             "chain_id": self.chain_id,
@@ -48,6 +112,14 @@ class BlockRangeReplayResult:
             "events_prepared": self.events_prepared,
             "events_inserted": self.events_inserted,
             "events_skipped_existing": self.events_skipped_existing,
+            "scan_mode": self.scan_mode,
+            "rpc_requests": self.rpc_requests,
+            "rpc_batches": self.rpc_batches,
+            "chunk_splits": self.chunk_splits,
+            "block_chunk": self.block_chunk,
+            "blocks_scanned": self.blocks_scanned,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "blocks_per_second": self.blocks_per_second,
             "preview": self.preview[:50],
             "preview_truncated": len(self.preview) > 50,
             "errors": self.errors,
@@ -138,6 +210,32 @@ def _wallet_transfer_topic(wallet_address: str) -> str:
     return "0x" + addr.rjust(64, "0")
 
 
+def _transfer_filter(
+    contracts: str | list[str],
+    from_block: int,
+    to_block: int,
+    to_topics: list[str] | None = None,
+) -> dict[str, Any]:
+    """Filtre eth_getLogs Transfer ; plusieurs contrats / topics ``to`` = OR côté provider."""
+    topics: list[Any] = [TRANSFER_TOPIC]
+    if to_topics:
+        topics.extend([None, to_topics[0] if len(to_topics) == 1 else to_topics])
+    if isinstance(contracts, list) and len(contracts) == 1:
+        contracts = contracts[0]
+    return {
+        "fromBlock": hex(from_block),
+        "toBlock": hex(to_block),
+        "address": contracts,
+        "topics": topics,
+    }
+
+
+def _log_list(result: Any) -> list[dict[str, Any]]:
+    if not isinstance(result, list):
+        return []
+    return [log for log in result if isinstance(log, dict)]
+
+
 def _fetch_transfer_logs(
     rpc_url: str,
     *,
@@ -146,21 +244,41 @@ def _fetch_transfer_logs(
     to_block: int,
     to_wallet: str | None = None,
 ) -> list[dict[str, Any]]:
-    topics: list[Any] = [TRANSFER_TOPIC]
-    if to_wallet:
-        topics.extend([None, _wallet_transfer_topic(to_wallet)])
-    params = [
-        {
-            "fromBlock": hex(from_block),
-            "toBlock": hex(to_block),
-            "address": contract,
-            "topics": topics,
-        }
-    ]
-    result = json_rpc_call(rpc_url, "eth_getLogs", params, timeout=60.0)
-    if not isinstance(result, list):
-        return []
-    return [log for log in result if isinstance(log, dict)]
+    to_topics = [_wallet_transfer_topic(to_wallet)] if to_wallet else None
+    params = [_transfer_filter(contract, from_block, to_block, to_topics)]
+    return _log_list(json_rpc_call(rpc_url, "eth_getLogs", params, timeout=60.0))
+
+
+def _fetch_transfer_logs_batch(
+    rpc_url: str,
+    filters: list[dict[str, Any]],
+) -> list[list[dict[str, Any]] | EvmRpcError]:
+    """Un eth_getLogs par filtre, en un batch JSON-RPC ; une erreur par filtre reste à sa place."""
+    if len(filters) > 1:
+        try:
+            results = json_rpc_batch_call(
+                rpc_url,
+                [("eth_getLogs", [f]) for f in filters],
+                timeout=60.0,
+            )
+            return [r if isinstance(r, EvmRpcError) else _log_list(r) for r in results]
+        except EvmRpcError as exc:
+            if exc.code != "evm.rpc.batch_unsupported":
+                return [exc] * len(filters)
+            logger.info("onchain_replay.batch_unsupported rpc=%s — appels unitaires", rpc_url)
+
+    out: list[list[dict[str, Any]] | EvmRpcError] = []
+    for f in filters:
+        try:
+            out.append(_log_list(json_rpc_call(rpc_url, "eth_getLogs", [f], timeout=60.0)))
+        except EvmRpcError as exc:
+            out.append(exc)
+    return out
+
+
+def _is_range_limit_error(exc: Exception) -> bool:
+    message = str(exc).lower()
+    return any(marker in message for marker in _RANGE_LIMIT_MARKERS)
 
 
 def effective_block_chunk(rpc_url: str, requested: int) -> int:
@@ -170,6 +288,110 @@ def effective_block_chunk(rpc_url: str, requested: int) -> int:
     return max(requested, 1)
 
 
+def _scan_per_wallet(
+    rpc_url: str,
+    result: BlockRangeReplayResult,
+    *,
+    contracts: list[str],
+    monitored: set[str],
+    block_chunk: int,
+) -> list[dict[str, Any]]:
+    """Historique : un eth_getLogs par contrat × wallet × plage (logs bruts)."""
+    logs_out: list[dict[str, Any]] = []
+    for contract in contracts:
+        for wallet in sorted(monitored):
+            block_start = result.from_block
+            while block_start <= result.to_block:
+                block_end = min(block_start + block_chunk - 1, result.to_block)
+                result.rpc_requests += 1
+                result.rpc_batches += 1
+                try:
+                    logs = _fetch_transfer_logs(
+                        rpc_url,
+                        contract=contract,
+                        from_block=block_start,
+                        to_block=block_end,
+                        to_wallet=wallet,
+                    )
+                except Exception as exc:
+                    result.errors.append(
+                        f"eth_getLogs {contract} → {wallet[:10]}… [{block_start}-{block_end}]: {exc}",
+                    )
+                    block_start = block_end + 1
+                    continue
+                logs_out.extend(logs)
+                block_start = block_end + 1
+    return logs_out
+
+
+def _scan_batched(
+    rpc_url: str,
+    result: BlockRangeReplayResult,
+    *,
+    contracts: list[str],
+    monitored: set[str],
+    block_chunk: int,
+    rpc_batch_size: int,
+    on_logs,
+) -> None:
+    """
+    Filtres multi-contrats (topics OR'd ou tous les Transfer) par batch JSON-RPC.
+
+    Une plage refusée par le provider (limite) est coupée en deux et re-planifiée en tête ;
+    la taille des nouvelles plages suit (moitié), puis double après ``CHUNK_GROW_AFTER``
+    succès consécutifs sans dépasser ``block_chunk``.
+    """
+    if result.scan_mode == SCAN_MODE_TOPICS:
+        wallets = sorted(monitored)
+        groups: list[list[str] | None] = [
+            [_wallet_transfer_topic(w) for w in wallets[i:i + WALLET_TOPICS_PER_FILTER]]
+            for i in range(0, len(wallets), WALLET_TOPICS_PER_FILTER)
+        ]
+    else:
+        groups = [None]
+
+    chunk = block_chunk
+    successes = 0
+    cursor = result.from_block
+    pending: deque[tuple[int, int, int]] = deque()  # (from, to, groupe)
+
+    while pending or cursor <= result.to_block:
+        while len(pending) < rpc_batch_size and cursor <= result.to_block:
+            block_end = min(cursor + chunk - 1, result.to_block)
+            pending.extend((cursor, block_end, g) for g in range(len(groups)))
+            cursor = block_end + 1
+
+        batch = [pending.popleft() for _ in range(min(rpc_batch_size, len(pending)))]
+        responses = _fetch_transfer_logs_batch(
+            rpc_url,
+            [_transfer_filter(contracts, start, end, groups[g]) for start, end, g in batch],
+        )
+        result.rpc_requests += len(batch)
+        result.rpc_batches += 1
+
+        for (start, end, g), response in zip(batch, responses):
+            if not isinstance(response, EvmRpcError):
+                successes += 1
+                on_logs(response)
+                continue
+            if _is_range_limit_error(response) and end > start:
+                mid = (start + end) // 2
+                pending.appendleft((mid + 1, end, g))
+                pending.appendleft((start, mid, g))
+                chunk = max(1, min(chunk, mid - start + 1))
+                successes = 0
+                result.chunk_splits += 1
+                continue
+            target = f"{len(groups[g])} wallet(s)" if groups[g] else "tous Transfer"
+            result.errors.append(f"eth_getLogs {len(contracts)} contrat(s) → {target} [{start}-{end}]: {response}")
+
+        if successes >= CHUNK_GROW_AFTER and chunk < block_chunk:
+            chunk = min(block_chunk, chunk * 2)
+            successes = 0
+
+    result.block_chunk = chunk
+
+
 def replay_block_range(
     db: Session,
     *,
@@ -180,11 +402,16 @@ def replay_block_range(
     block_chunk: int = DEFAULT_BLOCK_CHUNK,
     wallet_addresses: set[str] | None = None,
     assets: list[str] | None = None,
+    scan_mode: str | None = None,
+    rpc_batch_size: int | None = None,
 ) -> BlockRangeReplayResult:
     if from_block < 0 or to_block < from_block:
         raise ValueError("Plage de blocs invalide")
     if to_block - from_block > MAX_BLOCK_RANGE:
         raise ValueError(f"Plage max {MAX_BLOCK_RANGE} blocs par exécution")
+    scan_mode = (scan_mode or DEFAULT_SCAN_MODE).strip().lower()
+    if scan_mode not in SCAN_MODES:
+        raise ValueError(f"scan_mode inconnu: {scan_mode} (attendu: {', '.join(SCAN_MODES)})")
 
     rpc_url = resolve_chain_rpc_url(chain_id)
     if not rpc_url:
@@ -219,64 +446,74 @@ def replay_block_range(
         dry_run=dry_run,
         wallets_monitored=len(monitored),
         contracts_scanned=len(contracts),
+        scan_mode=scan_mode,
+        block_chunk=block_chunk,
     )
 
     if not monitored:
         result.errors.append("Aucun wallet actif à surveiller pour cette chaîne.")
         return result
+    if not contracts:
+        return result
 
-    for contract in contracts:
-        for wallet in sorted(monitored):
-            block_start = from_block
-            while block_start <= to_block:
-                block_end = min(block_start + block_chunk - 1, to_block)
-                try:
-                    logs = _fetch_transfer_logs(
-                        rpc_url,
-                        contract=contract,
-                        from_block=block_start,
-                        to_block=block_end,
-                        to_wallet=wallet,
-                    )
-                except Exception as exc:
-                    result.errors.append(
-                        f"eth_getLogs {contract} → {wallet[:10]}… [{block_start}-{block_end}]: {exc}",
-                    )
-                    block_start = block_end + 1
-                    continue
-
-                result.logs_scanned += len(logs)
-
-                for log in logs:
-                    event_data = _parse_transfer_log(
-                        log,
-                        chain_id=chain_id,
-                        contract_to_asset=contract_map,
-                        monitored_wallets=monitored,
-                    )
-                    if event_data is None:
-                        continue
-
-                    result.events_prepared += 1
-                    preview_item = {
-                        "tx_hash": event_data["tx_hash"],
-                        "log_index": event_data["log_index"],
-                        "wallet_address": event_data["wallet_address"],
-                        "asset": event_data["asset"],
-                        "amount_raw": str(event_data["amount_raw"]),
-                        "block_number": event_data["block_number"],
-                    }
-                    result.preview.append(preview_item)
-
-                    if dry_run:
-                        continue
-
-                    _, created = RawOnChainEventRepository.insert_if_absent(db, data=event_data)
-                    if created:
-                        result.events_inserted += 1
-                    else:
-                        result.events_skipped_existing += 1
-
-                block_start = block_end + 1
+    started = time.monotonic()
+    events: list[dict[str, Any]] = []
+
+    def _collect(logs: list[dict[str, Any]]) -> None:
+        # all_transfers : les logs hors wallets surveillés sont écartés ici (lookup set)
+        result.logs_scanned += len(logs)
+        for log in logs:
+            event_data = _parse_transfer_log(
+                log,
+                chain_id=chain_id,
+                contract_to_asset=contract_map,
+                monitored_wallets=monitored,
+            )
+            if event_data is not None:
+                events.append(event_data)
+
+    if scan_mode == SCAN_MODE_PER_WALLET:
+        _collect(_scan_per_wallet(rpc_url, result, contracts=contracts, monitored=monitored, block_chunk=block_chunk))
+    else:
+        _scan_batched(
+            rpc_url,
+            result,
+            contracts=contracts,
+            monitored=monitored,
+            block_chunk=block_chunk,
+            rpc_batch_size=rpc_batch_size or DEFAULT_RPC_BATCH_SIZE,
+            on_logs=_collect,
+        )
+        # Plages re-découpées : remise dans l'ordre de la chaîne
+        events.sort(key=lambda e: (e["block_number"], e["log_index"]))
+
+    for event_data in events:
+        result.events_prepared += 1
+        result.preview.append(
+            {
+                "tx_hash": event_data["tx_hash"],
+                "log_index": event_data["log_index"],
+                "wallet_address": event_data["wallet_address"],
+                "asset": event_data["asset"],
+                "amount_raw": str(event_data["amount_raw"]),
+                "block_number": event_data["block_number"],
+            }
+        )
 
+    if not dry_run and events:
+        inserted = RawOnChainEventRepository.bulk_insert_if_absent(db, events)
+        result.events_inserted += inserted.inserted
+        result.events_skipped_existing += inserted.skipped_existing
+
+    result.elapsed_ms = (time.monotonic() - started) * 1000.0
+    logger.info(
+        "onchain_replay.done chain_id=%s blocks=%s-%s mode=%s rpc_requests=%s batches=%s blocks_per_s=%s",
+        chain_id,
+        from_block,
+        to_block,
+        scan_mode,
+        result.rpc_requests,
+        result.rpc_batches,
+        result.blocks_per_second,
+    )
     return result
@@ -256,15 +256,21 @@ def run_base_indexer_once(
                 to_block=chunk_end,
                 monitored_wallets=monitored,
                 dry_run=dry_run,
+                checkpoint=checkpoint,
             )
             if native_result.errors:
+                # Checkpoint déjà avancé par le scan jusqu'au dernier bloc contigu du chunk
                 out.errors.extend(native_result.errors)
                 if checkpoint and not dry_run:
+                    if native_result.last_scanned_block is not None:
+                        out.checkpoint_after = native_result.last_scanned_block
                     CheckpointRepository.mark_error(
                         db,
                         checkpoint,
                         error=native_result.errors[0],
-                        failed_block=cursor,
+                        failed_block=(
+                            native_result.failed_blocks[0] if native_result.failed_blocks else cursor
+                        ),
                     )
                 out.status = "error"
                 break
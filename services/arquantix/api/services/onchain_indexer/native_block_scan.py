@@ -1,7 +1,17 @@
-"""Scan ETH natif entrant par blocs (wallets connus uniquement)."""
+"""Scan ETH natif entrant par blocs (wallets connus uniquement).
+
+Pipeline par fenêtres : les blocs d'une fenêtre sont récupérés en un batch JSON-RPC
+(``eth_getBlockByNumber`` full_txs), la fenêtre suivante est préchargée pendant le
+traitement de la courante, et les transactions sont filtrées sur ``to`` ∈ wallets suivis
+dès l'arrivée du bloc (aucun receipt). Un bloc en échec est réessayé seul ; le checkpoint
+n'avance que jusqu'au dernier bloc contigu traité.
+"""
 from __future__ import annotations
 
 import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -9,14 +19,26 @@ from sqlalchemy.orm import Session
 
 from services.privy_wallet.asset_mapping import normalize_evm_address
 from services.privy_wallet.evm_rpc_client import (
+    EvmRpcError,
     fetch_block_by_number,
+    json_rpc_batch_call,
     parse_native_transfer_from_tx,
 )
 
+from .checkpoint_repository import CheckpointRepository
+from .models import OnchainIndexerCheckpoint
 from .repository import RawOnChainEventRepository
 
 logger = logging.getLogger(__name__)
 
+# Blocs par batch eth_getBlockByNumber
+NATIVE_SCAN_WINDOW = max(1, int(os.getenv("ONCHAIN_NATIVE_SCAN_WINDOW", "20")))
+# Fenêtres récupérées en avance pendant le traitement de la fenêtre courante
+NATIVE_SCAN_PREFETCH = max(1, int(os.getenv("ONCHAIN_NATIVE_SCAN_PREFETCH", "2")))
+# Tentatives individuelles d'un bloc en échec dans le batch
+NATIVE_SCAN_BLOCK_RETRIES = max(1, int(os.getenv("ONCHAIN_NATIVE_SCAN_BLOCK_RETRIES", "3")))
+_RETRY_BACKOFF_SECONDS = 0.5
+
 
 @dataclass
 class NativeBlockScanResult:
@@ -28,6 +50,11 @@ class NativeBlockScanResult:
     events_prepared: int = 0
     events_inserted: int = 0
     events_skipped_existing: int = 0
+    last_scanned_block: int | None = None
+    failed_blocks: list[int] = field(default_factory=list)
+    block_retries: int = 0
+    rpc_batches: int = 0
+    elapsed_seconds: float = 0.0
     errors: list[str] = field(default_factory=list)
 
     def to_dict(self) -> dict[str, Any]:
@@ -40,10 +67,103 @@ class NativeBlockScanResult:
             "events_prepared": self.events_prepared,
             "events_inserted": self.events_inserted,
             "events_skipped_existing": self.events_skipped_existing,
+            "last_scanned_block": self.last_scanned_block,
+            "failed_blocks": self.failed_blocks,
+            "block_retries": self.block_retries,
+            "rpc_batches": self.rpc_batches,
+            "blocks_per_second": (
+                round(self.blocks_scanned / self.elapsed_seconds, 1) if self.elapsed_seconds > 0 else None
+            ),
             "errors": self.errors,
         }
 
 
+def _fetch_block_with_retry(rpc_url: str, block_num: int) -> dict[str, Any] | str:
+    """Bloc seul, ``NATIVE_SCAN_BLOCK_RETRIES`` tentatives ; renvoie le message d'erreur en échec."""
+    last_error = ""
+    for attempt in range(NATIVE_SCAN_BLOCK_RETRIES):
+        if attempt:
+            time.sleep(_RETRY_BACKOFF_SECONDS * attempt)
+        try:
+            return fetch_block_by_number(rpc_url, block_num, full_txs=True)
+        except Exception as exc:
+            last_error = str(exc)
+    return last_error
+
+
+def _fetch_window(rpc_url: str, blocks: list[int]) -> tuple[dict[int, dict[str, Any] | str], int]:
+    """
+    Blocs d'une fenêtre en un batch ; les blocs manquants / en erreur sont réessayés seuls.
+
+    Returns:
+        (bloc ou message d'erreur par numéro, nombre de blocs réessayés)
+    """
+    fetched: dict[int, dict[str, Any] | str] = {}
+    retried = 0
+    try:
+        items = json_rpc_batch_call(
+            rpc_url,
+            [("eth_getBlockByNumber", [hex(n), True]) for n in blocks],
+            timeout=30.0,
+        )
+    except EvmRpcError as exc:
+        logger.info("native_scan.batch_failed blocks=%s-%s err=%s", blocks[0], blocks[-1], exc)
+        items = [exc] * len(blocks)
+    for block_num, item in zip(blocks, items):
+        if isinstance(item, dict):
+            fetched[block_num] = item
+        else:
+            retried += 1
+            fetched[block_num] = _fetch_block_with_retry(rpc_url, block_num)
+    return fetched, retried
+
+
+def _incoming_native_events(
+    block: dict[str, Any],
+    *,
+    block_num: int,
+    chain_id: int,
+    monitored_wallets: set[str],
+    result: NativeBlockScanResult,
+) -> list[dict[str, Any]]:
+    txs = block.get("transactions") or []
+    if not isinstance(txs, list):
+        return []
+    events: list[dict[str, Any]] = []
+    for tx in txs:
+        if not isinstance(tx, dict):
+            continue
+        result.txs_scanned += 1
+        # Préfiltre sans normalisation : la majorité des tx d'un bloc ne vise aucun wallet suivi
+        to_raw = tx.get("to")
+        if not to_raw or str(to_raw).lower() not in monitored_wallets:
+            continue
+        to_addr = normalize_evm_address(to_raw)
+        transfer = parse_native_transfer_from_tx(
+            tx,
+            chain_id=chain_id,
+            wallet_address=to_addr,
+        )
+        if transfer is None:
+            continue
+        events.append({
+            "chain_id": chain_id,
+            "block_number": transfer.get("block_number") or block_num,
+            "tx_hash": transfer["tx_hash"],
+            "log_index": int(transfer.get("log_index") or 0),
+            "contract_address": None,
+            "event_type": "native_transfer",
+            "wallet_address": to_addr.lower(),
+            "asset": "ETH",
+            "amount_raw": int(transfer["amount_atomic"]),
+            "payload_json": {
+                "transfer": transfer,
+                "source": "native_block_scan",
+            },
+        })
+    return events
+
+
 def scan_native_incoming_transfers(
     db: Session,
     *,
@@ -53,7 +173,18 @@ def scan_native_incoming_transfers(
     to_block: int,
     monitored_wallets: set[str],
     dry_run: bool = True,
+    checkpoint: OnchainIndexerCheckpoint | None = None,
+    window: int | None = None,
 ) -> NativeBlockScanResult:
+    """
+    Scan des transferts ETH natifs entrants sur [from_block, to_block].
+
+    Un bloc qui échoue après ses tentatives n'interrompt pas la plage : il est listé dans
+    ``failed_blocks`` / ``errors`` et les blocs suivants sont traités (insert idempotent, un
+    re-scan ultérieur est sans effet). ``last_scanned_block`` est le dernier bloc contigu
+    traité ; si ``checkpoint`` est fourni (hors dry-run), il est avancé dans l'ordre à
+    chaque fenêtre via ``CheckpointRepository.advance_after_chunk``.
+    """
     result = NativeBlockScanResult(
         from_block=from_block,
         to_block=to_block,
@@ -62,58 +193,77 @@ def scan_native_incoming_transfers(
     if not monitored_wallets:
         return result
 
-    for block_num in range(from_block, to_block + 1):
-        try:
-            block = fetch_block_by_number(rpc_url, block_num, full_txs=True)
-        except Exception as exc:
-            result.errors.append(f"eth_getBlockByNumber {block_num}: {exc}")
-            return result
+    wallets = {w.lower() for w in monitored_wallets}
+    size = max(1, window or NATIVE_SCAN_WINDOW)
+    windows = [
+        list(range(start, min(start + size, to_block + 1)))
+        for start in range(from_block, to_block + 1, size)
+    ]
+    started = time.monotonic()
+    contiguous = True
+    checkpointed: int | None = None
 
-        result.blocks_scanned += 1
-        txs = block.get("transactions") or []
-        if not isinstance(txs, list):
-            continue
+    with ThreadPoolExecutor(max_workers=NATIVE_SCAN_PREFETCH, thread_name_prefix="native-scan") as pool:
+        pending: list[Future] = [
+            pool.submit(_fetch_window, rpc_url, blocks)
+            for blocks in windows[:NATIVE_SCAN_PREFETCH]
+        ]
+        next_window = len(pending)
+        while pending:
+            fetched, retried = pending.pop(0).result()
+            result.rpc_batches += 1
+            result.block_retries += retried
+            if next_window < len(windows):
+                pending.append(pool.submit(_fetch_window, rpc_url, windows[next_window]))
+                next_window += 1
+
+            window_events: list[dict[str, Any]] = []
+            for block_num in sorted(fetched):
+                block = fetched[block_num]
+                if not isinstance(block, dict):
+                    result.failed_blocks.append(block_num)
+                    result.errors.append(f"eth_getBlockByNumber {block_num}: {block}")
+                    contiguous = False
+                    continue
+
+                result.blocks_scanned += 1
+                if contiguous:
+                    result.last_scanned_block = block_num
+                window_events.extend(_incoming_native_events(
+                    block,
+                    block_num=block_num,
+                    chain_id=chain_id,
+                    monitored_wallets=wallets,
+                    result=result,
+                ))
+
+            result.events_prepared += len(window_events)
+            if window_events and not dry_run:
+                inserted = RawOnChainEventRepository.bulk_insert_if_absent(db, window_events)
+                result.events_inserted += inserted.inserted
+                result.events_skipped_existing += inserted.skipped_existing
 
-        for tx in txs:
-            if not isinstance(tx, dict):
-                continue
-            result.txs_scanned += 1
-            to_addr = normalize_evm_address(tx.get("to"))
-            if not to_addr or to_addr.lower() not in monitored_wallets:
-                continue
-
-            transfer = parse_native_transfer_from_tx(
-                tx,
-                chain_id=chain_id,
-                wallet_address=to_addr,
-            )
-            if transfer is None:
-                continue
-
-            event_data = {
-                "chain_id": chain_id,
-                "block_number": transfer.get("block_number") or block_num,
-                "tx_hash": transfer["tx_hash"],
-                "log_index": int(transfer.get("log_index") or 0),
-                "contract_address": None,
-                "event_type": "native_transfer",
-                "wallet_address": to_addr.lower(),
-                "asset": "ETH",
-                "amount_raw": int(transfer["amount_atomic"]),
-                "payload_json": {
-                    "transfer": transfer,
-                    "source": "native_block_scan",
-                },
-            }
-            result.events_prepared += 1
-
-            if dry_run:
-                continue
-
-            _, created = RawOnChainEventRepository.insert_if_absent(db, data=event_data)
-            if created:
-                result.events_inserted += 1
-            else:
-                result.events_skipped_existing += 1
+            if (
+                checkpoint is not None
+                and not dry_run
+                and result.last_scanned_block is not None
+                and result.last_scanned_block != checkpointed
+            ):
+                checkpointed = result.last_scanned_block
+                CheckpointRepository.advance_after_chunk(
+                    db,
+                    checkpoint,
+                    last_scanned_block=result.last_scanned_block,
+                    status="ok",
+                    run_metadata={"native_last_block": result.last_scanned_block},
+                )
 
+    result.elapsed_seconds = time.monotonic() - started
+    if result.failed_blocks:
+        logger.warning(
+            "native_scan.failed_blocks chain_id=%s blocks=%s last_contiguous=%s",
+            chain_id,
+            result.failed_blocks,
+            result.last_scanned_block,
+        )
     return result
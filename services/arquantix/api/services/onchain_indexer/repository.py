@@ -1,13 +1,41 @@
 """Repository raw_onchain_events — insert idempotent."""
 from __future__ import annotations
 
+import uuid
+from dataclasses import dataclass, field
 from decimal import Decimal
 from typing import Any
 
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from .models import RawOnChainEvent
 
+# Lignes max par INSERT multi-valeurs (limite de paramètres psycopg2 / taille de requête)
+BULK_INSERT_BATCH_SIZE = 500
+
+
+@dataclass
+class BulkInsertResult:
+    inserted: int = 0
+    skipped_existing: int = 0
+    inserted_keys: set[tuple[int, str, int]] = field(default_factory=set)
+
+
+def _event_values(data: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "chain_id": int(data["chain_id"]),
+        "block_number": data.get("block_number"),
+        "tx_hash": str(data["tx_hash"]).strip().lower(),
+        "log_index": int(data.get("log_index") or 0),
+        "contract_address": data.get("contract_address"),
+        "event_type": str(data.get("event_type") or "erc20_transfer"),
+        "wallet_address": str(data["wallet_address"]).strip().lower(),
+        "asset": str(data["asset"]).upper(),
+        "amount_raw": Decimal(str(data["amount_raw"])),
+        "payload_json": data.get("payload_json"),
+    }
+
 
 class RawOnChainEventRepository:
 
@@ -38,31 +66,58 @@ class RawOnChainEventRepository:
         Returns:
             (row, created) — ``created=False`` si déjà présent (idempotent).
         """
-        chain_id = int(data["chain_id"])
-        tx_hash = str(data["tx_hash"]).strip().lower()
-        log_index = int(data.get("log_index") or 0)
-
+        values = _event_values(data)
         existing = RawOnChainEventRepository.find_by_chain_tx_log(
             db,
-            chain_id=chain_id,
-            tx_hash=tx_hash,
-            log_index=log_index,
+            chain_id=values["chain_id"],
+            tx_hash=values["tx_hash"],
+            log_index=values["log_index"],
         )
         if existing is not None:
             return existing, False
 
-        row = RawOnChainEvent(
-            chain_id=chain_id,
-            block_number=data.get("block_number"),
-            tx_hash=tx_hash,
-            log_index=log_index,
-            contract_address=data.get("contract_address"),
-            event_type=str(data.get("event_type") or "erc20_transfer"),
-            wallet_address=str(data["wallet_address"]).strip().lower(),
-            asset=str(data["asset"]).upper(),
-            amount_raw=Decimal(str(data["amount_raw"])),
-            payload_json=data.get("payload_json"),
-        )
+        row = RawOnChainEvent(**values)
         db.add(row)
         db.flush()
         return row, True
+
+    @staticmethod
+    def bulk_insert_if_absent(
+        db: Session,
+        events: list[dict[str, Any]],
+        *,
+        batch_size: int = BULK_INSERT_BATCH_SIZE,
+    ) -> BulkInsertResult:
+        """
+        Insère un lot d'événements, idempotent sur (chain_id, tx_hash, log_index).
+
+        ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` par paquets de ``batch_size`` : une
+        requête par paquet au lieu d'un SELECT + INSERT par événement. Les doublons du lot
+        comptent comme déjà présents, donc ``inserted + skipped_existing == len(events)``.
+        """
+        out = BulkInsertResult()
+        rows: list[dict[str, Any]] = []
+        seen: set[tuple[int, str, int]] = set()
+        for data in events:
+            values = _event_values(data)
+            key = (values["chain_id"], values["tx_hash"], values["log_index"])
+            if key in seen:
+                out.skipped_existing += 1
+                continue
+            seen.add(key)
+            rows.append({"id": uuid.uuid4(), **values})
+
+        table = RawOnChainEvent.__table__
+        for i in range(0, len(rows), max(1, batch_size)):
+            chunk = rows[i:i + batch_size]
+            stmt = (
+                insert(RawOnChainEvent)
+                .values(chunk)
+                .on_conflict_do_nothing(index_elements=["chain_id", "tx_hash", "log_index"])
+                .returning(table.c.chain_id, table.c.tx_hash, table.c.log_index)
+            )
+            returned = {(int(c), str(t), int(li)) for c, t, li in db.execute(stmt).fetchall()}
+            out.inserted += len(returned)
+            out.skipped_existing += len(chunk) - len(returned)
+            out.inserted_keys |= returned
+        return out
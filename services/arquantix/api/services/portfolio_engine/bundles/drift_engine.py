@@ -17,6 +17,7 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from services.exchange.service import ExchangeService
+from services.market_data.price_snapshot import PriceSnapshot
 from services.portfolio_engine.allocations.models import TargetAllocation
 from services.portfolio_engine.assets.models import Asset
 from services.portfolio_engine.bundles.orchestrator import (
@@ -215,12 +216,25 @@ def _canonical_hash_payload(
 
 
 class _ExchangePriceResolver:
-    def __init__(self, db: Session, exchange: ExchangeService):
+    """Prix EUR via ``ExchangeService._resolve_price`` sur un seul PriceSnapshot.
+
+    Le snapshot (refresh Binance + une requête quotes / FX) est chargé au premier prix
+    demandé pour tous les ``assets`` connus : chaque actif du drift est valorisé sur les
+    mêmes cotations et le même taux EURUSDT.
+    """
+
+    def __init__(self, db: Session, exchange: ExchangeService, assets: tuple[str, ...] = ()):
         self._db = db
         self._exchange = exchange
+        self._assets = assets
+        self._snapshot: Optional[PriceSnapshot] = None
 
     def resolve_price_eur(self, asset: str) -> Decimal:
-        return self._exchange._resolve_price(self._db, asset, override_price=None, side="sell")
+        if self._snapshot is None:
+            self._snapshot = self._exchange._load_price_snapshot(self._db, [*self._assets, asset])
+        return self._exchange._resolve_price(
+            self._db, asset, override_price=None, side="sell", snapshot=self._snapshot,
+        )
 
 
 def compute_bundle_drift_snapshot(
@@ -238,12 +252,6 @@ def compute_bundle_drift_snapshot(
     entry_config = BundleOrchestrator._resolve_entry_config(product)
     entry_asset = str(entry_config["entry_asset_default"]).upper()
 
-    resolver: PriceResolver
-    if price_resolver is not None:
-        resolver = price_resolver
-    else:
-        resolver = _ExchangePriceResolver(db, exchange_service or ExchangeService())
-
     allocations = BundleOrchestrator._load_target_allocations(db, portfolio_id)
     warnings: list[str] = []
     if not allocations:
@@ -261,14 +269,26 @@ def compute_bundle_drift_snapshot(
     instrument_cache: dict[UUID, tuple[Instrument, Asset]] = {}
     target_instrument_ids: set[UUID] = {a.instrument_id for a in allocations}
 
-    for atom in atoms:
-        if atom.instrument_id not in instrument_cache:
-            instr = db.query(Instrument).filter(Instrument.id == atom.instrument_id).first()
+    for instrument_id in [*(atom.instrument_id for atom in atoms), *target_instrument_ids]:
+        if instrument_id not in instrument_cache:
+            instr = db.query(Instrument).filter(Instrument.id == instrument_id).first()
             asset_obj = (
                 db.query(Asset).filter(Asset.id == instr.asset_id).first() if instr else None
             )
             if instr and asset_obj:
-                instrument_cache[atom.instrument_id] = (instr, asset_obj)
+                instrument_cache[instrument_id] = (instr, asset_obj)
+
+    resolver: PriceResolver
+    if price_resolver is not None:
+        resolver = price_resolver
+    else:
+        snapshot_assets = {entry_asset} | {
+            BundleOrchestrator._normalize_asset_symbol(asset_obj.symbol.upper())
+            for _, asset_obj in instrument_cache.values()
+        }
+        resolver = _ExchangePriceResolver(
+            db, exchange_service or ExchangeService(), tuple(sorted(snapshot_assets)),
+        )
 
     cash_leg_qty = Decimal("0")
     spot_by_instrument: dict[UUID, Decimal] = {}
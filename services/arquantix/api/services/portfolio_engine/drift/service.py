@@ -12,12 +12,11 @@ from uuid import UUID
 from sqlalchemy.orm import Session
 
 from ..allocations.models import TargetAllocation
-from ..assets.models import Asset
-from ..instruments.models import Instrument
 from ..rebalancing.models import RebalancePolicy
 from ..rebalance_preview.enums import TradeDirection
 from ..rebalance_preview.schemas import PreviewCreate, PreviewItemCreate
 from ..rebalance_preview.service import RebalancePreviewService
+from ..valuations.batch import load_instrument_labels
 from ..valuations.schemas import PortfolioValuationResponse
 from ..valuations.service import ValuationService
 from .schemas import (
@@ -29,6 +28,7 @@ from .schemas import (
 
 ZERO = Decimal("0")
 DEFAULT_THRESHOLD = Decimal("0.05")
+_UNKNOWN_LABEL: tuple[str, Optional[str]] = ("UNKNOWN", None)
 
 
 class PortfolioNotFoundForDriftError(Exception):
@@ -108,6 +108,7 @@ class DriftRebalanceService:
             if p.pricing_status == "priced"
         }
         target_instrument_ids = {ta.instrument_id for ta in target_allocations}
+        labels = load_instrument_labels(db, [*target_instrument_ids, *priced_positions])
 
         items: list[DriftItemResult] = []
         max_abs_drift = ZERO
@@ -123,11 +124,11 @@ class DriftRebalanceService:
             max_abs_drift = max(max_abs_drift, abs_drift)
             sum_abs_drift += abs_drift
 
-            instrument, asset_symbol = self._resolve_instrument(db, ta.instrument_id)
+            instrument_code, asset_symbol = labels.get(ta.instrument_id, _UNKNOWN_LABEL)
 
             items.append(DriftItemResult(
                 instrument_id=ta.instrument_id,
-                instrument_code=instrument.code if instrument else "UNKNOWN",
+                instrument_code=instrument_code,
                 asset_symbol=asset_symbol,
                 target_weight=str(target_w),
                 current_weight=str(current_w),
@@ -144,11 +145,11 @@ class DriftRebalanceService:
                 max_abs_drift = max(max_abs_drift, abs_drift)
                 sum_abs_drift += abs_drift
 
-                instrument, asset_symbol = self._resolve_instrument(db, instr_id)
+                instrument_code, asset_symbol = labels.get(instr_id, _UNKNOWN_LABEL)
 
                 items.append(DriftItemResult(
                     instrument_id=instr_id,
-                    instrument_code=instrument.code if instrument else "UNKNOWN",
+                    instrument_code=instrument_code,
                     asset_symbol=asset_symbol,
                     target_weight="0",
                     current_weight=str(current_w),
@@ -238,6 +239,7 @@ class DriftRebalanceService:
             if p.pricing_status == "priced"
         }
         target_instrument_ids = {ta.instrument_id for ta in target_allocations}
+        labels = load_instrument_labels(db, [*target_instrument_ids, *priced_positions])
 
         trades: list[RebalanceTradeItem] = []
         sum_abs_drift = ZERO
@@ -265,11 +267,11 @@ class DriftRebalanceService:
                 delta, price_dec, min_trade_size
             )
 
-            instrument, asset_symbol = self._resolve_instrument(db, ta.instrument_id)
+            instrument_code, asset_symbol = labels.get(ta.instrument_id, _UNKNOWN_LABEL)
 
             trades.append(RebalanceTradeItem(
                 instrument_id=ta.instrument_id,
-                instrument_code=instrument.code if instrument else "UNKNOWN",
+                instrument_code=instrument_code,
                 asset_symbol=asset_symbol,
                 target_weight=str(target_w),
                 current_weight=str(current_w),
@@ -296,11 +298,11 @@ class DriftRebalanceService:
                     delta, price_dec, min_trade_size
                 )
 
-                instrument, asset_symbol = self._resolve_instrument(db, instr_id)
+                instrument_code, asset_symbol = labels.get(instr_id, _UNKNOWN_LABEL)
 
                 trades.append(RebalanceTradeItem(
                     instrument_id=instr_id,
-                    instrument_code=instrument.code if instrument else "UNKNOWN",
+                    instrument_code=instrument_code,
                     asset_symbol=asset_symbol,
                     target_weight="0",
                     current_weight=str(current_w),
@@ -408,21 +410,6 @@ class DriftRebalanceService:
             return Decimal(str(policy.min_trade_size))
         return ZERO
 
-    @staticmethod
-    def _resolve_instrument(
-        db: Session, instrument_id: UUID
-    ) -> tuple[Optional[Instrument], Optional[str]]:
-        instrument = (
-            db.query(Instrument)
-            .filter(Instrument.id == instrument_id)
-            .first()
-        )
-        asset_symbol = None
-        if instrument and instrument.asset_id:
-            asset = db.query(Asset).filter(Asset.id == instrument.asset_id).first()
-            asset_symbol = asset.symbol if asset else None
-        return instrument, asset_symbol
-
     @staticmethod
     def _compute_trade(
         delta: Decimal,
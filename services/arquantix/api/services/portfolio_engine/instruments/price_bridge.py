@@ -4,7 +4,8 @@ by looking up its market_data_instrument_id in the legacy market_data tables.
 
 No data duplication.  No new table.  No valuation engine.
 """
-from typing import Optional
+from decimal import Decimal
+from typing import Iterable, Optional
 from uuid import UUID
 
 from sqlalchemy.orm import Session
@@ -87,3 +88,42 @@ def get_instrument_price(db: Session, instrument_id: UUID) -> dict:
         "quote_time": quote.quote_time.isoformat() if quote.quote_time else None,
         "updated_at": quote.updated_at.isoformat() if quote.updated_at else None,
     }
+
+
+_IN_CHUNK = 1000
+
+
+def get_instrument_prices(db: Session, instrument_ids: Iterable[UUID]) -> dict[UUID, Decimal]:
+    """
+    Set-based counterpart of get_instrument_price: last price of many PE
+    instruments with two queries per 1000 instruments (links, then quotes).
+
+    Instruments without a market_data link, quote or last_price are absent
+    from the result (get_instrument_price would raise or return price=None).
+    """
+    ids = list(dict.fromkeys(instrument_ids))
+    links: dict[UUID, int] = {}
+    for start in range(0, len(ids), _IN_CHUNK):
+        rows = (
+            db.query(Instrument.id, Instrument.metadata_)
+            .filter(Instrument.id.in_(ids[start:start + _IN_CHUNK]))
+            .all()
+        )
+        for instrument_id, metadata in rows:
+            md_id = (metadata or {}).get("market_data_instrument_id")
+            if md_id is not None:
+                links[instrument_id] = int(md_id)
+
+    md_ids = sorted(set(links.values()))
+    last_prices: dict[int, Decimal] = {}
+    for start in range(0, len(md_ids), _IN_CHUNK):
+        rows = (
+            db.query(MarketDataLatestQuote.instrument_id, MarketDataLatestQuote.last_price)
+            .filter(MarketDataLatestQuote.instrument_id.in_(md_ids[start:start + _IN_CHUNK]))
+            .all()
+        )
+        for md_id, last_price in rows:
+            if last_price is not None:
+                last_prices[md_id] = Decimal(str(last_price))
+
+    return {iid: last_prices[md_id] for iid, md_id in links.items() if md_id in last_prices}
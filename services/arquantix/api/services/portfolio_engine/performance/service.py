@@ -7,6 +7,11 @@ Purely analytical, read-only layer. Never modifies:
 Important: The TWR implementation in v1 is snapshot-based and does not
 isolate external cash flows. Future versions may introduce true
 time-weighted return calculations using cash flow adjustments.
+
+The return series is read from pe_portfolio_return_series when it covers
+every valuation snapshot of the portfolio (the fleet snapshot engine extends
+it point by point, see series_point); otherwise it is rebuilt in memory
+from the snapshots.
 """
 from datetime import datetime, timezone
 from decimal import Decimal, InvalidOperation
@@ -14,12 +19,14 @@ from math import sqrt
 from typing import Optional
 from uuid import UUID
 
+from sqlalchemy import func as sa_func
 from sqlalchemy.orm import Session
 
 from database import MarketDataBar1d
 from ..instruments.models import Instrument
 from ..portfolios.models import Portfolio
 from ..valuations.models import PortfolioValuation
+from .models import PortfolioReturnSeries
 from .schemas import (
     BenchmarkComparison,
     PerformanceSeriesResponse,
@@ -31,6 +38,55 @@ ZERO = Decimal("0")
 ONE = Decimal("1")
 
 
+SeriesState = tuple[Decimal, Decimal, Decimal]  # (nav, growth factor, running peak NAV)
+
+
+def series_point(
+    nav: Decimal, prev: Optional[SeriesState]
+) -> tuple[dict, SeriesState]:
+    """Return-series values of a NAV appended after *prev* (None = first point).
+
+    Same arithmetic as PerformanceService._build_series, one point at a time.
+    Returns the column values (period_return, cumulative_return, drawdown) and
+    the state to carry to the next point.
+    """
+    if prev is None:
+        growth, peak = ONE, (nav if nav > ZERO else ZERO)
+        period_ret: Optional[Decimal] = None
+        cum_ret = ZERO
+    else:
+        prev_nav, growth, peak = prev
+        period_ret = None
+        if prev_nav > ZERO:
+            period_ret = (nav / prev_nav) - ONE
+            growth *= (ONE + period_ret)
+        cum_ret = growth - ONE
+        if nav > peak:
+            peak = nav
+    dd = ((nav - peak) / peak) if peak > ZERO else ZERO
+    values = {
+        "period_return": period_ret,
+        "cumulative_return": cum_ret,
+        "drawdown": dd,
+    }
+    return values, (nav, growth, peak)
+
+
+def series_state(point: PortfolioReturnSeries) -> Optional[SeriesState]:
+    """State after a stored series point; None when its running peak is unknown."""
+    nav = Decimal(str(point.nav))
+    meta = point.metadata_ or {}
+    if "growth" in meta and "peak_nav" in meta:
+        return nav, Decimal(meta["growth"]), Decimal(meta["peak_nav"])
+    # Points written by rebuild_performance: derive growth / peak from the stored ratios
+    if point.cumulative_return is None or point.drawdown is None:
+        return None
+    base = ONE + Decimal(str(point.drawdown))
+    if base <= ZERO:
+        return None
+    return nav, ONE + Decimal(str(point.cumulative_return)), nav / base
+
+
 class PortfolioNotFoundForPerformanceError(Exception):
     def __init__(self, portfolio_id: UUID):
         self.portfolio_id = portfolio_id
@@ -47,19 +103,17 @@ class PerformanceService:
         self, db: Session, portfolio_id: UUID
     ) -> PerformanceSummary:
         self._validate_portfolio(db, portfolio_id)
-        snapshots = self._load_snapshots(db, portfolio_id)
         warnings: list[str] = []
+        series = self._load_series(db, portfolio_id, warnings)
 
-        if len(snapshots) < 2:
+        if len(series) < 2:
             warnings.append("Insufficient performance data: fewer than 2 valuation snapshots")
             return PerformanceSummary(
                 portfolio_id=portfolio_id,
-                data_points=len(snapshots),
+                data_points=len(series),
                 warnings=warnings,
             )
 
-        series = self._build_series(snapshots, warnings)
-
         valid_returns = [
             r for r in (pt["period_return"] for pt in series)
             if r is not None
@@ -72,13 +126,13 @@ class PerformanceService:
 
         return PerformanceSummary(
             portfolio_id=portfolio_id,
-            period_start=snapshots[0].valuation_timestamp,
-            period_end=snapshots[-1].valuation_timestamp,
+            period_start=series[0]["timestamp"],
+            period_end=series[-1]["timestamp"],
             total_return=self._fmt(total_return),
             max_drawdown=self._fmt(max_dd),
             volatility=self._fmt(vol),
             winning_days_ratio=self._fmt(wr),
-            data_points=len(snapshots),
+            data_points=len(series),
             warnings=warnings,
         )
 
@@ -90,25 +144,22 @@ class PerformanceService:
         self, db: Session, portfolio_id: UUID
     ) -> PerformanceSeriesResponse:
         self._validate_portfolio(db, portfolio_id)
-        snapshots = self._load_snapshots(db, portfolio_id)
         warnings: list[str] = []
+        series = self._load_series(db, portfolio_id, warnings)
 
-        if len(snapshots) < 2:
+        if len(series) < 2:
             points = []
-            if snapshots:
-                nav = Decimal(str(snapshots[0].nav))
+            if series:
                 points.append(ReturnSeriesPoint(
-                    timestamp=snapshots[0].valuation_timestamp,
-                    nav=str(nav),
+                    timestamp=series[0]["timestamp"],
+                    nav=str(series[0]["nav"]),
                 ))
             return PerformanceSeriesResponse(
                 portfolio_id=portfolio_id,
                 series=points,
-                data_points=len(snapshots),
+                data_points=len(series),
             )
 
-        series = self._build_series(snapshots, warnings)
-
         points = [
             ReturnSeriesPoint(
                 timestamp=pt["timestamp"],
@@ -128,7 +179,7 @@ class PerformanceService:
             series=points,
             total_return=self._fmt(total_return),
             max_drawdown=self._fmt(max_dd),
-            data_points=len(snapshots),
+            data_points=len(series),
         )
 
     # ------------------------------------------------------------------
@@ -153,8 +204,8 @@ class PerformanceService:
         benchmark_instrument_id = UUID(benchmark_cfg["instrument_id"])
         benchmark_label = benchmark_cfg.get("label")
 
-        snapshots = self._load_snapshots(db, portfolio_id)
-        if len(snapshots) < 2:
+        portfolio_series = self._load_series(db, portfolio_id, [])
+        if len(portfolio_series) < 2:
             warnings.append("Insufficient data for benchmark comparison")
             return BenchmarkComparison(
                 portfolio_id=portfolio_id,
@@ -163,14 +214,13 @@ class PerformanceService:
                 warnings=warnings,
             )
 
-        first_ts = snapshots[0].valuation_timestamp
-        last_ts = snapshots[-1].valuation_timestamp
+        first_ts = portfolio_series[0]["timestamp"]
+        last_ts = portfolio_series[-1]["timestamp"]
 
         benchmark_return = self._resolve_benchmark_return(
             db, benchmark_instrument_id, first_ts, last_ts, warnings,
         )
 
-        portfolio_series = self._build_series(snapshots, [])
         portfolio_return = portfolio_series[-1]["cumulative_return"] if portfolio_series else None
 
         alpha = None
@@ -344,6 +394,50 @@ class PerformanceService:
         if exists is None:
             raise PortfolioNotFoundForPerformanceError(portfolio_id)
 
+    def _load_series(
+        self, db: Session, portfolio_id: UUID, warnings: list[str]
+    ) -> list[dict]:
+        """Precomputed return series when it covers every valuation snapshot,
+        else the series rebuilt from the snapshots (same point dicts)."""
+        snapshot_count = (
+            db.query(sa_func.count(PortfolioValuation.id))
+            .filter(PortfolioValuation.portfolio_id == portfolio_id)
+            .scalar()
+        ) or 0
+        rows = (
+            db.query(PortfolioReturnSeries)
+            .filter(PortfolioReturnSeries.portfolio_id == portfolio_id)
+            .order_by(PortfolioReturnSeries.timestamp.asc(), PortfolioReturnSeries.created_at.asc())
+            .all()
+        )
+        if rows and len(rows) == snapshot_count and all(r.valuation_id is not None for r in rows):
+            return self._series_from_rows(rows, warnings)
+        return self._build_series(self._load_snapshots(db, portfolio_id), warnings)
+
+    @staticmethod
+    def _series_from_rows(
+        rows: list[PortfolioReturnSeries], warnings: list[str]
+    ) -> list[dict]:
+        def _dec(v) -> Optional[Decimal]:
+            return Decimal(str(v)) if v is not None else None
+
+        series: list[dict] = []
+        for i, row in enumerate(rows):
+            if i > 0 and row.period_return is None:
+                warnings.append(
+                    f"Invalid NAV <= 0 at {row.timestamp}; "
+                    "period return set to None"
+                )
+            series.append({
+                "timestamp": row.timestamp,
+                "nav": Decimal(str(row.nav)),
+                "valuation_id": row.valuation_id,
+                "period_return": _dec(row.period_return),
+                "cumulative_return": _dec(row.cumulative_return),
+                "drawdown": _dec(row.drawdown),
+            })
+        return series
+
     @staticmethod
     def _load_snapshots(
         db: Session, portfolio_id: UUID
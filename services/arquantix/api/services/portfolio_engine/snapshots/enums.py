@@ -1 +1,7 @@
-# TODO: Enums if needed for snapshot metrics.
+"""Enums for the fleet valuation snapshot engine."""
+
+
+class SnapshotRunStatus:
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
@@ -1 +1,36 @@
-# TODO: SQLAlchemy models for portfolio_snapshots, position_snapshots. See docs/portfolio_engine/SQL_SCHEMA.md.
+"""SQLAlchemy model for pe_valuation_snapshot_runs (fleet valuation snapshots).
+
+One row per cutoff (as_of). The run pins the instrument prices used for every
+portfolio of the cutoff, so a resumed run values the remaining portfolios with
+the same prices. The snapshots themselves are pe_portfolio_valuations /
+pe_position_valuations rows with valuation_source = scheduled_snapshot.
+"""
+import uuid
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+
+from database import Base
+
+
+class ValuationSnapshotRun(Base):
+    __tablename__ = "pe_valuation_snapshot_runs"
+    __table_args__ = (
+        Index("uq_pe_valuation_snapshot_runs_as_of", "as_of", unique=True),
+        Index("ix_pe_valuation_snapshot_runs_status", "status"),
+        {"schema": "public"},
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    status = Column(String(20), nullable=False, server_default="running")
+    portfolios_total = Column(Integer, nullable=False, server_default="0")
+    portfolios_done = Column(Integer, nullable=False, server_default="0")
+    snapshots_written = Column(Integer, nullable=False, server_default="0")
+    # PE instrument id (str) -> price (str), pinned at run creation
+    prices = Column(JSONB(astext_type=Text), nullable=False, server_default="{}")
+    error_message = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
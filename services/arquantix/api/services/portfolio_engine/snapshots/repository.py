@@ -1 +1,64 @@
-# TODO: Repository for portfolio_snapshots and position_snapshots. Requires models and get_db.
+"""Repository for pe_valuation_snapshot_runs."""
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from .enums import SnapshotRunStatus
+from .models import ValuationSnapshotRun
+
+
+class SnapshotRunRepository:
+
+    @staticmethod
+    def get_by_as_of(db: Session, as_of: datetime) -> Optional[ValuationSnapshotRun]:
+        return (
+            db.query(ValuationSnapshotRun)
+            .filter(ValuationSnapshotRun.as_of == as_of)
+            .first()
+        )
+
+    @staticmethod
+    def create_if_absent(db: Session, *, data: dict) -> ValuationSnapshotRun:
+        """Insert the run of ``data["as_of"]`` unless one exists; return the stored run."""
+        db.execute(
+            insert(ValuationSnapshotRun)
+            .values(**data)
+            .on_conflict_do_nothing(index_elements=["as_of"])
+        )
+        return SnapshotRunRepository.get_by_as_of(db, data["as_of"])
+
+    @staticmethod
+    def add_progress(db: Session, run: ValuationSnapshotRun, *, portfolios: int, snapshots: int) -> None:
+        run.portfolios_done = ValuationSnapshotRun.portfolios_done + portfolios
+        run.snapshots_written = ValuationSnapshotRun.snapshots_written + snapshots
+        db.flush()
+
+    @staticmethod
+    def mark_completed(db: Session, run: ValuationSnapshotRun) -> ValuationSnapshotRun:
+        run.status = SnapshotRunStatus.COMPLETED
+        run.completed_at = datetime.now(timezone.utc)
+        run.error_message = None
+        db.flush()
+        return run
+
+    @staticmethod
+    def mark_failed(db: Session, run: ValuationSnapshotRun, *, error_message: str) -> ValuationSnapshotRun:
+        run.status = SnapshotRunStatus.FAILED
+        run.completed_at = datetime.now(timezone.utc)
+        run.error_message = error_message
+        db.flush()
+        return run
+
+    @staticmethod
+    def list_runs(db: Session, *, skip: int = 0, limit: int = 50) -> tuple[list[ValuationSnapshotRun], int]:
+        query = db.query(ValuationSnapshotRun)
+        total = query.count()
+        items = (
+            query.order_by(ValuationSnapshotRun.as_of.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return items, total
@@ -1,10 +1,29 @@
-"""Snapshots API — placeholder. See docs/portfolio_engine/PRD_MULTI_ASSET_WALLET.md."""
-from fastapi import APIRouter
+"""Snapshots API — fleet valuation snapshot runs (read-only).
+
+Runs are started by scripts/run_valuation_snapshots.py (nightly cron).
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from database import get_db
+from .repository import SnapshotRunRepository
+from .schemas import ValuationSnapshotRunListResponse, ValuationSnapshotRunRead
+from ..hardening.security.dependencies import require_admin_or_ops
 
 router = APIRouter()
+_repo = SnapshotRunRepository()
+_guard = require_admin_or_ops()
 
 
-@router.get("")
-def list_snapshots_placeholder():
-    """Placeholder: list portfolio/position snapshots. TODO: implement with repository + schemas."""
-    return {"module": "snapshots", "status": "placeholder"}
+@router.get("/runs", response_model=ValuationSnapshotRunListResponse)
+def list_snapshot_runs(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    _actor=Depends(_guard),
+):
+    items, total = _repo.list_runs(db, skip=skip, limit=limit)
+    return ValuationSnapshotRunListResponse(
+        items=[ValuationSnapshotRunRead.model_validate(i) for i in items],
+        total=total,
+    )
@@ -1 +1,25 @@
-# TODO: Pydantic schemas for snapshot API. Align with SQL_SCHEMA.
+"""Pydantic schemas for the fleet valuation snapshot engine."""
+from datetime import datetime
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class ValuationSnapshotRunRead(BaseModel):
+    id: UUID
+    as_of: datetime
+    status: str
+    portfolios_total: int
+    portfolios_done: int
+    snapshots_written: int
+    error_message: Optional[str] = None
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+
+    model_config = {"from_attributes": True}
+
+
+class ValuationSnapshotRunListResponse(BaseModel):
+    items: list[ValuationSnapshotRunRead]
+    total: int
@@ -1 +1,405 @@
-# TODO: Business logic for snapshots. Depends on repository and schemas.
+"""Fleet valuation snapshot engine (nightly).
+
+Values every active portfolio at a cutoff (as_of) and stores the result as
+scheduled_snapshot rows in pe_portfolio_valuations / pe_position_valuations,
+extending pe_portfolio_return_series so performance reads precomputed points.
+
+- One pricing snapshot: instrument prices are loaded once when the run is
+  created and pinned on the run row; every chunk (and a resumed run) values
+  with them.
+- Chunks of VALUATION_SNAPSHOT_CHUNK_SIZE portfolios run on a process pool; a
+  worker opens its own session, values the chunk with the set-based core
+  (valuations.batch), bulk inserts the rows and commits.
+- Idempotent per (portfolio, as_of): the unique partial index on scheduled
+  snapshots + INSERT ... ON CONFLICT DO NOTHING. A crashed run is resumed by
+  running the same as_of again: portfolios already snapshotted are skipped.
+- as_of is the cutoff stamped on the rows and filters portfolios by creation
+  date; positions are the open set at run time (positions have no history),
+  so a run for a past as_of values today's positions with its pinned prices.
+
+Read-only on trades, positions and ledger.
+"""
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Iterable, Mapping, Optional
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ..instruments.price_bridge import get_instrument_prices
+from ..performance.models import PortfolioReturnSeries
+from ..performance.service import SeriesState, series_point, series_state
+from ..portfolios.models import Portfolio
+from ..positions.models import PositionAtom
+from ..valuations.batch import PortfolioValue, value_portfolios
+from ..valuations.enums import ValuationSource
+from ..valuations.models import PortfolioValuation, PositionValuation
+from .enums import SnapshotRunStatus
+from .models import ValuationSnapshotRun
+from .repository import SnapshotRunRepository
+
+logger = logging.getLogger(__name__)
+
+# Nombre de processus de valorisation (1 = exécution dans le processus appelant)
+VALUATION_SNAPSHOT_WORKERS = max(1, int(os.getenv("VALUATION_SNAPSHOT_WORKERS", str(max(1, (os.cpu_count() or 2) - 1)))))
+# Portefeuilles par chunk (une transaction par chunk)
+VALUATION_SNAPSHOT_CHUNK_SIZE = max(1, int(os.getenv("VALUATION_SNAPSHOT_CHUNK_SIZE", "200")))
+
+_SOURCE = ValuationSource.SCHEDULED
+_POSITION_INSERT_BATCH = 1000
+
+_run_repo = SnapshotRunRepository()
+
+
+def _utc(ts: datetime) -> datetime:
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+
+def _active_portfolio_ids(db: Session, as_of: datetime) -> list[UUID]:
+    return [
+        pid for (pid,) in (
+            db.query(Portfolio.id)
+            .filter(Portfolio.status == "active", Portfolio.created_at <= as_of)
+            .order_by(Portfolio.id)
+            .all()
+        )
+    ]
+
+
+def _pin_prices(db: Session, portfolio_ids: list[UUID]) -> dict[str, str]:
+    """Prices of every instrument held in open spot positions, in one load."""
+    instrument_ids: set[UUID] = set()
+    for start in range(0, len(portfolio_ids), VALUATION_SNAPSHOT_CHUNK_SIZE):
+        instrument_ids.update(
+            iid for (iid,) in (
+                db.query(PositionAtom.instrument_id)
+                .filter(
+                    PositionAtom.portfolio_id.in_(portfolio_ids[start:start + VALUATION_SNAPSHOT_CHUNK_SIZE]),
+                    PositionAtom.status == "open",
+                    PositionAtom.position_type == "spot",
+                )
+                .distinct()
+                .all()
+            )
+        )
+    return {str(iid): str(price) for iid, price in get_instrument_prices(db, instrument_ids).items()}
+
+
+def _parse_prices(prices: Mapping[str, str]) -> dict[UUID, Decimal]:
+    return {UUID(iid): Decimal(price) for iid, price in prices.items()}
+
+
+def _snapshotted_ids(db: Session, portfolio_ids: list[UUID], as_of: datetime) -> set[UUID]:
+    return {
+        pid for (pid,) in (
+            db.query(PortfolioValuation.portfolio_id)
+            .filter(
+                PortfolioValuation.portfolio_id.in_(portfolio_ids),
+                PortfolioValuation.valuation_timestamp == as_of,
+                PortfolioValuation.valuation_source == _SOURCE,
+            )
+            .all()
+        )
+    }
+
+
+# ── Chunk (runs in a worker process) ───────────────────────────────
+
+
+def _portfolio_row(pf: PortfolioValue, as_of: datetime, run_id: Optional[UUID]) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "portfolio_id": pf.portfolio_id,
+        "nav": pf.nav,
+        "total_realized_pnl": pf.total_realized_pnl,
+        "total_unrealized_pnl": pf.total_unrealized_pnl,
+        "total_pnl": pf.total_pnl,
+        "priced_positions_count": pf.priced_positions_count,
+        "unpriced_positions_count": pf.unpriced_positions_count,
+        "valuation_source": _SOURCE,
+        "valuation_timestamp": as_of,
+        "metadata": {"snapshot_run_id": str(run_id)} if run_id else {},
+    }
+
+
+def _position_rows(pf: PortfolioValue, as_of: datetime) -> list[dict]:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "position_id": pv.position_id,
+            "portfolio_id": pv.portfolio_id,
+            "instrument_id": pv.instrument_id,
+            "quantity": pv.quantity,
+            "price": pv.price,
+            "market_value": pv.market_value,
+            "average_entry_price": pv.average_entry_price,
+            "unrealized_pnl": pv.unrealized_pnl,
+            "realized_pnl": pv.realized_pnl,
+            "pricing_status": pv.pricing_status,
+            "valuation_timestamp": as_of,
+        }
+        for pv in pf.positions
+    ]
+
+
+def _series_row(
+    portfolio_id: UUID, valuation_id: UUID, ts: datetime, nav: Decimal, prev: Optional[SeriesState],
+) -> tuple[dict, SeriesState]:
+    values, state = series_point(nav, prev)
+    _, growth, peak = state
+    return {
+        "id": uuid.uuid4(),
+        "portfolio_id": portfolio_id,
+        "valuation_id": valuation_id,
+        "timestamp": ts,
+        "nav": nav,
+        **values,
+        "metadata": {"source": "valuation_snapshot", "growth": str(growth), "peak_nav": str(peak)},
+    }, state
+
+
+def _latest_per_portfolio(db: Session, model, ts_col, portfolio_ids: list[UUID], exclude_ids=()) -> dict:
+    query = db.query(model).filter(model.portfolio_id.in_(portfolio_ids))
+    if exclude_ids:
+        query = query.filter(model.id.notin_(list(exclude_ids)))
+    rows = (
+        query.distinct(model.portfolio_id)
+        .order_by(model.portfolio_id, ts_col.desc(), model.created_at.desc())
+        .all()
+    )
+    return {row.portfolio_id: row for row in rows}
+
+
+def _rebuild_series(db: Session, portfolio_ids: list[UUID]) -> list[dict]:
+    """Full series of *portfolio_ids* from all their valuations (replaces existing points)."""
+    db.query(PortfolioReturnSeries).filter(
+        PortfolioReturnSeries.portfolio_id.in_(portfolio_ids)
+    ).delete(synchronize_session=False)
+    valuations = (
+        db.query(
+            PortfolioValuation.id, PortfolioValuation.portfolio_id,
+            PortfolioValuation.valuation_timestamp, PortfolioValuation.nav,
+        )
+        .filter(PortfolioValuation.portfolio_id.in_(portfolio_ids))
+        .order_by(PortfolioValuation.portfolio_id, PortfolioValuation.valuation_timestamp.asc())
+        .all()
+    )
+    rows: list[dict] = []
+    state: dict[UUID, SeriesState] = {}
+    for vid, pid, ts, nav in valuations:
+        row, state[pid] = _series_row(pid, vid, ts, Decimal(str(nav)), state.get(pid))
+        rows.append(row)
+    return rows
+
+
+def _extend_series(db: Session, inserted: dict[UUID, UUID], navs: dict[UUID, Decimal], as_of: datetime) -> int:
+    """Append the new snapshots to the return series: one point from the previous
+    point when the series is up to date, else a rebuild of that portfolio's series."""
+    pids = list(inserted)
+    prev_valuations = _latest_per_portfolio(
+        db, PortfolioValuation, PortfolioValuation.valuation_timestamp, pids, exclude_ids=inserted.values(),
+    )
+    prev_points = _latest_per_portfolio(db, PortfolioReturnSeries, PortfolioReturnSeries.timestamp, pids)
+
+    rows: list[dict] = []
+    stale: list[UUID] = []
+    for pid, valuation_id in inserted.items():
+        prev_val, prev_point = prev_valuations.get(pid), prev_points.get(pid)
+        if prev_val is None and prev_point is None:
+            rows.append(_series_row(pid, valuation_id, as_of, navs[pid], None)[0])
+            continue
+        state = series_state(prev_point) if prev_point is not None else None
+        if (
+            state is not None
+            and prev_val is not None
+            and prev_point.valuation_id == prev_val.id
+            and _utc(prev_val.valuation_timestamp) < as_of
+        ):
+            rows.append(_series_row(pid, valuation_id, as_of, navs[pid], state)[0])
+        else:
+            stale.append(pid)
+    if stale:
+        rows.extend(_rebuild_series(db, stale))
+    if rows:
+        db.execute(insert(PortfolioReturnSeries.__table__), rows)
+    return len(rows)
+
+
+def write_snapshot_chunk(
+    db: Session,
+    portfolio_ids: list[UUID],
+    *,
+    as_of: datetime,
+    prices: Mapping[UUID, Decimal],
+    run_id: Optional[UUID] = None,
+) -> dict:
+    """Value *portfolio_ids* with *prices* and insert their snapshots at *as_of*.
+
+    Portfolios already snapshotted at *as_of* are skipped. Does not commit.
+    """
+    done = _snapshotted_ids(db, portfolio_ids, as_of)
+    todo = [pid for pid in portfolio_ids if pid not in done]
+    valued = value_portfolios(db, todo, prices=prices, chunk_size=max(1, len(todo)))
+    if not valued:
+        return {"portfolios": len(portfolio_ids), "snapshots": 0, "positions": 0, "series_points": 0}
+
+    table = PortfolioValuation.__table__
+    stmt = (
+        insert(table)
+        .values([_portfolio_row(pf, as_of, run_id) for pf in valued.values()])
+        .on_conflict_do_nothing(
+            index_elements=["portfolio_id", "valuation_timestamp"],
+            index_where=text(f"valuation_source = '{_SOURCE}'"),
+        )
+        .returning(table.c.portfolio_id, table.c.id)
+    )
+    # Concurrent run of the same as_of: only the portfolios inserted here get positions / series
+    inserted = {pid: vid for pid, vid in db.execute(stmt).fetchall()}
+
+    position_rows = [row for pid in inserted for row in _position_rows(valued[pid], as_of)]
+    for start in range(0, len(position_rows), _POSITION_INSERT_BATCH):
+        db.execute(insert(PositionValuation.__table__), position_rows[start:start + _POSITION_INSERT_BATCH])
+
+    series_points = _extend_series(db, inserted, {pid: valued[pid].nav for pid in inserted}, as_of) if inserted else 0
+    return {
+        "portfolios": len(portfolio_ids),
+        "snapshots": len(inserted),
+        "positions": len(position_rows),
+        "series_points": series_points,
+    }
+
+
+def _run_chunk_in_worker(run_id: UUID, as_of: datetime, portfolio_ids: list[UUID], prices: dict[str, str]) -> dict:
+    """Process-pool entry point: own session, one transaction per chunk."""
+    from services.portfolio_engine.clients.models import Client as _Client  # noqa: F401 — force mapper init
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        result = write_snapshot_chunk(
+            db, portfolio_ids, as_of=as_of, prices=_parse_prices(prices), run_id=run_id,
+        )
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# ── Run orchestration ──────────────────────────────────────────────
+
+
+class ValuationSnapshotService:
+
+    def run(
+        self,
+        session_factory: Callable[[], Session],
+        as_of: datetime,
+        *,
+        workers: int = VALUATION_SNAPSHOT_WORKERS,
+        chunk_size: int = VALUATION_SNAPSHOT_CHUNK_SIZE,
+    ) -> ValuationSnapshotRun:
+        """Snapshot every active portfolio at *as_of* (created, or resumed if the
+        run of this cutoff exists and is not completed). Each chunk commits on its own."""
+        as_of = _utc(as_of)
+        db = session_factory()
+        try:
+            portfolio_ids = _active_portfolio_ids(db, as_of)
+            run = self._start_or_resume(db, as_of, portfolio_ids)
+            if run.status == SnapshotRunStatus.COMPLETED:
+                return run
+            run_id, prices = run.id, dict(run.prices or {})
+
+            size = max(1, chunk_size)
+            chunks = [portfolio_ids[i:i + size] for i in range(0, len(portfolio_ids), size)]
+            try:
+                for result in self._execute(session_factory, run_id, as_of, chunks, prices, workers):
+                    _run_repo.add_progress(
+                        db, run, portfolios=result["portfolios"], snapshots=result["snapshots"],
+                    )
+                    db.commit()
+            except Exception as exc:
+                db.rollback()
+                _run_repo.mark_failed(db, run, error_message=f"{type(exc).__name__}: {exc}"[:2000])
+                db.commit()
+                raise
+            _run_repo.mark_completed(db, run)
+            db.commit()
+            db.refresh(run)
+            logger.info(
+                "Valuation snapshot run %s (as_of=%s): %d portfolios, %d snapshots written",
+                run.id, as_of.isoformat(), run.portfolios_done, run.snapshots_written,
+            )
+            return run
+        finally:
+            db.close()
+
+    @staticmethod
+    def _start_or_resume(db: Session, as_of: datetime, portfolio_ids: list[UUID]) -> ValuationSnapshotRun:
+        run = _run_repo.get_by_as_of(db, as_of)
+        if run is None:
+            run = _run_repo.create_if_absent(db, data={
+                "id": uuid.uuid4(),
+                "as_of": as_of,
+                "status": SnapshotRunStatus.RUNNING,
+                "portfolios_total": len(portfolio_ids),
+                "prices": _pin_prices(db, portfolio_ids),
+            })
+        elif run.status != SnapshotRunStatus.COMPLETED:
+            # Resume: progress restarts, already snapshotted portfolios are skipped by the chunks
+            run.status = SnapshotRunStatus.RUNNING
+            run.portfolios_total = len(portfolio_ids)
+            run.portfolios_done = 0
+            run.error_message = None
+            run.completed_at = None
+            db.flush()
+        db.commit()
+        db.refresh(run)
+        return run
+
+    @staticmethod
+    def _execute(
+        session_factory: Callable[[], Session],
+        run_id: UUID,
+        as_of: datetime,
+        chunks: list[list[UUID]],
+        prices: dict[str, str],
+        workers: int,
+    ) -> Iterable[dict]:
+        if workers <= 1 or len(chunks) <= 1:
+            parsed = _parse_prices(prices)
+            for chunk in chunks:
+                db = session_factory()
+                try:
+                    result = write_snapshot_chunk(db, chunk, as_of=as_of, prices=parsed, run_id=run_id)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+                yield result
+            return
+
+        # spawn: les workers ne doivent pas hériter des connexions du pool SQLAlchemy du parent
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(chunks)),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [pool.submit(_run_chunk_in_worker, run_id, as_of, chunk, prices) for chunk in chunks]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            except Exception:
+                for f in futures:
+                    f.cancel()
+                raise
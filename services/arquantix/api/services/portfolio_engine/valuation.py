@@ -10,6 +10,9 @@ Pricing chain (invariant):
 
 FX source:
   get_fx_rate(db) → MarketDataLatestQuote WHERE provider_symbol = 'EURUSDT'
+
+Pricing helpers accept an optional request-scoped PriceSnapshot
+(services.market_data.price_snapshot) so a page reads each quote once.
 """
 from __future__ import annotations
 
@@ -21,9 +24,8 @@ from uuid import UUID
 
 from sqlalchemy.orm import Session
 
-from services.exchange.assets import ASSET_PROVIDER_SYMBOL_MAP
-from services.market_data.fx import get_eurusdt_rate, usdt_to_eur
-from database import MarketDataInstrument, MarketDataLatestQuote
+from services.market_data.fx import EURUSDT_PROVIDER_SYMBOL, usdt_to_eur
+from services.market_data.price_snapshot import PriceSnapshot, asset_provider_symbol, load_price_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -44,42 +46,59 @@ def _f(d: Decimal) -> float:
 
 # ── FX ─────────────────────────────────────────────────────────────
 
-def get_fx_rate(db: Session) -> Decimal:
+def get_fx_rate(db: Session, *, snapshot: Optional[PriceSnapshot] = None) -> Decimal:
     """EURUSDT rate from MarketDataLatestQuote (single source).
 
-    Logs the rate, source and timestamp for auditability.
+    Reads the rate and its timestamp from *snapshot* (one query loads it
+    when none is given). Logs the rate, source and timestamp for auditability.
     """
-    rate = get_eurusdt_rate(db, strict=False)
-    quote = (
-        db.query(MarketDataLatestQuote)
-        .join(MarketDataInstrument, MarketDataLatestQuote.instrument_id == MarketDataInstrument.id)
-        .filter(MarketDataInstrument.provider_symbol == "EURUSDT")
-        .first()
-    )
-    ts = quote.quote_time.isoformat() if quote and hasattr(quote, "quote_time") and quote.quote_time else "unknown"
+    if snapshot is None:
+        snapshot = load_price_snapshot(db)
+    rate = snapshot.eurusdt_rate(strict=False)
+    quote = snapshot.quote(EURUSDT_PROVIDER_SYMBOL)
+    ts = quote.quote_time.isoformat() if quote and quote.quote_time else "unknown"
     logger.info("FX EURUSDT rate=%.6f timestamp=%s source=MarketDataLatestQuote", float(rate), ts)
     return rate
 
 
 # ── Single-asset pricing ───────────────────────────────────────────
 
-def get_asset_price_eur(db: Session, asset: str, *, eurusdt_rate: Optional[Decimal] = None) -> Optional[Decimal]:
-    """Current price of 1 unit of *asset* in EUR via MarketDataLatestQuote."""
+def get_asset_price_eur(
+    db: Session,
+    asset: str,
+    *,
+    eurusdt_rate: Optional[Decimal] = None,
+    snapshot: Optional[PriceSnapshot] = None,
+) -> Optional[Decimal]:
+    """Current price of 1 unit of *asset* in EUR via MarketDataLatestQuote.
+
+    A *snapshot* that was not loaded for the asset's symbol is not read as
+    "no quote": the symbol is loaded on its own (FX stays the snapshot's).
+    """
+    provider_symbol = asset_provider_symbol(asset)
+    if snapshot is None:
+        snapshot = load_price_snapshot(db, [provider_symbol])
     if eurusdt_rate is None:
-        eurusdt_rate = get_eurusdt_rate(db, strict=False)
-    ps = ASSET_PROVIDER_SYMBOL_MAP.get(asset, f"{asset}USDT")
-    inst = db.query(MarketDataInstrument).filter(MarketDataInstrument.provider_symbol == ps).first()
-    if inst is None:
-        return None
-    quote = db.query(MarketDataLatestQuote).filter(MarketDataLatestQuote.instrument_id == inst.id).first()
-    if quote is None or quote.last_price is None:
+        eurusdt_rate = snapshot.eurusdt_rate(strict=False)
+    if not snapshot.covers([provider_symbol]):
+        logger.warning("Price snapshot does not cover %s (asset %s); loading it separately", provider_symbol, asset)
+        snapshot = load_price_snapshot(db, [provider_symbol])
+    price = snapshot.price_usdt(provider_symbol)
+    if price is None:
         return None
-    return usdt_to_eur(Decimal(str(quote.last_price)), eurusdt_rate)
+    return usdt_to_eur(price, eurusdt_rate)
 
 
-def get_asset_value_eur(db: Session, asset: str, quantity: Decimal, *, eurusdt_rate: Optional[Decimal] = None) -> Decimal:
+def get_asset_value_eur(
+    db: Session,
+    asset: str,
+    quantity: Decimal,
+    *,
+    eurusdt_rate: Optional[Decimal] = None,
+    snapshot: Optional[PriceSnapshot] = None,
+) -> Decimal:
     """Mark-to-market value of *quantity* units of *asset* in EUR."""
-    price = get_asset_price_eur(db, asset, eurusdt_rate=eurusdt_rate)
+    price = get_asset_price_eur(db, asset, eurusdt_rate=eurusdt_rate, snapshot=snapshot)
     if price is None:
         return _ZERO
     return (quantity * price).quantize(_ROUND, rounding=ROUND_HALF_UP)
@@ -131,7 +150,7 @@ def _compute_atoms_value(db: Session, portfolio_id, eurusdt_rate: Decimal) -> De
     return val
 
 
-def get_portfolio_breakdown(db: Session, client_id: UUID) -> dict:
+def get_portfolio_breakdown(db: Session, client_id: UUID, *, snapshot: Optional[PriceSnapshot] = None) -> dict:
     """Breakdown: fiat + direct crypto + bundles, all in EUR.
 
     Enforces invariant: direct + bundles ≈ crypto_total (tolerance 1€).
@@ -139,7 +158,7 @@ def get_portfolio_breakdown(db: Session, client_id: UUID) -> dict:
     """
     from services.portfolio_engine.portfolios.models import Portfolio
 
-    eurusdt_rate = get_fx_rate(db)
+    eurusdt_rate = get_fx_rate(db, snapshot=snapshot)
     fiat = get_fiat_balance_eur(db, client_id)
     crypto_total = get_crypto_value_eur(db, client_id)
 
@@ -0,0 +1,235 @@
+"""Set-based valuation core (Phase 5).
+
+Values one or many portfolios with a fixed number of queries per chunk of
+portfolios — portfolios, open positions joined to instruments and assets,
+realized PnL per portfolio, instrument prices — instead of one instrument,
+asset and quote lookup per position. Market value, unrealized PnL and
+allocation weights are then computed in one pass in memory.
+
+price_position holds the pricing rules, shared with ValuationService.value_position.
+Read-only: no DB writes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Iterable, Mapping, Optional
+from uuid import UUID
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.orm import Session
+
+from ..assets.models import Asset
+from ..instruments.models import Instrument
+from ..instruments.price_bridge import get_instrument_prices
+from ..portfolios.models import Portfolio
+from ..positions.models import PositionAtom
+from .enums import PricingStatus
+
+ZERO = Decimal("0")
+_CENT = Decimal("0.01")
+_WEIGHT_QUANT = Decimal("0.000001")
+
+# Portfolios valued per round of queries (keeps IN lists and memory bounded)
+VALUATION_CHUNK_SIZE = 500
+
+
+@dataclass
+class PositionValue:
+    position_id: UUID
+    portfolio_id: UUID
+    instrument_id: UUID
+    instrument_code: str
+    asset_symbol: Optional[str]
+    position_type: str
+    quantity: Decimal
+    average_entry_price: Optional[Decimal]
+    realized_pnl: Decimal
+    price: Optional[Decimal] = None
+    market_value: Optional[Decimal] = None
+    unrealized_pnl: Optional[Decimal] = None
+    pricing_status: str = PricingStatus.UNPRICED
+    allocation_weight: Optional[Decimal] = None
+
+
+@dataclass
+class PortfolioValue:
+    portfolio_id: UUID
+    portfolio_name: str
+    base_currency: str
+    nav: Decimal = ZERO
+    total_realized_pnl: Decimal = ZERO
+    total_unrealized_pnl: Decimal = ZERO
+    priced_positions_count: int = 0
+    unpriced_positions_count: int = 0
+    missing_avg_count: int = 0
+    positions: list[PositionValue] = field(default_factory=list)
+
+    @property
+    def total_pnl(self) -> Decimal:
+        return self.total_realized_pnl + self.total_unrealized_pnl
+
+    def warnings(self) -> list[str]:
+        warnings: list[str] = []
+        unpriced = unpriced_warning(self.unpriced_positions_count)
+        if unpriced:
+            warnings.append(unpriced)
+        if self.missing_avg_count > 0:
+            noun = "position" if self.missing_avg_count == 1 else "positions"
+            warnings.append(
+                f"{self.missing_avg_count} priced {noun} has no average entry price; "
+                f"unrealized pnl was set to 0"
+            )
+        return warnings
+
+
+def unpriced_warning(count: int) -> Optional[str]:
+    if count <= 0:
+        return None
+    noun = "position" if count == 1 else "positions"
+    return f"{count} {noun} could not be priced because no market quote link is available"
+
+
+def _dec(v) -> Decimal:
+    return Decimal(str(v)) if v is not None else ZERO
+
+
+def position_value(
+    pos: PositionAtom, instrument_code: Optional[str], asset_symbol: Optional[str]
+) -> PositionValue:
+    """Unpriced PositionValue of an open position atom (see price_position)."""
+    return PositionValue(
+        position_id=pos.id,
+        portfolio_id=pos.portfolio_id,
+        instrument_id=pos.instrument_id,
+        instrument_code=instrument_code or "UNKNOWN",
+        asset_symbol=asset_symbol,
+        position_type=pos.position_type,
+        quantity=_dec(pos.quantity),
+        average_entry_price=_dec(pos.average_entry_price) if pos.average_entry_price is not None else None,
+        realized_pnl=pos.realized_pnl or ZERO,
+    )
+
+
+def price_position(pv: PositionValue, price: Optional[Decimal]) -> None:
+    """Fill price / market value / unrealized PnL of *pv* (unpriced when *price* is None)."""
+    if price is None:
+        pv.pricing_status = PricingStatus.UNPRICED
+        return
+    pv.price = price
+    pv.market_value = (price * pv.quantity).quantize(_CENT)
+    avg = pv.average_entry_price
+    if avg is not None and avg > 0:
+        pv.unrealized_pnl = (pv.quantity * (price - avg)).quantize(_CENT)
+    else:
+        pv.unrealized_pnl = ZERO
+    pv.pricing_status = PricingStatus.PRICED
+
+
+def _finalize(pf: PortfolioValue) -> None:
+    for pv in pf.positions:
+        if pv.pricing_status != PricingStatus.PRICED:
+            pf.unpriced_positions_count += 1
+            continue
+        pf.priced_positions_count += 1
+        pf.nav += pv.market_value
+        pf.total_unrealized_pnl += pv.unrealized_pnl
+        if pv.average_entry_price is None and pv.unrealized_pnl == ZERO:
+            pf.missing_avg_count += 1
+    if pf.nav > ZERO:
+        for pv in pf.positions:
+            if pv.pricing_status == PricingStatus.PRICED:
+                pv.allocation_weight = (pv.market_value / pf.nav).quantize(_WEIGHT_QUANT)
+
+
+def _value_chunk(
+    db: Session,
+    portfolio_ids: list[UUID],
+    *,
+    prices: Optional[Mapping[UUID, Decimal]],
+    spot_only: bool,
+) -> dict[UUID, PortfolioValue]:
+    result: dict[UUID, PortfolioValue] = {
+        pid: PortfolioValue(portfolio_id=pid, portfolio_name=name, base_currency=ccy)
+        for pid, name, ccy in (
+            db.query(Portfolio.id, Portfolio.name, Portfolio.base_currency)
+            .filter(Portfolio.id.in_(portfolio_ids))
+            .all()
+        )
+    }
+    if not result:
+        return result
+
+    for pid, realized in (
+        db.query(PositionAtom.portfolio_id, sa_func.coalesce(sa_func.sum(PositionAtom.realized_pnl), 0))
+        .filter(PositionAtom.portfolio_id.in_(list(result)))
+        .group_by(PositionAtom.portfolio_id)
+        .all()
+    ):
+        result[pid].total_realized_pnl = _dec(realized)
+
+    rows = (
+        db.query(PositionAtom, Instrument.code, Asset.symbol)
+        .outerjoin(Instrument, Instrument.id == PositionAtom.instrument_id)
+        .outerjoin(Asset, Asset.id == Instrument.asset_id)
+        .filter(
+            PositionAtom.portfolio_id.in_(list(result)),
+            PositionAtom.status == "open",
+        )
+        .all()
+    )
+
+    positions: list[PositionValue] = []
+    for pos, instrument_code, asset_symbol in rows:
+        pv = position_value(pos, instrument_code, asset_symbol)
+        positions.append(pv)
+        result[pos.portfolio_id].positions.append(pv)
+
+    priceable = [pv for pv in positions if not spot_only or pv.position_type == "spot"]
+    if prices is None and priceable:
+        prices = get_instrument_prices(db, {pv.instrument_id for pv in priceable})
+    for pv in priceable:
+        price_position(pv, prices.get(pv.instrument_id))
+
+    for pf in result.values():
+        _finalize(pf)
+    return result
+
+
+def value_portfolios(
+    db: Session,
+    portfolio_ids: Iterable[UUID],
+    *,
+    prices: Optional[Mapping[UUID, Decimal]] = None,
+    spot_only: bool = True,
+    chunk_size: int = VALUATION_CHUNK_SIZE,
+) -> dict[UUID, PortfolioValue]:
+    """Value many portfolios; unknown ids are absent from the result.
+
+    *prices* (PE instrument id -> last price) pins the pricing of a batch job
+    to one snapshot; by default prices are loaded per chunk with
+    get_instrument_prices. With spot_only=False every open position with a
+    price is priced (summary semantics), not only spot positions.
+    """
+    ids = list(dict.fromkeys(portfolio_ids))
+    size = max(1, chunk_size)
+    out: dict[UUID, PortfolioValue] = {}
+    for start in range(0, len(ids), size):
+        out.update(_value_chunk(db, ids[start:start + size], prices=prices, spot_only=spot_only))
+    return out
+
+
+def load_instrument_labels(
+    db: Session, instrument_ids: Iterable[UUID]
+) -> dict[UUID, tuple[str, Optional[str]]]:
+    """(instrument code, asset symbol) per instrument, in one query."""
+    ids = list(dict.fromkeys(instrument_ids))
+    if not ids:
+        return {}
+    rows = (
+        db.query(Instrument.id, Instrument.code, Asset.symbol)
+        .outerjoin(Asset, Asset.id == Instrument.asset_id)
+        .filter(Instrument.id.in_(ids))
+        .all()
+    )
+    return {iid: (code, symbol) for iid, code, symbol in rows}
@@ -4,7 +4,7 @@ Both tables are append-only: no UPDATE, no DELETE.
 """
 import uuid
 
-from sqlalchemy import Column, ForeignKey, Integer, Numeric, String, DateTime, Index, Text
+from sqlalchemy import Column, ForeignKey, Integer, Numeric, String, DateTime, Index, Text, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 
@@ -54,6 +54,14 @@ class PortfolioValuation(Base):
         Index("ix_pe_portfolio_valuations_portfolio_id", "portfolio_id"),
         Index("ix_pe_portfolio_valuations_valuation_ts", "valuation_timestamp"),
         Index("ix_pe_portfolio_valuations_portfolio_ts", "portfolio_id", "valuation_timestamp"),
+        # One scheduled snapshot per (portfolio, as_of): fleet snapshot runs are idempotent
+        Index(
+            "uq_pe_portfolio_valuations_scheduled_pf_ts",
+            "portfolio_id",
+            "valuation_timestamp",
+            unique=True,
+            postgresql_where=text("valuation_source = 'scheduled_snapshot'"),
+        ),
         {"schema": "public"},
     )
 
@@ -3,7 +3,8 @@
 Read-only derived logic. Never modifies:
 - trades, settlements, ledger entries, position atoms, orders, executions.
 
-On-demand valuation is purely ephemeral (no DB writes).
+On-demand valuation is purely ephemeral (no DB writes); portfolios are
+valued by the set-based core in valuations.batch.
 Snapshots persist to pe_portfolio_valuations / pe_position_valuations (append-only).
 """
 from datetime import datetime, timezone
@@ -12,7 +13,6 @@ from typing import Optional
 from uuid import UUID
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sa_func
 
 from ..assets.models import Asset
 from ..instruments.models import Instrument
@@ -23,7 +23,8 @@ from ..instruments.price_bridge import (
 )
 from ..portfolios.models import Portfolio
 from ..positions.models import PositionAtom
-from .enums import PricingStatus, ValuationSource
+from .batch import PortfolioValue, PositionValue, position_value, price_position, value_portfolios
+from .enums import ValuationSource
 from .repository import ValuationRepository
 from .schemas import (
     PortfolioValuationResponse,
@@ -31,7 +32,6 @@ from .schemas import (
     PositionValuationResult,
 )
 
-ZERO = Decimal("0")
 
 
 class PortfolioNotFoundForValuationError(Exception):
@@ -66,31 +66,10 @@ class ValuationService:
         if position is None:
             raise PositionNotFoundForValuationError(position_id)
 
-        now = datetime.now(timezone.utc)
-        warnings: list[str] = []
         instrument, asset_symbol = self._resolve_instrument(db, position.instrument_id)
-        instrument_code = instrument.code if instrument else "UNKNOWN"
-
-        price_dec, market_value_dec, unrealized_dec, pricing_status = (
-            self._compute_position_metrics(db, position, warnings)
-        )
-
-        return PositionValuationResult(
-            position_id=position.id,
-            instrument_id=position.instrument_id,
-            instrument_code=instrument_code,
-            asset_symbol=asset_symbol,
-            position_type=position.position_type,
-            quantity=str(position.quantity),
-            average_entry_price=str(position.average_entry_price) if position.average_entry_price is not None else None,
-            price=str(price_dec) if price_dec is not None else None,
-            market_value=str(market_value_dec) if market_value_dec is not None else None,
-            unrealized_pnl=str(unrealized_dec) if unrealized_dec is not None else None,
-            realized_pnl=str(position.realized_pnl or ZERO),
-            allocation_weight=None,
-            pricing_status=pricing_status,
-            valuation_timestamp=now,
-        )
+        pv = position_value(position, instrument.code if instrument else None, asset_symbol)
+        price_position(pv, self._position_price(db, position))
+        return self._position_result(pv, datetime.now(timezone.utc))
 
     # ------------------------------------------------------------------
     # On-demand portfolio valuation
@@ -99,104 +78,55 @@ class ValuationService:
     def value_portfolio(
         self, db: Session, portfolio_id: UUID
     ) -> PortfolioValuationResponse:
-        portfolio = (
-            db.query(Portfolio)
-            .filter(Portfolio.id == portfolio_id)
-            .first()
-        )
-        if portfolio is None:
+        valued = value_portfolios(db, [portfolio_id])
+        if portfolio_id not in valued:
             raise PortfolioNotFoundForValuationError(portfolio_id)
+        return self._to_response(valued[portfolio_id], datetime.now(timezone.utc))
 
+    def value_portfolios(
+        self, db: Session, portfolio_ids: list[UUID]
+    ) -> dict[UUID, PortfolioValuationResponse]:
+        """Batch on-demand valuation (set-based, see valuations.batch); unknown ids are skipped."""
         now = datetime.now(timezone.utc)
-        warnings: list[str] = []
+        return {
+            pid: self._to_response(pf, now)
+            for pid, pf in value_portfolios(db, portfolio_ids).items()
+        }
 
-        open_positions = (
-            db.query(PositionAtom)
-            .filter(
-                PositionAtom.portfolio_id == portfolio_id,
-                PositionAtom.status == "open",
-            )
-            .all()
+    @staticmethod
+    def _position_result(pv: PositionValue, now: datetime) -> PositionValuationResult:
+        return PositionValuationResult(
+            position_id=pv.position_id,
+            instrument_id=pv.instrument_id,
+            instrument_code=pv.instrument_code,
+            asset_symbol=pv.asset_symbol,
+            position_type=pv.position_type,
+            quantity=str(pv.quantity),
+            average_entry_price=str(pv.average_entry_price) if pv.average_entry_price is not None else None,
+            price=str(pv.price) if pv.price is not None else None,
+            market_value=str(pv.market_value) if pv.market_value is not None else None,
+            unrealized_pnl=str(pv.unrealized_pnl) if pv.unrealized_pnl is not None else None,
+            realized_pnl=str(pv.realized_pnl),
+            allocation_weight=str(pv.allocation_weight) if pv.allocation_weight is not None else None,
+            pricing_status=pv.pricing_status,
+            valuation_timestamp=now,
         )
 
-        total_realized_all = self._aggregate_realized_pnl(db, portfolio_id)
-
-        position_results: list[dict] = []
-        total_nav = ZERO
-        total_unrealized = ZERO
-        priced_count = 0
-        unpriced_count = 0
-        missing_avg_count = 0
-
-        for pos in open_positions:
-            instrument, asset_symbol = self._resolve_instrument(db, pos.instrument_id)
-            instrument_code = instrument.code if instrument else "UNKNOWN"
-
-            price_dec, market_value_dec, unrealized_dec, pricing_status = (
-                self._compute_position_metrics(db, pos, warnings)
-            )
-
-            if pricing_status == PricingStatus.PRICED:
-                priced_count += 1
-                total_nav += market_value_dec
-                total_unrealized += unrealized_dec
-                if pos.average_entry_price is None and unrealized_dec == ZERO:
-                    missing_avg_count += 1
-            else:
-                unpriced_count += 1
-
-            position_results.append({
-                "position_id": pos.id,
-                "instrument_id": pos.instrument_id,
-                "instrument_code": instrument_code,
-                "asset_symbol": asset_symbol,
-                "position_type": pos.position_type,
-                "quantity": str(pos.quantity),
-                "average_entry_price": str(pos.average_entry_price) if pos.average_entry_price is not None else None,
-                "price": str(price_dec) if price_dec is not None else None,
-                "market_value": str(market_value_dec) if market_value_dec is not None else None,
-                "unrealized_pnl": str(unrealized_dec) if unrealized_dec is not None else None,
-                "realized_pnl": str(pos.realized_pnl or ZERO),
-                "allocation_weight": None,
-                "pricing_status": pricing_status,
-                "valuation_timestamp": now,
-            })
-
-        for row in position_results:
-            if row["pricing_status"] == PricingStatus.PRICED and total_nav > ZERO:
-                mv = Decimal(row["market_value"])
-                weight = (mv / total_nav).quantize(Decimal("0.000001"))
-                row["allocation_weight"] = str(weight)
-
-        if unpriced_count > 0:
-            noun = "position" if unpriced_count == 1 else "positions"
-            warnings.append(
-                f"{unpriced_count} {noun} could not be priced "
-                f"because no market quote link is available"
-            )
-
-        if missing_avg_count > 0:
-            noun = "position" if missing_avg_count == 1 else "positions"
-            warnings.append(
-                f"{missing_avg_count} priced {noun} has no average entry price; "
-                f"unrealized pnl was set to 0"
-            )
-
-        total_pnl = total_realized_all + total_unrealized
-
-        positions = [PositionValuationResult(**row) for row in position_results]
+    @staticmethod
+    def _to_response(pf: PortfolioValue, now: datetime) -> PortfolioValuationResponse:
+        positions = [ValuationService._position_result(pv, now) for pv in pf.positions]
 
         return PortfolioValuationResponse(
-            portfolio_id=portfolio.id,
-            portfolio_name=portfolio.name,
-            base_currency=portfolio.base_currency,
-            nav=str(total_nav),
-            total_realized_pnl=str(total_realized_all),
-            total_unrealized_pnl=str(total_unrealized),
-            total_pnl=str(total_pnl),
-            priced_positions_count=priced_count,
-            unpriced_positions_count=unpriced_count,
-            warnings=warnings,
+            portfolio_id=pf.portfolio_id,
+            portfolio_name=pf.portfolio_name,
+            base_currency=pf.base_currency,
+            nav=str(pf.nav),
+            total_realized_pnl=str(pf.total_realized_pnl),
+            total_unrealized_pnl=str(pf.total_unrealized_pnl),
+            total_pnl=str(pf.total_pnl),
+            priced_positions_count=pf.priced_positions_count,
+            unpriced_positions_count=pf.unpriced_positions_count,
+            warnings=pf.warnings(),
             positions=positions,
             valuation_timestamp=now,
         )
@@ -290,42 +220,13 @@ class ValuationService:
         return instrument, asset_symbol
 
     @staticmethod
-    def _compute_position_metrics(
-        db: Session,
-        position: PositionAtom,
-        warnings: list[str],
-    ) -> tuple[Optional[Decimal], Optional[Decimal], Optional[Decimal], str]:
-        """Returns (price, market_value, unrealized_pnl, pricing_status)."""
+    def _position_price(db: Session, position: PositionAtom) -> Optional[Decimal]:
+        """Live price of a spot position, None when it cannot be priced."""
         if position.position_type != "spot":
-            return None, None, None, PricingStatus.UNPRICED
-
+            return None
         try:
             result = get_instrument_price(db, position.instrument_id)
         except (MarketDataLinkMissingError, QuoteNotAvailableError):
-            return None, None, None, PricingStatus.UNPRICED
-
+            return None
         price_str = result.get("price")
-        if price_str is None:
-            return None, None, None, PricingStatus.UNPRICED
-
-        price_dec = Decimal(price_str)
-        quantity = Decimal(str(position.quantity)) if position.quantity is not None else ZERO
-        market_value = (price_dec * quantity).quantize(Decimal("0.01"))
-
-        avg_price = position.average_entry_price
-        if avg_price is not None and avg_price > 0:
-            unrealized = (quantity * (price_dec - Decimal(str(avg_price)))).quantize(Decimal("0.01"))
-        else:
-            unrealized = ZERO
-
-        return price_dec, market_value, unrealized, PricingStatus.PRICED
-
-    @staticmethod
-    def _aggregate_realized_pnl(db: Session, portfolio_id: UUID) -> Decimal:
-        """Sum realized_pnl across ALL positions (open + closed) for the portfolio."""
-        result = (
-            db.query(sa_func.coalesce(sa_func.sum(PositionAtom.realized_pnl), 0))
-            .filter(PositionAtom.portfolio_id == portfolio_id)
-            .scalar()
-        )
-        return Decimal(str(result))
+        return Decimal(price_str) if price_str is not None else None
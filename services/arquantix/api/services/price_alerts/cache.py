@@ -10,11 +10,17 @@ Price tracking (per-source for bid/ask/mid crossing):
   prices:{ASSET}:last_mid — string
 
 Bucket count is configurable (NUM_BUCKETS). Default 4.
+
+Atomic claim (claim_crossed_alerts): a server-side script pops the members crossed
+between two prices from one bucket (ZRANGEBYSCORE + ZREMRANGEBYSCORE in one step), so two
+engine processes never receive the same crossed alert. The per-bucket calls are
+pipelined: one round trip per asset/direction, each script touching a single key.
 """
 import hashlib
 import logging
 from typing import Optional
 
+from redis.exceptions import NoScriptError
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
@@ -147,6 +153,73 @@ def get_crossed_alert_ids(
     return [aid for aid, _ in get_crossed_alert_ids_sorted(r, asset, direction, low, high)]
 
 
+# ---------------------------------------------------------------------------
+# Atomic claim (server-side script)
+# ---------------------------------------------------------------------------
+
+# KEYS[1] = alerts:{ASSET}:{direction}:{bucket}, ARGV = low, high (inclusive)
+# Returns the popped members as a flat [member, score, ...] list, score ASC.
+_CLAIM_CROSSED_LUA = """
+local crossed = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[2], 'WITHSCORES')
+if #crossed > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], ARGV[1], ARGV[2])
+end
+return crossed
+"""
+_CLAIM_CROSSED_SHA = hashlib.sha1(_CLAIM_CROSSED_LUA.encode()).hexdigest()
+
+
+def supports_atomic_claim(r) -> bool:
+    """True for clients able to run server-side scripts (redis-py); in-memory fakes are not."""
+    return r is not None and callable(getattr(r, "evalsha", None))
+
+
+def _claim_buckets(r, asset: str, direction: str, low: float, high: float) -> list:
+    pipe = r.pipeline(transaction=False)
+    for bucket in range(NUM_BUCKETS):
+        pipe.evalsha(_CLAIM_CROSSED_SHA, 1, _direction_key(asset, direction, bucket), repr(low), repr(high))
+    return pipe.execute()
+
+
+def claim_crossed_alerts(
+    r,
+    asset: str,
+    direction: str,
+    low: float,
+    high: float,
+) -> list[tuple[str, float]]:
+    """Atomically pop the alerts crossed in [low, high] from every bucket.
+
+    Same order as get_crossed_alert_ids_sorted (ASC for up, DESC for down), ties broken by
+    alert id. The claimed alerts are no longer in the cache: the caller puts back those that
+    stay active (restore_claimed_alerts).
+    """
+    if r is None:
+        return []
+    try:
+        results = _claim_buckets(r, asset, direction, low, high)
+    except NoScriptError:
+        # Script cache flushed or new server: NOSCRIPT fails the whole pipeline, nothing was popped
+        r.script_load(_CLAIM_CROSSED_LUA)
+        results = _claim_buckets(r, asset, direction, low, high)
+
+    pairs: list[tuple[str, float]] = []
+    for flat in results:
+        pairs.extend((flat[i], float(flat[i + 1])) for i in range(0, len(flat), 2))
+    pairs.sort(key=lambda x: (x[1], x[0]), reverse=direction == "down")
+    return pairs
+
+
+def restore_claimed_alerts(r, asset: str, direction: str, pairs: list[tuple[str, float]]) -> None:
+    """Put claimed alerts that stay active back in their bucket (one pipelined round trip)."""
+    if r is None or not pairs:
+        return
+    pipe = r.pipeline(transaction=False)
+    for alert_id, score in pairs:
+        pipe.zadd(_direction_key(asset, direction, _bucket_for(alert_id)), {alert_id: score})
+    pipe.execute()
+
+
 # ---------------------------------------------------------------------------
 # Price tracking (per-source)
 # ---------------------------------------------------------------------------
@@ -12,8 +12,17 @@ Order execution hardening:
   - Pre-execution price check (skip if price moved beyond safety bounds)
   - Retry window (max 3 attempts within 1s window)
   - Partial fill detection and metadata tracking
+  - Execution off the tick path: with an OrderExecutor (services/price_alerts/execution.py)
+    the tick only claims the alert (execution_status='queued' + idempotency key) and the
+    exchange calls run on the executor's worker pool
+
+Horizontal safety: with a redis-py client the crossed alerts are popped from the sorted sets
+by a server-side script (cache.claim_crossed_alerts) — one round trip per asset/direction,
+and an alert is handed to a single engine process. The claimed alerts that stay active
+(recurring, other price source, cooldown, rolled back) are put back after the DB commit.
 """
 import logging
+import os
 import time
 from datetime import datetime, timezone
 from typing import Optional
@@ -21,25 +30,37 @@ from typing import Optional
 from sqlalchemy.orm import Session
 
 from services.price_alerts.cache import (
-    add_alert_to_cache,
     check_notif_dedup,
+    claim_crossed_alerts,
     get_and_set_price,
     get_crossed_alert_ids_sorted,
     remove_alert_from_cache,
+    restore_claimed_alerts,
+    supports_atomic_claim,
 )
 from services.price_alerts.metrics import LatencyTimer, get_metrics
 
 logger = logging.getLogger(__name__)
 
 MAX_PROCESSING_MS = 50.0
+# Claim atomique des alertes franchies (script Redis) ; false = lecture puis retrait en Python
+ATOMIC_CLAIM = os.getenv("PRICE_ALERT_ATOMIC_CLAIM", "true").lower() in ("1", "true", "yes")
+
+
+def order_idempotency_key(alert) -> str:
+    """Key of one trigger of an order alert; exchange external_reference = key + '-' + attempt."""
+    return f"trigger-{alert.id}-{alert.trigger_count or 0}"
 
 
 class PriceAlertEngine:
     """Stateless engine — all state lives in Redis + PostgreSQL."""
 
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, order_executor=None):
         self.redis = redis_client
-        self._deferred: list[tuple[str, str, float, str, str]] = []
+        self.order_executor = order_executor
+        self.atomic_claim = ATOMIC_CLAIM and supports_atomic_claim(redis_client)
+        # (alert_id, asset, price, source, direction, claimed score or None)
+        self._deferred: list[tuple[str, str, float, str, str, Optional[float]]] = []
 
     def on_price_batch(self, ticks: dict[str, dict], db_factory) -> int:
         """Process a batch of price ticks. Returns total triggered alerts."""
@@ -99,11 +120,13 @@ class PriceAlertEngine:
             return 0
 
         if current_price > prev_price:
-            pairs = get_crossed_alert_ids_sorted(self.redis, asset, "up", prev_price, current_price)
-            direction = "up"
+            direction, low, high = "up", prev_price, current_price
         else:
-            pairs = get_crossed_alert_ids_sorted(self.redis, asset, "down", current_price, prev_price)
-            direction = "down"
+            direction, low, high = "down", current_price, prev_price
+        if self.atomic_claim:
+            pairs = claim_crossed_alerts(self.redis, asset, direction, low, high)
+        else:
+            pairs = get_crossed_alert_ids_sorted(self.redis, asset, direction, low, high)
 
         if not pairs:
             return 0
@@ -113,7 +136,8 @@ class PriceAlertEngine:
             "Crossing detected: asset=%s source=%s direction=%s prev=%.2f curr=%.2f candidates=%d ids=%s",
             asset, source, direction, prev_price, current_price, len(ids), ids[:5],
         )
-        return self._process_triggered(ids, asset, current_price, source, direction, tick_time, db_factory)
+        claimed = dict(pairs) if self.atomic_claim else None
+        return self._process_triggered(ids, asset, current_price, source, direction, tick_time, db_factory, claimed)
 
     def _process_triggered(
         self,
@@ -124,13 +148,25 @@ class PriceAlertEngine:
         direction: str,
         tick_time: datetime,
         db_factory,
+        claimed: Optional[dict[str, float]] = None,
     ) -> int:
+        """Trigger the crossed alerts in one transaction.
+
+        claimed: alert_id -> score of alerts popped from the cache by claim_crossed_alerts;
+        those still active at the end are put back (after the commit, rows unlocked).
+        """
         from services.price_alerts.models import PriceAlert
 
         metrics = get_metrics()
         db: Optional[Session] = None
         triggered = 0
         start = time.monotonic()
+        order_alerts: list = []
+        order_jobs: Optional[list] = [] if self.order_executor is not None else None
+        # claimed ids that must not go back to the cache: stale / deferred, and once-alerts
+        # triggered by this transaction (only if it commits)
+        claimed_out: set[str] = set()
+        triggered_out: set[str] = set()
 
         # Deduplicate IDs (same alert can appear in multiple buckets)
         seen_ids: set[str] = set()
@@ -163,7 +199,9 @@ class PriceAlertEngine:
                 for aid in alert_ids:
                     a = alert_map.get(aid)
                     if a is None:
-                        remove_alert_from_cache(self.redis, aid, asset, direction)
+                        if claimed is None:
+                            remove_alert_from_cache(self.redis, aid, asset, direction)
+                        claimed_out.add(aid)
                         logger.debug("Removed stale cache entry: id=%s asset=%s dir=%s", aid, asset, direction)
                         continue
                     if a.price_source != source:
@@ -189,7 +227,9 @@ class PriceAlertEngine:
                         remaining = [str(a.id) for a in simple_alerts if str(a.id) not in {str(x.id) for x in order_alerts + simple_alerts[:simple_alerts.index(alert)]}]
                         if remaining:
                             for rid in remaining:
-                                self._deferred.append((rid, asset, current_price, source, direction))
+                                score = claimed.get(rid) if claimed is not None else None
+                                self._deferred.append((rid, asset, current_price, source, direction, score))
+                            claimed_out.update(remaining)
                             metrics.record_deferred(len(remaining))
                             logger.warning(
                                 "Latency budget exceeded (%.1fms > %.1fms), deferred %d alert(s) for %s",
@@ -197,9 +237,11 @@ class PriceAlertEngine:
                             )
                         break
 
-                    result = self._trigger_single(alert, asset, current_price, source, direction, now, db)
+                    result = self._trigger_single(alert, asset, current_price, source, direction, now, db, order_jobs)
                     if result:
                         triggered += 1
+                        if getattr(alert, "trigger_mode", "once") != "recurring":
+                            triggered_out.add(str(alert.id))
 
                 if triggered > 0:
                     db.commit()
@@ -207,6 +249,12 @@ class PriceAlertEngine:
                         "Triggered %d alert(s) for %s [%s] at %.2f (%.1fms)",
                         triggered, asset, source, current_price, timer.elapsed_ms,
                     )
+                if order_jobs:
+                    # Claims are committed: the executor's workers can pick them up.
+                    # Detection latency is measured from the tick, not from this batch.
+                    for job in order_jobs:
+                        job.tick_time = tick_time
+                    self.order_executor.submit_many(order_jobs)
             except Exception:
                 if db is not None:
                     db.rollback()
@@ -215,15 +263,32 @@ class PriceAlertEngine:
                 self._rescue_failed_orders(
                     order_alerts, asset, direction, db_factory,
                 )
+                if order_jobs:
+                    # Rescued claims stay 'queued'; the worker re-checks the row before executing
+                    self.order_executor.submit_many(order_jobs)
+                # Rolled back: only the order alerts handed to the rescue stay out of the cache
+                triggered_out = {str(a.id) for a in order_alerts}
             finally:
                 if db is not None:
                     db.close()
+                if claimed:
+                    self._restore_claimed(claimed, claimed_out | triggered_out, asset, direction)
 
         if triggered > 0:
             metrics.record_trigger(asset, triggered, timer.elapsed_ms)
 
         return triggered
 
+    def _restore_claimed(self, claimed: dict[str, float], keep_out: set[str], asset: str, direction: str) -> None:
+        pairs = [(aid, score) for aid, score in claimed.items() if aid not in keep_out]
+        if not pairs:
+            return
+        try:
+            restore_claimed_alerts(self.redis, asset, direction, pairs)
+        except Exception:
+            get_metrics().record_redis_error()
+            logger.exception("Failed to restore %d claimed alert(s) for %s/%s", len(pairs), asset, direction)
+
     def _trigger_single(
         self,
         alert,
@@ -233,8 +298,13 @@ class PriceAlertEngine:
         direction: str,
         now: datetime,
         db: Session,
+        order_jobs: Optional[list] = None,
     ) -> bool:
-        """Process a single alert. Returns True if triggered."""
+        """Process a single alert. Returns True if triggered.
+
+        Order alerts are executed inline, or only claimed for the execution pool
+        when order_jobs is given (the caller submits the jobs after its commit).
+        """
         metrics = get_metrics()
 
         if alert.cooldown_seconds and alert.cooldown_seconds > 0 and alert.last_triggered_at is not None:
@@ -268,16 +338,21 @@ class PriceAlertEngine:
                 "cross_price": current_price,
                 "cross_timestamp": now.isoformat(),
             }
-            remove_alert_from_cache(self.redis, str(alert.id), asset, alert.direction)
+            if not self.atomic_claim:
+                # claimed alerts were already popped from the cache
+                remove_alert_from_cache(self.redis, str(alert.id), asset, alert.direction)
 
         if alert.action_type == "order" and alert.order_payload:
-            alert.execution_status = "pending"
             logger.info(
                 "Order trigger: id=%s asset=%s side=%s type=%s trigger=%.2f cross=%.2f source=%s",
                 alert.id, asset, alert.order_payload.get("side"), alert.order_payload.get("order_type"),
                 float(alert.target_price), current_price, source,
             )
-            self._execute_order_hook(alert, db)
+            if order_jobs is not None:
+                order_jobs.append(self.order_executor.claim(alert, now))
+            else:
+                alert.execution_status = "pending"
+                self._execute_order_hook(alert, db)
         else:
             is_dedup = check_notif_dedup(self.redis, str(alert.client_id), asset, direction)
             if is_dedup:
@@ -316,6 +391,7 @@ class PriceAlertEngine:
                     row.triggered_at = alert.triggered_at or datetime.now(timezone.utc)
                     row.triggered_price = alert.triggered_price
                     exec_status = getattr(alert, "execution_status", None)
+                    # 'queued' = claimed for the execution pool, nothing sent to the exchange yet
                     row.execution_status = exec_status if exec_status != "pending" else "failed"
                     row.metadata_ = {
                         **(alert.metadata_ or {}),
@@ -344,15 +420,21 @@ class PriceAlertEngine:
 
         by_key: dict[tuple[str, str, str], list[str]] = {}
         price_map: dict[tuple[str, str, str], float] = {}
-        for aid, asset, price, source, direction in batch:
+        claimed_map: dict[tuple[str, str, str], dict[str, float]] = {}
+        for aid, asset, price, source, direction, score in batch:
             key = (asset, source, direction)
             by_key.setdefault(key, []).append(aid)
             price_map[key] = price
+            if score is not None:
+                claimed_map.setdefault(key, {})[aid] = score
 
         for key, ids in by_key.items():
             asset, source, direction = key
             price = price_map[key]
-            self._process_triggered(ids, asset, price, source, direction, datetime.now(timezone.utc), db_factory)
+            self._process_triggered(
+                ids, asset, price, source, direction, datetime.now(timezone.utc), db_factory,
+                claimed_map.get(key),
+            )
 
     @staticmethod
     def _enqueue_notification(alert, asset: str, current_price: float) -> None:
@@ -431,40 +513,15 @@ class PriceAlertEngine:
     _ORDER_DEFAULT_SAFETY_BPS = 200  # 2% default safety margin when no slippage_bps
 
     def _execute_order_hook(self, alert, db: Session) -> None:
+        """Inline execution (no execution pool): all attempts run in the caller's transaction."""
         metrics = get_metrics()
         if alert.execution_status != "pending":
             return
         try:
-            from decimal import Decimal
-            from uuid import uuid4
-            from services.exchange.service import ExchangeService
-            from services.exchange.schemas import ExchangeBuyRequest, ExchangeSellRequest
-            from services.portfolio_engine.hardening.security.context import ActorContext
-
-            payload = alert.order_payload or {}
-            side = payload.get("side")
-            amount = payload.get("amount")
-
-            if not side or not amount:
-                alert.execution_status = "failed"
-                alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": "missing_side_or_amount"}
-                metrics.record_order_failed()
+            prepared = self._prepare_order(alert)
+            if prepared is None:
                 return
-
-            if side not in ("buy", "sell"):
-                alert.execution_status = "failed"
-                alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": f"invalid_side:{side}"}
-                metrics.record_order_failed()
-                return
-
-            slippage_bps = payload.get("slippage_bps")
-            safety_bps = float(slippage_bps) if slippage_bps else float(self._ORDER_DEFAULT_SAFETY_BPS)
-            if not self._pre_execution_price_check(alert, side, safety_bps):
-                return
-
-            svc = ExchangeService()
-            actor = ActorContext(actor_type="trigger_engine", actor_id=str(alert.id))
-            remaining_amount = Decimal(str(amount))
+            side, amount, slippage_bps = prepared
 
             result = None
             attempt = 0
@@ -484,27 +541,8 @@ class PriceAlertEngine:
                         break
                     time.sleep(0.1)
 
-                ext_ref = f"trigger-{alert.id}-{uuid4().hex[:8]}"
-
                 try:
-                    if side == "buy":
-                        req = ExchangeBuyRequest(
-                            client_id=alert.client_id,
-                            asset=alert.asset,
-                            fiat_amount=remaining_amount,
-                            currency="EUR",
-                            external_reference=ext_ref,
-                        )
-                        result = svc.buy(db, req, actor)
-                    else:
-                        req = ExchangeSellRequest(
-                            client_id=alert.client_id,
-                            asset=alert.asset,
-                            amount_crypto=remaining_amount,
-                            currency="EUR",
-                            external_reference=ext_ref,
-                        )
-                        result = svc.sell(db, req, actor)
+                    result = self._call_exchange(alert, db, side, amount, f"{order_idempotency_key(alert)}-{attempt}")
                 except Exception as exc:
                     last_error = f"{type(exc).__name__}: {exc}"
                     logger.exception("Exchange call failed for alert %s (attempt %d/%d)", alert.id, attempt, self._ORDER_MAX_ATTEMPTS)
@@ -514,122 +552,197 @@ class PriceAlertEngine:
                 if result and result.get("status") == "completed":
                     break
 
-                last_error = (result.get("reason") or result.get("error") or "unknown") if result else "no_response"
+                last_error = self._result_error(result)
                 logger.warning(
                     "Order attempt %d/%d failed for alert %s: %s",
                     attempt, self._ORDER_MAX_ATTEMPTS, alert.id, last_error,
                 )
 
-            if result is None or result.get("status") != "completed":
-                alert.execution_status = "failed"
-                reason = "all_attempts_failed"
-                if result:
-                    reason = result.get("reason") or result.get("error") or "exchange_error"
-                alert.metadata_ = {
-                    **(alert.metadata_ or {}),
-                    "failure_reason": reason,
-                    "failure_detail": last_error,
-                    "exchange_status": result.get("status") if result else None,
-                    "attempts": attempt,
-                }
-                metrics.record_order_failed()
-                logger.warning("Order execution failed for alert %s after %d attempt(s): %s", alert.id, attempt, reason)
-                return
+            self._finalize_order(alert, side, amount, slippage_bps, result, attempt, last_error)
 
-            exec_price = result.get("price")
-            if slippage_bps and exec_price and alert.target_price:
-                trigger_px = float(alert.target_price)
-                exec_px = float(exec_price)
-                actual_bps = abs(exec_px - trigger_px) / trigger_px * 10000
-                if actual_bps > float(slippage_bps):
-                    alert.execution_status = "failed"
-                    alert.metadata_ = {
-                        **(alert.metadata_ or {}),
-                        "failure_reason": "slippage_exceeded",
-                        "slippage_bps_actual": round(actual_bps, 1),
-                        "slippage_bps_max": slippage_bps,
-                        "execution_price": float(exec_price),
-                        "attempts": attempt,
-                    }
-                    metrics.record_order_failed()
-                    logger.warning(
-                        "Slippage exceeded for alert %s: actual=%.1fbps max=%dbps",
-                        alert.id, actual_bps, slippage_bps,
-                    )
-                    return
+        except Exception:
+            alert.execution_status = "failed"
+            alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": "exception"}
+            metrics.record_order_failed()
+            logger.exception("Order execution failed for alert %s", alert.id)
 
-            filled_crypto = result.get("amount_crypto")
-            filled_fiat = result.get("amount_fiat") or result.get("net_eur")
-            requested = float(amount)
+        finally:
+            self._guard_terminal_status(alert)
 
-            if side == "buy":
-                filled_amount = float(filled_fiat or 0)
-            else:
-                filled_amount = float(filled_crypto or 0)
+    def _prepare_order(self, alert) -> Optional[tuple[str, object, object]]:
+        """Validate the order payload and check the live price. Returns (side, amount, slippage_bps) or None (failed)."""
+        metrics = get_metrics()
+        payload = alert.order_payload or {}
+        side = payload.get("side")
+        amount = payload.get("amount")
+
+        if not side or not amount:
+            alert.execution_status = "failed"
+            alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": "missing_side_or_amount"}
+            metrics.record_order_failed()
+            return None
+
+        if side not in ("buy", "sell"):
+            alert.execution_status = "failed"
+            alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": f"invalid_side:{side}"}
+            metrics.record_order_failed()
+            return None
+
+        slippage_bps = payload.get("slippage_bps")
+        safety_bps = float(slippage_bps) if slippage_bps else float(self._ORDER_DEFAULT_SAFETY_BPS)
+        if not self._pre_execution_price_check(alert, side, safety_bps):
+            return None
+        return side, amount, slippage_bps
+
+    @staticmethod
+    def _call_exchange(alert, db: Session, side: str, amount, ext_ref: str) -> Optional[dict]:
+        """One exchange call (buy: fiat amount, sell: crypto amount) in the given session."""
+        from decimal import Decimal
+        from services.exchange.service import ExchangeService
+        from services.exchange.schemas import ExchangeBuyRequest, ExchangeSellRequest
+        from services.portfolio_engine.hardening.security.context import ActorContext
+
+        svc = ExchangeService()
+        actor = ActorContext(actor_type="trigger_engine", actor_id=str(alert.id))
+        if side == "buy":
+            req = ExchangeBuyRequest(
+                client_id=alert.client_id,
+                asset=alert.asset,
+                fiat_amount=Decimal(str(amount)),
+                currency="EUR",
+                external_reference=ext_ref,
+            )
+            return svc.buy(db, req, actor)
+        req = ExchangeSellRequest(
+            client_id=alert.client_id,
+            asset=alert.asset,
+            amount_crypto=Decimal(str(amount)),
+            currency="EUR",
+            external_reference=ext_ref,
+        )
+        return svc.sell(db, req, actor)
 
-            remaining_amount = max(0.0, requested - filled_amount)
+    @staticmethod
+    def _result_error(result: Optional[dict]) -> str:
+        return (result.get("reason") or result.get("error") or "unknown") if result else "no_response"
 
-            if requested > 0 and filled_amount <= 0:
+    def _finalize_order(
+        self,
+        alert,
+        side: str,
+        amount,
+        slippage_bps,
+        result: Optional[dict],
+        attempt: int,
+        last_error: Optional[str],
+    ) -> None:
+        """Terminal execution_status (failed / partial / executed) from the last exchange result."""
+        metrics = get_metrics()
+        if result is None or result.get("status") != "completed":
+            alert.execution_status = "failed"
+            reason = "all_attempts_failed"
+            if result:
+                reason = result.get("reason") or result.get("error") or "exchange_error"
+            alert.metadata_ = {
+                **(alert.metadata_ or {}),
+                "failure_reason": reason,
+                "failure_detail": last_error,
+                "exchange_status": result.get("status") if result else None,
+                "attempts": attempt,
+            }
+            metrics.record_order_failed()
+            logger.warning("Order execution failed for alert %s after %d attempt(s): %s", alert.id, attempt, reason)
+            return
+
+        exec_price = result.get("price")
+        if slippage_bps and exec_price and alert.target_price:
+            trigger_px = float(alert.target_price)
+            exec_px = float(exec_price)
+            actual_bps = abs(exec_px - trigger_px) / trigger_px * 10000
+            if actual_bps > float(slippage_bps):
                 alert.execution_status = "failed"
                 alert.metadata_ = {
                     **(alert.metadata_ or {}),
-                    "failure_reason": "zero_fill",
-                    "filled_amount": 0,
-                    "remaining_amount": requested,
+                    "failure_reason": "slippage_exceeded",
+                    "slippage_bps_actual": round(actual_bps, 1),
+                    "slippage_bps_max": slippage_bps,
+                    "execution_price": float(exec_price),
                     "attempts": attempt,
                 }
                 metrics.record_order_failed()
-                logger.warning("Order zero-fill for alert %s", alert.id)
+                logger.warning(
+                    "Slippage exceeded for alert %s: actual=%.1fbps max=%dbps",
+                    alert.id, actual_bps, slippage_bps,
+                )
                 return
 
-            is_partial = (filled_amount / requested) < 0.995 if requested > 0 else False
+        filled_crypto = result.get("amount_crypto")
+        filled_fiat = result.get("amount_fiat") or result.get("net_eur")
+        requested = float(amount)
 
-            if is_partial:
-                alert.execution_status = "partial"
-                metrics.record_partial_fill()
-                metrics.record_partial_remaining(remaining_amount)
-                logger.info(
-                    "Order partial fill for alert %s: filled=%.4f / requested=%.4f remaining=%.4f",
-                    alert.id, filled_amount, requested, remaining_amount,
-                )
-            else:
-                alert.execution_status = "executed"
-                metrics.record_order_executed()
+        if side == "buy":
+            filled_amount = float(filled_fiat or 0)
+        else:
+            filled_amount = float(filled_crypto or 0)
+
+        remaining_amount = max(0.0, requested - filled_amount)
 
+        if requested > 0 and filled_amount <= 0:
+            alert.execution_status = "failed"
             alert.metadata_ = {
                 **(alert.metadata_ or {}),
-                "execution_price": float(exec_price) if exec_price else None,
-                "order_id": str(result.get("order_id")) if result.get("order_id") else None,
-                "amount_crypto": float(filled_crypto or 0),
-                "amount_fiat": float(filled_fiat or 0),
-                "filled_amount": filled_amount,
-                "remaining_amount": remaining_amount,
+                "failure_reason": "zero_fill",
+                "filled_amount": 0,
+                "remaining_amount": requested,
                 "attempts": attempt,
-                "partial_fill": is_partial,
-                "can_retry_remaining": is_partial,
             }
+            metrics.record_order_failed()
+            logger.warning("Order zero-fill for alert %s", alert.id)
+            return
+
+        is_partial = (filled_amount / requested) < 0.995 if requested > 0 else False
+
+        if is_partial:
+            alert.execution_status = "partial"
+            metrics.record_partial_fill()
+            metrics.record_partial_remaining(remaining_amount)
             logger.info(
-                "Order %s for alert %s: side=%s asset=%s price=%s attempts=%d",
-                alert.execution_status, alert.id, side, alert.asset, exec_price, attempt,
+                "Order partial fill for alert %s: filled=%.4f / requested=%.4f remaining=%.4f",
+                alert.id, filled_amount, requested, remaining_amount,
             )
+        else:
+            alert.execution_status = "executed"
+            metrics.record_order_executed()
+
+        alert.metadata_ = {
+            **(alert.metadata_ or {}),
+            "execution_price": float(exec_price) if exec_price else None,
+            "order_id": str(result.get("order_id")) if result.get("order_id") else None,
+            "amount_crypto": float(filled_crypto or 0),
+            "amount_fiat": float(filled_fiat or 0),
+            "filled_amount": filled_amount,
+            "remaining_amount": remaining_amount,
+            "attempts": attempt,
+            "partial_fill": is_partial,
+            "can_retry_remaining": is_partial,
+        }
+        logger.info(
+            "Order %s for alert %s: side=%s asset=%s price=%s attempts=%d",
+            alert.execution_status, alert.id, side, alert.asset, exec_price, attempt,
+        )
 
-            self._enqueue_order_notification(alert, side, result)
+        self._enqueue_order_notification(alert, side, result)
 
-        except Exception:
+    @staticmethod
+    def _guard_terminal_status(alert) -> None:
+        if alert.execution_status == "pending":
             alert.execution_status = "failed"
-            alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": "exception"}
-            metrics.record_order_failed()
-            logger.exception("Order execution failed for alert %s", alert.id)
-
-        finally:
-            if alert.execution_status == "pending":
-                alert.execution_status = "failed"
-                alert.metadata_ = {
-                    **(alert.metadata_ or {}),
-                    "failure_reason": "unexpected_non_terminal_exit",
-                }
-                metrics.record_order_failed()
-                logger.error("SAFETY GUARD: order %s exited hook still pending — forced to failed", alert.id)
+            alert.metadata_ = {
+                **(alert.metadata_ or {}),
+                "failure_reason": "unexpected_non_terminal_exit",
+            }
+            get_metrics().record_order_failed()
+            logger.error("SAFETY GUARD: order %s exited hook still pending — forced to failed", alert.id)
 
     def _pre_execution_price_check(self, alert, side: str, safety_bps: float) -> bool:
         """Check live price from Redis before executing. Returns False if skipped."""
@@ -718,11 +831,18 @@ def get_alert_engine() -> Optional[PriceAlertEngine]:
     return _engine_instance
 
 
-def init_alert_engine(redis_client) -> Optional[PriceAlertEngine]:
+def init_alert_engine(redis_client, db_factory=None) -> Optional[PriceAlertEngine]:
+    """Create the engine; with a db_factory, triggered orders run on an OrderExecutor pool."""
     global _engine_instance
     if redis_client is None:
         logger.warning("Redis unavailable — PriceAlertEngine disabled")
         return None
     _engine_instance = PriceAlertEngine(redis_client)
-    logger.info("PriceAlertEngine initialized")
+    if db_factory is not None:
+        from services.price_alerts.execution import init_order_executor
+        _engine_instance.order_executor = init_order_executor(_engine_instance, db_factory)
+    logger.info(
+        "PriceAlertEngine initialized (order execution: %s)",
+        "pool" if _engine_instance.order_executor is not None else "inline",
+    )
     return _engine_instance
@@ -0,0 +1,365 @@
+"""OrderExecutor — worker pool executing triggered limit-order alerts off the tick path.
+
+Tick path (PriceAlertEngine._process_triggered):
+  claim() marks the alert execution_status='queued' with an idempotency key in metadata;
+  once the tick transaction is committed, the jobs are submitted here. No exchange call,
+  no sleep: the tick only pays Redis ZRANGEBYSCORE + the claim commit.
+
+Workers:
+  - one exchange attempt per job, on their own session, with the alert row locked
+    (FOR UPDATE SKIP LOCKED) and the exchange writes in a savepoint;
+  - a failed attempt is re-scheduled with exponential backoff (delay queue) instead of
+    sleeping, within _ORDER_MAX_ATTEMPTS / _ORDER_RETRY_WINDOW_S of the engine;
+  - exchange external_reference = idempotency key + attempt: a replayed attempt is
+    rejected by the exchange (duplicate_external_reference), and a job whose alert is
+    no longer 'queued' with the same key is dropped.
+
+Recovery: alerts left 'queued' (queue full, restart) are re-submitted by a periodic sweep.
+
+Metrics: detection latency (tick -> job enqueued), queue wait, execution latency per
+attempt and end-to-end latency (tick -> terminal status), queue depth.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from services.price_alerts.metrics import LatencyTimer, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Nombre de threads d'exécution des ordres déclenchés
+ORDER_WORKERS = max(1, int(os.getenv("PRICE_ALERT_ORDER_WORKERS", "4")))
+# Taille max de la file ; au-delà les ordres restent 'queued' et sont repris par le balayage
+ORDER_QUEUE_MAX = int(os.getenv("PRICE_ALERT_ORDER_QUEUE_MAX", "10000"))
+# Intervalle du balayage de reprise des alertes restées 'queued'
+ORDER_RECOVERY_INTERVAL_SEC = float(os.getenv("PRICE_ALERT_ORDER_RECOVERY_INTERVAL_SEC", "30"))
+# Exécution via le pool (false = exécution dans le tick, comportement historique)
+ORDER_EXECUTION_ASYNC = os.getenv("PRICE_ALERT_ORDER_EXECUTION_ASYNC", "true").lower() in ("1", "true", "yes")
+
+RETRY_BASE_DELAY_S = 0.1
+LOCK_RETRY_DELAY_S = 0.05
+MAX_LOCK_RETRIES = 100
+
+
+@dataclass
+class OrderJob:
+    alert_id: str
+    idempotency_key: str
+    tick_time: datetime
+    attempt: int = 1
+    enqueued_at: float = field(default_factory=time.monotonic)
+    first_attempt_at: Optional[float] = None
+    last_error: Optional[str] = None
+    lock_retries: int = 0
+
+
+class OrderExecutor:
+    """Delay-queue + worker threads; the engine provides the order steps."""
+
+    def __init__(self, engine, db_factory, workers: int = ORDER_WORKERS, max_queue: int = ORDER_QUEUE_MAX):
+        self._engine = engine
+        self._db_factory = db_factory
+        self._workers = workers
+        self._max_queue = max_queue
+        self._heap: list[tuple[float, int, OrderJob]] = []
+        self._seq = itertools.count()
+        self._keys: set[str] = set()  # idempotency keys queued or running
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads: list[threading.Thread] = []
+
+    # -- lifecycle --
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for i in range(self._workers):
+            t = threading.Thread(target=self._worker_loop, daemon=True, name=f"order-exec-{i}")
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._recovery_loop, daemon=True, name="order-exec-recovery")
+        t.start()
+        self._threads.append(t)
+        logger.info("OrderExecutor started (workers=%d, queue_max=%d)", self._workers, self._max_queue)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads.clear()
+
+    @property
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    # -- tick side --
+
+    def claim(self, alert, tick_time: datetime) -> OrderJob:
+        """Mark a triggered order alert for the pool (before the tick commit) and return its job."""
+        from services.price_alerts.engine import order_idempotency_key
+
+        key = order_idempotency_key(alert)
+        alert.execution_status = "queued"
+        alert.metadata_ = {
+            **(alert.metadata_ or {}),
+            "idempotency_key": key,
+            "queued_at": datetime.now(timezone.utc).isoformat(),
+        }
+        return OrderJob(alert_id=str(alert.id), idempotency_key=key, tick_time=tick_time)
+
+    def submit_many(self, jobs: list[OrderJob]) -> int:
+        """Enqueue claimed jobs (after the claim commit). Returns the number accepted."""
+        metrics = get_metrics()
+        accepted = 0
+        now = datetime.now(timezone.utc)
+        for job in jobs:
+            if self.submit(job):
+                accepted += 1
+                metrics.record_order_enqueued((now - job.tick_time).total_seconds() * 1000.0)
+        return accepted
+
+    def submit(self, job: OrderJob, delay: float = 0.0) -> bool:
+        metrics = get_metrics()
+        with self._cond:
+            if job.idempotency_key in self._keys:
+                metrics.record_order_duplicate()
+                return False
+            if len(self._heap) >= self._max_queue:
+                metrics.record_order_rejected()
+                logger.warning("Order queue full (%d): alert %s left queued for recovery", len(self._heap), job.alert_id)
+                return False
+            self._keys.add(job.idempotency_key)
+            self._push(job, delay)
+        return True
+
+    def _push(self, job: OrderJob, delay: float) -> None:
+        job.enqueued_at = time.monotonic() + delay
+        heapq.heappush(self._heap, (job.enqueued_at, next(self._seq), job))
+        get_metrics().set_order_queue_depth(len(self._heap))
+        self._cond.notify()
+
+    def _reschedule(self, job: OrderJob, delay: float) -> None:
+        with self._cond:
+            self._push(job, delay)
+
+    def _release(self, job: OrderJob) -> None:
+        with self._cond:
+            self._keys.discard(job.idempotency_key)
+
+    # -- workers --
+
+    def _next_job(self) -> Optional[OrderJob]:
+        with self._cond:
+            while self._running:
+                job = self._next_job_nowait()
+                if job is not None:
+                    return job
+                wait = self._heap[0][0] - time.monotonic() if self._heap else 1.0
+                self._cond.wait(timeout=max(wait, 0.001))
+            return None
+
+    def _next_job_nowait(self) -> Optional[OrderJob]:
+        """Pop the first job whose run time has come, or None."""
+        with self._cond:
+            if not self._heap or self._heap[0][0] > time.monotonic():
+                return None
+            _, _, job = heapq.heappop(self._heap)
+            get_metrics().set_order_queue_depth(len(self._heap))
+            return job
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self.run_job(job)
+            except Exception:
+                logger.exception("Order job crashed for alert %s", job.alert_id)
+                self._release(job)
+
+    def run_job(self, job: OrderJob) -> None:
+        """Run one attempt of a job: re-scheduled on retry, released when terminal or dropped."""
+        from services.price_alerts.models import PriceAlert
+
+        metrics = get_metrics()
+        queue_wait_ms = max(0.0, (time.monotonic() - job.enqueued_at) * 1000.0)
+        db: Optional[Session] = None
+        try:
+            db = self._db_factory()
+            alert = (
+                db.query(PriceAlert)
+                .filter(PriceAlert.id == job.alert_id)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if alert is None:
+                # Row locked by the tick / another worker, or deleted: look again shortly
+                db.rollback()
+                if job.lock_retries < MAX_LOCK_RETRIES:
+                    job.lock_retries += 1
+                    self._reschedule(job, LOCK_RETRY_DELAY_S)
+                else:
+                    self._release(job)
+                return
+            meta = alert.metadata_ or {}
+            if alert.execution_status != "queued" or meta.get("idempotency_key") != job.idempotency_key:
+                db.rollback()
+                metrics.record_order_duplicate()
+                self._release(job)
+                return
+
+            # Attempt number from the row: another process may have run attempts for this key
+            job.attempt = int(meta.get("attempts") or 0) + 1
+            if job.first_attempt_at is None:
+                job.first_attempt_at = time.monotonic()
+            with LatencyTimer() as timer:
+                retry_delay = self._attempt(job, alert, db)
+            db.commit()
+            metrics.record_order_attempt(queue_wait_ms, timer.elapsed_ms)
+        except Exception:
+            if db is not None:
+                db.rollback()
+            logger.exception("Order attempt %d failed for alert %s (left queued for recovery)", job.attempt, job.alert_id)
+            self._release(job)
+            return
+        finally:
+            if db is not None:
+                db.close()
+
+        if retry_delay is not None:
+            metrics.record_order_retry_scheduled()
+            self._reschedule(job, retry_delay)
+            return
+        self._release(job)
+        metrics.record_order_completed((datetime.now(timezone.utc) - job.tick_time).total_seconds() * 1000.0)
+
+    def _attempt(self, job: OrderJob, alert, db: Session) -> Optional[float]:
+        """One exchange attempt. Returns the retry delay, or None once the alert is terminal."""
+        engine = self._engine
+        alert.execution_status = "pending"
+        try:
+            prepared = engine._prepare_order(alert)
+            if prepared is None:
+                return None
+            side, amount, slippage_bps = prepared
+
+            alert.metadata_ = {**(alert.metadata_ or {}), "attempts": job.attempt}
+            result: Optional[dict] = None
+            savepoint = db.begin_nested()
+            try:
+                result = engine._call_exchange(alert, db, side, amount, f"{job.idempotency_key}-{job.attempt}")
+                savepoint.commit()
+            except Exception as exc:
+                savepoint.rollback()
+                job.last_error = f"{type(exc).__name__}: {exc}"
+                logger.warning(
+                    "Exchange call failed for alert %s (attempt %d/%d): %s",
+                    alert.id, job.attempt, engine._ORDER_MAX_ATTEMPTS, job.last_error,
+                )
+
+            if result is not None and result.get("status") == "completed":
+                engine._finalize_order(alert, side, amount, slippage_bps, result, job.attempt, job.last_error)
+                return None
+            if result is not None:
+                job.last_error = engine._result_error(result)
+            alert.metadata_ = {**(alert.metadata_ or {}), "last_error": job.last_error}
+
+            # 'ignored' = duplicate_external_reference: this attempt already reached the exchange
+            retryable = result is None or result.get("status") != "ignored"
+            elapsed = time.monotonic() - (job.first_attempt_at or time.monotonic())
+            if retryable and job.attempt < engine._ORDER_MAX_ATTEMPTS and elapsed <= engine._ORDER_RETRY_WINDOW_S:
+                alert.execution_status = "queued"
+                get_metrics().record_retry_attempt()
+                return RETRY_BASE_DELAY_S * (2 ** (job.attempt - 1))
+
+            engine._finalize_order(alert, side, amount, slippage_bps, result, job.attempt, job.last_error)
+            return None
+        except Exception:
+            alert.execution_status = "failed"
+            alert.metadata_ = {**(alert.metadata_ or {}), "failure_reason": "exception"}
+            get_metrics().record_order_failed()
+            logger.exception("Order execution failed for alert %s", alert.id)
+            return None
+        finally:
+            engine._guard_terminal_status(alert)
+
+    # -- recovery --
+
+    def recover_queued(self) -> int:
+        """Re-submit alerts left 'queued' that are not in the queue. Returns the number submitted."""
+        from services.price_alerts.models import PriceAlert
+
+        db: Optional[Session] = None
+        try:
+            db = self._db_factory()
+            rows = (
+                db.query(PriceAlert.id, PriceAlert.metadata_, PriceAlert.last_triggered_at)
+                .filter(PriceAlert.execution_status == "queued")
+                .limit(self._max_queue)
+                .all()
+            )
+        except Exception:
+            logger.exception("Order recovery sweep failed")
+            return 0
+        finally:
+            if db is not None:
+                db.close()
+
+        jobs = []
+        for alert_id, meta, last_triggered_at in rows:
+            key = (meta or {}).get("idempotency_key")
+            if not key:
+                continue
+            jobs.append(OrderJob(
+                alert_id=str(alert_id),
+                idempotency_key=key,
+                tick_time=last_triggered_at or datetime.now(timezone.utc),
+            ))
+        submitted = sum(1 for job in jobs if self.submit(job))
+        if submitted:
+            get_metrics().record_order_recovered(submitted)
+            logger.info("Order recovery: %d queued alert(s) re-submitted", submitted)
+        return submitted
+
+    def _recovery_loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._running:
+                    return
+            self.recover_queued()
+            with self._cond:
+                self._cond.wait(timeout=ORDER_RECOVERY_INTERVAL_SEC)
+                if not self._running:
+                    return
+
+
+_executor: Optional[OrderExecutor] = None
+
+
+def get_order_executor() -> Optional[OrderExecutor]:
+    return _executor
+
+
+def init_order_executor(engine, db_factory) -> Optional[OrderExecutor]:
+    """Start the pool (None when PRICE_ALERT_ORDER_EXECUTION_ASYNC is off: inline execution)."""
+    global _executor
+    if not ORDER_EXECUTION_ASYNC:
+        return None
+    if _executor is not None:
+        _executor.stop()
+    _executor = OrderExecutor(engine, db_factory)
+    _executor.start()
+    return _executor
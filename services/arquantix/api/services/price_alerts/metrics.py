@@ -30,6 +30,17 @@ class AlertMetrics:
         self.orders_retry_attempts = 0
         self.orders_skipped_price = 0
         self.processing_time_per_tick: list[float] = []
+        # Order execution pool (services/price_alerts/execution.py)
+        self.order_jobs_enqueued = 0
+        self.order_jobs_rejected = 0
+        self.order_jobs_duplicates = 0
+        self.order_jobs_recovered = 0
+        self.order_retries_scheduled = 0
+        self.order_queue_depth = 0
+        self.order_detection_latency: list[float] = []
+        self.order_queue_wait: list[float] = []
+        self.order_execution_latency: list[float] = []
+        self.order_end_to_end_latency: list[float] = []
 
     def record_trigger(self, asset: str, count: int, latency_ms: float) -> None:
         with self._lock:
@@ -96,6 +107,41 @@ class AlertMetrics:
         with self._lock:
             self.orders_skipped_price += 1
 
+    def record_order_enqueued(self, detection_ms: float) -> None:
+        """Tick received -> job handed to the execution pool (crossing detection + claim commit)."""
+        with self._lock:
+            self.order_jobs_enqueued += 1
+            _append_sample(self.order_detection_latency, detection_ms)
+
+    def record_order_rejected(self) -> None:
+        with self._lock:
+            self.order_jobs_rejected += 1
+
+    def record_order_duplicate(self) -> None:
+        with self._lock:
+            self.order_jobs_duplicates += 1
+
+    def record_order_recovered(self, count: int) -> None:
+        with self._lock:
+            self.order_jobs_recovered += count
+
+    def record_order_retry_scheduled(self) -> None:
+        with self._lock:
+            self.order_retries_scheduled += 1
+
+    def set_order_queue_depth(self, depth: int) -> None:
+        with self._lock:
+            self.order_queue_depth = depth
+
+    def record_order_attempt(self, queue_wait_ms: float, execution_ms: float) -> None:
+        with self._lock:
+            _append_sample(self.order_queue_wait, queue_wait_ms)
+            _append_sample(self.order_execution_latency, execution_ms)
+
+    def record_order_completed(self, end_to_end_ms: float) -> None:
+        with self._lock:
+            _append_sample(self.order_end_to_end_latency, end_to_end_ms)
+
     def snapshot(self) -> dict:
         with self._lock:
             latencies = list(self.trigger_latency_samples)
@@ -126,9 +172,35 @@ class AlertMetrics:
                 "trigger_latency_p99_ms": round(p99_lat, 2),
                 "trigger_latency_samples": len(latencies),
                 "processing_time_per_tick_avg_ms": round(avg_tick, 2),
+                "order_jobs_enqueued": self.order_jobs_enqueued,
+                "order_jobs_rejected": self.order_jobs_rejected,
+                "order_jobs_duplicates": self.order_jobs_duplicates,
+                "order_jobs_recovered": self.order_jobs_recovered,
+                "order_retries_scheduled": self.order_retries_scheduled,
+                "order_queue_depth": self.order_queue_depth,
+                **_latency_stats("order_detection_latency", self.order_detection_latency),
+                **_latency_stats("order_queue_wait", self.order_queue_wait),
+                **_latency_stats("order_execution_latency", self.order_execution_latency),
+                **_latency_stats("order_end_to_end_latency", self.order_end_to_end_latency),
             }
 
 
+def _append_sample(samples: list[float], value: float) -> None:
+    samples.append(value)
+    if len(samples) > 1000:
+        del samples[:-500]
+
+
+def _latency_stats(name: str, samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"{name}_p50_ms": 0.0, f"{name}_p99_ms": 0.0}
+    return {
+        f"{name}_p50_ms": round(ordered[len(ordered) // 2], 2),
+        f"{name}_p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+    }
+
+
 _metrics = AlertMetrics()
 
 
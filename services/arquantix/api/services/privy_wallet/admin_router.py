@@ -16,6 +16,7 @@ from .admin_service import (
     PrivyWalletAdminService,
     PrivyWalletNotFoundError,
 )
+from .evm_rpc_pool import rpc_metrics_snapshot
 from .readiness import get_customer_wallet_readiness, get_privy_infra_readiness
 from .schemas import (
     PrivyBackfillDepositRequest,
@@ -78,6 +79,12 @@ def privy_infra_readiness(
     return get_privy_infra_readiness(db)
 
 
+@privy_wallet_admin_router.get("/rpc-metrics")
+def privy_rpc_metrics(_actor=Depends(_guard)):
+    """Client JSON-RPC EVM mutualisé : requêtes, 429, débit courant, latences par méthode (hôte seul)."""
+    return {"providers": rpc_metrics_snapshot()}
+
+
 @privy_wallet_admin_router.get(
     "/customer-readiness/{person_id}",
     response_model=PrivyCustomerReadinessResponse,
@@ -1,10 +1,7 @@
 """Client JSON-RPC minimal pour soldes et receipts EVM (réconciliation Privy)."""
 from __future__ import annotations
 
-import json
 import logging
-import urllib.error
-import urllib.request
 from decimal import Decimal
 from typing import Any
 
@@ -13,6 +10,7 @@ from services.exchange.assets import ASSET_PRECISION
 
 from .asset_mapping import ERC20_CONTRACT_TO_ASSET, contract_for_asset, normalize_evm_address
 from .evm_chain_config import is_alchemy_rpc
+from .evm_rpc_pool import get_rpc_client
 
 logger = logging.getLogger(__name__)
 
@@ -26,27 +24,33 @@ class EvmRpcError(Exception):
         super().__init__(message)
 
 
+def _response_error(body: dict[str, Any], method: str) -> EvmRpcError | None:
+    if "error" not in body:
+        return None
+    err = body["error"]
+    message = err.get("message") if isinstance(err, dict) else str(err)
+    return EvmRpcError(message or f"RPC error ({method})", code="evm.rpc.response_error")
+
+
 def json_rpc_call(rpc_url: str, method: str, params: list[Any], *, timeout: float = 20.0) -> Any:
-    payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
-    req = urllib.request.Request(
-        rpc_url,
-        data=json.dumps(payload).encode("utf-8"),
-        headers={"Content-Type": "application/json", "Accept": "application/json"},
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            body = json.loads(resp.read().decode())
-    except urllib.error.HTTPError as exc:
-        raise EvmRpcError(f"RPC HTTP {exc.code} ({method})", code="evm.rpc.http_error") from exc
-    except (urllib.error.URLError, TimeoutError, OSError, json.JSONDecodeError) as exc:
-        raise EvmRpcError(f"RPC indisponible ({method})", code="evm.rpc.unavailable") from exc
-
-    if "error" in body:
-        err = body["error"]
-        message = err.get("message") if isinstance(err, dict) else str(err)
-        raise EvmRpcError(message or f"RPC error ({method})", code="evm.rpc.response_error")
-    return body.get("result")
+    """Un appel JSON-RPC via le client mutualisé de l'URL (keep-alive, débit adaptatif)."""
+    return get_rpc_client(rpc_url).call(method, params, timeout=timeout)
+
+
+def json_rpc_batch_call(
+    rpc_url: str,
+    calls: list[tuple[str, list[Any]]],
+    *,
+    timeout: float = 20.0,
+) -> list[Any]:
+    """
+    Batch JSON-RPC : résultats dans l'ordre des appels (découpé en requêtes de
+    ``EVM_RPC_MAX_BATCH_SIZE`` appels envoyées en parallèle).
+
+    Un appel en erreur renvoie une ``EvmRpcError`` à sa place (pas levée) ; une erreur de
+    transport, ou un provider sans support batch (``evm.rpc.batch_unsupported``), est levée.
+    """
+    return get_rpc_client(rpc_url).batch(calls, timeout=timeout)
 
 
 def hex_to_int(value: str | None) -> int:
@@ -0,0 +1,409 @@
+"""Client JSON-RPC EVM mutualisé — connexions persistantes, batch, concurrence bornée, débit adaptatif.
+
+Un ``EvmRpcClient`` par URL RPC (``get_rpc_client``) partagé par tout le process :
+  - un ``httpx.Client`` (keep-alive, pool de ``EVM_RPC_MAX_CONNECTIONS`` connexions) ;
+  - au plus ``EVM_RPC_MAX_CONCURRENCY`` requêtes HTTP en vol (sémaphore) ;
+  - batch JSON-RPC (tableau) découpé par ``EVM_RPC_MAX_BATCH_SIZE`` appels, les batches
+    d'un ``batch()`` partant en parallèle dans la limite de concurrence ;
+  - limiteur de débit (appels/s), plafonné seulement si ``EVM_RPC_MAX_RPS`` est défini : divisé
+    par deux sur 429 / erreur de quota, puis remontée progressive jusqu'au plafond ; après un 429
+    les appels attendent Retry-After, ou à défaut un backoff exponentiel avec jitter (même sans
+    plafond), et les appels refusés pour quota sont rejoués (``RATE_LIMIT_RETRIES``) ;
+  - histogrammes de latence par méthode (``rpc_metrics_snapshot``).
+
+``evm_rpc_client.json_rpc_call`` / ``json_rpc_batch_call`` passent par ce client.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connexions HTTP persistantes par URL RPC
+MAX_CONNECTIONS = max(1, int(os.getenv("EVM_RPC_MAX_CONNECTIONS", "8")))
+# Requêtes HTTP simultanées max par URL RPC
+MAX_CONCURRENCY = max(1, int(os.getenv("EVM_RPC_MAX_CONCURRENCY", "4")))
+# Appels JSON-RPC max par requête batch
+MAX_BATCH_SIZE = max(1, int(os.getenv("EVM_RPC_MAX_BATCH_SIZE", "20")))
+# Débit plafond (appels JSON-RPC / s) ; le limiteur descend sous ce plafond après un 429.
+# Non défini / 0 : pas de plafond (seuls Retry-After / le backoff s'appliquent après un 429)
+MAX_RPS = float(os.getenv("EVM_RPC_MAX_RPS") or "0")
+MIN_RPS = 0.5
+RATE_LIMIT_RETRIES = 3
+# Pause après un 429 sans Retry-After : base * 2^(429 consécutifs - 1), plafonnée, jitter 50-100 %
+THROTTLE_BACKOFF_BASE_SEC = 0.25
+THROTTLE_BACKOFF_MAX_SEC = 8.0
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Messages provider signalant un quota (et non une requête invalide)
+_THROTTLE_MARKERS = (
+    "rate limit",
+    "too many requests",
+    "compute units",
+    "exceeded its throughput",
+    "request limit",
+    "capacity",
+)
+
+
+class RpcTransportError(Exception):
+    """Erreur HTTP / réseau d'une requête (le client la convertit en EvmRpcError)."""
+
+    def __init__(self, message: str, *, code: str, status_code: int | None = None, retry_after: float | None = None):
+        self.code = code
+        self.status_code = status_code
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class LatencyHistogram:
+    """Histogramme à seaux fixes (ms) ; quantiles estimés à la borne haute du seau."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+
+    def record(self, elapsed_ms: float, *, error: bool = False) -> None:
+        i = 0
+        while i < len(LATENCY_BUCKETS_MS) and elapsed_ms > LATENCY_BUCKETS_MS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum_ms += elapsed_ms
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else float("inf")
+        return None
+
+    def snapshot(self) -> dict[str, Any]:
+        labels = [f"le_{b}" for b in LATENCY_BUCKETS_MS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.sum_ms / self.count, 2) if self.count else None,
+            "p50_ms": self.quantile(0.50),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class AdaptiveRateLimiter:
+    """Espacement des appels au débit courant ; baisse multiplicative / hausse additive.
+
+    Un 429 suspend aussi les appels suivants : Retry-After, sinon backoff exponentiel avec
+    jitter sur les 429 consécutifs (seule protection quand aucun plafond n'est configuré)."""
+
+    def __init__(self, max_rate: float, *, min_rate: float = MIN_RPS) -> None:
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate) if max_rate > 0 else min_rate
+        self.rate = max_rate
+        self._next_slot = 0.0
+        self._throttle_streak = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, permits: int = 1) -> float:
+        """Bloque jusqu'au créneau des ``permits`` appels ; renvoie l'attente (s). Débit <= 0 : illimité."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + (permits / self.rate if self.rate > 0 else 0.0)
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def on_success(self) -> None:
+        self._throttle_streak = 0
+        if self.max_rate <= 0 or self.rate >= self.max_rate:
+            return
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+    def on_throttle(self, retry_after: float | None = None) -> float:
+        """Baisse le débit et repousse le prochain créneau ; renvoie la pause imposée (s)."""
+        with self._lock:
+            if self.max_rate > 0:
+                self.rate = max(self.min_rate, self.rate / 2.0)
+            self._throttle_streak += 1
+            if retry_after is None:
+                backoff = min(THROTTLE_BACKOFF_MAX_SEC, THROTTLE_BACKOFF_BASE_SEC * 2 ** (self._throttle_streak - 1))
+                pause = backoff * random.uniform(0.5, 1.0)
+            else:
+                pause = max(retry_after, 0.0)
+            self._next_slot = max(self._next_slot, time.monotonic() + pause)
+            return pause
+
+
+def is_throttle_error(message: str, *, status_code: int | None = None) -> bool:
+    if status_code == 429:
+        return True
+    text = (message or "").lower()
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+def _retry_after(response: httpx.Response) -> float | None:
+    raw = response.headers.get("retry-after")
+    try:
+        return float(raw) if raw else None
+    except ValueError:
+        return None
+
+
+class EvmRpcClient:
+    """Client JSON-RPC d'une URL ; thread-safe, à partager (voir ``get_rpc_client``)."""
+
+    def __init__(
+        self,
+        rpc_url: str,
+        *,
+        max_connections: int = MAX_CONNECTIONS,
+        max_concurrency: int = MAX_CONCURRENCY,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_rps: float = MAX_RPS,
+        transport: httpx.BaseTransport | None = None,
+    ) -> None:
+        self.rpc_url = rpc_url
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self._http = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+            transport=transport,
+        )
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.limiter = AdaptiveRateLimiter(max_rps)
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self.requests = 0
+        self.batches = 0
+        self.throttled = 0
+        self.in_flight = 0
+
+    def close(self) -> None:
+        self._http.close()
+
+    # ------------------------------------------------------------------
+    # Transport
+    # ------------------------------------------------------------------
+
+    def _post(self, payload: Any, *, label: str, timeout: float, permits: int) -> Any:
+        self.limiter.acquire(permits)
+        with self._slots:
+            with self._lock:
+                self.in_flight += 1
+                self.requests += 1
+            try:
+                response = self._http.post(self.rpc_url, content=json.dumps(payload), timeout=timeout)
+            except (httpx.TimeoutException, httpx.TransportError) as exc:
+                raise RpcTransportError(f"RPC indisponible ({label})", code="evm.rpc.unavailable") from exc
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        if response.status_code >= 400:
+            raise RpcTransportError(
+                f"RPC HTTP {response.status_code} ({label})",
+                code="evm.rpc.http_error",
+                status_code=response.status_code,
+                retry_after=_retry_after(response),
+            )
+        try:
+            return response.json()
+        except (json.JSONDecodeError, ValueError) as exc:
+            raise RpcTransportError(f"RPC indisponible ({label})", code="evm.rpc.unavailable") from exc
+
+    def _record(self, methods: list[str], elapsed_ms: float, errors: list[bool]) -> None:
+        with self._lock:
+            for method, error in zip(methods, errors):
+                hist = self._histograms.get(method)
+                if hist is None:
+                    hist = self._histograms[method] = LatencyHistogram()
+                hist.record(elapsed_ms, error=error)
+
+    def _throttled(self, retry_after: float | None = None) -> None:
+        with self._lock:
+            self.throttled += 1
+        self.limiter.on_throttle(retry_after)
+
+    # ------------------------------------------------------------------
+    # Appels
+    # ------------------------------------------------------------------
+
+    def call(self, method: str, params: list[Any], *, timeout: float = 20.0) -> Any:
+        """Un appel ; lève ``EvmRpcError`` (mêmes codes que l'implémentation urllib historique)."""
+        from .evm_rpc_client import EvmRpcError, _response_error
+
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            start = time.monotonic()
+            try:
+                body = self._post(payload, label=method, timeout=timeout, permits=1)
+            except RpcTransportError as exc:
+                self._record([method], (time.monotonic() - start) * 1000.0, [True])
+                if exc.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                    self._throttled(exc.retry_after)
+                    continue
+                raise EvmRpcError(str(exc), code=exc.code) from exc
+            error = _response_error(body, method) if isinstance(body, dict) else None
+            self._record([method], (time.monotonic() - start) * 1000.0, [error is not None])
+            if error is not None and is_throttle_error(str(error)) and attempt < RATE_LIMIT_RETRIES:
+                self._throttled()
+                continue
+            if error is not None:
+                raise error
+            self.limiter.on_success()
+            return body.get("result") if isinstance(body, dict) else None
+        raise EvmRpcError(f"RPC quota dépassé ({method})", code="evm.rpc.rate_limited")
+
+    def _batch_once(self, calls: list[tuple[str, list[Any]]], *, timeout: float) -> list[Any]:
+        """Une requête batch ; résultats dans l'ordre, ``EvmRpcError`` à la place d'un appel en erreur."""
+        from .evm_rpc_client import EvmRpcError, _response_error
+
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        methods = [method for method, _ in calls]
+        label = f"batch {methods[0]} x{len(calls)}"
+        start = time.monotonic()
+        with self._lock:
+            self.batches += 1
+        try:
+            body = self._post(payload, label=label, timeout=timeout, permits=len(calls))
+        except RpcTransportError:
+            self._record(methods, (time.monotonic() - start) * 1000.0, [True] * len(calls))
+            raise
+        elapsed_ms = (time.monotonic() - start) * 1000.0
+        if not isinstance(body, list):
+            self._record(methods, elapsed_ms, [True] * len(calls))
+            error = _response_error(body, label) if isinstance(body, dict) else None
+            raise EvmRpcError(
+                f"Batch JSON-RPC non supporté ({error or label})",
+                code="evm.rpc.batch_unsupported",
+            )
+
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        out: list[Any] = []
+        for i, method in enumerate(methods):
+            item = by_id.get(i)
+            if item is None:
+                out.append(EvmRpcError(f"Réponse manquante ({method})", code="evm.rpc.batch_missing"))
+                continue
+            error = _response_error(item, method)
+            out.append(error if error is not None else item.get("result"))
+        self._record(methods, elapsed_ms, [isinstance(r, EvmRpcError) for r in out])
+        return out
+
+    def _batch_with_retry(self, calls: list[tuple[str, list[Any]]], *, timeout: float) -> list[Any]:
+        from .evm_rpc_client import EvmRpcError
+
+        results: list[Any] = [None] * len(calls)
+        todo = list(range(len(calls)))
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            try:
+                batch_results = self._batch_once([calls[i] for i in todo], timeout=timeout)
+            except RpcTransportError as exc:
+                if exc.status_code == 429 and attempt < RATE_LIMIT_RETRIES:
+                    self._throttled(exc.retry_after)
+                    continue
+                raise EvmRpcError(str(exc), code=exc.code) from exc
+            retry: list[int] = []
+            for i, res in zip(todo, batch_results):
+                results[i] = res
+                if isinstance(res, EvmRpcError) and is_throttle_error(str(res)):
+                    retry.append(i)
+            if not retry or attempt == RATE_LIMIT_RETRIES:
+                if not retry:
+                    self.limiter.on_success()
+                return results
+            self._throttled()
+            todo = retry
+        return results
+
+    def batch(self, calls: list[tuple[str, list[Any]]], *, timeout: float = 20.0) -> list[Any]:
+        """
+        Batch JSON-RPC : résultats dans l'ordre des appels, ``EvmRpcError`` à la place d'un appel
+        en erreur. Au-delà de ``max_batch_size`` appels, plusieurs requêtes en parallèle.
+        Lève ``EvmRpcError`` sur erreur de transport ou provider sans batch
+        (``evm.rpc.batch_unsupported``).
+        """
+        if not calls:
+            return []
+        groups = [calls[i:i + self.max_batch_size] for i in range(0, len(calls), self.max_batch_size)]
+        if len(groups) == 1:
+            return self._batch_with_retry(groups[0], timeout=timeout)
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(groups))) as pool:
+            parts = list(pool.map(lambda g: self._batch_with_retry(g, timeout=timeout), groups))
+        return [res for part in parts for res in part]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "throttled": self.throttled,
+                "in_flight": self.in_flight,
+                "rate_limit_rps": round(self.limiter.rate, 2),
+                "methods": {m: h.snapshot() for m, h in sorted(self._histograms.items())},
+            }
+
+
+_clients: dict[str, EvmRpcClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_rpc_client(rpc_url: str) -> EvmRpcClient:
+    """Client partagé de l'URL (créé au premier appel)."""
+    client = _clients.get(rpc_url)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(rpc_url)
+        if client is None:
+            client = _clients[rpc_url] = EvmRpcClient(rpc_url)
+        return client
+
+
+def _public_label(rpc_url: str) -> str:
+    """Hôte seul : les URLs Alchemy / Infura portent la clé API dans le chemin."""
+    parts = urlsplit(rpc_url)
+    return parts.netloc or "rpc"
+
+
+def rpc_metrics_snapshot() -> dict[str, Any]:
+    """Compteurs et histogrammes par URL RPC (hôte seul, sans clé API)."""
+    out: dict[str, Any] = {}
+    for url, client in list(_clients.items()):
+        label = _public_label(url)
+        if label in out:
+            label = f"{label}#{len(out)}"
+        out[label] = client.snapshot()
+    return out
+
+
+def close_rpc_clients() -> None:
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,263 @@
+"""Consumer outbox multi-workers — scopes en parallèle, ordre préservé dans un scope.
+
+N threads workers ; le worker ``k`` ne réclame que les scopes de la partition ``k``
+(``hashtext(person_id) mod N``, voir ``TransactionOutboxRepository.claim_next_scoped_event``).
+Un événement = une transaction : claim → handler → ``mark_*`` → commit ; un handler lent ne
+bloque que son scope. Dans un scope, seul l'événement le plus ancien est éligible, donc
+jamais deux en vol et l'ordre de création est respecté.
+
+Types gérés : ``intent.created`` (avec le différé S4d par ``lock_key``) et ``intent.settle``.
+``intent.execute`` reste sur le tick / listener (verrou global par utilisateur).
+Activé par ``TRANSACTION_OUTBOX_CONSUMER_WORKERS`` > 0 (défaut 0) : le tick
+``defi_observability`` et le listener NOTIFY laissent alors ces types au consumer.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from services.transaction_outbox.enums import OutboxEventStatus, OutboxEventType
+from services.transaction_outbox.metrics import OutboxConsumerMetrics, get_outbox_metrics
+from services.transaction_outbox.models import TransactionOutbox
+from services.transaction_outbox.repository import TransactionOutboxRepository
+
+logger = logging.getLogger(__name__)
+
+# Nombre de workers (0 = consumer désactivé, tick / listener seuls)
+CONSUMER_WORKERS = max(0, int(os.getenv("TRANSACTION_OUTBOX_CONSUMER_WORKERS", "0")))
+# Attente max d'un worker sans événement avant de re-poller (s) ; ``wake()`` l'interrompt
+IDLE_POLL_SECONDS = float(os.getenv("TRANSACTION_OUTBOX_CONSUMER_IDLE_SECONDS", "1.0"))
+# Rafraîchissement des jauges profondeur / lag depuis la base (s)
+QUEUE_STATS_INTERVAL_SECONDS = 5.0
+# Événement remis en pending sans traitement (différé S4d, hors allowlist) : pas de re-claim immédiat
+_REQUEUE_DELAY_SECONDS = 2
+_REQUEUE_OUTCOMES = frozenset({"deferred_same_scope", "skipped_allowlist"})
+
+
+def outbox_consumer_enabled() -> bool:
+    return CONSUMER_WORKERS > 0
+
+
+@dataclass(frozen=True)
+class ConsumerSpec:
+    event_type: str
+    enabled: Callable[[], bool]
+    process_event: Callable[[Session, TransactionOutbox], tuple[str, str | None]]
+
+
+def _process_intent_created(db: Session, event: TransactionOutbox) -> tuple[str, str | None]:
+    from services.transaction_outbox.worker import process_intent_created_event
+    from services.transaction_outbox.worker_queue_hardening import partition_intent_created_events
+
+    _, deferred = partition_intent_created_events(db, [event])
+    if deferred:
+        TransactionOutboxRepository.release_processing_lock(db, event)
+        return "deferred_same_scope", None
+    return process_intent_created_event(db, event)
+
+
+def _process_intent_settle(db: Session, event: TransactionOutbox) -> tuple[str, str | None]:
+    from services.transaction_outbox.settlement_worker import process_intent_settle_event
+
+    return process_intent_settle_event(db, event)
+
+
+def _outbox_worker_enabled() -> bool:
+    from services.lifi.config import lifi_outbox_worker_enabled
+
+    return lifi_outbox_worker_enabled()
+
+
+def default_consumer_specs() -> list[ConsumerSpec]:
+    return [
+        ConsumerSpec(OutboxEventType.INTENT_CREATED.value, _outbox_worker_enabled, _process_intent_created),
+        ConsumerSpec(OutboxEventType.INTENT_SETTLE.value, _outbox_worker_enabled, _process_intent_settle),
+    ]
+
+
+def _worker_instance_id() -> str:
+    import socket
+
+    return f"{socket.gethostname() or 'local'}:{os.getpid()}"
+
+
+class OutboxConsumer:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        workers: int = CONSUMER_WORKERS,
+        specs: list[ConsumerSpec] | None = None,
+        idle_seconds: float = IDLE_POLL_SECONDS,
+        metrics: OutboxConsumerMetrics | None = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self.workers = max(1, workers)
+        self.specs = specs if specs is not None else default_consumer_specs()
+        self.idle_seconds = idle_seconds
+        self.metrics = metrics or get_outbox_metrics()
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stats_refreshed_at = 0.0
+
+    @property
+    def event_types(self) -> frozenset[str]:
+        return frozenset(spec.event_type for spec in self.specs)
+
+    # ------------------------------------------------------------------
+    # Un événement
+    # ------------------------------------------------------------------
+
+    def run_one(self, spec: ConsumerSpec, *, partition: int, locked_by: str) -> bool:
+        """Réclame et traite au plus un événement de la partition ; True si un événement a été pris."""
+        db = self._session_factory()
+        event_id = None
+        try:
+            event = TransactionOutboxRepository.claim_next_scoped_event(
+                db,
+                event_type=spec.event_type,
+                locked_by=locked_by,
+                partition=partition,
+                partitions=self.workers,
+            )
+            if event is None:
+                db.rollback()
+                return False
+            event_id = event.id
+            created_at = event.created_at
+            self.metrics.set_in_flight(+1)
+            started = time.monotonic()
+            try:
+                outcome, _ = spec.process_event(db, event)
+                if outcome in _REQUEUE_OUTCOMES and event.status == OutboxEventStatus.PENDING.value:
+                    TransactionOutboxRepository.release_processing_lock(
+                        db, event, retry_delay_seconds=_REQUEUE_DELAY_SECONDS
+                    )
+                db.commit()
+            finally:
+                self.metrics.set_in_flight(-1)
+            pickup_lag = None
+            if created_at is not None:
+                pickup_lag = max(0.0, (datetime.now(timezone.utc) - created_at).total_seconds())
+            self.metrics.record_event(
+                spec.event_type,
+                outcome,
+                handler_ms=(time.monotonic() - started) * 1000.0,
+                pickup_lag_s=pickup_lag,
+            )
+            return True
+        except Exception as exc:
+            db.rollback()
+            self.metrics.record_error()
+            logger.warning(
+                "outbox_consumer_event_failed",
+                extra={"event_type": spec.event_type, "outbox_id": str(event_id) if event_id else None},
+                exc_info=True,
+            )
+            if event_id is not None:
+                self._record_failure(db, event_id, str(exc))
+            return event_id is not None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _record_failure(db: Session, event_id, error: str) -> None:
+        """Erreur hors handler (commit, DB) : claim annulé, on compte la tentative à part."""
+        try:
+            row = db.get(TransactionOutbox, event_id)
+            if row is not None and row.status == OutboxEventStatus.PENDING.value:
+                TransactionOutboxRepository.mark_failure(db, row, error=error)
+                db.commit()
+        except Exception:
+            db.rollback()
+            logger.warning("outbox_consumer_mark_failure_failed", exc_info=True)
+
+    def refresh_queue_stats(self) -> None:
+        db = self._session_factory()
+        try:
+            self.metrics.set_queue_stats(TransactionOutboxRepository.pending_queue_stats(db))
+        except Exception:
+            logger.warning("outbox_consumer_queue_stats_failed", exc_info=True)
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _worker_loop(self, partition: int) -> None:
+        locked_by = f"{_worker_instance_id()}#{partition}"
+        while not self._stop.is_set():
+            worked = False
+            for spec in self.specs:
+                try:
+                    if spec.enabled() and self.run_one(spec, partition=partition, locked_by=locked_by):
+                        worked = True
+                except Exception:
+                    logger.warning("outbox_consumer_worker_error partition=%s", partition, exc_info=True)
+            if partition == 0 and time.monotonic() - self._stats_refreshed_at >= QUEUE_STATS_INTERVAL_SECONDS:
+                self._stats_refreshed_at = time.monotonic()
+                self.refresh_queue_stats()
+            if not worked:
+                with self._wakeup:
+                    self._wakeup.wait(self.idle_seconds)
+
+    def wake(self) -> None:
+        """Réveille les workers en attente (ex. notification outbox)."""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def start(self) -> None:
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._worker_loop, args=(k,), name=f"outbox-consumer-{k}", daemon=True)
+            for k in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self.wake()
+        for t in self._threads:
+            t.join(timeout)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "running": sum(1 for t in self._threads if t.is_alive()),
+            "event_types": sorted(self.event_types),
+            **self.metrics.snapshot(),
+        }
+
+
+_consumer: OutboxConsumer | None = None
+_consumer_lock = threading.Lock()
+
+
+def get_outbox_consumer() -> OutboxConsumer | None:
+    return _consumer
+
+
+def start_outbox_consumer() -> bool:
+    """Côté API : démarre le consumer (idempotent). Retourne True s'il tourne."""
+    global _consumer
+    if not outbox_consumer_enabled():
+        return False
+    from database import SessionLocal
+
+    with _consumer_lock:
+        if _consumer is None:
+            _consumer = OutboxConsumer(SessionLocal)
+        _consumer.start()
+    return True
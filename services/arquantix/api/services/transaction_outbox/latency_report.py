@@ -0,0 +1,103 @@
+"""Latence outbox et intents mesurée en base (avant / après réveil LISTEN/NOTIFY).
+
+- par événement : ``processed_at - created_at`` par ``event_type`` ;
+- par intent : premier événement outbox créé → dernier événement outbox traité.
+
+Percentiles calculés par Postgres (``percentile_cont``) sur une fenêtre ``[since, until)``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from services.transaction_outbox.enums import OutboxEventStatus
+
+_EVENT_LATENCY_SQL = text(
+    """
+    SELECT event_type,
+           count(*) AS events,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY extract(epoch FROM processed_at - created_at)) AS p50_s,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY extract(epoch FROM processed_at - created_at)) AS p95_s,
+           max(extract(epoch FROM processed_at - created_at)) AS max_s
+    FROM public.transaction_outbox
+    WHERE status = :processed
+      AND processed_at IS NOT NULL
+      AND created_at >= :since AND created_at < :until
+    GROUP BY event_type
+    ORDER BY event_type
+    """
+)
+
+_INTENT_LATENCY_SQL = text(
+    """
+    WITH per_intent AS (
+        SELECT intent_id,
+               extract(epoch FROM max(processed_at) - min(created_at)) AS latency_s
+        FROM public.transaction_outbox
+        -- Only intents with an event in the window are aggregated (not the whole outbox history)
+        WHERE intent_id IN (
+            SELECT intent_id
+            FROM public.transaction_outbox
+            WHERE created_at >= :since AND created_at < :until
+        )
+        GROUP BY intent_id
+        HAVING bool_and(status = :processed)
+           AND min(created_at) >= :since AND min(created_at) < :until
+    )
+    SELECT count(*) AS intents,
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_s) AS p50_s,
+           percentile_cont(0.95) WITHIN GROUP (ORDER BY latency_s) AS p95_s,
+           max(latency_s) AS max_s
+    FROM per_intent
+    """
+)
+
+
+def _seconds(value: Any) -> float | None:
+    return round(float(value), 3) if value is not None else None
+
+
+def build_outbox_latency_window(db: Session, *, since: datetime, until: datetime) -> dict[str, Any]:
+    params = {"processed": OutboxEventStatus.PROCESSED.value, "since": since, "until": until}
+    events = [
+        {
+            "event_type": row.event_type,
+            "events": int(row.events),
+            "p50_s": _seconds(row.p50_s),
+            "p95_s": _seconds(row.p95_s),
+            "max_s": _seconds(row.max_s),
+        }
+        for row in db.execute(_EVENT_LATENCY_SQL, params)
+    ]
+    intents = db.execute(_INTENT_LATENCY_SQL, params).one()
+    return {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "events_by_type": events,
+        "intents": {
+            "intents": int(intents.intents or 0),
+            "p50_s": _seconds(intents.p50_s),
+            "p95_s": _seconds(intents.p95_s),
+            "max_s": _seconds(intents.max_s),
+        },
+    }
+
+
+def build_outbox_latency_report(
+    db: Session,
+    *,
+    since: datetime,
+    until: datetime,
+    split_at: datetime | None = None,
+) -> dict[str, Any]:
+    """Fenêtre unique, ou ``before`` / ``after`` autour de ``split_at`` (ex. activation du listener)."""
+    if split_at is None:
+        return {"window": build_outbox_latency_window(db, since=since, until=until)}
+    return {
+        "split_at": split_at.isoformat(),
+        "before": build_outbox_latency_window(db, since=since, until=split_at),
+        "after": build_outbox_latency_window(db, since=split_at, until=until),
+    }
@@ -0,0 +1,114 @@
+"""Jauges du consumer outbox : profondeur de file, lag, débit par type d'événement.
+
+Compteurs en mémoire (thread-safe), sans dépendance externe — même principe que
+``services/price_alerts/metrics``. Profondeur / lag sont rafraîchis depuis la base par le
+consumer (``set_queue_stats``) ; le débit est calculé sur une fenêtre glissante.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Any
+
+THROUGHPUT_WINDOW_SECONDS = 60.0
+_MAX_SAMPLES = 1000
+
+
+def _percentile(samples: list[float], q: float) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class OutboxConsumerMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.outcomes: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._completions: dict[str, deque[float]] = defaultdict(deque)
+        self._handler_ms: dict[str, list[float]] = defaultdict(list)
+        self._pickup_lag_s: dict[str, list[float]] = defaultdict(list)
+        self.queue_depth: dict[str, int] = {}
+        self.queue_lag_seconds: dict[str, float] = {}
+        self.queue_sampled_at: float | None = None
+        self.in_flight = 0
+        self.errors = 0
+
+    def record_event(self, event_type: str, outcome: str, *, handler_ms: float, pickup_lag_s: float | None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.outcomes[event_type][outcome] += 1
+            done = self._completions[event_type]
+            done.append(now)
+            while done and now - done[0] > THROUGHPUT_WINDOW_SECONDS:
+                done.popleft()
+            for store, value in ((self._handler_ms, handler_ms), (self._pickup_lag_s, pickup_lag_s)):
+                if value is None:
+                    continue
+                samples = store[event_type]
+                samples.append(value)
+                if len(samples) > _MAX_SAMPLES:
+                    del samples[: len(samples) - _MAX_SAMPLES // 2]
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def set_in_flight(self, delta: int) -> None:
+        with self._lock:
+            self.in_flight += delta
+
+    def set_queue_stats(self, stats: dict[str, dict[str, Any]], *, now: datetime | None = None) -> None:
+        """``stats`` : sortie de ``TransactionOutboxRepository.pending_queue_stats``."""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            self.queue_depth = {t: int(s["depth"]) for t, s in stats.items()}
+            self.queue_lag_seconds = {
+                t: max(0.0, (now - s["oldest_created_at"]).total_seconds())
+                for t, s in stats.items()
+                if s.get("oldest_created_at") is not None
+            }
+            self.queue_sampled_at = time.time()
+
+    def throughput_per_second(self, event_type: str) -> float:
+        now = time.monotonic()
+        with self._lock:
+            recent = [t for t in self._completions.get(event_type, ()) if now - t <= THROUGHPUT_WINDOW_SECONDS]
+        return round(len(recent) / THROUGHPUT_WINDOW_SECONDS, 3)
+
+    def snapshot(self) -> dict[str, Any]:
+        event_types = set(self.outcomes) | set(self.queue_depth)
+        with self._lock:
+            handler_ms = {t: list(s) for t, s in self._handler_ms.items()}
+            pickup = {t: list(s) for t, s in self._pickup_lag_s.items()}
+            outcomes = {t: dict(o) for t, o in self.outcomes.items()}
+            depth = dict(self.queue_depth)
+            lag = dict(self.queue_lag_seconds)
+            in_flight, errors, sampled_at = self.in_flight, self.errors, self.queue_sampled_at
+        return {
+            "in_flight": in_flight,
+            "errors": errors,
+            "queue_sampled_at": sampled_at,
+            "event_types": {
+                t: {
+                    "queue_depth": depth.get(t, 0),
+                    "queue_lag_seconds": round(lag[t], 3) if t in lag else None,
+                    "throughput_per_s": self.throughput_per_second(t),
+                    "outcomes": outcomes.get(t, {}),
+                    "handler_p50_ms": _percentile(handler_ms.get(t, []), 0.5),
+                    "handler_p95_ms": _percentile(handler_ms.get(t, []), 0.95),
+                    "pickup_lag_p50_s": _percentile(pickup.get(t, []), 0.5),
+                    "pickup_lag_p95_s": _percentile(pickup.get(t, []), 0.95),
+                }
+                for t in sorted(event_types)
+            },
+        }
+
+
+_metrics = OutboxConsumerMetrics()
+
+
+def get_outbox_metrics() -> OutboxConsumerMetrics:
+    return _metrics
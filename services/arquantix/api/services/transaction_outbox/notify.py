@@ -0,0 +1,294 @@
+"""Réveil des workers outbox par Postgres ``LISTEN/NOTIFY``.
+
+``insert_event`` émet ``pg_notify('transaction_outbox', <event_type>)`` dans la transaction
+d'insertion : la notification n'est délivrée qu'au commit (et jamais si la transaction ou
+le savepoint est annulé). ``OutboxWakeupListener`` tient une connexion dédiée en ``LISTEN``
+et draine immédiatement les handlers concernés ; sans notification pendant
+``TRANSACTION_OUTBOX_SAFETY_POLL_SECONDS`` il poll tous les types (filet de sécurité,
+en plus du tick ``defi_observability`` qui reste inchangé).
+
+Le listener est désactivé par défaut (``TRANSACTION_OUTBOX_LISTEN_ENABLED``) ; chaque
+handler garde son propre flag (``LIFI_OUTBOX_WORKER_ENABLED``, ``LIFI_EXECUTION_WORKER_ENABLED``).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import select
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from services.transaction_outbox.enums import OutboxEventType
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_NOTIFY_CHANNEL = "transaction_outbox"
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = (os.getenv(name) or "").strip().lower()
+    if not raw:
+        return default
+    return raw in {"1", "true", "yes", "on"}
+
+
+# NOTIFY à l'insertion outbox (coût négligeable, sans effet si personne n'écoute)
+OUTBOX_NOTIFY_ENABLED = _env_bool("TRANSACTION_OUTBOX_NOTIFY_ENABLED", True)
+# Thread LISTEN dans le process API
+OUTBOX_LISTEN_ENABLED = _env_bool("TRANSACTION_OUTBOX_LISTEN_ENABLED", False)
+# Poll de sécurité du listener sans notification (s)
+SAFETY_POLL_SECONDS = float(os.getenv("TRANSACTION_OUTBOX_SAFETY_POLL_SECONDS", "30"))
+# Fenêtre de regroupement des notifications d'une rafale (s)
+NOTIFY_DEBOUNCE_SECONDS = float(os.getenv("TRANSACTION_OUTBOX_NOTIFY_DEBOUNCE_SECONDS", "0.02"))
+# Passes max par handler et par réveil (une passe = un poll de ``limit`` événements)
+MAX_DRAIN_ROUNDS = 10
+_RECONNECT_BASE_DELAY_SEC = 1.0
+_RECONNECT_MAX_DELAY_SEC = 30.0
+
+
+def notify_outbox_event(db: Session, event_type: str) -> None:
+    """``pg_notify`` transactionnel (Postgres uniquement)."""
+    if not OUTBOX_NOTIFY_ENABLED:
+        return
+    bind = db.get_bind()
+    if getattr(getattr(bind, "dialect", None), "name", None) != "postgresql":
+        return
+    db.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": OUTBOX_NOTIFY_CHANNEL, "payload": str(event_type)},
+    )
+
+
+@dataclass(frozen=True)
+class OutboxHandler:
+    event_type: str
+    enabled: Callable[[], bool]
+    process: Callable[..., dict[str, Any]]
+    limit: int
+
+
+def _process_intent_created(db: Session, *, limit: int) -> dict[str, Any]:
+    from services.transaction_outbox.worker import process_transaction_outbox_intent_created
+
+    return process_transaction_outbox_intent_created(db, limit=limit)
+
+
+def _process_intent_execute(db: Session, *, limit: int) -> dict[str, Any]:
+    from services.transaction_outbox.execution_worker import process_transaction_outbox_intent_execute
+
+    return process_transaction_outbox_intent_execute(db, limit=limit)
+
+
+def _process_intent_settle(db: Session, *, limit: int) -> dict[str, Any]:
+    from services.transaction_outbox.settlement_worker import process_transaction_outbox_intent_settle
+
+    return process_transaction_outbox_intent_settle(db, limit=limit)
+
+
+def _outbox_worker_enabled() -> bool:
+    from services.lifi.config import lifi_outbox_worker_enabled
+
+    return lifi_outbox_worker_enabled()
+
+
+def _execution_worker_enabled() -> bool:
+    from services.lifi.config import lifi_execution_worker_enabled
+
+    return lifi_execution_worker_enabled()
+
+
+def default_outbox_handlers() -> list[OutboxHandler]:
+    """Mêmes handlers et limites que le tick ``defi_observability`` (étapes 2c, 2c-bis, 2d)."""
+    return [
+        OutboxHandler(OutboxEventType.INTENT_CREATED.value, _outbox_worker_enabled, _process_intent_created, 20),
+        OutboxHandler(OutboxEventType.INTENT_EXECUTE.value, _execution_worker_enabled, _process_intent_execute, 10),
+        OutboxHandler(OutboxEventType.INTENT_SETTLE.value, _outbox_worker_enabled, _process_intent_settle, 20),
+    ]
+
+
+class OutboxWakeupListener:
+    """Thread ``LISTEN`` : draine les handlers dès qu'une notification arrive."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        dsn: str | None = None,
+        handlers: list[OutboxHandler] | None = None,
+        safety_poll_seconds: float = SAFETY_POLL_SECONDS,
+    ) -> None:
+        self._session_factory = session_factory
+        self._dsn = dsn
+        self.handlers = handlers if handlers is not None else default_outbox_handlers()
+        self.safety_poll_seconds = safety_poll_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.wakeups = 0
+        self.safety_polls = 0
+        self.drain_passes = 0
+        self.events_processed = 0
+        self.events_failed = 0
+        self.last_drain_ms: float | None = None
+        self.last_error: str | None = None
+
+    # ------------------------------------------------------------------
+    # Drain
+    # ------------------------------------------------------------------
+
+    def drain(self, event_types: set[str] | None = None) -> dict[str, Any]:
+        """Poll des handlers concernés (tous si ``None``) jusqu'à file vide ou ``MAX_DRAIN_ROUNDS``."""
+        from services.transaction_outbox.consumer import get_outbox_consumer
+
+        started = time.monotonic()
+        out: dict[str, Any] = {}
+        # Types pris en charge par le consumer multi-workers : on le réveille au lieu de poller
+        consumer = get_outbox_consumer()
+        consumer_types = consumer.event_types if consumer is not None else frozenset()
+        if consumer is not None:
+            consumer.wake()
+        for handler in self.handlers:
+            if event_types is not None and handler.event_type not in event_types:
+                continue
+            if handler.event_type in consumer_types:
+                continue
+            if not handler.enabled():
+                continue
+            processed = failed = 0
+            for _ in range(MAX_DRAIN_ROUNDS):
+                db = self._session_factory()
+                try:
+                    result = handler.process(db, limit=handler.limit)
+                except Exception as exc:
+                    db.rollback()
+                    logger.warning("outbox_listener_drain_failed event_type=%s", handler.event_type, exc_info=True)
+                    self.last_error = str(exc)
+                    break
+                finally:
+                    db.close()
+                with self._lock:
+                    self.drain_passes += 1
+                done = int(result.get("processed") or 0)
+                processed += done
+                failed += int(result.get("failed") or 0)
+                # Lot incomplet (file vide) ou rien de traité (différés / allowlist remis en
+                # pending) : on rend la main jusqu'au prochain réveil
+                if int(result.get("polled") or 0) < handler.limit or not done:
+                    break
+            out[handler.event_type] = {"processed": processed, "failed": failed}
+            with self._lock:
+                self.events_processed += processed
+                self.events_failed += failed
+        self.last_drain_ms = (time.monotonic() - started) * 1000.0
+        return out
+
+    # ------------------------------------------------------------------
+    # LISTEN
+    # ------------------------------------------------------------------
+
+    def _connect(self):
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        conn = psycopg2.connect(self._dsn)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {OUTBOX_NOTIFY_CHANNEL}")
+        return conn
+
+    @staticmethod
+    def _collect(conn, timeout: float) -> set[str] | None:
+        """Types notifiés, ou ``None`` si aucune notification avant ``timeout``."""
+        readable, _, _ = select.select([conn], [], [], timeout)
+        if not readable:
+            return None
+        time.sleep(NOTIFY_DEBOUNCE_SECONDS)
+        conn.poll()
+        types = {n.payload for n in conn.notifies}
+        conn.notifies.clear()
+        return types
+
+    def _listen_forever(self) -> None:
+        delay = _RECONNECT_BASE_DELAY_SEC
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                logger.info("Outbox listener subscribed to %s", OUTBOX_NOTIFY_CHANNEL)
+                delay = _RECONNECT_BASE_DELAY_SEC
+                # Rattrapage de ce qui a été inséré pendant la déconnexion
+                self.drain()
+                while not self._stop.is_set():
+                    types = self._collect(conn, self.safety_poll_seconds)
+                    with self._lock:
+                        if types is None:
+                            self.safety_polls += 1
+                        else:
+                            self.wakeups += 1
+                    if types is not None and not types:
+                        continue
+                    self.drain(types)
+            except Exception as exc:
+                self.last_error = str(exc)
+                logger.warning("Outbox listener error (reconnecting in %.1fs): %s", delay, exc)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self._stop.wait(delay)
+            delay = min(delay * 2, _RECONNECT_MAX_DELAY_SEC)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="outbox-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "wakeups": self.wakeups,
+                "safety_polls": self.safety_polls,
+                "drain_passes": self.drain_passes,
+                "events_processed": self.events_processed,
+                "events_failed": self.events_failed,
+                "last_drain_ms": round(self.last_drain_ms, 2) if self.last_drain_ms is not None else None,
+                "last_error": self.last_error,
+            }
+
+
+_listener: OutboxWakeupListener | None = None
+_listener_lock = threading.Lock()
+
+
+def get_outbox_listener() -> OutboxWakeupListener | None:
+    return _listener
+
+
+def start_outbox_wakeup_listener() -> bool:
+    """Côté API : démarre le listener (idempotent). Retourne True s'il écoute."""
+    global _listener
+    if not OUTBOX_LISTEN_ENABLED:
+        return False
+    from database import SessionLocal, engine
+
+    with _listener_lock:
+        if _listener is None:
+            dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+            _listener = OutboxWakeupListener(SessionLocal, dsn=dsn)
+        _listener.start()
+    return True
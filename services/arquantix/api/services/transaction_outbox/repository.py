@@ -5,12 +5,41 @@ from datetime import datetime, timedelta, timezone
 from typing import Any
 from uuid import UUID
 
+from sqlalchemy import func, text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from services.onchain_indexer.models import TransactionIntent
 from services.transaction_outbox.enums import OutboxEventStatus
 from services.transaction_outbox.models import TransactionIntentTransition, TransactionOutbox
+from services.transaction_outbox.notify import notify_outbox_event
+
+
+# Tête (plus ancien pending) de chaque scope d'une partition, éligible si son retry est échu
+_SCOPE_HEADS_SQL = text(
+    """
+    WITH heads AS (
+        SELECT o.id,
+               o.created_at,
+               o.next_retry_at,
+               coalesce(i.person_id::text, o.intent_id::text) AS scope,
+               row_number() OVER (
+                   PARTITION BY coalesce(i.person_id::text, o.intent_id::text)
+                   ORDER BY o.created_at, o.id
+               ) AS rn
+        FROM public.transaction_outbox o
+        JOIN public.transaction_intents i ON i.id = o.intent_id
+        WHERE o.status = :pending AND o.event_type = :event_type
+    )
+    SELECT id
+    FROM heads
+    WHERE rn = 1
+      AND next_retry_at <= now()
+      AND ((hashtext(scope)::bigint % :partitions) + :partitions) % :partitions = :partition
+    ORDER BY created_at
+    LIMIT :candidates
+    """
+)
 
 
 class TransactionOutboxRepository:
@@ -35,6 +64,9 @@ class TransactionOutboxRepository:
         )
         db.add(row)
         db.flush()
+        if status == OutboxEventStatus.PENDING.value:
+            # Délivré au commit : réveille le listener outbox sans attendre le tick
+            notify_outbox_event(db, event_type)
         return row
 
     @staticmethod
@@ -125,6 +157,73 @@ class TransactionOutboxRepository:
             db.flush()
         return rows
 
+    @staticmethod
+    def claim_next_scoped_event(
+        db: Session,
+        *,
+        event_type: str,
+        locked_by: str,
+        partition: int = 0,
+        partitions: int = 1,
+        candidates: int = 10,
+    ) -> TransactionOutbox | None:
+        """Réclame (PROCESSING) l'événement en tête d'un scope de la partition, ou ``None``.
+
+        Scope = ``person_id`` de l'intent (à défaut l'intent). Seule la tête de chaque scope
+        (plus ancien pending, même en attente de retry) est candidate : un scope n'a jamais
+        deux événements en vol et l'ordre de création y est respecté. Partition =
+        ``hashtext(scope) mod partitions`` ; la tête verrouillée par un autre worker est sautée
+        (``SKIP LOCKED``).
+        """
+        head_ids = [
+            row.id
+            for row in db.execute(
+                _SCOPE_HEADS_SQL,
+                {
+                    "pending": OutboxEventStatus.PENDING.value,
+                    "event_type": event_type,
+                    "partition": partition,
+                    "partitions": max(1, partitions),
+                    "candidates": candidates,
+                },
+            )
+        ]
+        if not head_ids:
+            return None
+        row = (
+            db.query(TransactionOutbox)
+            .filter(
+                TransactionOutbox.id.in_(head_ids),
+                TransactionOutbox.status == OutboxEventStatus.PENDING.value,
+            )
+            .order_by(TransactionOutbox.created_at.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if row is None:
+            return None
+        row.status = OutboxEventStatus.PROCESSING.value
+        row.locked_by = locked_by
+        row.locked_at = datetime.now(timezone.utc)
+        db.flush()
+        return row
+
+    @staticmethod
+    def pending_queue_stats(db: Session) -> dict[str, dict[str, Any]]:
+        """Par ``event_type`` : profondeur pending et date du plus ancien (lag)."""
+        rows = (
+            db.query(
+                TransactionOutbox.event_type,
+                func.count(TransactionOutbox.id),
+                func.min(TransactionOutbox.created_at),
+            )
+            .filter(TransactionOutbox.status == OutboxEventStatus.PENDING.value)
+            .group_by(TransactionOutbox.event_type)
+            .all()
+        )
+        return {event_type: {"depth": int(depth), "oldest_created_at": oldest} for event_type, depth, oldest in rows}
+
     @staticmethod
     def mark_processed(db: Session, row: TransactionOutbox) -> None:
         now = datetime.now(timezone.utc)
@@ -136,11 +235,18 @@ class TransactionOutboxRepository:
         db.flush()
 
     @staticmethod
-    def release_processing_lock(db: Session, row: TransactionOutbox) -> None:
+    def release_processing_lock(
+        db: Session,
+        row: TransactionOutbox,
+        *,
+        retry_delay_seconds: int | None = None,
+    ) -> None:
         """Remet un événement en pending sans incrémenter attempt_count (skip allowlist, etc.)."""
         row.status = OutboxEventStatus.PENDING.value
         row.locked_by = None
         row.locked_at = None
+        if retry_delay_seconds is not None:
+            row.next_retry_at = datetime.now(timezone.utc) + timedelta(seconds=retry_delay_seconds)
         db.flush()
 
     @staticmethod
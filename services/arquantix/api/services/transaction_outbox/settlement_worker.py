@@ -129,6 +129,57 @@ def handle_intent_settle_event(db: Session, outbox: TransactionOutbox) -> None:
     )
 
 
+def process_intent_settle_event(db: Session, event: TransactionOutbox) -> tuple[str, str | None]:
+    """Traite un événement ``intent.settle`` déjà réclamé (PROCESSING), sans commit.
+
+    Returns:
+        (issue, erreur) — issue ∈ ``processed``, ``failed``, ``retried``, ``skipped_allowlist``.
+    """
+    intent = db.query(TransactionIntent).filter(TransactionIntent.id == event.intent_id).first()
+    if intent is None or not lifi_outbox_worker_enabled_for_person(db, intent.person_id):
+        TransactionOutboxRepository.release_processing_lock(db, event)
+        return "skipped_allowlist", None
+    try:
+        handle_intent_settle_event(db, event)
+        TransactionOutboxRepository.mark_processed(db, event)
+        return "processed", None
+    except RetryableSettlementError as exc:
+        logger.info(
+            "outbox_intent_settle_retryable",
+            extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
+        )
+        TransactionOutboxRepository.mark_failure(
+            db,
+            event,
+            error=str(exc),
+            retry_delay_seconds=_RETRY_DELAY_SECONDS,
+        )
+        return "retried", str(exc)
+    except Exception as exc:
+        logger.warning(
+            "outbox_intent_settle_handler_failed",
+            extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
+            exc_info=True,
+        )
+        TransactionOutboxRepository.mark_failure(
+            db,
+            event,
+            error=str(exc),
+            retry_delay_seconds=_RETRY_DELAY_SECONDS,
+        )
+        if event.status == OutboxEventStatus.DEAD_LETTER.value and intent is not None:
+            from services.transaction_outbox.orchestrator_product_locks import (
+                release_orchestrator_product_locks_for_intent,
+            )
+
+            release_orchestrator_product_locks_for_intent(
+                db,
+                intent,
+                reason="outbox_dead_letter",
+            )
+        return "failed", str(exc)
+
+
 def process_transaction_outbox_intent_settle(
     db: Session,
     *,
@@ -146,68 +197,24 @@ def process_transaction_outbox_intent_settle(
         locked_by=locked_by,
     )
 
-    processed = 0
-    failed = 0
-    retried = 0
-    skipped_allowlist = 0
+    counts = {"processed": 0, "failed": 0, "retried": 0, "skipped_allowlist": 0}
     errors: list[dict[str, str]] = []
 
     for event in events:
-        intent = db.query(TransactionIntent).filter(TransactionIntent.id == event.intent_id).first()
-        if intent is None or not lifi_outbox_worker_enabled_for_person(db, intent.person_id):
-            TransactionOutboxRepository.release_processing_lock(db, event)
-            skipped_allowlist += 1
-            continue
-        try:
-            handle_intent_settle_event(db, event)
-            TransactionOutboxRepository.mark_processed(db, event)
-            processed += 1
-        except RetryableSettlementError as exc:
-            logger.info(
-                "outbox_intent_settle_retryable",
-                extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
-            )
-            TransactionOutboxRepository.mark_failure(
-                db,
-                event,
-                error=str(exc),
-                retry_delay_seconds=_RETRY_DELAY_SECONDS,
-            )
-            retried += 1
-        except Exception as exc:
-            logger.warning(
-                "outbox_intent_settle_handler_failed",
-                extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
-                exc_info=True,
-            )
-            TransactionOutboxRepository.mark_failure(
-                db,
-                event,
-                error=str(exc),
-                retry_delay_seconds=_RETRY_DELAY_SECONDS,
-            )
-            if event.status == OutboxEventStatus.DEAD_LETTER.value and intent is not None:
-                from services.transaction_outbox.orchestrator_product_locks import (
-                    release_orchestrator_product_locks_for_intent,
-                )
-
-                release_orchestrator_product_locks_for_intent(
-                    db,
-                    intent,
-                    reason="outbox_dead_letter",
-                )
-            failed += 1
-            errors.append({"outbox_id": str(event.id), "error": str(exc)})
-
-    if processed or failed or retried or skipped_allowlist:
+        outcome, error = process_intent_settle_event(db, event)
+        counts[outcome] += 1
+        if outcome == "failed":
+            errors.append({"outbox_id": str(event.id), "error": error or ""})
+
+    if any(counts.values()):
         db.commit()
 
     return {
         "enabled": True,
         "polled": len(events),
-        "processed": processed,
-        "failed": failed,
-        "retried": retried,
-        "skipped_allowlist": skipped_allowlist,
+        "processed": counts["processed"],
+        "failed": counts["failed"],
+        "retried": counts["retried"],
+        "skipped_allowlist": counts["skipped_allowlist"],
         "errors": errors,
     }
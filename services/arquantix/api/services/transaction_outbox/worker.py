@@ -130,6 +130,58 @@ def handle_intent_created_event(db: Session, outbox: TransactionOutbox) -> None:
     _apply_locks_queue_and_enqueue_settle(db, intent, outbox)
 
 
+def process_intent_created_event(db: Session, event: TransactionOutbox) -> tuple[str, str | None]:
+    """Traite un événement ``intent.created`` déjà réclamé (PROCESSING), sans commit.
+
+    Returns:
+        (issue, erreur) — issue ∈ ``processed``, ``failed``, ``requeued_lock_conflict``,
+        ``skipped_allowlist``.
+    """
+    intent = db.query(TransactionIntent).filter(TransactionIntent.id == event.intent_id).first()
+    if intent is None or not lifi_outbox_worker_enabled_for_person(db, intent.person_id):
+        TransactionOutboxRepository.release_processing_lock(db, event)
+        return "skipped_allowlist", None
+    try:
+        handle_intent_created_event(db, event)
+        TransactionOutboxRepository.mark_processed(db, event)
+        return "processed", None
+    except ProductLockConflict409 as exc:
+        logger.info(
+            "outbox_intent_created_lock_conflict_requeue",
+            extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
+        )
+        TransactionOutboxRepository.mark_failure(
+            db,
+            event,
+            error=str(exc),
+            retry_delay_seconds=_LOCK_CONFLICT_RETRY_DELAY_SECONDS,
+        )
+        return "requeued_lock_conflict", str(exc)
+    except Exception as exc:
+        logger.warning(
+            "outbox_intent_created_handler_failed",
+            extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
+            exc_info=True,
+        )
+        TransactionOutboxRepository.mark_failure(
+            db,
+            event,
+            error=str(exc),
+            retry_delay_seconds=_RETRY_DELAY_SECONDS,
+        )
+        if event.status == OutboxEventStatus.DEAD_LETTER.value and intent is not None:
+            from services.transaction_outbox.orchestrator_product_locks import (
+                release_orchestrator_product_locks_for_intent,
+            )
+
+            release_orchestrator_product_locks_for_intent(
+                db,
+                intent,
+                reason="outbox_dead_letter",
+            )
+        return "failed", str(exc)
+
+
 def process_transaction_outbox_intent_created(
     db: Session,
     *,
@@ -151,70 +203,27 @@ def process_transaction_outbox_intent_created(
     for event in deferred_same_scope:
         TransactionOutboxRepository.release_processing_lock(db, event)
 
-    processed = 0
-    failed = 0
-    requeued_lock_conflict = 0
-    skipped_allowlist = 0
+    counts = {"processed": 0, "failed": 0, "requeued_lock_conflict": 0, "skipped_allowlist": 0}
     errors: list[dict[str, str]] = []
 
     for event in to_process:
-        intent = db.query(TransactionIntent).filter(TransactionIntent.id == event.intent_id).first()
-        if intent is None or not lifi_outbox_worker_enabled_for_person(db, intent.person_id):
-            TransactionOutboxRepository.release_processing_lock(db, event)
-            skipped_allowlist += 1
-            continue
-        try:
-            handle_intent_created_event(db, event)
-            TransactionOutboxRepository.mark_processed(db, event)
-            processed += 1
-        except ProductLockConflict409 as exc:
-            logger.info(
-                "outbox_intent_created_lock_conflict_requeue",
-                extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
-            )
-            TransactionOutboxRepository.mark_failure(
-                db,
-                event,
-                error=str(exc),
-                retry_delay_seconds=_LOCK_CONFLICT_RETRY_DELAY_SECONDS,
-            )
-            requeued_lock_conflict += 1
-            errors.append({"outbox_id": str(event.id), "error": str(exc), "requeued": "lock_conflict"})
-        except Exception as exc:
-            logger.warning(
-                "outbox_intent_created_handler_failed",
-                extra={"outbox_id": str(event.id), "intent_id": str(event.intent_id)},
-                exc_info=True,
-            )
-            TransactionOutboxRepository.mark_failure(
-                db,
-                event,
-                error=str(exc),
-                retry_delay_seconds=_RETRY_DELAY_SECONDS,
-            )
-            if event.status == OutboxEventStatus.DEAD_LETTER.value and intent is not None:
-                from services.transaction_outbox.orchestrator_product_locks import (
-                    release_orchestrator_product_locks_for_intent,
-                )
-
-                release_orchestrator_product_locks_for_intent(
-                    db,
-                    intent,
-                    reason="outbox_dead_letter",
-                )
-            failed += 1
-            errors.append({"outbox_id": str(event.id), "error": str(exc)})
-
-    if processed or failed or requeued_lock_conflict or skipped_allowlist or deferred_same_scope:
+        outcome, error = process_intent_created_event(db, event)
+        counts[outcome] += 1
+        if outcome == "requeued_lock_conflict":
+            errors.append({"outbox_id": str(event.id), "error": error or "", "requeued": "lock_conflict"})
+        elif outcome == "failed":
+            errors.append({"outbox_id": str(event.id), "error": error or ""})
+
+    if any(counts.values()) or deferred_same_scope:
         db.commit()
 
     return {
         "enabled": True,
         "polled": len(events),
-        "processed": processed,
-        "failed": failed,
-        "requeued_lock_conflict": requeued_lock_conflict,
+        "processed": counts["processed"],
+        "failed": counts["failed"],
+        "requeued_lock_conflict": counts["requeued_lock_conflict"],
         "deferred_same_scope": len(deferred_same_scope),
-        "skipped_allowlist": skipped_allowlist,
+        "skipped_allowlist": counts["skipped_allowlist"],
         "errors": errors,
     }
@@ -23,11 +23,14 @@ from sqlalchemy.orm import Session
 from database import (
     MarketDataBar1d,
     MarketDataInstrument,
-    MarketDataLatestQuote,
 )
-from services.exchange.assets import ASSET_PROVIDER_SYMBOL_MAP
 from services.exchange.models import CryptoPosition, ExchangeOrder
 from services.market_data.fx import get_eurusdt_rate, usdt_to_eur
+from services.market_data.price_snapshot import (
+    PriceSnapshot,
+    asset_provider_symbol,
+    get_cached_price_snapshot,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -58,15 +61,9 @@ def _resolve_instrument_id(db: Session, provider_symbol: str) -> Optional[int]:
     return row[0] if row else None
 
 
-def _get_live_price_usdt(db: Session, instrument_id: int) -> Optional[Decimal]:
-    quote = (
-        db.query(MarketDataLatestQuote)
-        .filter(MarketDataLatestQuote.instrument_id == instrument_id)
-        .first()
-    )
-    if quote and quote.last_price:
-        return Decimal(str(quote.last_price))
-    return None
+def _get_live_price_usdt(snapshot: PriceSnapshot, provider_symbol: str) -> Optional[Decimal]:
+    price = snapshot.price_usdt(provider_symbol)
+    return price if price else None
 
 
 def _compute_volatility_30d(
@@ -228,6 +225,8 @@ def build_wallet_statistics(
     reference_currency: str = "EUR",
     portfolio_scope: Optional[str] = None,
     portfolio_id: Optional[str] = None,
+    *,
+    snapshot: Optional[PriceSnapshot] = None,
 ) -> dict:
     """Build complete statistics for a single asset position.
 
@@ -235,6 +234,9 @@ def build_wallet_statistics(
       - None / "global" → all orders + crypto_positions (default, backward compatible)
       - "direct"         → non-bundle orders + direct atom quantity
       - "bundle"         → bundle orders for portfolio_id + bundle atom quantity
+
+    Prices and FX come from *snapshot* (default: the short-TTL process
+    snapshot — this is a read-only computation).
     """
     use_eur = reference_currency.upper() == "EUR"
 
@@ -256,10 +258,12 @@ def build_wallet_statistics(
 
         orders = filter_self_trading_exchange_orders(orders)
 
-    provider_symbol = ASSET_PROVIDER_SYMBOL_MAP.get(asset.upper(), f"{asset.upper()}USDT")
+    provider_symbol = asset_provider_symbol(asset.upper())
     instrument_id = _resolve_instrument_id(db, provider_symbol)
 
-    eurusdt_rate = get_eurusdt_rate(db, strict=False)
+    if snapshot is None or not snapshot.covers([provider_symbol]):
+        snapshot = get_cached_price_snapshot(db, [provider_symbol])
+    eurusdt_rate = get_eurusdt_rate(db, strict=False, snapshot=snapshot)
 
     def _to_ref(usdt_price: Decimal) -> Decimal:
         if use_eur:
@@ -269,7 +273,7 @@ def build_wallet_statistics(
     # ── Current price ───────────────────────────────────────────────
     current_price_usdt = Decimal("0")
     if instrument_id is not None:
-        p = _get_live_price_usdt(db, instrument_id)
+        p = _get_live_price_usdt(snapshot, provider_symbol)
         if p is not None:
             current_price_usdt = p
     current_price = _to_ref(current_price_usdt)
@@ -358,14 +362,14 @@ def build_wallet_statistics(
                 .filter(CryptoPosition.client_id == client_id)
                 .all()
             )
+            position_symbols = [asset_provider_symbol(p.asset) for p in all_positions]
+            if not snapshot.covers(position_symbols):
+                snapshot = get_cached_price_snapshot(db, position_symbols)
             total_portfolio = Decimal("0")
-            for p in all_positions:
-                ps = ASSET_PROVIDER_SYMBOL_MAP.get(p.asset, f"{p.asset}USDT")
-                iid = _resolve_instrument_id(db, ps)
-                if iid is not None:
-                    p_price_usdt = _get_live_price_usdt(db, iid)
-                    if p_price_usdt is not None:
-                        total_portfolio += _dec(p.balance) * _to_ref(p_price_usdt)
+            for p, ps in zip(all_positions, position_symbols):
+                p_price_usdt = _get_live_price_usdt(snapshot, ps)
+                if p_price_usdt is not None:
+                    total_portfolio += _dec(p.balance) * _to_ref(p_price_usdt)
             if total_portfolio > 0:
                 portfolio_weight = round(float(current_value / total_portfolio), 4)
         else:
@@ -0,0 +1,61 @@
+"""Helpers tests: mock of the set-based price bridge (get_instrument_prices)."""
+from __future__ import annotations
+
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from services.portfolio_engine.instruments.price_bridge import (
+    MarketDataLinkMissingError,
+    QuoteNotAvailableError,
+)
+
+INSTRUMENT_PRICES_PATH = "services.portfolio_engine.valuations.batch.get_instrument_prices"
+
+
+class InstrumentPriceStub:
+    """Stands in for ``get_instrument_prices``, configured per instrument like a
+    ``get_instrument_price`` mock: ``return_value`` (dict with "price") or
+    ``side_effect`` (exception, or callable ``(db, instrument_id)``).
+
+    Usage: ``@patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)``.
+    """
+
+    def __init__(self, **kwargs):
+        self.per_instrument = MagicMock(**kwargs)
+        self.calls: list[list] = []
+
+    @property
+    def return_value(self):
+        return self.per_instrument.return_value
+
+    @return_value.setter
+    def return_value(self, value):
+        self.per_instrument.return_value = value
+
+    @property
+    def side_effect(self):
+        return self.per_instrument.side_effect
+
+    @side_effect.setter
+    def side_effect(self, value):
+        self.per_instrument.side_effect = value
+
+    def __call__(self, db, instrument_ids):
+        ids = list(instrument_ids)
+        self.calls.append(ids)
+        prices: dict = {}
+        for instrument_id in ids:
+            try:
+                result = self.per_instrument(db, instrument_id)
+            except (MarketDataLinkMissingError, QuoteNotAvailableError):
+                continue
+            if result.get("price") is not None:
+                prices[instrument_id] = Decimal(result["price"])
+        return prices
+
+    def assert_not_called(self):
+        assert not self.calls, f"get_instrument_prices called {len(self.calls)} time(s)"
+
+    @property
+    def call_count(self) -> int:
+        return len(self.calls)
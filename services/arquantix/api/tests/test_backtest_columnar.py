@@ -0,0 +1,152 @@
+"""
+Tests for backtest series persistence (bulk rows and columnar blob)
+"""
+import math
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import BacktestInstrumentSeries, BacktestMetrics, BacktestPortfolioSeries
+from services.backtest import repository
+from services.backtest.columnar import (
+    columnar_payload,
+    decode_series,
+    encode_series,
+    instrument_rows,
+    portfolio_rows,
+)
+from services.backtest.repository import instrument_series_rows, metrics_rows, portfolio_series_rows
+
+
+def _result(n_days=40, instrument_ids=(11, 12, 13), seed=3):
+    rng = np.random.default_rng(seed)
+    dates = [date(2024, 1, 1) + timedelta(days=i) for i in range(n_days)]
+    nav = 100.0 * np.cumprod(1.0 + rng.normal(0.0003, 0.01, n_days))
+    portfolio_series = [
+        {
+            "date": d,
+            "nav_base100": float(nav[t]),
+            "portfolio_return": float(nav[t] / nav[t - 1] - 1.0) if t else 0.0,
+            "drawdown": -0.01 * t / n_days,
+            "turnover": 0.1 if t % 7 == 0 else 0.0,
+            "costs": 0.0001 if t % 7 == 0 else 0.0,
+            "weights_json": {str(i): (float("nan") if t == 3 else 1.0 / len(instrument_ids)) for i in instrument_ids},
+            "tradable_json": {str(i): True for i in instrument_ids},
+        }
+        for t, d in enumerate(dates)
+    ]
+    instrument_series = {}
+    for j, instrument_id in enumerate(instrument_ids):
+        start = 5 * j  # later listings: fewer rows
+        instrument_series[instrument_id] = [
+            {
+                "date": dates[t],
+                "base100": 100.0 + 0.123456789 * (t - start),
+                "instrument_return": None if t == start else (0.0 if t % 5 == 0 else 0.00123456789 * j),
+            }
+            for t in range(start, n_days)
+        ]
+    return portfolio_series, instrument_series
+
+
+def _legacy_portfolio(series):
+    """What the row endpoint returns for rows stored as Numeric(20, 8)"""
+    q = Decimal("0.00000001")
+    out = []
+    for item in series:
+        weights = repository.clean_json_numbers(item["weights_json"])
+        out.append({
+            "date": item["date"].isoformat(),
+            **{k: float(Decimal(str(item[k])).quantize(q)) for k in ("nav_base100", "portfolio_return", "drawdown", "turnover", "costs")},
+            "weights_json": weights or {},
+            "tradable_json": item["tradable_json"] or {},
+        })
+    return out
+
+
+def test_blob_round_trip_matches_row_endpoint_values():
+    portfolio_series, instrument_series = _result()
+    decoded = decode_series(encode_series(portfolio_series, instrument_series))
+
+    assert portfolio_rows(decoded) == _legacy_portfolio(portfolio_series)
+    assert portfolio_rows(decoded)[3]["weights_json"] == {"11": None, "12": None, "13": None}
+
+    bars = instrument_rows(decoded)
+    assert sorted(bars) == [11, 12, 13]
+    for instrument_id, rows in instrument_series.items():
+        assert [b["date"] for b in bars[instrument_id]] == [r["date"].isoformat() for r in rows]
+        for bar, row in zip(bars[instrument_id], rows):
+            assert math.isclose(bar["base100"], round(row["base100"], 8), abs_tol=1e-12)
+            # the row endpoint reports 0 and missing returns as None
+            expected = row["instrument_return"] or None
+            assert bar["instrument_return"] == (round(expected, 8) if expected else None)
+
+
+def test_decode_skips_members_and_columnar_payload_shape():
+    portfolio_series, instrument_series = _result(n_days=12)
+    blob = encode_series(portfolio_series, instrument_series)
+    light = decode_series(blob, with_instruments=False, with_json=False)
+    assert light.dates == [item["date"] for item in portfolio_series]
+    assert light.instrument_ids == [] and light.weights_json == []
+
+    payload = columnar_payload(decode_series(blob))
+    assert len(payload["dates"]) == len(payload["nav_base100"]) == 12
+    assert payload["instruments"]["instrument_ids"] == [11, 12, 13]
+    assert payload["instruments"]["base100"][2][:10] == [None] * 10
+
+
+def test_empty_result_encodes():
+    decoded = decode_series(encode_series([], {}))
+    assert portfolio_rows(decoded) == [] and instrument_rows(decoded) == {}
+
+
+def test_row_builders():
+    portfolio_series, instrument_series = _result(n_days=10)
+    rows = portfolio_series_rows(7, portfolio_series)
+    assert len(rows) == 10 and rows[0]["run_id"] == 7
+    assert rows[3]["weights_json"]["11"] is None
+    assert len(instrument_series_rows(7, instrument_series)) == 10 + 5 + 0
+
+    metrics = {"portfolio": {"sharpe_ratio": 1.2, "cagr": None}, "instruments": {11: {"volatility": 0.2}}}
+    assert metrics_rows(7, metrics) == [
+        {"run_id": 7, "scope": "portfolio", "instrument_id": None, "key": "sharpe_ratio", "value": 1.2},
+        {"run_id": 7, "scope": "instrument", "instrument_id": 11, "key": "volatility", "value": 0.2},
+    ]
+
+
+def test_bulk_insert_rows_in_batches(monkeypatch):
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _attach_public(dbapi_connection, _):
+        dbapi_connection.execute("ATTACH DATABASE ':memory:' AS public")
+
+    tables = [BacktestPortfolioSeries.__table__, BacktestInstrumentSeries.__table__, BacktestMetrics.__table__]
+    with engine.begin() as conn:
+        for table in tables:
+            table.create(conn)
+    monkeypatch.setattr(repository, "BULK_INSERT_BATCH", 7)
+    db = sessionmaker(bind=engine)()
+    try:
+        portfolio_series, instrument_series = _result(n_days=30)
+        repository.store_portfolio_series(db, 1, portfolio_series)
+        repository.store_instrument_series(db, 1, instrument_series)
+        repository.store_metrics(db, 1, {"portfolio": {"sharpe_ratio": 0.5}, "instruments": {}})
+        # re-storing replaces the rows
+        repository.store_portfolio_series(db, 1, portfolio_series)
+
+        stored = db.query(BacktestPortfolioSeries).order_by(BacktestPortfolioSeries.date).all()
+        assert len(stored) == 30
+        assert float(stored[-1].nav_base100) == round(portfolio_series[-1]["nav_base100"], 8)
+        assert stored[3].weights_json["12"] is None
+        assert db.query(BacktestInstrumentSeries).count() == 30 + 25 + 20
+        assert [float(m.value) for m in db.query(BacktestMetrics)] == [0.5]
+    finally:
+        db.close()
@@ -0,0 +1,267 @@
+"""
+Parity tests: NumPy engine based strategies vs golden digests of the previous loop
+implementations, captured once per case on the same synthetic prices
+(tests/fixtures/backtest_engine_golden.json).
+"""
+import json
+import math
+import sys
+import zlib
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backtest.engine import RollingMoments, rebalance_mask
+from services.backtest.executor import run_weight_strategy_backtest
+from services.backtest.strategies.core_satellite import run_core_satellite_backtest
+from services.backtest.strategies.cppi import run_cppi_backtest
+
+# Tolerances on digest sums (the engine matches the captured legacy sums to ~1e-13)
+REL_TOL = 1e-11
+ABS_TOL = 1e-11
+GOLDEN = json.loads((Path(__file__).parent / "fixtures" / "backtest_engine_golden.json").read_text())
+
+
+def _prices(n_days=260, n_instruments=5, seed=7, weekdays_only=False, start="2022-01-03"):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=n_days) if weekdays_only else pd.date_range(start, periods=n_days, freq="D")
+    drift = rng.normal(0.0004, 0.0003, n_instruments)
+    vol = rng.uniform(0.01, 0.04, n_instruments)
+    log_returns = rng.normal(drift, vol, (n_days, n_instruments))
+    values = 100.0 * np.exp(np.cumsum(log_returns, axis=0))
+    return pd.DataFrame(values, index=index, columns=list(range(101, 101 + n_instruments)))
+
+
+def _is_instrument_key(key) -> bool:
+    return isinstance(key, (int, np.integer)) or (isinstance(key, str) and key.isdigit())
+
+
+def digest(result) -> dict:
+    """[count, sum, position-weighted sum] per field path of a backtest result.
+
+    List indices are collapsed (``portfolio_series[].nav_base100``), as are
+    instrument-id keys (``weights_json.*``); non-numeric leaves (dates, events)
+    contribute their CRC32.
+    """
+    out: dict = {}
+
+    def walk(node, path, pos):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                walk(value, f"{path}.{'*' if _is_instrument_key(key) else key}", pos)
+        elif isinstance(node, (list, tuple)):
+            for i, value in enumerate(node):
+                walk(value, f"{path}[]", i + 1)
+        else:
+            if isinstance(node, (bool, int, float, np.integer, np.floating)):
+                value = float(node)
+                if math.isnan(value):
+                    value = 0.0
+            else:
+                value = float(zlib.crc32(str(node).encode()))
+            entry = out.setdefault(path, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += value
+            entry[2] += pos * value
+
+    walk(result, "result", 0)
+    return out
+
+
+def assert_golden(request, result):
+    expected = GOLDEN[request.node.name]
+    actual = digest(result)
+    assert sorted(expected) == sorted(actual), request.node.name
+    for path, (count, total, weighted) in expected.items():
+        got = actual[path]
+        assert got[0] == count, f"{path}: {got[0]} values != {count}"
+        assert math.isclose(got[1], total, rel_tol=REL_TOL, abs_tol=ABS_TOL), f"{path}: sum {got[1]} != {total}"
+        assert math.isclose(got[2], weighted, rel_tol=REL_TOL, abs_tol=ABS_TOL), f"{path}: weighted sum {got[2]} != {weighted}"
+
+
+def _window(prices):
+    return prices.index[0].date(), prices.index[-1].date()
+
+
+# ----------------------------------------------------------------------------
+# CPPI
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("rebalance", ["daily", "weekly", "monthly"])
+@pytest.mark.parametrize("debug", [False, True])
+def test_cppi_parity(request, rebalance, debug):
+    prices = _prices()
+    start, end = _window(prices)
+    ids = list(prices.columns)
+    kwargs = dict(
+        prices_df=prices,
+        weights_resolver=lambda d: {i: 1.0 / len(ids) for i in ids},
+        start_date=start,
+        end_date=end,
+        initial_capital=100.0,
+        rebalance_frequency=rebalance,
+        fees_bps=10.0,
+        slippage_bps=5.0,
+        floor_ratio=0.85,
+        multiplier=3.0,
+        risky_cap=0.9,
+        core_min=0.05,
+        debug=debug,
+    )
+    assert_golden(request, run_cppi_backtest(**kwargs))
+
+
+def test_cppi_parity_changing_universe_and_missing_prices(request):
+    prices = _prices(n_days=200, n_instruments=4, seed=11)
+    prices.iloc[40:43, 2] = np.nan
+    prices.iloc[0, 3] = np.nan
+    start, end = _window(prices)
+    ids = list(prices.columns)
+
+    def resolver(d):
+        # Universe shrinks to the first three instruments in the second half
+        active = ids if d < date(2022, 4, 1) else ids[:3]
+        return {i: 1.0 / len(active) for i in active}
+
+    kwargs = dict(
+        prices_df=prices,
+        weights_resolver=resolver,
+        start_date=start,
+        end_date=end,
+        initial_capital=100.0,
+        rebalance_frequency="weekly",
+        fees_bps=20.0,
+        slippage_bps=0.0,
+        debug=True,
+    )
+    assert_golden(request, run_cppi_backtest(**kwargs))
+
+
+# ----------------------------------------------------------------------------
+# Core-Satellite
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize(
+    "allocation_mode,rebalance,debug,extra",
+    [
+        ("te_target", "weekly", False, {}),
+        ("te_target", "monthly", True, {"shrinkage": True}),
+        ("utility_lambda", "weekly", True, {"core_min": 0.3}),
+        ("dynamic_cushion", "weekly", True, {}),
+        ("dynamic_cushion", "monthly", False, {"floor_accrues_with_core": False}),
+        ("te_target", "weekly", True, {"optimization_method": "quadratic", "turnover_penalty": 0.1}),
+    ],
+)
+def test_core_satellite_parity(request, allocation_mode, rebalance, debug, extra):
+    prices = _prices(n_days=220, n_instruments=5, seed=3, weekdays_only=True)
+    start, end = _window(prices)
+    kwargs = dict(
+        prices_df=prices,
+        instrument_ids=list(prices.columns),
+        start_date=start,
+        end_date=end,
+        initial_capital=100.0,
+        rebalance_frequency=rebalance,
+        fees_bps=10.0,
+        slippage_bps=5.0,
+        lookback_risk_days=30,
+        lookback_return_days=30,
+        allocation_mode=allocation_mode,
+        debug=debug,
+        **extra,
+    )
+    assert_golden(request, run_core_satellite_backtest(**kwargs))
+
+
+def test_core_satellite_parity_missing_prices(request):
+    prices = _prices(n_days=150, n_instruments=4, seed=5)
+    prices.iloc[60:62, 1] = np.nan
+    start, end = _window(prices)
+    kwargs = dict(
+        prices_df=prices,
+        instrument_ids=list(prices.columns),
+        start_date=start,
+        end_date=end,
+        initial_capital=100.0,
+        rebalance_frequency="daily",
+        fees_bps=5.0,
+        slippage_bps=5.0,
+        lookback_risk_days=20,
+        lookback_return_days=20,
+        debug=True,
+    )
+    assert_golden(request, run_core_satellite_backtest(**kwargs))
+
+
+@pytest.mark.parametrize(
+    "risk_days,return_days,extra",
+    [
+        (30, 30, {"shrinkage": True}),
+        (40, 15, {"optimization_method": "quadratic", "stability_penalty": 0.05}),
+        (15, 40, {"allocation_mode": "utility_lambda", "top_k_satellite": 4}),
+        (25, 10, {"allocation_mode": "dynamic_cushion", "shrinkage": True}),
+    ],
+)
+def test_core_satellite_parity_daily_rolling_windows(request, risk_days, return_days, extra):
+    prices = _prices(n_days=200, n_instruments=8, seed=13)
+    prices.iloc[90:93, 4] = np.nan
+    start, end = _window(prices)
+    kwargs = dict(
+        prices_df=prices,
+        instrument_ids=list(prices.columns),
+        start_date=start,
+        end_date=end,
+        initial_capital=100.0,
+        rebalance_frequency="daily",
+        fees_bps=10.0,
+        slippage_bps=5.0,
+        lookback_risk_days=risk_days,
+        lookback_return_days=return_days,
+        debug=True,
+        **extra,
+    )
+    assert_golden(request, run_core_satellite_backtest(**kwargs))
+
+
+def test_rolling_moments_match_full_window_statistics():
+    rng = np.random.default_rng(17)
+    values = rng.normal(0.001, 0.02, (120, 6))
+    moments = RollingMoments(values, window=20)
+    # growing window, daily steps (through several recomputes), a jump and a move backwards
+    for end in list(range(2, 90)) + [115, 118, 40]:
+        moments.advance(end)
+        block = values[max(0, end - 20):end]
+        assert moments.count == len(block)
+        np.testing.assert_allclose(moments.mean(), block.mean(axis=0), rtol=1e-10, atol=1e-14)
+        np.testing.assert_allclose(moments.cov(), pd.DataFrame(block).cov().values, rtol=1e-9, atol=1e-14)
+    assert np.isnan(moments.advance(1).cov()).all()
+
+
+# ----------------------------------------------------------------------------
+# Executor weight-schedule strategies
+# ----------------------------------------------------------------------------
+
+@pytest.mark.parametrize("strategy_type", ["equal_weight", "momentum", "bundle_strategy"])
+@pytest.mark.parametrize("rebalance", ["daily", "weekly", "monthly"])
+@pytest.mark.parametrize("weekdays_only", [False, True])
+def test_weight_strategy_parity(request, strategy_type, rebalance, weekdays_only):
+    prices = _prices(n_days=180, n_instruments=4, seed=21, weekdays_only=weekdays_only)
+    ids = list(prices.columns)
+    calendar = [d.date() for d in prices.index]
+    args = (prices, ids, calendar, strategy_type, rebalance, 10.0, 5.0)
+    allocations = {101: 40.0, 102: 30.0, 103: 20.0, 104: 10.0}
+    assert_golden(request, run_weight_strategy_backtest(*args, bundle_allocations=allocations))
+
+
+def test_rebalance_mask_matches_strategy_rules():
+    calendar = [d.date() for d in pd.date_range("2024-01-30", "2024-03-05", freq="D")]
+    weekly = rebalance_mask(calendar, "weekly")
+    monthly = rebalance_mask(calendar, "monthly")
+    assert [d for d, m in zip(calendar, weekly) if m] == [calendar[0]] + [d for d in calendar if d.weekday() == 0]
+    assert [d for d, m in zip(calendar, monthly) if m] == [date(2024, 1, 30), date(2024, 2, 1), date(2024, 3, 1)]
+    assert rebalance_mask(calendar, "daily").all()
@@ -0,0 +1,175 @@
+"""
+Tests for the backtest job queue helpers (params hash, progress/cancellation, run reuse)
+"""
+import sys
+from concurrent.futures import Future
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backtest import jobs
+from services.backtest.jobs import (
+    BacktestCancelled,
+    ProgressReporter,
+    compute_params_hash,
+    find_reusable_run,
+)
+from services.backtest.strategies.cppi import run_cppi_backtest
+
+
+def _hash(**overrides):
+    kwargs = dict(
+        instrument_ids=[3, 1, 2],
+        start_date=date(2023, 1, 1),
+        end_date=date(2024, 1, 1),
+        strategy_type="CORE_SATELLITE",
+        rebalance="weekly",
+        fees_bps=10.0,
+        slippage_bps=5,
+        allow_weekend_trading=False,
+        strategy_params_json={"target_te": 0.1, "debug": None},
+    )
+    kwargs.update(overrides)
+    return compute_params_hash(**kwargs)
+
+
+def test_params_hash_is_canonical_and_input_sensitive():
+    assert _hash() == _hash(instrument_ids=[1, 2, 3], slippage_bps=5.0)
+    assert _hash() == _hash(strategy_params_json={"debug": None, "target_te": 0.1})
+    assert len(_hash()) == 64
+    assert _hash() != _hash(rebalance="monthly")
+    assert _hash() != _hash(strategy_params_json={"target_te": 0.12, "debug": None})
+    assert _hash() != _hash(bundle_allocations={1: 50.0, 2: 50.0})
+
+
+class _FakeResult:
+    def __init__(self, value):
+        self._value = value
+
+    def scalar(self):
+        return self._value
+
+
+class _FakeProgressSession:
+    def __init__(self):
+        self.cancel_requested = False
+        self.progress = []
+        self.commits = 0
+
+    def execute(self, stmt, params):
+        self.progress.append((params["done"], params["total"]))
+        return _FakeResult(self.cancel_requested)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_progress_reporter_throttles_and_always_writes_last_date():
+    db = _FakeProgressSession()
+    now = [0.0]
+    reporter = ProgressReporter(db, run_id=7, min_interval_sec=1.0, clock=lambda: now[0])
+    for i in range(10):
+        reporter(i, 10)
+        now[0] += 0.3
+    reporter(10, 10)
+    assert db.progress == [(0, 10), (4, 10), (8, 10), (10, 10)]
+    assert db.commits == 4
+
+
+def test_progress_reporter_cancels_cppi_loop():
+    calendar = pd.date_range("2024-01-01", periods=60, freq="D")
+    prices = pd.DataFrame(
+        {1: np.linspace(100, 130, 60), 2: np.linspace(50, 45, 60)}, index=calendar
+    )
+    db = _FakeProgressSession()
+    reporter = ProgressReporter(db, run_id=7, min_interval_sec=0.0)
+
+    def cancel_after_ten(done, total):
+        if done == 10:
+            db.cancel_requested = True
+        reporter(done, total)
+
+    with pytest.raises(BacktestCancelled):
+        run_cppi_backtest(
+            prices_df=prices,
+            weights_resolver=lambda d: {1: 0.5, 2: 0.5},
+            start_date=calendar[0].date(),
+            end_date=calendar[-1].date(),
+            initial_capital=100.0,
+            rebalance_frequency="daily",
+            fees_bps=0.0,
+            slippage_bps=0.0,
+            progress_callback=cancel_after_ten,
+        )
+    assert db.progress[-1] == (10, 60)
+
+
+class _FakeQuery:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def filter(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def limit(self, n):
+        self._rows = self._rows[:n]
+        return self
+
+    def all(self):
+        return self._rows
+
+
+class _FakeQuerySession:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def query(self, model):
+        return _FakeQuery(list(self._rows))
+
+
+def _run(run_id, status, cancel_requested=False):
+    return SimpleNamespace(id=run_id, status=status, cancel_requested=cancel_requested)
+
+
+def test_find_reusable_run_prefers_live_runs(monkeypatch):
+    monkeypatch.setattr(jobs, "_tracked", {8, 9})
+    rows = [_run(9, "RUNNING", cancel_requested=True), _run(8, "PENDING"), _run(5, "SUCCESS")]
+    assert find_reusable_run(_FakeQuerySession(rows), "h").id == 8
+
+    rows = [_run(4, "SUCCESS"), _run(3, "SUCCESS")]
+    assert find_reusable_run(_FakeQuerySession(rows), "h").id == 4
+
+
+def test_find_reusable_run_skips_runs_orphaned_by_a_restart(monkeypatch):
+    # PENDING / RUNNING rows from a previous API process: the new pool does not track them
+    monkeypatch.setattr(jobs, "_tracked", set())
+    rows = [_run(8, "RUNNING"), _run(7, "PENDING"), _run(5, "SUCCESS")]
+    assert find_reusable_run(_FakeQuerySession(rows), "h").id == 5
+
+    rows = [_run(8, "PENDING")]
+    assert find_reusable_run(_FakeQuerySession(rows), "h") is None
+
+
+def test_submitted_runs_are_tracked_until_done(monkeypatch):
+    monkeypatch.setattr(jobs, "_tracked", set())
+    pending = Future()
+
+    class _Pool:
+        def submit(self, fn, *args):
+            return pending
+
+    monkeypatch.setattr(jobs, "_get_pool", lambda: _Pool())
+    jobs.submit_backtest(42, {})
+    assert jobs.is_tracked(42)
+
+    pending.set_result("SUCCESS")
+    assert not jobs.is_tracked(42)
@@ -0,0 +1,147 @@
+"""
+Tests for backtest parameter sweeps (grid expansion, ranking, shared prices, worker pool)
+"""
+import math
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from services.backtest.engine import PriceMatrix
+from services.backtest.executor import cppi_params
+from services.backtest.strategies.cppi import run_cppi_backtest
+from services.backtest.sweep import (
+    SweepError,
+    SweepStrategySpec,
+    _evaluate_in_worker,
+    _init_worker,
+    attach_prices,
+    evaluate_combination,
+    expand_grid,
+    publish_prices,
+    rank_results,
+    summarize_metrics,
+)
+
+
+def _matrix(n_days=120, n_instruments=3, seed=5):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2023-01-02", periods=n_days, freq="D")
+    values = 100.0 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, (n_days, n_instruments)), axis=0))
+    return PriceMatrix([d.date() for d in index], list(range(1, n_instruments + 1)), values)
+
+
+def _cppi_spec(ids):
+    return SweepStrategySpec(strategy_type="CPPI", rebalance="weekly", fees_bps=10.0, slippage_bps=5.0, instrument_ids=ids)
+
+
+def test_expand_grid_is_cartesian_over_base_params():
+    combos = expand_grid({"floor_ratio": 0.9, "core_yield": 0.03}, {"floor_ratio": [0.8, 0.85], "multiplier": [2, 3, 4]})
+    assert len(combos) == 6
+    assert combos[0] == {"floor_ratio": 0.8, "core_yield": 0.03, "multiplier": 2}
+    assert combos[1]["multiplier"] == 3 and combos[3]["floor_ratio"] == 0.85
+    assert all(c["core_yield"] == 0.03 for c in combos)
+
+    with pytest.raises(SweepError):
+        expand_grid({}, {"multiplier": []})
+    with pytest.raises(SweepError):
+        expand_grid({}, {"a": list(range(30)), "b": list(range(30))})
+
+
+def test_summarize_metrics_handles_nested_flat_and_nan():
+    assert summarize_metrics({"portfolio": {"sharpe_ratio": 1.5, "volatility": float("nan")}, "instruments": {}}) == {
+        "sharpe_ratio": 1.5,
+        "volatility": None,
+    }
+    flat = summarize_metrics({"total_return": 3, "realized_te": None, "debug_only": 7})
+    assert flat == {"total_return": 3.0, "realized_te": None}
+
+
+def test_rank_results_orders_successes_and_leaves_failures_unranked():
+    results = [
+        {"combo_index": 0, "status": "SUCCESS", "metrics": {"sharpe_ratio": 0.5, "max_drawdown": -20.0}},
+        {"combo_index": 1, "status": "FAILED", "metrics": None},
+        {"combo_index": 2, "status": "SUCCESS", "metrics": {"sharpe_ratio": 1.2, "max_drawdown": -35.0}},
+        {"combo_index": 3, "status": "SUCCESS", "metrics": {"sharpe_ratio": 0.5, "max_drawdown": None}},
+    ]
+    ranked = rank_results(results, "sharpe_ratio")
+    assert [r["combo_index"] for r in ranked] == [2, 0, 3]
+    assert [r["rank"] for r in results] == [2, None, 1, 3]
+
+    ranked = rank_results(results, "max_drawdown", ascending=True)
+    assert [r["combo_index"] for r in ranked] == [2, 0]
+    assert results[3]["rank"] is None
+
+
+def test_shared_prices_round_trip_read_only():
+    matrix = _matrix()
+    shm, spec = publish_prices(matrix)
+    try:
+        attached_shm, attached = attach_prices(spec)
+        try:
+            assert attached.dates == matrix.dates
+            assert attached.instrument_ids == matrix.instrument_ids
+            np.testing.assert_array_equal(attached.values, matrix.values)
+            with pytest.raises(ValueError):
+                attached.values[0, 0] = 1.0
+        finally:
+            attached_shm.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_evaluate_combination_matches_standalone_cppi_run():
+    matrix = _matrix()
+    prices_df = matrix.to_frame()
+    params = {"floor_ratio": 0.85, "multiplier": 3.0}
+    out = evaluate_combination(prices_df, matrix.dates, _cppi_spec(matrix.instrument_ids), 4, params, full=True)
+    assert out["status"] == "SUCCESS" and out["combo_index"] == 4
+
+    expected = run_cppi_backtest(
+        prices_df=prices_df,
+        weights_resolver=lambda d: {i: 1.0 / 3 for i in matrix.instrument_ids},
+        start_date=matrix.dates[0],
+        end_date=matrix.dates[-1],
+        initial_capital=100.0,
+        rebalance_frequency="weekly",
+        fees_bps=10.0,
+        slippage_bps=5.0,
+        **cppi_params(params),
+    )
+    assert out["metrics"] == summarize_metrics(expected["metrics"])
+    assert out["result"]["portfolio_series"] == expected["portfolio_series"]
+
+    failed = evaluate_combination(prices_df, matrix.dates, _cppi_spec([]), 5, params)
+    assert failed["status"] == "FAILED" and failed["error"]
+
+
+def test_process_pool_workers_read_shared_prices():
+    matrix = _matrix(n_days=90)
+    spec = _cppi_spec(matrix.instrument_ids)
+    combos = expand_grid({}, {"multiplier": [2.0, 4.0], "floor_ratio": [0.8, 0.9]})
+    shm, prices_spec = publish_prices(matrix)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=2,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(prices_spec, spec),
+        ) as pool:
+            pooled = list(pool.map(_evaluate_in_worker, range(len(combos)), combos))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    prices_df = matrix.to_frame()
+    for i, (params, out) in enumerate(zip(combos, pooled)):
+        local = evaluate_combination(prices_df, matrix.dates, spec, i, params)
+        assert out["combo_index"] == i and out["status"] == "SUCCESS"
+        for key, value in local["metrics"].items():
+            assert math.isclose(out["metrics"][key], value, rel_tol=1e-12), key
@@ -216,7 +216,7 @@ def test_sell_then_buy_order(db: Session):
     provider = _RecordingMockProvider()
     exchange = MagicMock()
     exchange._resolve_price = MagicMock(
-        side_effect=lambda _db, asset, override_price=None, side="sell": {
+        side_effect=lambda _db, asset, override_price=None, side="sell", snapshot=None: {
             "USDC": Decimal("0.92"),
             "BTC": Decimal("90000"),
             "ETH": Decimal("3000"),
@@ -0,0 +1,192 @@
+"""Client JSON-RPC EVM mutualisé (evm_rpc_pool) : keep-alive, batch découpé, concurrence bornée,
+débit adaptatif sur 429 / quota, histogrammes par méthode. Transport httpx mocké."""
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import httpx
+import pytest
+
+from services.privy_wallet import evm_rpc_client, evm_rpc_pool
+from services.privy_wallet.evm_rpc_client import EvmRpcError
+from services.privy_wallet.evm_rpc_pool import AdaptiveRateLimiter, EvmRpcClient, LatencyHistogram
+
+RPC = "https://base-mainnet.g.alchemy.com/v2/secret-key"
+
+
+def _echo(item: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": item["id"], "result": item["params"][0] if item["params"] else "0x1"}
+
+
+def _client(handler, **kwargs) -> EvmRpcClient:
+    kwargs.setdefault("max_rps", 0)
+    return EvmRpcClient(RPC, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_call_returns_result_and_records_latency():
+    client = _client(lambda req: httpx.Response(200, json=_echo(json.loads(req.content))))
+
+    assert client.call("eth_blockNumber", []) == "0x1"
+    with pytest.raises(EvmRpcError) as exc:
+        _client(lambda req: httpx.Response(200, json={"id": 1, "error": {"message": "execution reverted"}})).call(
+            "eth_call", [{}]
+        )
+
+    assert exc.value.code == "evm.rpc.response_error"
+    snap = client.snapshot()
+    assert snap["requests"] == 1 and snap["methods"]["eth_blockNumber"]["count"] == 1
+
+
+def test_transport_errors_keep_legacy_codes():
+    def down(req):
+        raise httpx.ConnectError("refused", request=req)
+
+    with pytest.raises(EvmRpcError) as unavailable:
+        _client(down).call("eth_blockNumber", [])
+    with pytest.raises(EvmRpcError) as http_error:
+        _client(lambda req: httpx.Response(503)).call("eth_blockNumber", [])
+
+    assert unavailable.value.code == "evm.rpc.unavailable"
+    assert http_error.value.code == "evm.rpc.http_error" and "503" in str(http_error.value)
+
+
+def test_batch_is_split_and_results_stay_ordered():
+    sizes: list[int] = []
+
+    def handler(req):
+        items = json.loads(req.content)
+        sizes.append(len(items))
+        return httpx.Response(200, json=[_echo(item) for item in reversed(items)])
+
+    client = _client(handler, max_batch_size=4)
+    results = client.batch([("eth_getBlockByNumber", [hex(n)]) for n in range(10)])
+
+    assert results == [hex(n) for n in range(10)]
+    assert sorted(sizes) == [2, 4, 4]
+    assert client.snapshot()["methods"]["eth_getBlockByNumber"]["count"] == 10
+
+
+def test_concurrency_is_bounded():
+    lock = threading.Lock()
+    state = {"in_flight": 0, "peak": 0}
+
+    def handler(req):
+        with lock:
+            state["in_flight"] += 1
+            state["peak"] = max(state["peak"], state["in_flight"])
+        time.sleep(0.02)
+        with lock:
+            state["in_flight"] -= 1
+        return httpx.Response(200, json=[_echo(item) for item in json.loads(req.content)])
+
+    client = _client(handler, max_batch_size=1, max_concurrency=2)
+    client.batch([("eth_getBlockByNumber", [hex(n)]) for n in range(8)])
+
+    assert state["peak"] == 2
+
+
+def test_http_429_backs_off_and_retries():
+    responses = iter([httpx.Response(429, headers={"Retry-After": "0"}), None])
+
+    def handler(req):
+        resp = next(responses)
+        return resp or httpx.Response(200, json=_echo(json.loads(req.content)))
+
+    client = _client(handler, max_rps=1000)
+
+    assert client.call("eth_blockNumber", []) == "0x1"
+    snap = client.snapshot()
+    assert snap["throttled"] == 1 and snap["rate_limit_rps"] < 1000
+
+
+def test_batch_retries_only_throttled_items():
+    rounds: list[list[str]] = []
+
+    def handler(req):
+        items = json.loads(req.content)
+        rounds.append([item["params"][0] for item in items])
+        out = []
+        for item in items:
+            if item["params"][0] == "0x2" and len(rounds) == 1:
+                out.append({"id": item["id"], "error": {"code": 429, "message": "Your app has exceeded its compute units per second capacity"}})
+            elif item["params"][0] == "0x3":
+                out.append({"id": item["id"], "error": {"code": -32000, "message": "header not found"}})
+            else:
+                out.append(_echo(item))
+        return httpx.Response(200, json=out)
+
+    client = _client(handler, max_rps=1000)
+    results = client.batch([("eth_getBlockByNumber", [hex(n)]) for n in range(1, 4)])
+
+    assert rounds == [["0x1", "0x2", "0x3"], ["0x2"]]
+    assert results[:2] == ["0x1", "0x2"] and isinstance(results[2], EvmRpcError)
+
+
+def test_rate_limiter_halves_then_recovers():
+    limiter = AdaptiveRateLimiter(100.0)
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 25.0
+    for _ in range(30):
+        limiter.on_success()
+    assert limiter.rate == 100.0
+
+
+def test_rate_limiter_unlimited_without_cap():
+    limiter = AdaptiveRateLimiter(0)
+    assert limiter.acquire(1000) == 0.0
+    limiter.on_throttle(retry_after=0)
+    assert limiter.rate == 0 and limiter.acquire(1000) == 0.0
+
+
+def test_rate_limiter_backs_off_exponentially_without_retry_after(monkeypatch):
+    monkeypatch.setattr(evm_rpc_pool.random, "uniform", lambda lo, hi: hi)
+    limiter = AdaptiveRateLimiter(0)
+
+    pauses = [limiter.on_throttle() for _ in range(8)]
+
+    base = evm_rpc_pool.THROTTLE_BACKOFF_BASE_SEC
+    assert pauses[:3] == [base, base * 2, base * 4]
+    assert max(pauses) == evm_rpc_pool.THROTTLE_BACKOFF_MAX_SEC
+    limiter.on_success()
+    assert limiter.on_throttle() == base
+
+
+def test_http_429_without_retry_after_waits_before_retrying(monkeypatch):
+    monkeypatch.setattr(evm_rpc_pool, "THROTTLE_BACKOFF_BASE_SEC", 0.1)
+    sent: list[float] = []
+
+    def handler(req):
+        sent.append(time.monotonic())
+        if len(sent) == 1:
+            return httpx.Response(429)
+        return httpx.Response(200, json=_echo(json.loads(req.content)))
+
+    client = _client(handler)  # max_rps=0 : pas de plafond configuré
+
+    assert client.call("eth_blockNumber", []) == "0x1"
+    assert len(sent) == 2 and sent[1] - sent[0] >= 0.05
+
+
+def test_histogram_quantiles():
+    hist = LatencyHistogram()
+    for ms in [3] * 98 + [400, 20000]:
+        hist.record(ms)
+
+    snap = hist.snapshot()
+    assert snap["p50_ms"] == 5.0 and snap["p99_ms"] == 500.0
+    assert snap["buckets"]["le_inf"] == 1
+
+
+def test_registry_shares_clients_and_hides_api_key(monkeypatch):
+    monkeypatch.setattr(evm_rpc_pool, "_clients", {})
+    client = evm_rpc_pool.get_rpc_client(RPC)
+    client._http = httpx.Client(transport=httpx.MockTransport(lambda req: httpx.Response(200, json=_echo(json.loads(req.content)))))
+
+    assert evm_rpc_client.fetch_block_number(RPC) == 1
+    assert evm_rpc_pool.get_rpc_client(RPC) is client
+    metrics = evm_rpc_pool.rpc_metrics_snapshot()
+    assert list(metrics) == ["base-mainnet.g.alchemy.com"]
+    assert "secret-key" not in json.dumps(metrics)
@@ -0,0 +1,69 @@
+"""Tests for the shared bulk candle insert (bars_bulk_repo) — no DB, statements are recorded."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.market_data.bars_bulk_repo import bulk_insert_bars
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+
+class RecordingSession:
+    """Records executed statements; pretends every other row already exists."""
+
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, stmt, params):
+        self.calls.append((str(stmt), params))
+        return _Result(len(params["open_times"]) // 2)
+
+
+def _candles(n, start=datetime(2026, 1, 1)):
+    return [
+        {
+            "open_time": start + timedelta(hours=i),
+            "open": 1.0 + i,
+            "high": 2.0 + i,
+            "low": 0.5 + i,
+            "close": 1.5 + i,
+            "volume": 10.0,
+        }
+        for i in range(n)
+    ]
+
+
+def test_one_statement_per_chunk_with_counts():
+    session = RecordingSession()
+    result = bulk_insert_bars(session, "1h", 7, _candles(10), chunk_size=4)
+    assert len(session.calls) == 3
+    sql, params = session.calls[0]
+    assert "INSERT INTO public.market_data_bars_1h" in sql
+    assert "unnest(" in sql and "ON CONFLICT (instrument_id, open_time) DO NOTHING" in sql
+    assert params["instrument_id"] == 7 and params["source"] == "binance"
+    assert result.inserted == 2 + 2 + 1
+    assert result.skipped == 10 - 5
+    assert result.total == 10
+
+
+def test_naive_open_times_are_utc_and_duplicates_collapse():
+    session = RecordingSession()
+    candles = _candles(3) + [dict(_candles(1)[0], close=99.0)]
+    candles.append({"open_time": None, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1})
+    result = bulk_insert_bars(session, "5m", 1, candles)
+    _, params = session.calls[0]
+    assert len(params["open_times"]) == 3
+    assert all(ot.tzinfo is timezone.utc for ot in params["open_times"])
+    assert params["closes"][0] == 99.0
+    assert result.total == 3
+
+
+def test_empty_and_unsupported_timeframe():
+    session = RecordingSession()
+    assert bulk_insert_bars(session, "1d", 1, []).total == 0
+    assert session.calls == []
+    with pytest.raises(ValueError):
+        bulk_insert_bars(session, "3m", 1, _candles(1))
@@ -0,0 +1,149 @@
+"""Tests for the concurrent, weight-paced candle backfill — fake Binance pages and session, no DB."""
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.market_data import candles_backfill_concurrent as mod
+from services.market_data.binance_client import KlinesPage, klines_request_weight
+from services.market_data.candles_backfill_concurrent import WeightTokenBucket, run_backfill_concurrent
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, sec):
+        self.slept.append(sec)
+        self.now += sec
+
+
+class _Result:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+
+
+class RecordingSession:
+    """Single-threaded writer session: records inserts, counts commits."""
+
+    def __init__(self, fail_commit=False):
+        self.inserts = []
+        self.commits = 0
+        self.fail_commit = fail_commit
+        self.writer_threads = set()
+
+    def execute(self, stmt, params):
+        self.writer_threads.add(threading.get_ident())
+        self.inserts.append((params["instrument_id"], list(params["open_times"])))
+        return _Result(len(params["open_times"]))
+
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("db down")
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_klines_request_weight_tiers():
+    assert klines_request_weight(50) == 1
+    assert klines_request_weight(500) == 5
+    assert klines_request_weight(1000) == 5
+    assert klines_request_weight(499) == 2
+
+
+def test_bucket_paces_on_budget_server_weight_and_penalty():
+    clock = FakeClock()
+    bucket = WeightTokenBucket(60, server_limit_1m=6000, clock=clock, sleep=clock.sleep)
+    for _ in range(12):
+        assert bucket.acquire(5) == 0.0
+    # Bucket empty: 5 weight at 1/s refill -> 5 s wait.
+    assert bucket.acquire(5) == pytest.approx(5.0)
+    clock.now += 60
+    bucket.observe_server_weight(5998)
+    assert bucket.acquire(5) == pytest.approx(3.0)
+    bucket.penalize(30)
+    # Blocked for Retry-After; the bucket refills meanwhile.
+    assert bucket.acquire(1) == pytest.approx(30.0)
+    snap = bucket.snapshot()
+    assert snap["weight_used"] == 12 * 5 + 5 + 5 + 1
+    assert snap["rate_limited"] == 1 and snap["max_server_weight_1m"] == 5998
+
+
+def _install_instruments(monkeypatch, instruments, latest):
+    monkeypatch.setattr(mod, "load_binance_instruments", lambda session, symbol=None: instruments)
+    monkeypatch.setattr(mod, "get_latest_open_time", lambda session, tf, iid: latest.get(iid))
+
+
+def _fake_pages(per_page=3, rate_limit_once=()):
+    """Fake Binance: contiguous 1h candles from start_ms up to end_ms, per_page at a time."""
+    limited = set(rate_limit_once)
+    calls = []
+    lock = threading.Lock()
+
+    def fetch(client, symbol, interval, limit, start_ms, end_ms):
+        with lock:
+            calls.append((symbol, start_ms))
+            if symbol in limited:
+                limited.discard(symbol)
+                return KlinesPage(None, 6000, 0.0)
+        start = datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc)
+        out = []
+        for i in range(per_page):
+            ot = start + timedelta(hours=i)
+            if ot.timestamp() * 1000 > end_ms:
+                break
+            out.append({"open_time": ot, "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0})
+        return KlinesPage(out, 10)
+
+    return fetch, calls
+
+
+def test_concurrent_backfill_resumes_from_checkpoint_and_reports_throughput(monkeypatch):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    _install_instruments(
+        monkeypatch,
+        [(1, "AAAUSDT"), (2, "BBBUSDT"), (3, "CCCUSDT")],
+        {1: now - timedelta(hours=7), 3: now},
+    )
+    fetch, calls = _fake_pages(per_page=3, rate_limit_once=("BBBUSDT",))
+    session = RecordingSession()
+    summary = run_backfill_concurrent(
+        session, "1h", workers=3, fallback_days=1, limit_per_request=500,
+        commit_batch=2, fetch_page_fn=fetch, bucket=WeightTokenBucket(100000),
+    )
+    assert summary["errors"] == []
+    by_id = {d["instrument_id"]: d for d in summary["instrument_details"]}
+    # Resume: instrument 1 starts right after its latest candle, 3 is already up to date.
+    assert by_id[1]["candles_fetched"] == 7
+    assert min(ot for iid, ots in session.inserts if iid == 1 for ot in ots) == now - timedelta(hours=6)
+    assert by_id[3]["candles_fetched"] == 0
+    assert not any(sym == "CCCUSDT" for sym, _ in calls)
+    assert by_id[2]["candles_fetched"] == 24
+    assert by_id[1]["checkpoint"] == now.isoformat()
+    assert summary["candles_fetched"] == summary["candles_upserted"] == 31
+    assert summary["rate_limited"] == 1
+    assert summary["weight_used"] == 5 * summary["requests"]
+    assert summary["candles_per_sec"] > 0
+    assert session.commits == summary["commits_performed"] >= 1
+    assert session.writer_threads == {threading.get_ident()}
+
+
+def test_failed_commit_stops_instruments_with_uncommitted_pages(monkeypatch):
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    _install_instruments(monkeypatch, [(1, "AAAUSDT")], {1: now - timedelta(hours=10)})
+    fetch, _ = _fake_pages(per_page=2)
+    summary = run_backfill_concurrent(
+        RecordingSession(fail_commit=True), "1h", workers=2, commit_batch=1,
+        fetch_page_fn=fetch, bucket=WeightTokenBucket(100000),
+    )
+    detail = summary["instrument_details"][0]
+    assert detail["error"] == "commit failed"
+    assert detail["checkpoint"] == (now - timedelta(hours=10)).isoformat()
+    assert summary["commits_performed"] == 0
+    assert any("commit failed" in e for e in summary["errors"])
@@ -0,0 +1,69 @@
+"""Tests for the 5m -> 1h/4h/1d/1w candle rollup (pure aggregation, no DB)."""
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from services.market_data.candles_rollup import bucket_start, build_rollup_candles
+
+UTC = timezone.utc
+
+
+def _bars(start, n, skip=()):
+    rows = []
+    for i in range(n):
+        if i in skip:
+            continue
+        ot = start + timedelta(minutes=5 * i)
+        p = Decimal(100 + i)
+        rows.append((ot, p, p + 2, p - 1, p + 1, Decimal("1.5")))
+    return rows
+
+
+def test_bucket_alignment_matches_binance():
+    t = datetime(2026, 3, 11, 13, 47, tzinfo=UTC)  # mercredi
+    assert bucket_start(t, "1h") == datetime(2026, 3, 11, 13, 0, tzinfo=UTC)
+    assert bucket_start(t, "4h") == datetime(2026, 3, 11, 12, 0, tzinfo=UTC)
+    assert bucket_start(t, "1d") == datetime(2026, 3, 11, 0, 0, tzinfo=UTC)
+    assert bucket_start(t, "1w") == datetime(2026, 3, 9, 0, 0, tzinfo=UTC)  # lundi
+    assert bucket_start(datetime(2026, 3, 11, 13, 47), "1h").tzinfo is UTC
+
+
+def test_complete_hour_aggregates_ohlcv():
+    start = datetime(2026, 1, 1, 10, tzinfo=UTC)
+    rows = _bars(start, 24)  # 10:00 -> 11:55
+    candles, gaps = build_rollup_candles(rows, "1h", {start}, last_base_open=rows[-1][0])
+    assert gaps == []
+    assert len(candles) == 1
+    c = candles[0]
+    assert c["open_time"] == start
+    assert c["open"] == Decimal(100)
+    assert c["close"] == Decimal(112)
+    assert c["high"] == Decimal(113)
+    assert c["low"] == Decimal(99)
+    assert c["volume"] == Decimal("18.0")
+
+
+def test_hole_in_base_is_flagged_not_aggregated():
+    start = datetime(2026, 1, 1, 10, tzinfo=UTC)
+    rows = _bars(start, 24, skip={5, 6})
+    candles, gaps = build_rollup_candles(rows, "1h", {start}, last_base_open=rows[-1][0])
+    assert candles == []
+    assert gaps[0]["base_bars"] == 10 and gaps[0]["expected_base_bars"] == 12
+    assert gaps[0]["holes"][0]["start"] == (start + timedelta(minutes=25)).isoformat()
+
+
+def test_in_progress_bucket_is_written_partially():
+    start = datetime(2026, 1, 1, 10, tzinfo=UTC)
+    rows = _bars(start, 15)  # 10:00 -> 11:10
+    second = start + timedelta(hours=1)
+    candles, gaps = build_rollup_candles(rows, "1h", {start, second}, last_base_open=rows[-1][0])
+    assert gaps == []
+    assert [c["open_time"] for c in candles] == [start, second]
+    assert candles[1]["close"] == Decimal(115)
+
+
+def test_only_touched_buckets_are_recomputed():
+    start = datetime(2026, 1, 1, 0, tzinfo=UTC)
+    rows = _bars(start, 48)
+    second = start + timedelta(hours=1)
+    candles, _ = build_rollup_candles(rows, "1h", {second}, last_base_open=rows[-1][0])
+    assert [c["open_time"] for c in candles] == [second]
@@ -0,0 +1,138 @@
+"""Tests for the chart-history cache — bars come from an in-memory store, no DB."""
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from starlette.responses import JSONResponse
+
+from services.market_data import chart_history_cache as chart_cache_mod
+from services.market_data import quote_bus as quote_bus_mod
+from services.market_data.chart_history_cache import (
+    ChartHistoryCache,
+    decode_invalidations,
+    encode_invalidations,
+)
+from services.market_data.chart_history_service import _normalize_bar
+from services.market_data.quote_bus import FallbackQuoteBus
+
+NOW = datetime(2026, 3, 2, 12, 2, tzinfo=timezone.utc)
+
+
+class BarStore:
+    """Stands in for the bars_* tables: rows (open_time, open, high, low, close, volume)."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.queries = []
+
+    def query(self, session, timeframe, instrument_id, after, end, limit, inclusive):
+        self.queries.append((after, inclusive))
+        out = [r for r in self.rows if (r[0] >= after if inclusive else r[0] > after) and r[0] <= end]
+        return out[:limit]
+
+
+def _rows_5m(start, n):
+    return [(start + timedelta(minutes=5 * i), 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 2.0) for i in range(n)]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    store = BarStore(_rows_5m(NOW - timedelta(hours=25) + timedelta(minutes=2), 25 * 12))
+    c = ChartHistoryCache(ttl_sec=3600)
+    monkeypatch.setattr(c, "_query_bars", store.query)
+    monkeypatch.setattr(c, "_resolve", lambda session, symbol, instrument_id: (7, "BTCUSDT"))
+    c.store = store
+    return c
+
+
+def _expected_body(rows, now):
+    start = now - timedelta(hours=24)
+    bars = [
+        SimpleNamespace(instrument_id=7, open_time=r[0], open=r[1], high=r[2], low=r[3], close=r[4], volume=r[5])
+        for r in rows if start <= r[0] <= now
+    ][:288]
+    payload = {
+        "symbol": "BTCUSDT",
+        "period": "1j",
+        "timeframe": "5m",
+        "start_time": start.isoformat(),
+        "end_time": now.isoformat(),
+        "candles": [_normalize_bar(b, "BTCUSDT") for b in bars],
+    }
+    return JSONResponse(payload).body
+
+
+def test_miss_then_hit_is_byte_identical_and_only_queries_the_tail(cache):
+    first = cache.get(None, symbol="BTCUSDT", period="1j", now=NOW)
+    assert not first.cache_hit
+    assert first.body == _expected_body(cache.store.rows, NOW)
+
+    # Five minutes later: a new bar landed, the previous open bar closed.
+    later = NOW + timedelta(minutes=5)
+    cache.store.rows.append((NOW + timedelta(minutes=3), 1.0, 2.0, 0.5, 1.5, 3.0))
+    second = cache.get(None, symbol="BTCUSDT", period="1j", now=later)
+    assert second.cache_hit
+    assert second.body == _expected_body(cache.store.rows, later)
+    after, inclusive = cache.store.queries[-1]
+    assert not inclusive and after > later - timedelta(minutes=15)
+    snap = cache.snapshot()
+    assert snap["hits"] == 1 and snap["misses"] == 1 and snap["hit_ratio"] == 0.5
+    assert snap["bars_appended"] == 1
+
+
+def test_etag_if_none_match_returns_not_modified(cache):
+    first = cache.get(None, symbol="BTCUSDT", period="1j", now=NOW)
+    assert first.etag.startswith('W/"')
+    again = cache.get(None, symbol="BTCUSDT", period="1j", if_none_match=first.etag, now=NOW)
+    assert again.body is None and again.etag == first.etag
+    cache.store.rows[-1] = (cache.store.rows[-1][0], 1.0, 9.0, 0.5, 8.0, 1.0)  # open bar ticks
+    changed = cache.get(None, symbol="BTCUSDT", period="1j", if_none_match=first.etag, now=NOW)
+    assert changed.body is not None and changed.etag != first.etag
+    assert cache.snapshot()["not_modified"] == 1
+
+
+def test_invalidation_only_drops_entries_whose_prefix_is_rewritten(cache):
+    cache.get(None, symbol="BTCUSDT", period="1j", now=NOW)
+    assert cache.invalidate("1h", 7, NOW - timedelta(days=1)) == 0
+    assert cache.invalidate("5m", 7, NOW) == 0  # appended after the last closed bar
+    assert cache.invalidate("5m", 7, NOW - timedelta(hours=3)) == 1
+    assert cache.size() == 0
+
+    cache.get(None, symbol="BTCUSDT", period="1j", now=NOW)
+    message = encode_invalidations({("5m", 7): NOW - timedelta(hours=2), ("1d", 3): None})
+    assert decode_invalidations(message) == [
+        ("1d", 3, None),
+        ("5m", 7, int((NOW - timedelta(hours=2)).timestamp() * 1000)),
+    ]
+    cache.apply_message(message)
+    assert cache.size() == 0
+    assert cache.snapshot()["invalidations"] == 2
+
+
+def test_invalidation_listener_moves_to_redis_when_it_comes_back(monkeypatch):
+    # API process boots while Redis is down: the subscribe-only listener must still reach Redis
+    redis_up = {"client": None}
+    monkeypatch.setattr("services.redis_client.get_redis", lambda: redis_up["client"])
+
+    class FakeRedisBus:
+        def __init__(self, client, channel):
+            self.handlers = []
+
+        def subscribe(self, handler):
+            self.handlers.append(handler)
+
+    monkeypatch.setattr(quote_bus_mod, "RedisQuoteBus", FakeRedisBus)
+    bus = FallbackQuoteBus("chart-chan", name="test chart bus", retry_sec=0.01)
+    monkeypatch.setattr(chart_cache_mod, "_bus", bus)
+    monkeypatch.setattr(chart_cache_mod, "_listener_started", False)
+    monkeypatch.setattr(chart_cache_mod, "MARKET_DATA_CHART_CACHE_ENABLED", True)
+
+    assert chart_cache_mod.start_chart_cache_listener()
+    redis_up["client"] = object()
+
+    deadline = time.monotonic() + 2.0
+    while bus._redis_bus is None and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert bus._redis_bus is not None
+    assert bus._redis_bus.handlers == [chart_cache_mod._cache.apply_message]
@@ -0,0 +1,72 @@
+"""Tests for the set-based market summary helpers — NumPy reductions and concurrent live fallback, no DB."""
+import threading
+import time
+
+import numpy as np
+
+from services.market_data import market_summary_repo as repo
+from services.market_data.market_summary_repo import compute_24h_stats, downsample_sparkline
+
+
+def test_compute_24h_stats_groups_sorted_bars_per_instrument():
+    ids = np.array([3, 3, 3, 9, 9], dtype=np.int64)
+    closes = np.array([10.0, 11.0, 12.0, 5.0, 4.0])
+    volumes = np.array([1.0, 2.0, 3.0, 0.5, 0.25])
+    stats = compute_24h_stats(ids, closes, volumes)
+    assert stats[3] == (10.0, 6.0, [10.0, 11.0, 12.0])
+    assert stats[9] == (5.0, 0.75, [5.0, 4.0])
+    # Per-instrument cap keeps the earliest bars, like get_bars_5m(limit=...).
+    assert compute_24h_stats(ids, closes, volumes, max_bars=2)[3] == (10.0, 3.0, [10.0, 11.0])
+    assert compute_24h_stats(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)) == {}
+
+
+def test_downsample_sparkline_keeps_endpoints():
+    closes = np.arange(288, dtype=np.float64)
+    out = downsample_sparkline(closes, 48)
+    assert out.shape == (48,) and out[0] == 0.0 and out[-1] == 287.0
+    assert np.all(np.diff(out) > 0)
+    assert downsample_sparkline(closes, None) is closes
+    assert downsample_sparkline(closes[:10], 48).shape == (10,)
+
+
+class _Session:
+    def __init__(self):
+        self.executed = []
+        self.commits = 0
+
+    def execute(self, stmt):
+        self.executed.append(stmt)
+        return type("R", (), {"rowcount": 1})()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_live_fallback_fetches_concurrently_and_commits_once(monkeypatch):
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_fetch(symbol):
+        with lock:
+            in_flight.append(symbol)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.remove(symbol)
+        if symbol == "BADUSDT":
+            return None
+        return {"provider_symbol": symbol, "last_price": 2.0, "bid_price": None, "ask_price": None,
+                "volume": None, "quote_time": None}
+
+    monkeypatch.setattr(repo, "_fetch_ticker_safe", fake_fetch)
+    session = _Session()
+    targets = [(i, f"S{i}USDT") for i in range(6)] + [(99, "BADUSDT")]
+    prices = repo._fetch_binance_and_upsert_many(session, targets)
+    assert prices == {i: 2.0 for i in range(6)}
+    assert max(peak) > 1
+    assert len(session.executed) == 1 and session.commits == 1
+    assert repo._fetch_binance_and_upsert_many(session, []) == {}
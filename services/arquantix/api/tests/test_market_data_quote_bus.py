@@ -0,0 +1,129 @@
+"""Tests for the market data quote bus (encode/decode, in-memory table, local stand-in)."""
+import time
+from datetime import datetime, timezone
+
+from services.market_data import quote_bus as quote_bus_mod
+from services.market_data.quote_bus import (
+    FallbackQuoteBus,
+    LatestQuoteTable,
+    LocalQuoteBus,
+    cached_quotes_to_payload,
+    decode_quote_deltas,
+    encode_quote_deltas,
+)
+
+
+def _pending():
+    qt = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    return {
+        "ETHUSDT": {"last_price": 2000.5, "bid_price": 2000.0, "ask_price": 2001.0, "quote_time": qt},
+        "BTCUSDT": {"last_price": 50000.0, "bid_price": 49999.0, "ask_price": 50001.0, "quote_time": qt},
+        "UNKNOWN": {"last_price": 1.0, "bid_price": 1.0, "ask_price": 1.0, "quote_time": qt},
+    }
+
+
+def test_encode_decode_roundtrip_skips_unknown_symbols():
+    msg = encode_quote_deltas(_pending(), {"BTCUSDT": 1, "ETHUSDT": 2})
+    quotes = decode_quote_deltas(msg, received_at=123.0)
+    assert [q.provider_symbol for q in quotes] == ["BTCUSDT", "ETHUSDT"]
+    btc = quotes[0]
+    assert btc.instrument_id == 1
+    assert btc.last_price == 50000.0
+    assert btc.quote_time == datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert btc.received_at == 123.0
+
+
+def test_encode_returns_none_when_nothing_known():
+    assert encode_quote_deltas(_pending(), {}) is None
+
+
+def test_decode_ignores_garbage_and_other_versions():
+    assert decode_quote_deltas("not json") == []
+    assert decode_quote_deltas('{"v": 99, "q": [["BTCUSDT", 1, 1, 1, 1, null]]}') == []
+    assert len(decode_quote_deltas('{"v": 1, "q": [["BTCUSDT"], ["ETHUSDT", 2, 1, null, null, null]]}')) == 1
+
+
+def test_local_bus_feeds_table_and_freshness_filter():
+    bus = LocalQuoteBus()
+    table = LatestQuoteTable()
+    bus.subscribe(table.apply_message)
+    bus.publish(encode_quote_deltas(_pending(), {"BTCUSDT": 1, "ETHUSDT": 2}))
+
+    fresh = table.get_fresh(["btcusdt", "ETHUSDT", "SOLUSDT"], max_age_sec=60)
+    assert set(fresh) == {"BTCUSDT", "ETHUSDT"}
+
+    time.sleep(0.01)
+    assert table.get_fresh(["BTCUSDT"], max_age_sec=0.001) == {}
+
+
+def test_cached_payload_matches_rest_shape():
+    quotes = decode_quote_deltas(encode_quote_deltas(_pending(), {"BTCUSDT": 1}))
+    payload = cached_quotes_to_payload(quotes, eurusdt_rate=1.25)
+    assert set(payload[0]) == {
+        "instrument_id", "symbol", "price", "bid_price", "ask_price",
+        "volume", "quote_time", "updated_at", "price_eur",
+    }
+    assert payload[0]["price_eur"] == 40000.0
+
+
+def test_fallback_bus_retries_redis_and_moves_subscribers(monkeypatch):
+    redis_up = {"client": None}
+    calls = []
+    monkeypatch.setattr("services.redis_client.get_redis", lambda: redis_up["client"])
+
+    class FakeRedisBus:
+        def __init__(self, client, channel):
+            self.published, self.handlers = [], []
+
+        def publish(self, message):
+            self.published.append(message)
+
+        def subscribe(self, handler):
+            self.handlers.append(handler)
+
+    monkeypatch.setattr(quote_bus_mod, "RedisQuoteBus", FakeRedisBus)
+    bus = FallbackQuoteBus("chan", name="test bus", retry_sec=0.0)
+    bus.subscribe(calls.append)
+
+    bus.publish("local")
+    assert calls == ["local"]
+
+    redis_up["client"] = object()
+    bus.publish("remote")
+    redis_bus = bus._redis_bus
+    assert redis_bus.published == ["remote"] and redis_bus.handlers == [calls.append]
+
+
+class _FakeRedisBus:
+    def __init__(self, client, channel):
+        self.channel, self.handlers = channel, []
+
+    def publish(self, message):
+        pass
+
+    def subscribe(self, handler):
+        self.handlers.append(handler)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_subscribe_only_listener_moves_to_redis_without_publishing(monkeypatch):
+    # API process: start_quote_bus_listener subscribes once at boot while Redis is down, never publishes
+    redis_up = {"client": None}
+    monkeypatch.setattr("services.redis_client.get_redis", lambda: redis_up["client"])
+    monkeypatch.setattr(quote_bus_mod, "RedisQuoteBus", _FakeRedisBus)
+    bus = FallbackQuoteBus("chan", name="test bus", retry_sec=0.01)
+    monkeypatch.setattr(quote_bus_mod, "_bus", bus)
+    monkeypatch.setattr(quote_bus_mod, "_listener_started", False)
+
+    assert quote_bus_mod.start_quote_bus_listener()
+    assert bus._redis_bus is None
+
+    redis_up["client"] = object()
+    assert _wait_for(lambda: bus._redis_bus is not None)
+    assert bus._redis_bus.handlers == [quote_bus_mod._table.apply_message]
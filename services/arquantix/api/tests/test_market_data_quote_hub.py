@@ -0,0 +1,133 @@
+"""Tests for the /ws/market-data quote hub (fan-out, diffs, backpressure).
+
+No DB: the hub's broadcast() is fed directly and WebSockets are fakes.
+"""
+import asyncio
+import json
+
+from services.market_data.quote_hub import QuoteHub
+
+
+class FakeWebSocket:
+    def __init__(self, block: asyncio.Event = None):
+        self.sent = []
+        self._block = block
+
+    async def send_text(self, text):
+        if self._block is not None:
+            await self._block.wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000, reason=""):
+        pass
+
+
+def _q(symbol, price, updated_at="2026-01-01T00:00:00"):
+    return {"symbol": symbol, "price": price, "updated_at": updated_at}
+
+
+async def _drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _hub_without_poller() -> QuoteHub:
+    hub = QuoteHub()
+    hub._ensure_poller = lambda: None
+    hub._wakeup = asyncio.Event()
+    return hub
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_same_symbol_set_shares_one_channel_and_first_message_is_full():
+    async def scenario():
+        hub = _hub_without_poller()
+        ws1, ws2 = FakeWebSocket(), FakeWebSocket()
+        s1 = hub.subscribe(ws1, ["BTCUSDT", "ETHUSDT"])
+        s2 = hub.subscribe(ws2, ["ETHUSDT", "BTCUSDT"])
+        tasks = [asyncio.create_task(s.run_sender(hub.metrics)) for s in (s1, s2)]
+        hub.broadcast([_q("BTCUSDT", 100.0), _q("ETHUSDT", 10.0), _q("SOLUSDT", 1.0)])
+        await _drain()
+        for s in (s1, s2):
+            hub.unsubscribe(s)
+        await asyncio.gather(*tasks)
+        return hub, ws1, ws2
+
+    hub, ws1, ws2 = _run(scenario())
+    assert ws1.sent == ws2.sent
+    assert [q["symbol"] for q in ws1.sent[0]["quotes"]] == ["BTCUSDT", "ETHUSDT"]
+    snap = hub.metrics.snapshot()
+    assert snap["subscribers"] == 0 and snap["channels"] == 0
+    assert snap["broadcasts_total"] == 1
+
+
+def test_only_changed_quotes_are_sent():
+    async def scenario():
+        hub = _hub_without_poller()
+        ws = FakeWebSocket()
+        sub = hub.subscribe(ws, ["BTCUSDT", "ETHUSDT"])
+        task = asyncio.create_task(sub.run_sender(hub.metrics))
+        hub.broadcast([_q("BTCUSDT", 100.0), _q("ETHUSDT", 10.0)])
+        await _drain()
+        # updated_at bump alone is not a change
+        hub.broadcast([_q("BTCUSDT", 100.0, "2026-01-01T00:00:01"), _q("ETHUSDT", 10.0)])
+        await _drain()
+        hub.broadcast([_q("BTCUSDT", 101.0), _q("ETHUSDT", 10.0)])
+        await _drain()
+        hub.unsubscribe(sub)
+        await task
+        return ws
+
+    ws = _run(scenario())
+    assert len(ws.sent) == 2
+    assert ws.sent[1]["quotes"] == [_q("BTCUSDT", 101.0)]
+
+
+def test_slow_client_is_conflated_without_blocking_others():
+    async def scenario():
+        hub = _hub_without_poller()
+        gate = asyncio.Event()
+        slow, fast = FakeWebSocket(block=gate), FakeWebSocket()
+        s_slow = hub.subscribe(slow, ["BTCUSDT", "ETHUSDT"])
+        s_fast = hub.subscribe(fast, ["BTCUSDT", "ETHUSDT"])
+        tasks = [asyncio.create_task(s.run_sender(hub.metrics)) for s in (s_slow, s_fast)]
+        hub.broadcast([_q("BTCUSDT", 100.0), _q("ETHUSDT", 10.0)])
+        await _drain()
+        hub.broadcast([_q("BTCUSDT", 101.0), _q("ETHUSDT", 10.0)])
+        await _drain()
+        hub.broadcast([_q("BTCUSDT", 101.0), _q("ETHUSDT", 11.0)])
+        await _drain()
+        assert len(fast.sent) == 3
+        gate.set()
+        await _drain()
+        for s in (s_slow, s_fast):
+            hub.unsubscribe(s)
+        await asyncio.gather(*tasks)
+        return hub, slow
+
+    hub, slow = _run(scenario())
+    # First (blocked) send, then one conflated full snapshot with the latest prices.
+    assert len(slow.sent) == 2
+    assert slow.sent[-1]["quotes"] == [_q("BTCUSDT", 101.0), _q("ETHUSDT", 11.0)]
+    assert hub.metrics.snapshot()["messages_conflated"] >= 1
+
+
+def test_late_joiner_receives_channel_snapshot():
+    async def scenario():
+        hub = _hub_without_poller()
+        first = hub.subscribe(FakeWebSocket(), ["BTCUSDT"])
+        hub.broadcast([_q("BTCUSDT", 100.0)])
+        ws = FakeWebSocket()
+        late = hub.subscribe(ws, ["BTCUSDT"])
+        task = asyncio.create_task(late.run_sender(hub.metrics))
+        await _drain()
+        hub.unsubscribe(late)
+        hub.unsubscribe(first)
+        await task
+        return ws
+
+    ws = _run(scenario())
+    assert ws.sent == [{"quotes": [_q("BTCUSDT", 100.0)]}]
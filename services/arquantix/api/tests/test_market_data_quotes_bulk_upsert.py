@@ -0,0 +1,38 @@
+"""Tests for the single-statement latest-quote upsert used by the bookTicker flush."""
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from services.market_data.quotes_repo import build_bulk_upsert_latest_quotes_stmt
+
+
+def _row(instrument_id, price):
+    return {
+        "instrument_id": instrument_id,
+        "provider": "binance",
+        "provider_symbol": f"S{instrument_id}USDT",
+        "last_price": price,
+        "bid_price": price - 1,
+        "ask_price": price + 1,
+        "quote_time": datetime(2026, 1, 1, tzinfo=timezone.utc),
+    }
+
+
+def test_empty_rows_builds_nothing():
+    assert build_bulk_upsert_latest_quotes_stmt([]) is None
+
+
+def test_single_insert_on_conflict_update():
+    stmt = build_bulk_upsert_latest_quotes_stmt([_row(3, 10.0), _row(1, 20.0)])
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    assert sql.count("INSERT INTO") == 1
+    assert "ON CONFLICT (instrument_id) DO UPDATE" in sql
+    assert "updated_at = now()" in sql
+
+
+def test_rows_sorted_by_instrument_id_and_deduplicated_last_wins():
+    stmt = build_bulk_upsert_latest_quotes_stmt([_row(5, 1.0), _row(2, 2.0), _row(5, 3.0)])
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    assert "instrument_id_m2" not in params
+    assert (params["instrument_id_m0"], params["instrument_id_m1"]) == (2, 5)
+    assert (params["last_price_m0"], params["last_price_m1"]) == (2.0, 3.0)
@@ -0,0 +1,117 @@
+"""Scan ETH natif pipeliné (native_block_scan) : fenêtres batchées, préfiltre wallets,
+retry par bloc, checkpoint contigu. RPC mocké, sans DB (dry-run / checkpoint factice)."""
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+from services.onchain_indexer import native_block_scan as scan
+from services.onchain_indexer.chain_config import CHAIN_BASE
+from services.privy_wallet.evm_rpc_client import EvmRpcError
+
+RPC = "http://mock-rpc"
+WALLET = "0x" + "ab" * 20
+
+
+def _block(n: int) -> dict:
+    txs = [
+        {"hash": "0x" + format(n * 10 + i, "x").rjust(64, "0"), "to": "0x" + format(i, "x").rjust(40, "0"),
+         "from": "0x" + "11" * 20, "value": hex(10**15), "blockNumber": hex(n)}
+        for i in range(1, 4)
+    ]
+    if n % 5 == 0:
+        txs.append({"hash": "0x" + format(n, "x").rjust(64, "f"), "to": WALLET.upper().replace("0X", "0x"),
+                    "from": "0x" + "22" * 20, "value": hex(10**16), "blockNumber": hex(n)})
+    return {"number": hex(n), "transactions": txs}
+
+
+class FakeBlocks:
+    def __init__(self, *, fail_in_batch=(), fail_always=(), batch=True):
+        self.fail_in_batch = set(fail_in_batch)
+        self.fail_always = set(fail_always)
+        self.batch = batch
+        self.batches: list[list[int]] = []
+        self.singles: list[int] = []
+
+    def batch_call(self, rpc_url, calls, *, timeout=20.0):
+        if not self.batch:
+            raise EvmRpcError("Batch JSON-RPC non supporté", code="evm.rpc.batch_unsupported")
+        blocks = [int(params[0], 16) for _, params in calls]
+        self.batches.append(blocks)
+        return [
+            EvmRpcError("header not found") if n in self.fail_in_batch | self.fail_always else _block(n)
+            for n in blocks
+        ]
+
+    def single(self, rpc_url, block_number, *, full_txs=True):
+        self.singles.append(block_number)
+        if block_number in self.fail_always:
+            raise EvmRpcError("header not found")
+        return _block(block_number)
+
+
+def _scan(rpc: FakeBlocks, *, from_block=1, to_block=50, **kwargs):
+    with (
+        patch.object(scan, "json_rpc_batch_call", side_effect=rpc.batch_call),
+        patch.object(scan, "fetch_block_by_number", side_effect=rpc.single),
+        patch.object(scan, "_RETRY_BACKOFF_SECONDS", 0),
+    ):
+        return scan.scan_native_incoming_transfers(
+            MagicMock(),
+            chain_id=CHAIN_BASE,
+            rpc_url=RPC,
+            from_block=from_block,
+            to_block=to_block,
+            monitored_wallets={WALLET},
+            **kwargs,
+        )
+
+
+def test_windows_are_batched_and_prefiltered():
+    rpc = FakeBlocks()
+
+    result = _scan(rpc, window=20)
+
+    assert sorted(len(b) for b in rpc.batches) == [10, 20, 20] and rpc.singles == []
+    assert result.blocks_scanned == 50 and result.events_prepared == 10
+    assert result.txs_scanned == 160 and result.last_scanned_block == 50
+    assert result.errors == [] and result.to_dict()["rpc_batches"] == 3
+
+
+def test_failed_block_is_retried_alone():
+    rpc = FakeBlocks(fail_in_batch={7})
+
+    result = _scan(rpc, to_block=10, window=10)
+
+    assert rpc.singles == [7]
+    assert result.errors == [] and result.blocks_scanned == 10 and result.block_retries == 1
+
+
+def test_persistent_failure_keeps_scanning_and_checkpoint_stops_at_gap():
+    rpc = FakeBlocks(fail_always={12})
+    checkpoint = MagicMock()
+
+    with patch.object(scan.CheckpointRepository, "advance_after_chunk") as advance:
+        result = _scan(rpc, to_block=30, window=10, dry_run=False, checkpoint=checkpoint)
+
+    assert rpc.singles == [12] * scan.NATIVE_SCAN_BLOCK_RETRIES
+    assert result.failed_blocks == [12] and result.blocks_scanned == 29
+    assert result.last_scanned_block == 11
+    assert [c.kwargs["last_scanned_block"] for c in advance.call_args_list] == [10, 11]
+
+
+def test_batch_unsupported_falls_back_to_single_blocks():
+    rpc = FakeBlocks(batch=False)
+
+    result = _scan(rpc, to_block=6, window=3)
+
+    assert rpc.singles == list(range(1, 7))
+    assert result.blocks_scanned == 6 and result.events_prepared == 1
+
+
+def test_no_wallets_skips_rpc():
+    rpc = FakeBlocks()
+    with patch.object(scan, "json_rpc_batch_call", side_effect=rpc.batch_call):
+        result = scan.scan_native_incoming_transfers(
+            MagicMock(), chain_id=CHAIN_BASE, rpc_url=RPC, from_block=1, to_block=5, monitored_wallets=set(),
+        )
+    assert rpc.batches == [] and result.blocks_scanned == 0
@@ -0,0 +1,68 @@
+"""bulk_insert_if_absent sans DB : une requête ON CONFLICT DO NOTHING RETURNING par paquet,
+comptes inserted / skipped exacts (doublons du lot inclus)."""
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql
+
+from services.onchain_indexer.repository import RawOnChainEventRepository
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeDb:
+    """Simule la contrainte unique : les clés de ``existing`` ne sont pas renvoyées."""
+
+    def __init__(self, existing=()):
+        self.existing = set(existing)
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        params = stmt.compile(dialect=postgresql.dialect()).params
+        rows = []
+        i = 0
+        while f"tx_hash_m{i}" in params:
+            key = (params[f"chain_id_m{i}"], params[f"tx_hash_m{i}"], params[f"log_index_m{i}"])
+            if key not in self.existing:
+                self.existing.add(key)
+                rows.append(key)
+            i += 1
+        return FakeResult(rows)
+
+
+def _event(log_index: int, *, tx_hash: str = "0xABC") -> dict:
+    return {
+        "chain_id": 8453,
+        "block_number": 100,
+        "tx_hash": tx_hash,
+        "log_index": log_index,
+        "wallet_address": "0xWallet",
+        "asset": "usdc",
+        "amount_raw": 5,
+    }
+
+
+def test_bulk_insert_uses_on_conflict_returning_per_batch():
+    db = FakeDb(existing={(8453, "0xabc", 0)})
+
+    result = RawOnChainEventRepository.bulk_insert_if_absent(
+        db, [_event(0), _event(1), _event(1, tx_hash="0xabc"), _event(2), _event(3)], batch_size=2
+    )
+
+    assert len(db.statements) == 2
+    sql = str(db.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (chain_id, tx_hash, log_index) DO NOTHING" in sql and "RETURNING" in sql
+    assert (result.inserted, result.skipped_existing) == (3, 2)
+    assert result.inserted_keys == {(8453, "0xabc", 1), (8453, "0xabc", 2), (8453, "0xabc", 3)}
+
+
+def test_bulk_insert_empty_batch_is_noop():
+    db = FakeDb()
+    result = RawOnChainEventRepository.bulk_insert_if_absent(db, [])
+    assert db.statements == [] and result.inserted == 0 and result.skipped_existing == 0
@@ -0,0 +1,183 @@
+"""Replay eth_getLogs batché (block_range_replay) : topics OR'd, Transfer filtrés localement,
+batch JSON-RPC, découpage adaptatif des plages. RPC mocké, sans DB (dry-run, wallets fournis)."""
+from __future__ import annotations
+
+import json
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from services.onchain_indexer import block_range_replay as replay
+from services.onchain_indexer.chain_config import CHAIN_BASE
+from services.privy_wallet import evm_rpc_client
+from services.privy_wallet.evm_rpc_client import TRANSFER_TOPIC, EvmRpcError, json_rpc_batch_call
+from services.privy_wallet.evm_rpc_pool import EvmRpcClient
+
+RPC = "http://mock-rpc"
+USDC = "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913"
+
+
+def _wallet(i: int) -> str:
+    return "0x" + format(i, "x").rjust(40, "0")
+
+
+def _log(*, block: int, log_index: int, to_wallet: str) -> dict:
+    return {
+        "address": USDC,
+        "topics": [TRANSFER_TOPIC, "0x" + "1" * 64, "0x" + to_wallet[2:].rjust(64, "0")],
+        "data": hex(1_000_000),
+        "transactionHash": "0x" + format(block * 1000 + log_index, "x").rjust(64, "0"),
+        "blockNumber": hex(block),
+        "logIndex": hex(log_index),
+    }
+
+
+class FakeRpc:
+    """eth_getLogs sur une liste de logs ; ``max_span`` simule la limite de plage du provider."""
+
+    def __init__(self, logs, *, max_span: int | None = None, batch: bool = True):
+        self.logs = logs
+        self.max_span = max_span
+        self.batch = batch
+        self.filters: list[dict] = []
+        self.batches: list[int] = []
+
+    def _get_logs(self, f):
+        self.filters.append(f)
+        start, end = int(f["fromBlock"], 16), int(f["toBlock"], 16)
+        if self.max_span is not None and end - start + 1 > self.max_span:
+            return EvmRpcError(f"Log response size exceeded. Use up to a {self.max_span} block range")
+        contracts = f["address"] if isinstance(f["address"], list) else [f["address"]]
+        to_topics = f["topics"][2] if len(f["topics"]) > 2 else None
+        if isinstance(to_topics, str):
+            to_topics = [to_topics]
+        return [
+            log for log in self.logs
+            if start <= int(log["blockNumber"], 16) <= end
+            and log["address"] in contracts
+            and (to_topics is None or log["topics"][2] in to_topics)
+        ]
+
+    def batch_call(self, rpc_url, calls, *, timeout=20.0):
+        if not self.batch:
+            raise EvmRpcError("Batch JSON-RPC non supporté", code="evm.rpc.batch_unsupported")
+        self.batches.append(len(calls))
+        return [self._get_logs(params[0]) for _, params in calls]
+
+    def call(self, rpc_url, method, params, *, timeout=20.0):
+        out = self._get_logs(params[0])
+        if isinstance(out, EvmRpcError):
+            raise out
+        return out
+
+
+def _replay(rpc: FakeRpc, wallets, *, from_block=1, to_block=100, **kwargs):
+    with (
+        patch.object(replay, "resolve_chain_rpc_url", return_value=RPC),
+        patch.object(replay, "json_rpc_batch_call", side_effect=rpc.batch_call),
+        patch.object(replay, "json_rpc_call", side_effect=rpc.call),
+    ):
+        return replay.replay_block_range(
+            MagicMock(),
+            chain_id=CHAIN_BASE,
+            from_block=from_block,
+            to_block=to_block,
+            dry_run=True,
+            wallet_addresses=set(wallets),
+            **kwargs,
+        )
+
+
+def test_topics_mode_or_wallets_across_contracts():
+    wallets = [_wallet(i) for i in range(1, 2001)]
+    rpc = FakeRpc([_log(block=70, log_index=1, to_wallet=wallets[1500]), _log(block=5, log_index=0, to_wallet=wallets[3])])
+
+    result = _replay(rpc, wallets, block_chunk=50, scan_mode="topics")
+
+    # 2 plages × 4 groupes de 500 wallets, tous contrats dans chaque filtre
+    assert result.rpc_requests == 8 and rpc.batches == [8]
+    assert all(isinstance(f["address"], list) and len(f["address"]) == 7 for f in rpc.filters)
+    assert {len(f["topics"][2]) for f in rpc.filters} == {replay.WALLET_TOPICS_PER_FILTER}
+    assert [p["block_number"] for p in result.preview] == [5, 70]
+    assert result.to_dict()["blocks_per_second"] is not None and result.errors == []
+
+
+def test_all_transfers_mode_filters_locally():
+    wallets = [_wallet(1), _wallet(2)]
+    rpc = FakeRpc([
+        _log(block=10, log_index=0, to_wallet=_wallet(99)),
+        _log(block=11, log_index=0, to_wallet=wallets[1]),
+    ])
+
+    result = _replay(rpc, wallets, block_chunk=100, scan_mode="all_transfers")
+
+    assert rpc.filters[0]["topics"] == [TRANSFER_TOPIC]
+    assert result.logs_scanned == 2 and result.events_prepared == 1
+    assert result.preview[0]["wallet_address"] == wallets[1]
+
+
+def test_range_limit_splits_and_shrinks_chunk():
+    wallet = _wallet(7)
+    rpc = FakeRpc([_log(block=b, log_index=0, to_wallet=wallet) for b in (3, 40, 99)], max_span=25)
+
+    result = _replay(rpc, [wallet], block_chunk=100, rpc_batch_size=1)
+
+    assert result.errors == []
+    assert [p["block_number"] for p in result.preview] == [3, 40, 99]
+    # [1-100] puis [1-50] coupées ; [51-100] déjà planifiée avant le rétrécissement
+    assert result.chunk_splits == 3
+    assert result.block_chunk == 25
+
+
+def test_batch_unsupported_falls_back_to_single_calls():
+    wallet = _wallet(7)
+    rpc = FakeRpc([_log(block=60, log_index=2, to_wallet=wallet)], batch=False)
+
+    result = _replay(rpc, [wallet], block_chunk=20)
+
+    assert result.events_prepared == 1
+    assert result.rpc_requests == 5 and len(rpc.filters) == 5
+
+
+def test_non_limit_error_is_reported():
+    rpc = FakeRpc([])
+    rpc.batch_call = MagicMock(side_effect=EvmRpcError("RPC indisponible", code="evm.rpc.unavailable"))
+
+    result = _replay(rpc, [_wallet(1)], block_chunk=50)
+
+    assert len(result.errors) == 2 and result.chunk_splits == 0
+
+
+def test_unknown_scan_mode_rejected():
+    with pytest.raises(ValueError):
+        _replay(FakeRpc([]), [_wallet(1)], scan_mode="bogus")
+
+
+def _mock_client(body, sent: list):
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json=body)
+
+    return EvmRpcClient(RPC, transport=httpx.MockTransport(handler), max_rps=0)
+
+
+def test_json_rpc_batch_call_orders_results_and_keeps_item_errors():
+    body = [
+        {"jsonrpc": "2.0", "id": 1, "error": {"code": -32005, "message": "query returned more than 10000 results"}},
+        {"jsonrpc": "2.0", "id": 0, "result": ["a"]},
+    ]
+    sent: list = []
+    with patch.object(evm_rpc_client, "get_rpc_client", return_value=_mock_client(body, sent)):
+        results = json_rpc_batch_call(RPC, [("eth_getLogs", [{}]), ("eth_getLogs", [{}]), ("eth_blockNumber", [])])
+
+    assert [item["id"] for item in sent[0]] == [0, 1, 2]
+    assert results[0] == ["a"]
+    assert isinstance(results[1], EvmRpcError) and "more than" in str(results[1])
+    assert isinstance(results[2], EvmRpcError) and results[2].code == "evm.rpc.batch_missing"
+
+    client = _mock_client({"error": {"message": "batch not allowed"}}, [])
+    with patch.object(evm_rpc_client, "get_rpc_client", return_value=client):
+        with pytest.raises(EvmRpcError) as exc:
+            json_rpc_batch_call(RPC, [("eth_blockNumber", [])])
+    assert exc.value.code == "evm.rpc.batch_unsupported"
@@ -107,6 +107,11 @@ def _mock_transfer_log(*, tx_hash: str, log_index: int, to_wallet: str) -> dict:
     }
 
 
+def _logs_per_filter(mock_log: dict):
+    """side_effect de _fetch_transfer_logs_batch : le log mocké pour chaque filtre."""
+    return lambda rpc_url, filters: [[mock_log] for _ in filters]
+
+
 def test_replay_block_range_dry_run_writes_nothing(db: Session):
     pe = make_linked_client(db)
     wallet = _seed_wallet(db, pe)
@@ -120,8 +125,8 @@ def test_replay_block_range_dry_run_writes_nothing(db: Session):
         return_value="http://mock-rpc",
     ):
         with patch(
-            "services.onchain_indexer.block_range_replay._fetch_transfer_logs",
-            return_value=[mock_log],
+            "services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch",
+            side_effect=_logs_per_filter(mock_log),
         ):
             before = db.query(RawOnChainEvent).count()
             result = replay_block_range(
@@ -152,8 +157,8 @@ def test_replay_block_range_no_dry_run_inserts_only_raw_events(db: Session):
         return_value="http://mock-rpc",
     ):
         with patch(
-            "services.onchain_indexer.block_range_replay._fetch_transfer_logs",
-            return_value=[mock_log],
+            "services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch",
+            side_effect=_logs_per_filter(mock_log),
         ):
             result = replay_block_range(
                 db,
@@ -175,8 +180,8 @@ def test_replay_block_range_no_dry_run_inserts_only_raw_events(db: Session):
         return_value="http://mock-rpc",
     ):
         with patch(
-            "services.onchain_indexer.block_range_replay._fetch_transfer_logs",
-            return_value=[mock_log],
+            "services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch",
+            side_effect=_logs_per_filter(mock_log),
         ):
             result2 = replay_block_range(
                 db,
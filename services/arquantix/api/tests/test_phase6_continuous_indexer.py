@@ -28,7 +28,7 @@ from services.privy_wallet.repository import (
     PersonWalletDepositRepository,
 )
 from tests.conftest import make_linked_client
-from tests.test_phase4_reconciliation import CHAIN_ID, _mock_transfer_log, _seed_wallet
+from tests.test_phase4_reconciliation import CHAIN_ID, _logs_per_filter, _mock_transfer_log, _seed_wallet
 
 RPC = "http://mock-rpc"
 
@@ -127,8 +127,8 @@ def test_no_dry_run_inserts_raw_and_advances_checkpoint(db: Session):
             return_value=1020,
         ):
             with patch(
-                "services.onchain_indexer.block_range_replay._fetch_transfer_logs",
-                return_value=[mock_log],
+                "services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch",
+                side_effect=_logs_per_filter(mock_log),
             ):
                 with patch(
                     "services.onchain_indexer.continuous_base_indexer.replay_block_range",
@@ -168,7 +168,7 @@ def test_idempotent_replay_skips_existing(db: Session):
     patches = [
         patch("services.onchain_indexer.continuous_base_indexer.resolve_chain_rpc_url", return_value=RPC),
         patch("services.onchain_indexer.continuous_base_indexer.fetch_block_number", return_value=1015),
-        patch("services.onchain_indexer.block_range_replay._fetch_transfer_logs", return_value=[mock_log]),
+        patch("services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch", side_effect=_logs_per_filter(mock_log)),
         patch("services.onchain_indexer.continuous_base_indexer.replay_block_range", side_effect=_real_replay),
     ]
     for p in patches:
@@ -464,8 +464,8 @@ def test_consumed_raw_event_not_mutated_on_reindex(db: Session):
             return_value=1012,
         ):
             with patch(
-                "services.onchain_indexer.block_range_replay._fetch_transfer_logs",
-                return_value=[mock_log],
+                "services.onchain_indexer.block_range_replay._fetch_transfer_logs_batch",
+                side_effect=_logs_per_filter(mock_log),
             ):
                 with patch(
                     "services.onchain_indexer.continuous_base_indexer.replay_block_range",
@@ -17,6 +17,7 @@ from services.portfolio_engine.drift.service import (
     DriftRebalanceService,
     PortfolioNotFoundForDriftError,
 )
+from tests.price_bridge_test_utils import INSTRUMENT_PRICES_PATH, InstrumentPriceStub
 
 
 # ---------------------------------------------------------------------------
@@ -241,7 +242,7 @@ def _mock_price(instrument_id_to_price: dict):
     return _side_effect
 
 
-PRICE_BRIDGE = "services.portfolio_engine.valuations.service.get_instrument_price"
+PRICE_BRIDGE = INSTRUMENT_PRICES_PATH
 
 
 # ---------------------------------------------------------------------------
@@ -262,7 +263,7 @@ class TestDriftDetection:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert report.needs_rebalance is True or report.needs_rebalance is False
@@ -272,7 +273,7 @@ class TestDriftDetection:
     def test_drift_no_allocations_returns_warning(self, db, svc, portfolio, position_btc, instrument_btc):
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert report.needs_rebalance is False
@@ -287,7 +288,7 @@ class TestDriftDetection:
 
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert Decimal(report.threshold) == Decimal("0.10")
@@ -300,7 +301,7 @@ class TestDriftDetection:
 
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(
                 db, portfolio.id, threshold=Decimal("0.02"),
             )
@@ -329,7 +330,7 @@ class TestDriftScore:
             instrument_sol.id: Decimal("200"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert Decimal(report.drift_score) >= Decimal("0")
@@ -352,7 +353,7 @@ class TestNeedsRebalance:
 
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert report.needs_rebalance is False
@@ -370,7 +371,7 @@ class TestNeedsRebalance:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(
                 db, portfolio.id, threshold=Decimal("0.01"),
             )
@@ -397,7 +398,7 @@ class TestRebalancePreview:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(
                 db, portfolio.id, threshold=Decimal("0.01"),
             )
@@ -419,7 +420,7 @@ class TestRebalancePreview:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(db, portfolio.id)
 
         for trade in result.trades:
@@ -429,7 +430,7 @@ class TestRebalancePreview:
     def test_preview_no_allocations(self, db, svc, portfolio, position_btc, instrument_btc):
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(db, portfolio.id)
 
         assert result.needs_rebalance is False
@@ -438,7 +439,7 @@ class TestRebalancePreview:
     def test_preview_nav_zero(self, db, svc, portfolio, instrument_btc):
         _alloc(db, portfolio, instrument_btc, "1.0")
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price({})):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price({})):
             result = svc.generate_rebalance_preview(db, portfolio.id)
 
         assert result.needs_rebalance is False
@@ -459,7 +460,7 @@ class TestMinTradeSize:
 
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(db, portfolio.id)
 
         for trade in result.trades:
@@ -484,7 +485,7 @@ class TestUnallocatedPositions:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id, threshold=Decimal("0.01"))
 
         unallocated = [i for i in report.items if i.is_unallocated]
@@ -503,7 +504,7 @@ class TestUnallocatedPositions:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(
                 db, portfolio.id, threshold=Decimal("0.01"),
             )
@@ -529,7 +530,7 @@ class TestUnpricedExclusion:
 
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             report = svc.detect_drift(db, portfolio.id)
 
         assert report.unpriced_excluded_count >= 1
@@ -548,10 +549,10 @@ class TestValuationCache:
         _alloc(db, portfolio, instrument_btc, "1.0")
         prices = {instrument_btc.id: Decimal("70000")}
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             valuation = svc._valuation_service.value_portfolio(db, portfolio.id)
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)) as mock_bridge:
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)) as mock_bridge:
             result = svc.generate_rebalance_preview(
                 db, portfolio.id, valuation=valuation,
             )
@@ -591,7 +592,7 @@ class TestCreateRebalancePlan:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             preview = svc.create_rebalance_plan(db, portfolio.id)
 
         assert preview.id is not None
@@ -625,7 +626,7 @@ class TestTargetWithoutPosition:
             instrument_eth.id: Decimal("4000"),
         }
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.generate_rebalance_preview(
                 db, portfolio.id, threshold=Decimal("0.01"),
             )
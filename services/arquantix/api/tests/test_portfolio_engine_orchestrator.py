@@ -26,6 +26,7 @@ from services.portfolio_engine.strategies.models import (
     StrategyDefinition,
     StrategyInstance,
 )
+from tests.price_bridge_test_utils import INSTRUMENT_PRICES_PATH, InstrumentPriceStub
 
 
 # ---------------------------------------------------------------------------
@@ -182,7 +183,7 @@ def _mock_price(instrument_id_to_price: dict):
     return _side_effect
 
 
-PRICE_BRIDGE = "services.portfolio_engine.valuations.service.get_instrument_price"
+PRICE_BRIDGE = INSTRUMENT_PRICES_PATH
 
 
 # ---------------------------------------------------------------------------
@@ -200,7 +201,7 @@ class TestManualMode:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.COMPLETED
@@ -225,7 +226,7 @@ class TestAssistedMode:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.COMPLETED
@@ -249,7 +250,7 @@ class TestAutomaticMode:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.COMPLETED
@@ -276,7 +277,7 @@ class TestAutomaticMode:
         before_count = db.query(ExecutionInstruction).count()
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             svc.run_portfolio_cycle(db, portfolio.id)
 
         after_count = db.query(ExecutionInstruction).count()
@@ -298,7 +299,7 @@ class TestPreviewCreation:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.rebalance_preview_id is not None
@@ -326,7 +327,7 @@ class TestManualNoPreview:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.rebalance_preview_id is None
@@ -343,7 +344,7 @@ class TestNavZeroAbort:
         defn = _def(db, "threshold_rebalance")
         _instance(db, portfolio, defn)
 
-        with patch(PRICE_BRIDGE, side_effect=_mock_price({})):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price({})):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.ABORTED
@@ -362,7 +363,7 @@ class TestNoStrategies:
         _policy(db, portfolio, orchestration_mode="assisted")
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.COMPLETED
@@ -386,7 +387,7 @@ class TestNoActionableSignals:
         _instance(db, portfolio, defn, parameters={"threshold": "0.99"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.status == OrchestrationStatus.COMPLETED
@@ -409,7 +410,7 @@ class TestRunLogging:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         run = db.query(OrchestrationRun).filter(
@@ -436,7 +437,7 @@ class TestRunHistory:
         _instance(db, portfolio, defn, parameters={"frequency": "daily"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             svc.run_portfolio_cycle(db, portfolio.id)
             svc.run_portfolio_cycle(db, portfolio.id)
 
@@ -463,7 +464,7 @@ class TestExecutionEligible:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         run = db.query(OrchestrationRun).filter(
@@ -486,7 +487,7 @@ class TestPolicyMissing:
         _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.run_portfolio_cycle(db, portfolio.id)
 
         assert result.mode == RebalanceExecutionMode.MANUAL
@@ -24,6 +24,7 @@ from services.portfolio_engine.strategy_engine.service import (
     StrategyEngineService,
     StrategyInstanceNotFoundError,
 )
+from tests.price_bridge_test_utils import INSTRUMENT_PRICES_PATH, InstrumentPriceStub
 
 
 # ---------------------------------------------------------------------------
@@ -153,7 +154,7 @@ def _mock_price(instrument_id_to_price: dict):
     return _side_effect
 
 
-PRICE_BRIDGE = "services.portfolio_engine.valuations.service.get_instrument_price"
+PRICE_BRIDGE = INSTRUMENT_PRICES_PATH
 
 
 # ---------------------------------------------------------------------------
@@ -179,7 +180,7 @@ class TestThresholdRebalance:
         inst = _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         assert result.strategies_evaluated == 1
@@ -208,7 +209,7 @@ class TestThresholdRebalance:
         inst = _instance(db, portfolio, defn, parameters={"threshold": "0.10"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -229,7 +230,7 @@ class TestPeriodicRebalance:
         inst = _instance(db, portfolio, defn, parameters={"frequency": "monthly"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -258,7 +259,7 @@ class TestPeriodicRebalance:
         db.flush()
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -288,7 +289,7 @@ class TestDriftGuard:
         inst = _instance(db, portfolio, defn, parameters={"warning_threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -313,7 +314,7 @@ class TestDriftGuard:
         inst = _instance(db, portfolio, defn, parameters={"warning_threshold": "0.50"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -341,7 +342,7 @@ class TestRiskLimit:
         inst = _instance(db, portfolio, defn)
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -365,7 +366,7 @@ class TestRiskLimit:
         inst = _instance(db, portfolio, defn)
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -378,7 +379,7 @@ class TestRiskLimit:
         inst = _instance(db, portfolio, defn)
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         sig = result.signals[0]
@@ -411,7 +412,7 @@ class TestMultipleStrategies:
         inst2 = _instance(db, portfolio, defn_drift, priority=2, parameters={"warning_threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         assert result.strategies_evaluated == 2
@@ -448,7 +449,7 @@ class TestIgnoredStrategies:
         inst = _instance(db, portfolio, defn, status="paused", parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         assert result.strategies_evaluated == 0
@@ -460,7 +461,7 @@ class TestIgnoredStrategies:
         inst = _instance(db, portfolio, defn, status="archived")
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         assert result.strategies_evaluated == 0
@@ -479,7 +480,7 @@ class TestLogging:
         inst = _instance(db, portfolio, defn, parameters={"frequency": "daily"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         logs = (
@@ -518,7 +519,7 @@ class TestExecuteAction:
         inst = _instance(db, portfolio, defn, parameters={"threshold": "0.01"})
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.execute_strategy_action(db, inst.id)
 
         assert result.strategies_evaluated == 1
@@ -551,7 +552,7 @@ class TestUnknownStrategyType:
         inst = _instance(db, portfolio, defn)
 
         prices = {instrument_btc.id: Decimal("70000")}
-        with patch(PRICE_BRIDGE, side_effect=_mock_price(prices)):
+        with patch(PRICE_BRIDGE, new_callable=InstrumentPriceStub, side_effect=_mock_price(prices)):
             result = svc.evaluate_portfolio_strategies(db, portfolio.id)
 
         assert result.strategies_evaluated == 1
@@ -18,6 +18,7 @@ from services.portfolio_engine.summary.service import (
     PortfolioNotFoundForSummaryError,
     PortfolioSummaryService,
 )
+from tests.price_bridge_test_utils import INSTRUMENT_PRICES_PATH, InstrumentPriceStub
 
 
 # ---------------------------------------------------------------------------
@@ -214,7 +215,7 @@ class TestSummaryEmptyPortfolio:
 
 class TestSummaryPricedPositions:
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_single_priced_position(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio, position_btc: PositionAtom, instrument_btc: Instrument,
@@ -241,7 +242,7 @@ class TestSummaryPricedPositions:
         assert pos.allocation_weight == "1.000000"
         assert pos.pricing_status == "priced"
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_multiple_priced_positions_allocation_weights(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio,
@@ -279,7 +280,7 @@ class TestSummaryPricedPositions:
 
 class TestSummaryMixedPositions:
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_mixed_priced_and_unpriced(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio,
@@ -318,7 +319,7 @@ class TestSummaryMixedPositions:
 
 class TestSummaryAllUnpriced:
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_all_positions_unpriced(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio,
@@ -342,7 +343,7 @@ class TestSummaryAllUnpriced:
 
 class TestSummaryClosedPositionsExcluded:
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_closed_positions_not_included(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio,
@@ -362,7 +363,7 @@ class TestSummaryClosedPositionsExcluded:
 
 class TestSummaryQuoteNotAvailable:
 
-    @patch("services.portfolio_engine.summary.service.get_instrument_price")
+    @patch(INSTRUMENT_PRICES_PATH, new_callable=InstrumentPriceStub)
     def test_quote_not_available_treated_as_unpriced(
         self, mock_price, db: Session, summary_svc: PortfolioSummaryService,
         portfolio: Portfolio,
@@ -0,0 +1,352 @@
+"""Tests for the fleet valuation snapshot engine (snapshots/service.py) and the
+precomputed return series read by the Performance Engine."""
+import uuid
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from services.portfolio_engine.assets.models import Asset
+from services.portfolio_engine.instruments.models import Instrument
+from services.portfolio_engine.performance.models import PortfolioReturnSeries
+from services.portfolio_engine.performance.service import (
+    PerformanceService,
+    series_point,
+    series_state,
+)
+from services.portfolio_engine.portfolios.models import Portfolio
+from services.portfolio_engine.positions.models import PositionAtom
+from services.portfolio_engine.snapshots import service as snapshot_service
+from services.portfolio_engine.snapshots.enums import SnapshotRunStatus
+from services.portfolio_engine.snapshots.repository import SnapshotRunRepository
+from services.portfolio_engine.snapshots.service import ValuationSnapshotService, write_snapshot_chunk
+from services.portfolio_engine.valuations.models import PortfolioValuation, PositionValuation
+
+T0 = datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# Incremental series arithmetic (no DB)
+# ---------------------------------------------------------------------------
+
+def _chain(navs):
+    state, points = None, []
+    for nav in navs:
+        values, state = series_point(Decimal(nav), state)
+        points.append(values)
+    return points
+
+
+@pytest.mark.parametrize("navs", [
+    ["10000", "10500", "9800", "11000"],
+    ["100", "0", "50", "120"],
+    ["0", "100", "90"],
+])
+def test_series_point_matches_full_rebuild(navs):
+    snapshots = [
+        SimpleNamespace(id=i, nav=Decimal(n), valuation_timestamp=T0 + timedelta(days=i))
+        for i, n in enumerate(navs)
+    ]
+    expected = PerformanceService._build_series(snapshots, [])
+
+    for got, exp in zip(_chain(navs), expected):
+        assert got["period_return"] == exp["period_return"]
+        assert got["cumulative_return"] == exp["cumulative_return"]
+        assert got["drawdown"] == exp["drawdown"]
+
+
+def test_series_state_derived_from_rebuild_point():
+    # rebuild_performance rows carry no growth / peak metadata
+    point = SimpleNamespace(
+        nav=Decimal("9000"), cumulative_return=Decimal("-0.1"), drawdown=Decimal("-0.25"), metadata_={"source": "rebuild"},
+    )
+    nav, growth, peak = series_state(point)
+    assert (nav, growth, peak) == (Decimal("9000"), Decimal("0.9"), Decimal("12000"))
+
+    wiped = SimpleNamespace(nav=Decimal("0"), cumulative_return=Decimal("-1"), drawdown=Decimal("-1"), metadata_={})
+    assert series_state(wiped) is None
+
+
+# ---------------------------------------------------------------------------
+# Chunk writes (DB)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def portfolio(db: Session) -> Portfolio:
+    pf = Portfolio(
+        id=uuid.uuid4(),
+        client_id=uuid.uuid4(),
+        portfolio_type="bundle_portfolio",
+        name="Snapshot Test PF",
+        base_currency="EUR",
+        status="active",
+        metadata_={},
+    )
+    db.add(pf)
+    db.flush()
+    return pf
+
+
+@pytest.fixture
+def instrument(db: Session) -> Instrument:
+    asset = Asset(
+        id=uuid.uuid4(),
+        symbol=f"SNAP_BTC_{uuid.uuid4().hex[:4]}",
+        name="Bitcoin",
+        asset_type="crypto",
+        metadata_={},
+    )
+    db.add(asset)
+    db.flush()
+    i = Instrument(
+        id=uuid.uuid4(),
+        asset_id=asset.id,
+        code=f"SNAP_BTC-SPOT-{uuid.uuid4().hex[:4]}",
+        name="BTC Spot",
+        instrument_type="spot",
+        metadata_={"market_data_instrument_id": 9951},
+    )
+    db.add(i)
+    db.flush()
+    return i
+
+
+@pytest.fixture
+def position(db: Session, portfolio: Portfolio, instrument: Instrument) -> PositionAtom:
+    p = PositionAtom(
+        id=uuid.uuid4(),
+        portfolio_id=portfolio.id,
+        instrument_id=instrument.id,
+        position_type="spot",
+        status="open",
+        quantity=Decimal("2"),
+        available_quantity=Decimal("2"),
+        average_entry_price=Decimal("50000"),
+        realized_pnl=Decimal("0"),
+        metadata_={},
+    )
+    db.add(p)
+    db.flush()
+    return p
+
+
+class TestWriteSnapshotChunk:
+
+    def test_idempotent_per_portfolio_and_as_of(self, db, portfolio, instrument, position):
+        prices = {instrument.id: Decimal("60000")}
+
+        first = write_snapshot_chunk(db, [portfolio.id], as_of=T0, prices=prices)
+        second = write_snapshot_chunk(db, [portfolio.id], as_of=T0, prices=prices)
+
+        assert (first["snapshots"], first["positions"], first["series_points"]) == (1, 1, 1)
+        assert second["snapshots"] == 0
+        pv = db.query(PortfolioValuation).filter(PortfolioValuation.portfolio_id == portfolio.id).one()
+        assert Decimal(str(pv.nav)) == Decimal("120000")
+        assert pv.valuation_source == "scheduled_snapshot"
+        assert db.query(PositionValuation).filter(PositionValuation.portfolio_id == portfolio.id).count() == 1
+
+    def test_series_extended_and_read_by_performance(self, db, portfolio, instrument, position):
+        write_snapshot_chunk(db, [portfolio.id], as_of=T0, prices={instrument.id: Decimal("60000")})
+        write_snapshot_chunk(
+            db, [portfolio.id], as_of=T0 + timedelta(days=1), prices={instrument.id: Decimal("66000")},
+        )
+
+        points = (
+            db.query(PortfolioReturnSeries)
+            .filter(PortfolioReturnSeries.portfolio_id == portfolio.id)
+            .order_by(PortfolioReturnSeries.timestamp)
+            .all()
+        )
+        assert len(points) == 2
+        assert Decimal(str(points[1].period_return)) == Decimal("0.1")
+
+        result = PerformanceService().compute_performance_series(db, portfolio.id)
+        assert result.data_points == 2
+        assert Decimal(result.total_return) == Decimal("0.1")
+
+    def test_out_of_date_series_is_rebuilt(self, db, portfolio, instrument, position):
+        # On-demand snapshot without a series point: the next run rebuilds the series
+        db.add(PortfolioValuation(
+            id=uuid.uuid4(),
+            portfolio_id=portfolio.id,
+            nav=Decimal("100000"),
+            total_realized_pnl=Decimal("0"),
+            total_unrealized_pnl=Decimal("0"),
+            total_pnl=Decimal("0"),
+            priced_positions_count=1,
+            unpriced_positions_count=0,
+            valuation_source="on_demand_snapshot",
+            valuation_timestamp=T0 - timedelta(hours=6),
+        ))
+        db.flush()
+
+        result = write_snapshot_chunk(db, [portfolio.id], as_of=T0, prices={instrument.id: Decimal("60000")})
+
+        assert result["series_points"] == 2
+        summary = PerformanceService().compute_portfolio_performance(db, portfolio.id)
+        assert Decimal(summary.total_return) == Decimal("0.2")
+
+
+# ---------------------------------------------------------------------------
+# Run orchestration (DB)
+# ---------------------------------------------------------------------------
+
+RUN_AS_OF = datetime(2030, 1, 1, tzinfo=timezone.utc)
+SERVICE_PATH = "services.portfolio_engine.snapshots.service"
+
+
+class _NonClosingSession:
+    """Session fixture handed out by the run's session_factory: close / rollback are
+    no-ops and commit is a flush, so every write stays in the fixture savepoint.
+    Injected failures happen before any write of their chunk."""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def close(self):
+        return None
+
+    def rollback(self):
+        return None
+
+    def commit(self):
+        self._db.flush()
+
+
+class _InlineExecutor:
+    """ProcessPoolExecutor stand-in: runs each submitted call in-process."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+@pytest.fixture
+def fleet(db: Session, instrument: Instrument) -> list[uuid.UUID]:
+    ids = []
+    for n in range(3):
+        pf = Portfolio(
+            id=uuid.uuid4(), client_id=uuid.uuid4(), portfolio_type="bundle_portfolio",
+            name=f"Snapshot Fleet PF {n}", base_currency="EUR", status="active", metadata_={},
+        )
+        db.add(pf)
+        db.add(PositionAtom(
+            id=uuid.uuid4(), portfolio_id=pf.id, instrument_id=instrument.id, position_type="spot",
+            status="open", quantity=Decimal("2"), available_quantity=Decimal("2"),
+            average_entry_price=Decimal("50000"), realized_pnl=Decimal("0"), metadata_={},
+        ))
+        ids.append(pf.id)
+    db.flush()
+    return sorted(ids)
+
+
+@pytest.fixture
+def active_ids(fleet):
+    """Restricts the run to the fleet (the test DB may hold other active portfolios)."""
+    real = snapshot_service._active_portfolio_ids
+    spy = MagicMock(side_effect=lambda db, as_of: [pid for pid in real(db, as_of) if pid in fleet])
+    with patch(f"{SERVICE_PATH}._active_portfolio_ids", spy):
+        yield spy
+
+
+def _scheduled(db, portfolio_ids):
+    return (
+        db.query(PortfolioValuation)
+        .filter(
+            PortfolioValuation.portfolio_id.in_(portfolio_ids),
+            PortfolioValuation.valuation_timestamp == RUN_AS_OF,
+            PortfolioValuation.valuation_source == "scheduled_snapshot",
+        )
+        .all()
+    )
+
+
+class TestSnapshotRun:
+
+    def test_failed_run_resumes_with_pinned_prices(self, db, instrument, fleet, active_ids):
+        factory = lambda: _NonClosingSession(db)  # noqa: E731
+        real_chunk = snapshot_service.write_snapshot_chunk
+        calls = []
+
+        def fail_second_chunk(chunk_db, ids, **kwargs):
+            calls.append(ids)
+            if len(calls) == 2:
+                raise RuntimeError("boom")
+            return real_chunk(chunk_db, ids, **kwargs)
+
+        with patch(f"{SERVICE_PATH}.get_instrument_prices", return_value={instrument.id: Decimal("60000")}), \
+                patch(f"{SERVICE_PATH}.write_snapshot_chunk", side_effect=fail_second_chunk):
+            with pytest.raises(RuntimeError):
+                ValuationSnapshotService().run(factory, RUN_AS_OF, workers=1, chunk_size=1)
+
+        run = SnapshotRunRepository.get_by_as_of(db, RUN_AS_OF)
+        assert run.status == SnapshotRunStatus.FAILED
+        assert run.error_message == "RuntimeError: boom"
+        first = {v.portfolio_id: v.id for v in _scheduled(db, fleet)}
+        assert list(first) == [fleet[0]]
+
+        # Live quote moved since: the resumed run must keep the prices pinned on the run row
+        with patch(f"{SERVICE_PATH}.get_instrument_prices", return_value={instrument.id: Decimal("70000")}) as live:
+            run = ValuationSnapshotService().run(factory, RUN_AS_OF, workers=1, chunk_size=1)
+
+        live.assert_not_called()
+        assert run.status == SnapshotRunStatus.COMPLETED
+        assert run.error_message is None
+        assert (run.portfolios_total, run.portfolios_done, run.snapshots_written) == (3, 3, 3)
+        snapshots = _scheduled(db, fleet)
+        assert len(snapshots) == 3
+        assert {v.id for v in snapshots if v.portfolio_id == fleet[0]} == {first[fleet[0]]}
+        assert {Decimal(str(v.nav)) for v in snapshots} == {Decimal("120000")}
+        assert active_ids.call_count == 2  # once per run
+
+    def test_completed_run_is_a_no_op(self, db, instrument, fleet, active_ids):
+        factory = lambda: _NonClosingSession(db)  # noqa: E731
+        with patch(f"{SERVICE_PATH}.get_instrument_prices", return_value={instrument.id: Decimal("60000")}):
+            first = ValuationSnapshotService().run(factory, RUN_AS_OF, workers=1, chunk_size=2)
+        assert first.status == SnapshotRunStatus.COMPLETED
+
+        with patch(f"{SERVICE_PATH}.write_snapshot_chunk") as chunk:
+            again = ValuationSnapshotService().run(factory, RUN_AS_OF, workers=1, chunk_size=2)
+
+        chunk.assert_not_called()
+        assert again.id == first.id
+        assert again.snapshots_written == 3
+        assert len(_scheduled(db, fleet)) == 3
+
+    def test_workers_run_chunks_through_worker_entry_point(self, db, instrument, fleet, active_ids):
+        worker = MagicMock(side_effect=snapshot_service._run_chunk_in_worker)
+        with patch(f"{SERVICE_PATH}.get_instrument_prices", return_value={instrument.id: Decimal("60000")}), \
+                patch(f"{SERVICE_PATH}.ProcessPoolExecutor", _InlineExecutor), \
+                patch(f"{SERVICE_PATH}._run_chunk_in_worker", worker), \
+                patch("database.SessionLocal", lambda: _NonClosingSession(db)):
+            run = ValuationSnapshotService().run(
+                lambda: _NonClosingSession(db), RUN_AS_OF, workers=2, chunk_size=1,
+            )
+
+        assert worker.call_count == 3
+        run_id, as_of, ids, prices = worker.call_args_list[0].args
+        assert (run_id, as_of) == (run.id, RUN_AS_OF)
+        assert prices == {str(instrument.id): "60000"}
+        assert run.status == SnapshotRunStatus.COMPLETED
+        assert run.snapshots_written == 3
+        assert len(_scheduled(db, fleet)) == 3
@@ -24,6 +24,7 @@ from services.portfolio_engine.valuations.service import (
     PositionNotFoundForValuationError,
     ValuationService,
 )
+from tests.price_bridge_test_utils import INSTRUMENT_PRICES_PATH, InstrumentPriceStub
 
 
 # ---------------------------------------------------------------------------
@@ -219,7 +220,8 @@ def closed_position_with_pnl(db: Session, portfolio: Portfolio, instrument_btc:
     return p
 
 
-PRICE_BRIDGE_PATH = "services.portfolio_engine.valuations.service.get_instrument_price"
+POSITION_PRICE_PATH = "services.portfolio_engine.valuations.service.get_instrument_price"
+PRICE_BRIDGE_PATH = INSTRUMENT_PRICES_PATH
 
 
 # ---------------------------------------------------------------------------
@@ -228,7 +230,7 @@ PRICE_BRIDGE_PATH = "services.portfolio_engine.valuations.service.get_instrument
 
 class TestSinglePositionValuation:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(POSITION_PRICE_PATH)
     def test_priced_position(
         self, mock_price, db: Session, svc: ValuationService,
         position_btc: PositionAtom, instrument_btc: Instrument,
@@ -250,7 +252,7 @@ class TestSinglePositionValuation:
 
 class TestUnrealizedPnl:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(POSITION_PRICE_PATH)
     def test_unrealized_pnl_positive(
         self, mock_price, db: Session, svc: ValuationService,
         position_btc: PositionAtom,
@@ -261,7 +263,7 @@ class TestUnrealizedPnl:
         expected = Decimal("0.5") * (Decimal("70000") - Decimal("68000"))
         assert Decimal(result.unrealized_pnl) == expected.quantize(Decimal("0.01"))
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(POSITION_PRICE_PATH)
     def test_unrealized_pnl_negative(
         self, mock_price, db: Session, svc: ValuationService,
         position_btc: PositionAtom,
@@ -279,7 +281,7 @@ class TestUnrealizedPnl:
 
 class TestPortfolioNAV:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_nav_multiple_positions(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom, position_eth: PositionAtom,
@@ -310,7 +312,7 @@ class TestPortfolioNAV:
 
 class TestAllocationWeights:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_allocation_weights_sum_to_one(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom, position_eth: PositionAtom,
@@ -337,7 +339,7 @@ class TestAllocationWeights:
 
 class TestMissingPrice:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_missing_price_does_not_break_valuation(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom,
@@ -351,7 +353,7 @@ class TestMissingPrice:
         assert Decimal(result.nav) == Decimal("0")
         assert len(result.warnings) >= 1
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_quote_not_available(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom,
@@ -371,7 +373,7 @@ class TestMissingPrice:
 
 class TestUnsupportedPositionType:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_vault_position_unpriced(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_vault: PositionAtom,
@@ -390,7 +392,7 @@ class TestUnsupportedPositionType:
 
 class TestMissingAverageEntryPrice:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_no_avg_price_unrealized_zero_with_warning(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_no_avg: PositionAtom,
@@ -414,7 +416,7 @@ class TestMissingAverageEntryPrice:
 
 class TestPnlAggregation:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_total_pnl_equals_realized_plus_unrealized(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom,
@@ -435,7 +437,7 @@ class TestPnlAggregation:
 
 class TestClosedPositionRealized:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_closed_position_realized_pnl_included(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio,
@@ -453,7 +455,7 @@ class TestClosedPositionRealized:
 
         assert Decimal(result.total_realized_pnl) == Decimal("5000")
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_closed_position_only_contributes_realized(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio,
@@ -474,7 +476,7 @@ class TestClosedPositionRealized:
 
 class TestSnapshotCreation:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_create_snapshot_persists(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom, instrument_btc: Instrument,
@@ -504,7 +506,7 @@ class TestSnapshotCreation:
 
 class TestSnapshotHistory:
 
-    @patch(PRICE_BRIDGE_PATH)
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
     def test_list_snapshots(
         self, mock_price, db: Session, svc: ValuationService,
         portfolio: Portfolio, position_btc: PositionAtom, instrument_btc: Instrument,
@@ -570,3 +572,49 @@ class TestEmptyPortfolio:
         assert result.priced_positions_count == 0
         assert result.unpriced_positions_count == 0
         assert result.positions == []
+
+
+# ---------------------------------------------------------------------------
+# Batch valuation: many portfolios, one price load per chunk
+# ---------------------------------------------------------------------------
+
+class TestBatchValuation:
+
+    @patch(PRICE_BRIDGE_PATH, new_callable=InstrumentPriceStub)
+    def test_value_portfolios_loads_prices_once(
+        self, mock_price, db: Session, svc: ValuationService,
+        portfolio: Portfolio, position_btc: PositionAtom, position_eth: PositionAtom,
+        instrument_btc: Instrument,
+    ):
+        other = Portfolio(
+            id=uuid.uuid4(),
+            client_id=uuid.uuid4(),
+            portfolio_type="bundle_portfolio",
+            name="Valuation Test PF 2",
+            base_currency="EUR",
+            status="active",
+            metadata_={},
+        )
+        db.add(other)
+        db.add(PositionAtom(
+            id=uuid.uuid4(),
+            portfolio_id=other.id,
+            instrument_id=instrument_btc.id,
+            position_type="spot",
+            status="open",
+            quantity=Decimal("2"),
+            available_quantity=Decimal("2"),
+            average_entry_price=Decimal("60000"),
+            realized_pnl=Decimal("0"),
+            metadata_={},
+        ))
+        db.flush()
+        mock_price.return_value = {"price": "70000.00"}
+
+        results = svc.value_portfolios(db, [portfolio.id, other.id, uuid.uuid4()])
+
+        assert set(results) == {portfolio.id, other.id}
+        assert mock_price.call_count == 1
+        assert Decimal(results[other.id].nav) == Decimal("140000.00")
+        assert Decimal(results[other.id].total_unrealized_pnl) == Decimal("20000.00")
+        assert results[portfolio.id].priced_positions_count == 2
@@ -0,0 +1,268 @@
+"""Tests for the atomic claim of crossed alerts (cache.claim_crossed_alerts + engine).
+
+FakeScriptRedis emulates the claim script (ZRANGEBYSCORE + ZREMRANGEBYSCORE) behind
+EVALSHA, including NOSCRIPT until the script is loaded. The DB session is an in-memory fake.
+"""
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from redis.exceptions import NoScriptError
+
+from services.price_alerts import cache
+from services.price_alerts.cache import (
+    add_alert_to_cache,
+    claim_crossed_alerts,
+    get_crossed_alert_ids_sorted,
+)
+from services.price_alerts.engine import PriceAlertEngine
+from services.price_alerts.metrics import AlertMetrics
+
+
+class FakeScriptPipeline:
+    def __init__(self, redis):
+        self._redis = redis
+        self._ops = []
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        self._ops.append(("evalsha", sha, keys_and_args))
+
+    def zadd(self, key, mapping):
+        self._ops.append(("zadd", key, mapping))
+
+    def zrem(self, key, member):
+        self._ops.append(("zrem", key, member))
+
+    def execute(self):
+        ops, self._ops = self._ops, []
+        self._redis.round_trips += 1
+        if any(op[0] == "evalsha" and op[1] not in self._redis.scripts for op in ops):
+            raise NoScriptError("No matching script. Please use EVAL.")
+        results = []
+        for op in ops:
+            if op[0] == "evalsha":
+                key, low, high = op[2]
+                results.append(self._redis.pop_range(key, float(low), float(high)))
+            elif op[0] == "zadd":
+                results.append(self._redis.zadd(op[1], op[2]))
+            else:
+                results.append(self._redis.zrem(op[1], op[2]))
+        return results
+
+
+class FakeScriptRedis:
+    def __init__(self):
+        self._data = {}
+        self.scripts = set()
+        self.round_trips = 0
+
+    def evalsha(self, *args):
+        raise AssertionError("claims must go through a pipeline")
+
+    def script_load(self, script):
+        import hashlib
+        sha = hashlib.sha1(script.encode()).hexdigest()
+        self.scripts.add(sha)
+        return sha
+
+    def pop_range(self, key, low, high):
+        entries = self._data.get(key, {})
+        crossed = sorted(((m, s) for m, s in entries.items() if low <= s <= high), key=lambda x: x[1])
+        flat = []
+        for member, score in crossed:
+            del entries[member]
+            flat.extend([member, repr(score)])
+        return flat
+
+    def zadd(self, key, mapping):
+        self._data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zrem(self, key, member):
+        return 1 if self._data.get(key, {}).pop(member, None) is not None else 0
+
+    def zrangebyscore(self, key, min, max, withscores=False):
+        entries = self._data.get(key, {})
+        result = sorted(((m, s) for m, s in entries.items() if min <= s <= max), key=lambda x: x[1])
+        return result if withscores else [m for m, _ in result]
+
+    def pipeline(self, transaction=True):
+        return FakeScriptPipeline(self)
+
+    def getset(self, key, value):
+        prev = self._data.get(key)
+        self._data[key] = value
+        return prev
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self._data:
+            return None
+        self._data[key] = value
+        return True
+
+    def members(self, asset, direction):
+        return {m for b in range(cache.NUM_BUCKETS) for m in self._data.get(cache._direction_key(asset, direction, b), {})}
+
+
+class FakeAlert:
+    def __init__(self, target, direction="down", source="mid", mode="once"):
+        self.id = uuid.uuid4()
+        self.client_id = uuid.uuid4()
+        self.asset = "BTC"
+        self.target_price = Decimal(str(target))
+        self.direction = direction
+        self.price_source = source
+        self.status = "active"
+        self.action_type = "alert"
+        self.trigger_mode = mode
+        self.trigger_count = 0
+        self.order_payload = None
+        self.cooldown_seconds = 0
+        self.triggered_at = None
+        self.last_triggered_at = None
+        self.triggered_price = None
+        self.execution_status = None
+        self.metadata_ = None
+
+
+class FakeQuery:
+    def __init__(self, session):
+        self._session = session
+
+    def filter(self, *args):
+        return self
+
+    def with_for_update(self, **kwargs):
+        return self
+
+    def all(self):
+        self._session.queries += 1
+        return [a for a in self._session.alerts if a.status == "active"]
+
+
+class FakeSession:
+    def __init__(self, alerts, fail_commit=False):
+        self.alerts = alerts
+        self.fail_commit = fail_commit
+        self.queries = 0
+
+    def query(self, *args):
+        return FakeQuery(self)
+
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    from services.price_alerts import metrics as m
+    m._metrics = AlertMetrics()
+    yield
+    m._metrics = AlertMetrics()
+
+
+def _seed(r, *alerts):
+    for alert in alerts:
+        add_alert_to_cache(r, alert)
+
+
+def _check(engine, session, prev=86000.0, current=84000.0, source="mid"):
+    return engine._check_source("BTC", source, prev, current, datetime.now(timezone.utc), lambda: session)
+
+
+def test_claim_pops_crossed_members_in_deterministic_order():
+    r = FakeScriptRedis()
+    r.script_load(cache._CLAIM_CROSSED_LUA)
+    alerts = [FakeAlert(p) for p in (85500, 84500, 85000, 83000)]
+    _seed(r, *alerts)
+
+    pairs = claim_crossed_alerts(r, "BTC", "down", 84000.0, 86000.0)
+
+    assert [score for _, score in pairs] == [85500.0, 85000.0, 84500.0]
+    assert r.round_trips == 1
+    assert r.members("BTC", "down") == {str(alerts[3].id)}
+    assert claim_crossed_alerts(r, "BTC", "down", 84000.0, 86000.0) == []
+
+
+def test_claim_loads_script_after_noscript():
+    r = FakeScriptRedis()
+    alert = FakeAlert(85000)
+    _seed(r, alert)
+
+    pairs = claim_crossed_alerts(r, "BTC", "down", 84000.0, 86000.0)
+
+    assert pairs == [(str(alert.id), 85000.0)]
+    assert cache._CLAIM_CROSSED_SHA in r.scripts
+
+
+def test_concurrent_engines_claim_a_crossing_once():
+    r = FakeScriptRedis()
+    alert = FakeAlert(85000)
+    _seed(r, alert)
+    first, second = PriceAlertEngine(r), PriceAlertEngine(r)
+    session_a, session_b = FakeSession([alert]), FakeSession([alert])
+
+    assert first.atomic_claim and second.atomic_claim
+    assert _check(first, session_a) == 1
+    assert _check(second, session_b) == 0
+    assert session_b.queries == 0
+    assert alert.status == "triggered" and alert.trigger_count == 1
+    assert r.members("BTC", "down") == set()
+
+
+def test_still_active_claims_are_restored():
+    r = FakeScriptRedis()
+    recurring = FakeAlert(85000, mode="recurring")
+    other_source = FakeAlert(85200, source="bid")
+    once = FakeAlert(84800)
+    _seed(r, recurring, other_source, once)
+    engine = PriceAlertEngine(r)
+
+    assert _check(engine, FakeSession([recurring, other_source, once])) == 2
+
+    assert r.members("BTC", "down") == {str(recurring.id), str(other_source.id)}
+    pairs = get_crossed_alert_ids_sorted(r, "BTC", "down", 84000.0, 86000.0)
+    assert dict(pairs)[str(other_source.id)] == 85200.0
+
+
+def test_stale_claims_are_dropped():
+    r = FakeScriptRedis()
+    stale = FakeAlert(85000)
+    _seed(r, stale)
+
+    assert _check(PriceAlertEngine(r), FakeSession([])) == 0
+    assert r.members("BTC", "down") == set()
+
+
+def test_rolled_back_claims_are_restored():
+    r = FakeScriptRedis()
+    alert = FakeAlert(85000)
+    _seed(r, alert)
+
+    _check(PriceAlertEngine(r), FakeSession([alert], fail_commit=True))
+    assert r.members("BTC", "down") == {str(alert.id)}
+
+
+def test_clients_without_scripts_keep_legacy_path():
+    class NoScriptRedis(FakeScriptRedis):
+        evalsha = None
+
+    r = NoScriptRedis()
+    alert = FakeAlert(85000)
+    _seed(r, alert)
+    engine = PriceAlertEngine(r)
+
+    assert not engine.atomic_claim
+    assert _check(engine, FakeSession([alert])) == 1
+    assert r.members("BTC", "down") == set()
@@ -0,0 +1,268 @@
+"""Tests for the order execution pool — triggered orders are claimed on the tick
+and executed by OrderExecutor workers (retry scheduling, idempotency keys, metrics).
+
+ExchangeService is mocked; the DB session is a minimal in-memory fake.
+"""
+import threading
+import time
+import uuid
+from decimal import Decimal
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.price_alerts.engine import PriceAlertEngine
+from services.price_alerts.execution import OrderExecutor, OrderJob
+from services.price_alerts.metrics import AlertMetrics, get_metrics
+
+
+class FakeRedis:
+    def __init__(self):
+        self._data = {}
+
+    def get(self, key):
+        return self._data.get(key)
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self._data:
+            return None
+        self._data[key] = value
+        return True
+
+    def zadd(self, key, mapping):
+        self._data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        if key in self._data:
+            self._data[key].pop(member, None)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipe:
+            def zrem(self, key, member):
+                redis.zrem(key, member)
+
+            def execute(self):
+                return []
+
+        return _Pipe()
+
+    def getset(self, key, value):
+        prev = self._data.get(key)
+        self._data[key] = value
+        return prev
+
+    def zrangebyscore(self, key, min, max, withscores=False):
+        entries = self._data.get(key, {})
+        result = sorted(((m, s) for m, s in entries.items() if min <= s <= max), key=lambda x: x[1])
+        return result if withscores else [m for m, _ in result]
+
+
+class FakeAlert:
+    def __init__(self, **kwargs):
+        self.id = kwargs.get("id", uuid.uuid4())
+        self.client_id = uuid.uuid4()
+        self.asset = "BTC"
+        self.target_price = Decimal("85000")
+        self.direction = "down"
+        self.price_source = "mid"
+        self.status = "active"
+        self.action_type = "order"
+        self.trigger_mode = "once"
+        self.trigger_count = 0
+        self.order_payload = {"side": "buy", "order_type": "limit", "amount": 100.0}
+        self.cooldown_seconds = 0
+        self.triggered_at = None
+        self.last_triggered_at = None
+        self.triggered_price = None
+        self.execution_status = kwargs.get("execution_status")
+        self.metadata_ = kwargs.get("metadata_", {})
+
+
+class FakeQuery:
+    def __init__(self, alerts):
+        self._alerts = alerts
+
+    def filter(self, *args, **kwargs):
+        return self
+
+    def with_for_update(self, **kwargs):
+        return self
+
+    def all(self):
+        return list(self._alerts)
+
+    def first(self):
+        return self._alerts[0] if self._alerts else None
+
+
+class FakeSession:
+    def __init__(self, alerts):
+        self._alerts = alerts
+        self.commits = 0
+
+    def query(self, *args):
+        return FakeQuery(self._alerts)
+
+    def begin_nested(self):
+        return MagicMock()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _completed():
+    return {
+        "status": "completed",
+        "order_id": uuid.uuid4(),
+        "price": Decimal("85000"),
+        "amount_crypto": Decimal("0.00118"),
+        "amount_fiat": Decimal("100"),
+    }
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    from services.price_alerts import metrics as m
+    m._metrics = AlertMetrics()
+    yield
+    m._metrics = AlertMetrics()
+
+
+def _engine_with_executor(alert, workers=1):
+    engine = PriceAlertEngine(FakeRedis())
+    session = FakeSession([alert])
+    executor = OrderExecutor(engine, lambda: session, workers=workers, max_queue=10)
+    engine.order_executor = executor
+    engine.redis.zadd("alerts:BTC:down:0", {str(alert.id): 85000.0})
+    return engine, executor, session
+
+
+def _queued_job(alert, executor):
+    job = executor.claim(alert, datetime.now(timezone.utc))
+    assert executor.submit(job)
+    return job
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_tick_only_claims_order_and_submits_after_commit(MockSvc):
+    alert = FakeAlert()
+    engine, executor, session = _engine_with_executor(alert)
+
+    engine.on_price_batch({"BTCUSDT": {"bid": 86000, "ask": 86000}}, lambda: session)
+    triggered = engine.on_price_batch({"BTCUSDT": {"bid": 84000, "ask": 84000}}, lambda: session)
+
+    assert triggered == 1
+    assert not MockSvc.return_value.buy.called
+    assert alert.status == "triggered" and alert.execution_status == "queued"
+    assert alert.metadata_["idempotency_key"] == f"trigger-{alert.id}-1"
+    assert session.commits == 1 and executor.depth == 1
+    snap = get_metrics().snapshot()
+    assert snap["order_jobs_enqueued"] == 1 and snap["order_queue_depth"] == 1
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_worker_executes_with_idempotent_reference(MockSvc):
+    MockSvc.return_value.buy.return_value = _completed()
+    alert = FakeAlert(execution_status=None)
+    engine, executor, session = _engine_with_executor(alert)
+    job = _queued_job(alert, executor)
+
+    executor.run_job(executor._next_job_nowait())
+
+    assert alert.execution_status == "executed"
+    assert MockSvc.return_value.buy.call_args.args[1].external_reference == f"{job.idempotency_key}-1"
+    assert alert.metadata_["attempts"] == 1
+    snap = get_metrics().snapshot()
+    assert snap["orders_executed"] == 1
+    assert snap["order_end_to_end_latency_p50_ms"] >= snap["order_execution_latency_p50_ms"] >= 0.0
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_failed_attempt_is_rescheduled_not_slept(MockSvc):
+    MockSvc.return_value.buy.side_effect = [Exception("timeout"), _completed()]
+    alert = FakeAlert()
+    engine, executor, session = _engine_with_executor(alert)
+    job = _queued_job(alert, executor)
+
+    executor.run_job(executor._next_job_nowait())
+    assert alert.execution_status == "queued"
+    assert alert.metadata_["attempts"] == 1 and "timeout" in alert.metadata_["last_error"]
+    assert executor.depth == 1
+    assert get_metrics().snapshot()["order_retries_scheduled"] == 1
+
+    time.sleep(0.12)
+    executor.run_job(executor._next_job_nowait())
+    refs = [c.args[1].external_reference for c in MockSvc.return_value.buy.call_args_list]
+    assert refs == [f"{job.idempotency_key}-1", f"{job.idempotency_key}-2"]
+    assert alert.execution_status == "executed" and alert.metadata_["attempts"] == 2
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_exhausted_attempts_fail(MockSvc):
+    MockSvc.return_value.buy.side_effect = Exception("down")
+    alert = FakeAlert()
+    engine, executor, session = _engine_with_executor(alert)
+    _queued_job(alert, executor)
+
+    for _ in range(engine._ORDER_MAX_ATTEMPTS):
+        time.sleep(0.25)
+        job = executor._next_job_nowait()
+        if job is None:
+            break
+        executor.run_job(job)
+
+    assert alert.execution_status == "failed"
+    assert alert.metadata_["failure_reason"] == "all_attempts_failed"
+    assert executor.depth == 0
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_stale_or_duplicate_jobs_are_dropped(MockSvc):
+    alert = FakeAlert()
+    engine, executor, session = _engine_with_executor(alert)
+    job = _queued_job(alert, executor)
+
+    assert not executor.submit(OrderJob(str(alert.id), job.idempotency_key, job.tick_time))
+    alert.execution_status = "executed"
+    executor.run_job(executor._next_job_nowait())
+
+    assert not MockSvc.return_value.buy.called
+    assert get_metrics().snapshot()["order_jobs_duplicates"] == 2
+
+
+@patch("services.exchange.service.ExchangeService")
+def test_slow_exchange_does_not_block_ticks(MockSvc):
+    release = threading.Event()
+
+    def slow_buy(*args, **kwargs):
+        release.wait(2.0)
+        return _completed()
+
+    MockSvc.return_value.buy.side_effect = slow_buy
+    alert = FakeAlert()
+    engine, executor, session = _engine_with_executor(alert, workers=2)
+    executor.start()
+    try:
+        engine.on_price_batch({"BTCUSDT": {"bid": 86000, "ask": 86000}}, lambda: session)
+        start = time.monotonic()
+        engine.on_price_batch({"BTCUSDT": {"bid": 84000, "ask": 84000}}, lambda: session)
+        engine.on_price_batch({"ETHUSDT": {"bid": 3000, "ask": 3000}}, lambda: session)
+        assert time.monotonic() - start < 0.5
+
+        release.set()
+        deadline = time.monotonic() + 3.0
+        while alert.execution_status != "executed" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert alert.execution_status == "executed"
+    finally:
+        release.set()
+        executor.stop()
@@ -0,0 +1,160 @@
+"""PriceSnapshot : cotations + FX figées une fois par requête, partagées par valuation,
+exchange, drift et wallet statistics ; cache process à TTL court. Sans DB."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from types import MappingProxyType
+
+import pytest
+
+from services.exchange.service import ExchangeService, MarketQuoteStaleError
+from services.market_data import price_snapshot as ps_mod
+from services.market_data.fx import DEFAULT_EURUSDT_RATE, FxQuoteStaleError, get_eurusdt_rate
+from services.market_data.price_snapshot import PriceSnapshot, SnapshotQuote
+from services.portfolio_engine.bundles.drift_engine import _ExchangePriceResolver
+from services.portfolio_engine.valuation import get_asset_price_eur, get_fx_rate
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _quote(symbol, price, *, age=1, bid=None, ask=None, instrument_id=1):
+    ts = NOW - timedelta(seconds=age)
+    return SnapshotQuote(
+        provider_symbol=symbol,
+        instrument_id=instrument_id,
+        last_price=Decimal(price),
+        bid_price=Decimal(bid) if bid else None,
+        ask_price=Decimal(ask) if ask else None,
+        quote_time=ts,
+        updated_at=ts,
+    )
+
+
+def _snapshot(*quotes, symbols=()):
+    by_symbol = {q.provider_symbol: q for q in quotes}
+    return PriceSnapshot(
+        taken_at=NOW,
+        quotes=MappingProxyType(by_symbol),
+        symbols=frozenset(by_symbol) | frozenset(symbols) | {"EURUSDT"},
+    )
+
+
+def test_fx_and_prices_read_from_snapshot_without_db():
+    snap = _snapshot(_quote("EURUSDT", "1.25"), _quote("BTCUSDT", "100000"), symbols=("ETHUSDT",))
+
+    assert get_eurusdt_rate(None, strict=True, snapshot=snap) == Decimal("1.25")
+    assert get_fx_rate(None, snapshot=snap) == Decimal("1.25")
+    assert get_asset_price_eur(None, "BTC", snapshot=snap) == Decimal("80000")
+    assert get_asset_price_eur(None, "ETH", snapshot=snap) is None
+
+
+def test_asset_price_loads_symbol_missing_from_snapshot(monkeypatch):
+    loads = []
+
+    def fake_load(db, symbols=()):
+        loads.append(list(symbols))
+        return _snapshot(_quote("EURUSDT", "2"), _quote("ETHUSDT", "4000"))
+
+    monkeypatch.setattr("services.portfolio_engine.valuation.load_price_snapshot", fake_load)
+    snap = _snapshot(_quote("EURUSDT", "1.25"), _quote("BTCUSDT", "100000"))
+
+    # ETH not loaded in the snapshot: fetched on its own, FX from the caller's snapshot
+    assert get_asset_price_eur(None, "ETH", snapshot=snap) == Decimal("3200")
+    assert loads == [["ETHUSDT"]]
+
+
+def test_fx_freshness_evaluated_at_snapshot_time():
+    stale = _snapshot(_quote("EURUSDT", "1.1", age=3600))
+
+    with pytest.raises(FxQuoteStaleError):
+        stale.eurusdt_rate(strict=True)
+    assert stale.eurusdt_rate(strict=False) == Decimal("1.1")
+    assert _snapshot().eurusdt_rate(strict=False) == DEFAULT_EURUSDT_RATE
+
+
+def test_snapshot_is_immutable():
+    snap = _snapshot(_quote("EURUSDT", "1.1"))
+    with pytest.raises(Exception):
+        snap.taken_at = NOW  # type: ignore[misc]
+    with pytest.raises(TypeError):
+        snap.quotes["BTCUSDT"] = _quote("BTCUSDT", "1")  # type: ignore[index]
+
+
+class _Db:
+    """Toute requête est une erreur : le snapshot doit suffire."""
+
+    def query(self, *a, **k):
+        raise AssertionError("unexpected query")
+
+
+def test_exchange_resolve_price_uses_snapshot_for_both_swap_legs(monkeypatch):
+    monkeypatch.setattr(
+        "services.exchange.service.refresh_binance_quotes_for_provider_symbols",
+        lambda *a, **k: pytest.fail("refresh must not run when a snapshot is given"),
+    )
+    snap = _snapshot(
+        _quote("EURUSDT", "1.25"),
+        _quote("BTCUSDT", "100000", bid="99000", ask="101000"),
+        _quote("ETHUSDT", "4000", bid="3990", ask="4010", instrument_id=2),
+    )
+    svc = ExchangeService()
+
+    assert svc._resolve_price(_Db(), "BTC", None, side="sell", snapshot=snap) == Decimal("79200")
+    assert svc._resolve_price(_Db(), "ETH", None, side="buy", snapshot=snap) == Decimal("3208")
+
+
+def test_exchange_resolve_price_stale_quote_in_snapshot():
+    snap = _snapshot(_quote("EURUSDT", "1.25"), _quote("BTCUSDT", "100000", age=3600, bid="1", ask="2"))
+    with pytest.raises(MarketQuoteStaleError):
+        ExchangeService()._resolve_price(_Db(), "BTC", None, side="buy", snapshot=snap)
+
+
+class _FakeExchange:
+    def __init__(self, snap):
+        self.snap = snap
+        self.loads: list[list[str]] = []
+
+    def _load_price_snapshot(self, db, assets):
+        self.loads.append(sorted(assets))
+        return self.snap
+
+    def _resolve_price(self, db, asset, override_price=None, side="sell", snapshot=None):
+        assert snapshot is self.snap
+        return Decimal(len(asset))
+
+
+def test_drift_resolver_loads_one_snapshot_for_all_assets():
+    exchange = _FakeExchange(_snapshot())
+    resolver = _ExchangePriceResolver(None, exchange, ("BTC", "ETH", "USDC"))
+
+    for asset in ("USDC", "BTC", "ETH"):
+        resolver.resolve_price_eur(asset)
+
+    assert exchange.loads == [["BTC", "ETH", "USDC", "USDC"]]
+
+
+def test_process_cache_reuses_snapshot_within_ttl(monkeypatch):
+    loads: list[frozenset] = []
+
+    def fake_load(db, symbols=()):
+        loads.append(frozenset(symbols))
+        return _snapshot(symbols=symbols)
+
+    monkeypatch.setattr(ps_mod, "load_price_snapshot", fake_load)
+    monkeypatch.setattr(ps_mod, "MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC", 60.0)
+    ps_mod.clear_price_snapshot_cache()
+    try:
+        first = ps_mod.get_cached_price_snapshot(None, ["BTCUSDT"])
+        assert ps_mod.get_cached_price_snapshot(None, ["BTCUSDT"]) is first
+        assert ps_mod.get_cached_price_snapshot(None, []) is first
+
+        # Symbole absent : rechargé avec les symboles déjà en cache
+        ps_mod.get_cached_price_snapshot(None, ["ETHUSDT"])
+        assert loads == [frozenset({"BTCUSDT"}), frozenset({"BTCUSDT", "ETHUSDT", "EURUSDT"})]
+
+        monkeypatch.setattr(ps_mod, "MARKET_DATA_PRICE_SNAPSHOT_TTL_SEC", 0.0)
+        ps_mod.get_cached_price_snapshot(None, ["BTCUSDT"])
+        assert len(loads) == 3
+    finally:
+        ps_mod.clear_price_snapshot_cache()
@@ -70,3 +70,21 @@ def test_same_tx_hash_log_index_single_row(db: Session):
     )
     assert c1 is True
     assert c2 is False
+
+
+def test_bulk_insert_counts_inserted_and_skipped(db: Session):
+    tx_hash = f"0x{uuid.uuid4().hex}{uuid.uuid4().hex[:24]}"
+    RawOnChainEventRepository.insert_if_absent(db, data=_sample_event_data(tx_hash=tx_hash, log_index=0))
+    events = [
+        _sample_event_data(tx_hash=tx_hash, log_index=0),
+        _sample_event_data(tx_hash=tx_hash.upper().replace("0X", "0x"), log_index=1),
+        _sample_event_data(tx_hash=tx_hash, log_index=1),
+        _sample_event_data(tx_hash=tx_hash, log_index=2),
+    ]
+
+    result = RawOnChainEventRepository.bulk_insert_if_absent(db, events, batch_size=2)
+
+    assert (result.inserted, result.skipped_existing) == (2, 2)
+    assert result.inserted_keys == {(8453, tx_hash, 1), (8453, tx_hash, 2)}
+    rerun = RawOnChainEventRepository.bulk_insert_if_absent(db, events)
+    assert (rerun.inserted, rerun.skipped_existing) == (0, 4)
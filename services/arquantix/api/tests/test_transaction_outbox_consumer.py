@@ -0,0 +1,210 @@
+"""Consumer outbox multi-workers : scopes en parallèle, ordre par scope, commit par événement,
+jauges profondeur / lag / débit. File en mémoire à la place de la DB (même sémantique de claim :
+tête de scope uniquement, partition par hash du scope)."""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.transaction_outbox import consumer as consumer_mod
+from services.transaction_outbox.consumer import ConsumerSpec, OutboxConsumer
+from services.transaction_outbox.enums import OutboxEventStatus
+from services.transaction_outbox.metrics import OutboxConsumerMetrics
+from services.transaction_outbox.repository import _SCOPE_HEADS_SQL, TransactionOutboxRepository
+
+EVENT_TYPE = "intent.created"
+
+
+class FakeEvent:
+    def __init__(self, scope: str, seq: int):
+        self.id = uuid.uuid4()
+        self.intent_id = uuid.uuid4()
+        self.scope = scope
+        self.seq = seq
+        self.event_type = EVENT_TYPE
+        self.status = OutboxEventStatus.PENDING.value
+        self.created_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        self.locked_by = None
+
+
+class FakeQueue:
+    def __init__(self, events):
+        self.events = list(events)
+        self.lock = threading.Lock()
+        self.commits = 0
+
+    def claim(self, db, *, event_type, locked_by, partition=0, partitions=1, candidates=10):
+        with self.lock:
+            heads: dict[str, FakeEvent] = {}
+            for e in self.events:
+                if e.status in (OutboxEventStatus.PENDING.value, OutboxEventStatus.PROCESSING.value):
+                    heads.setdefault(e.scope, e)
+            for scope, head in heads.items():
+                if head.status != OutboxEventStatus.PENDING.value:
+                    continue
+                if zlib.crc32(scope.encode()) % partitions != partition:
+                    continue
+                head.status = OutboxEventStatus.PROCESSING.value
+                head.locked_by = locked_by
+                return head
+        return None
+
+    def stats(self, db):
+        pending = [e for e in self.events if e.status == OutboxEventStatus.PENDING.value]
+        if not pending:
+            return {}
+        return {EVENT_TYPE: {"depth": len(pending), "oldest_created_at": min(e.created_at for e in pending)}}
+
+
+class FakeSession:
+    def __init__(self, queue: FakeQueue):
+        self.queue = queue
+
+    def commit(self):
+        with self.queue.lock:
+            self.queue.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def queue_factory(monkeypatch):
+    def make(events):
+        queue = FakeQueue(events)
+        monkeypatch.setattr(TransactionOutboxRepository, "claim_next_scoped_event", staticmethod(queue.claim))
+        monkeypatch.setattr(TransactionOutboxRepository, "pending_queue_stats", staticmethod(queue.stats))
+        return queue
+
+    return make
+
+
+class Recorder:
+    def __init__(self, delay=0.0, slow_scope=None, slow_delay=0.0):
+        self.delay = delay
+        self.slow_scope = slow_scope
+        self.slow_delay = slow_delay
+        self.lock = threading.Lock()
+        self.order: dict[str, list[int]] = {}
+        self.active = 0
+        self.peak = 0
+        self.active_scopes: set[str] = set()
+        self.overlap = False
+
+    def __call__(self, db, event):
+        with self.lock:
+            if event.scope in self.active_scopes:
+                self.overlap = True
+            self.active_scopes.add(event.scope)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.slow_delay if event.scope == self.slow_scope else self.delay)
+        with self.lock:
+            self.order.setdefault(event.scope, []).append(event.seq)
+            self.active -= 1
+            self.active_scopes.discard(event.scope)
+        event.status = OutboxEventStatus.PROCESSED.value
+        return "processed", None
+
+
+def _consumer(queue, handler, *, workers):
+    return OutboxConsumer(
+        lambda: FakeSession(queue),
+        workers=workers,
+        specs=[ConsumerSpec(EVENT_TYPE, lambda: True, handler)],
+        idle_seconds=0.01,
+        metrics=OutboxConsumerMetrics(),
+    )
+
+
+def _run_until_drained(consumer, queue, timeout=5.0):
+    consumer.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if all(e.status == OutboxEventStatus.PROCESSED.value for e in queue.events):
+                return
+            time.sleep(0.01)
+        raise AssertionError("queue not drained")
+    finally:
+        consumer.stop()
+
+
+def test_scopes_run_in_parallel_with_order_preserved(queue_factory):
+    scopes = [f"person-{i}" for i in range(8)]
+    queue = queue_factory([FakeEvent(s, seq) for seq in range(4) for s in scopes])
+    handler = Recorder(delay=0.01)
+
+    _run_until_drained(_consumer(queue, handler, workers=4), queue)
+
+    assert all(handler.order[s] == [0, 1, 2, 3] for s in scopes)
+    assert not handler.overlap and handler.peak > 1
+    assert queue.commits == 32
+
+
+def test_slow_scope_does_not_hold_back_other_scopes(queue_factory):
+    queue = queue_factory([FakeEvent("slow", 0)] + [FakeEvent(f"fast-{i}", 0) for i in range(12)])
+    handler = Recorder(delay=0.0, slow_scope="slow", slow_delay=0.4)
+    consumer = _consumer(queue, handler, workers=3)
+
+    consumer.start()
+    try:
+        time.sleep(0.25)
+        done = {s for s, seqs in handler.order.items() if seqs}
+        slow_partition = zlib.crc32(b"slow") % 3
+        other_partitions_scopes = {f"fast-{i}" for i in range(12) if zlib.crc32(f"fast-{i}".encode()) % 3 != slow_partition}
+        assert other_partitions_scopes <= done and "slow" not in done
+    finally:
+        consumer.stop()
+
+
+def test_handler_requeue_outcome_delays_event(queue_factory, monkeypatch):
+    queue = queue_factory([FakeEvent("p", 0)])
+    released = []
+
+    def release(db, row, *, retry_delay_seconds=None):
+        row.status = OutboxEventStatus.PENDING.value
+        released.append(retry_delay_seconds)
+
+    monkeypatch.setattr(TransactionOutboxRepository, "release_processing_lock", staticmethod(release))
+
+    def deferred(db, event):
+        event.status = OutboxEventStatus.PENDING.value
+        return "deferred_same_scope", None
+
+    consumer = _consumer(queue, deferred, workers=1)
+    assert consumer.run_one(consumer.specs[0], partition=0, locked_by="w#0") is True
+    assert released == [consumer_mod._REQUEUE_DELAY_SECONDS]
+    assert consumer.metrics.snapshot()["event_types"][EVENT_TYPE]["outcomes"] == {"deferred_same_scope": 1}
+
+
+def test_gauges_expose_depth_lag_and_throughput(queue_factory):
+    queue = queue_factory([FakeEvent("a", 0), FakeEvent("a", 1), FakeEvent("b", 0)])
+    consumer = _consumer(queue, Recorder(), workers=1)
+
+    consumer.refresh_queue_stats()
+    before = consumer.snapshot()["event_types"][EVENT_TYPE]
+    assert before["queue_depth"] == 3 and before["queue_lag_seconds"] >= 1.0
+
+    while consumer.run_one(consumer.specs[0], partition=0, locked_by="w#0"):
+        pass
+    consumer.refresh_queue_stats()
+    after = consumer.snapshot()["event_types"][EVENT_TYPE]
+    assert after["queue_depth"] == 0 and after["outcomes"] == {"processed": 3}
+    assert after["throughput_per_s"] == pytest.approx(3 / 60.0, abs=1e-3)
+    assert after["pickup_lag_p50_s"] >= 1.0
+
+
+def test_scope_heads_sql_partitions_by_person_scope():
+    sql = str(_SCOPE_HEADS_SQL.compile(dialect=postgresql.dialect()))
+    assert "row_number() OVER" in sql and "PARTITION BY coalesce(i.person_id::text" in sql
+    assert "hashtext(scope)" in sql and "rn = 1" in sql
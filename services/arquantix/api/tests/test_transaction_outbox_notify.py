@@ -0,0 +1,183 @@
+"""Réveil outbox LISTEN/NOTIFY : pg_notify à l'insertion, drain du listener, poll de sécurité.
+Sans DB : session / connexion factices."""
+from __future__ import annotations
+
+import socket
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from services.transaction_outbox import notify
+from services.transaction_outbox.enums import OutboxEventStatus, OutboxEventType
+from services.transaction_outbox.notify import OutboxHandler, OutboxWakeupListener
+from services.transaction_outbox.repository import TransactionOutboxRepository
+
+
+class FakeSession:
+    def __init__(self, dialect: str = "postgresql"):
+        self.dialect = dialect
+        self.executed: list[tuple[str, dict]] = []
+        self.added = []
+        self.closed = 0
+        self.rolled_back = 0
+
+    def get_bind(self):
+        return SimpleNamespace(dialect=SimpleNamespace(name=self.dialect))
+
+    def execute(self, stmt, params=None):
+        self.executed.append((str(stmt), params))
+
+    def add(self, row):
+        self.added.append(row)
+
+    def flush(self):
+        pass
+
+    def rollback(self):
+        self.rolled_back += 1
+
+    def close(self):
+        self.closed += 1
+
+
+def test_insert_event_notifies_pending_rows_only():
+    db = FakeSession()
+    TransactionOutboxRepository.insert_event(db, intent_id=uuid.uuid4(), event_type=OutboxEventType.INTENT_CREATED.value)
+    TransactionOutboxRepository.insert_event(
+        db,
+        intent_id=uuid.uuid4(),
+        event_type=OutboxEventType.INTENT_SETTLE.value,
+        status=OutboxEventStatus.PROCESSED.value,
+    )
+
+    assert len(db.added) == 2
+    assert len(db.executed) == 1
+    sql, params = db.executed[0]
+    assert "pg_notify" in sql
+    assert params == {"channel": notify.OUTBOX_NOTIFY_CHANNEL, "payload": "intent.created"}
+
+
+def test_notify_skipped_outside_postgres_or_when_disabled(monkeypatch):
+    sqlite = FakeSession(dialect="sqlite")
+    notify.notify_outbox_event(sqlite, "intent.created")
+    monkeypatch.setattr(notify, "OUTBOX_NOTIFY_ENABLED", False)
+    pg = FakeSession()
+    notify.notify_outbox_event(pg, "intent.created")
+
+    assert sqlite.executed == [] and pg.executed == []
+
+
+class QueueHandler:
+    """File factice : ``pending`` événements, traités par lots de ``limit``."""
+
+    def __init__(self, pending: int, *, deferred: bool = False):
+        self.pending = pending
+        self.deferred = deferred
+        self.calls = 0
+
+    def __call__(self, db, *, limit):
+        self.calls += 1
+        batch = min(limit, self.pending)
+        if self.deferred:
+            return {"polled": batch, "processed": 0, "failed": 0}
+        self.pending -= batch
+        return {"polled": batch, "processed": batch, "failed": 0}
+
+
+def _listener(*handlers: OutboxHandler) -> tuple[OutboxWakeupListener, list[FakeSession]]:
+    sessions: list[FakeSession] = []
+
+    def factory():
+        sessions.append(FakeSession())
+        return sessions[-1]
+
+    return OutboxWakeupListener(factory, handlers=list(handlers)), sessions
+
+
+def test_drain_empties_notified_queue_only():
+    created = QueueHandler(45)
+    settle = QueueHandler(3)
+    listener, sessions = _listener(
+        OutboxHandler("intent.created", lambda: True, created, 20),
+        OutboxHandler("intent.settle", lambda: True, settle, 20),
+    )
+
+    out = listener.drain({"intent.created"})
+
+    assert out == {"intent.created": {"processed": 45, "failed": 0}}
+    assert created.calls == 3 and settle.calls == 0
+    assert all(s.closed == 1 for s in sessions)
+    assert listener.snapshot()["drain_passes"] == 3
+
+
+def test_drain_stops_when_nothing_processed_and_skips_disabled():
+    blocked = QueueHandler(20, deferred=True)
+    disabled = QueueHandler(5)
+    listener, _ = _listener(
+        OutboxHandler("intent.created", lambda: True, blocked, 20),
+        OutboxHandler("intent.execute", lambda: False, disabled, 10),
+    )
+
+    listener.drain()
+
+    assert blocked.calls == 1 and disabled.calls == 0
+
+
+def test_drain_handler_error_is_recorded():
+    def boom(db, *, limit):
+        raise RuntimeError("db gone")
+
+    listener, sessions = _listener(OutboxHandler("intent.created", lambda: True, boom, 20))
+
+    listener.drain()
+
+    assert listener.last_error == "db gone"
+    assert sessions[0].rolled_back == 1 and sessions[0].closed == 1
+
+
+class FakeConn:
+    def __init__(self):
+        self._sock, self._peer = socket.socketpair()
+        self.notifies: list = []
+        self._incoming: list = []
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def send(self, *payloads):
+        self._incoming.extend(SimpleNamespace(payload=p) for p in payloads)
+        self._peer.send(b"x")
+
+    def poll(self):
+        self._sock.recv(64)
+        self.notifies.extend(self._incoming)
+        self._incoming.clear()
+
+    def close(self):
+        self._sock.close()
+        self._peer.close()
+
+
+def test_collect_coalesces_notifications_and_times_out():
+    conn = FakeConn()
+    try:
+        assert OutboxWakeupListener._collect(conn, 0.01) is None
+
+        conn.send("intent.created", "intent.created", "intent.settle")
+        assert OutboxWakeupListener._collect(conn, 1.0) == {"intent.created", "intent.settle"}
+        assert conn.notifies == []
+    finally:
+        conn.close()
+
+
+def test_start_listener_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(notify, "OUTBOX_LISTEN_ENABLED", False)
+    assert notify.start_outbox_wakeup_listener() is False
+    assert notify.get_outbox_listener() is None
+
+
+@pytest.mark.parametrize("handler", notify.default_outbox_handlers())
+def test_default_handlers_match_tick_limits(handler):
+    expected = {"intent.created": 20, "intent.execute": 10, "intent.settle": 20}
+    assert handler.limit == expected[handler.event_type]
@@ -13,6 +13,7 @@ import { CoreSatelliteCharts } from '@/components/backtests/CoreSatelliteCharts'
 import type { InstrumentInfo, Bundle, BacktestCreateRequest, BacktestDetailResponse, SeriesResponse } from '@/components/backtests/types'
 import { Play, BarChart3, Package } from 'lucide-react'
 import { z } from 'zod'
+import { waitForBacktestRun } from '@/lib/admin/backtestRunPolling'
 
 export function BacktestsTab() {
   const router = useRouter()
@@ -266,9 +267,15 @@ export function BacktestsTab() {
         return
       }
 
-      toastSuccess('Backtest lancé avec succès')
+      toastSuccess(data.reused ? 'Résultat d’un backtest identique réutilisé' : 'Backtest lancé avec succès')
       setRunId(data.run_id)
 
+      // Le run est exécuté en tâche de fond : attendre la fin avant de charger les séries
+      const finalStatus = await waitForBacktestRun(data.run_id)
+      if (finalStatus && finalStatus !== 'SUCCESS') {
+        toastError(`Backtest ${finalStatus === 'CANCELLED' ? 'annulé' : 'en échec'}`)
+      }
+
       // Load results (chart will appear on the right)
       await loadResults(data.run_id)
     } catch (error: any) {
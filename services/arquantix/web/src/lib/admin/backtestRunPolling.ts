@@ -0,0 +1,26 @@
+/**
+ * Les backtests sont exécutés par un pool de workers côté API : POST /api/backtests/run
+ * renvoie un run PENDING. On interroge le détail jusqu’à un statut terminal.
+ */
+
+const TERMINAL_STATUSES = new Set(['SUCCESS', 'FAILED', 'CANCELLED'])
+
+export async function waitForBacktestRun(
+  runId: number,
+  options: { intervalMs?: number; timeoutMs?: number } = {},
+): Promise<string | null> {
+  const intervalMs = options.intervalMs ?? 1500
+  const deadline = Date.now() + (options.timeoutMs ?? 15 * 60 * 1000)
+  while (Date.now() < deadline) {
+    const res = await fetch(`/api/backtests/${runId}`, { credentials: 'include' })
+    if (res.ok) {
+      const data = await res.json()
+      const status: string | undefined = data?.run?.status
+      if (status && TERMINAL_STATUSES.has(status)) {
+        return status
+      }
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+  return null
+}